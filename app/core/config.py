@@ -81,10 +81,16 @@ class Settings(BaseSettings):
     QUEUE_VISIBILITY_TIMEOUT: int = Field(default=300)  # 5分钟
     QUEUE_MAX_RETRIES: int = Field(default=3)
     WORKER_HEARTBEAT_INTERVAL: int = Field(default=30)  # 30秒
+    # 单个 Worker 进程同时执行的分析任务数（槽位数）
+    WORKER_CONCURRENCY: int = Field(default=1)
+    # SimpleAnalysisService 分析线程池大小
+    ANALYSIS_THREAD_POOL_SIZE: int = Field(default=3)
 
 
     # 队列轮询/清理间隔（秒）
     QUEUE_POLL_INTERVAL_SECONDS: float = Field(default=1.0)
+    # 阻塞出队（BLMOVE）等待时间，0 表示退回轮询模式；需小于 Redis socket_timeout（10秒）
+    QUEUE_BLOCK_TIMEOUT_SECONDS: float = Field(default=5.0)
     QUEUE_CLEANUP_INTERVAL_SECONDS: float = Field(default=60.0)
 
     # 并发控制
@@ -96,6 +102,14 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = Field(default=True)
     DEFAULT_RATE_LIMIT: int = Field(default=100)  # 每分钟请求数
 
+    # 操作日志异步批量写入（write-behind）
+    OPLOG_BUFFER_MAX_SIZE: int = Field(default=10000)
+    OPLOG_FLUSH_BATCH_SIZE: int = Field(default=200)
+    OPLOG_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0)
+    # 缓冲区满时的处理策略：drop=丢弃新日志，spill=追加到本地 JSONL，下次启动时回放
+    OPLOG_OVERFLOW_POLICY: str = Field(default="drop")
+    OPLOG_SPILL_PATH: str = Field(default="data/logs/operation_log_spill.jsonl")
+
     # 日志配置
     LOG_LEVEL: str = Field(default="INFO")
     LOG_FORMAT: str = Field(default="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -119,6 +133,8 @@ class Settings(BaseSettings):
     # 缓存配置
     CACHE_TTL: int = Field(default=3600)  # 1小时
     SCREENING_CACHE_TTL: int = Field(default=1800)  # 30分钟
+    # 选股使用批量加载 + 向量化指标（关闭后退回逐只股票计算）
+    SCREENING_VECTORIZED_ENABLED: bool = Field(default=True)
 
     # 安全配置
     BCRYPT_ROUNDS: int = Field(default=12)
@@ -158,6 +174,11 @@ class Settings(BaseSettings):
     # 时区
     TIMEZONE: str = Field(default="Asia/Shanghai")
 
+    # 周线/月线由日线按需重采样生成（tradingagents/dataflows/resample.py），
+    # 开启后多周期同步默认只同步日线；显式指定 periods 时仍按指定周期同步。
+    # 开启时K线读路径也始终由日线重采样周线/月线，不读取存储中已停止更新的周线/月线
+    MULTI_PERIOD_SYNC_RESAMPLE_DERIVED: bool = Field(default=True)
+
     # 实时行情入库任务
     QUOTES_INGEST_ENABLED: bool = Field(default=True)
     QUOTES_INGEST_INTERVAL_SECONDS: int = Field(
@@ -1,109 +1,261 @@
 """
 速率限制器
 用于控制API调用频率，避免超过数据源的限流限制
+
+令牌桶实现：
+- 每次调用在锁内只计算自己的“预约时刻”（令牌可以透支，透支量决定等待时间），
+  释放锁后再各自 sleep，等待者之间互不阻塞
+- 可选 Redis 共享令牌桶（Lua 脚本原子预约），多个 Worker 进程分摊同一个数据源配额；
+  Redis 不可用时自动降级为进程内令牌桶
+- 不同 API 可以配置不同的令牌消耗（权重）
 """
 import asyncio
+import math
+import threading
 import time
 import logging
 from collections import deque
-from typing import Optional
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 
+# Redis 共享令牌桶：原子地补充令牌并预约 cost 个令牌，返回需要等待的秒数（字符串）
+# 使用服务端 TIME，避免各进程时钟不一致
+TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+if now > ts then
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    ts = now
+end
+tokens = tokens - cost
+redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(ts))
+redis.call('PEXPIRE', key, math.ceil((capacity - tokens) / rate * 1000) + 60000)
+local wait = 0
+if tokens < 0 then
+    wait = -tokens / rate
+end
+return tostring(wait)
+"""
+
+REDIS_KEY_PREFIX = "rate_limit:bucket:"
+
+# Redis 调用失败后，多久之后再尝试共享令牌桶（秒）
+REDIS_RETRY_INTERVAL = 30.0
+
+# 等待时间分位数统计的样本数
+WAIT_SAMPLES = 1000
+
+
 class RateLimiter:
     """
-    滑动窗口速率限制器
-    
-    使用滑动窗口算法精确控制API调用频率
+    令牌桶速率限制器
+
+    平均速率为 max_calls / time_window，最多允许 burst 次突发调用。
+    任意 time_window 内的调用次数不超过 max_calls + burst。
     """
-    
-    def __init__(self, max_calls: int, time_window: float, name: str = "RateLimiter"):
+
+    def __init__(
+        self,
+        max_calls: int,
+        time_window: float,
+        name: str = "RateLimiter",
+        burst: Optional[int] = None,
+        api_costs: Optional[Dict[str, float]] = None,
+        distributed: bool = True,
+        redis=None,
+    ):
         """
         初始化速率限制器
-        
+
         Args:
             max_calls: 时间窗口内最大调用次数
             time_window: 时间窗口大小（秒）
-            name: 限制器名称（用于日志）
+            name: 限制器名称（用于日志，也是 Redis 共享桶的键名）
+            burst: 令牌桶容量（允许的突发调用次数），默认为 max_calls 的 10%，至少为 1
+            api_costs: 各 API 的令牌消耗，如 {"daily": 1, "stk_mins": 5}，未配置的 API 消耗 1
+            distributed: 是否在 Redis 可用时使用跨进程共享的令牌桶
+            redis: 指定 Redis 客户端（redis.asyncio），默认使用 app.core.redis_client 的全局连接
         """
         self.max_calls = max_calls
         self.time_window = time_window
         self.name = name
-        self.calls = deque()  # 存储调用时间戳
-        self.lock = asyncio.Lock()  # 确保线程安全
-        
+        self.rate = max_calls / time_window  # 每秒补充的令牌数
+        # 容量为 0 时令牌永远不会累积到 1，调用会无限等待，因此至少为 1
+        self.capacity = float(max(1, burst if burst is not None else max_calls // 10))
+        self.api_costs: Dict[str, float] = dict(api_costs or {})
+        self.distributed = distributed
+
+        # 进程内令牌桶状态；锁内只做计算，不 sleep
+        self.lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+        self._redis = redis
+        self._script = None
+        self._redis_disabled_until = 0.0
+
         # 统计信息
+        self.calls = deque()  # 最近一个时间窗口内的调用时间戳
         self.total_calls = 0
+        self.total_cost = 0.0
         self.total_waits = 0
         self.total_wait_time = 0.0
-        
-        logger.info(f"🔧 {self.name} 初始化: {max_calls}次/{time_window}秒")
-    
-    async def acquire(self):
+        self.max_wait_time = 0.0
+        self.burst_calls = 0  # 无需等待直接获得令牌的调用
+        self.max_burst = 0  # 最长的连续无等待调用
+        self._current_burst = 0
+        self._wait_samples = deque(maxlen=WAIT_SAMPLES)
+
+        logger.info(f"🔧 {self.name} 初始化: {max_calls}次/{time_window}秒, 突发容量 {self.capacity:g}")
+
+    def cost_of(self, api: Optional[str]) -> float:
+        """获取某个 API 的令牌消耗"""
+        return self.api_costs.get(api, 1.0) if api else 1.0
+
+    async def acquire(self, api: Optional[str] = None, cost: Optional[float] = None):
         """
         获取调用许可
         如果超过速率限制，会等待直到可以调用
+
+        Args:
+            api: API 名称，用于查找 api_costs 中的权重
+            cost: 直接指定令牌消耗（优先于 api）
         """
-        async with self.lock:
+        if cost is None:
+            cost = self.cost_of(api)
+
+        wait_time = await self._reserve(cost)
+        self._record(cost, wait_time)
+
+        if wait_time > 0:
+            logger.debug(f"⏳ {self.name} 达到速率限制，等待 {wait_time:.2f}秒")
+            await asyncio.sleep(wait_time)
+
+    async def _reserve(self, cost: float) -> float:
+        """预约 cost 个令牌，返回需要等待的秒数"""
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                if self._script is None:
+                    self._script = redis.register_script(TOKEN_BUCKET_LUA)
+                result = await self._script(
+                    keys=[REDIS_KEY_PREFIX + self.name],
+                    args=[self.rate, self.capacity, cost],
+                )
+                return float(result)
+            except Exception as e:
+                logger.warning(f"⚠️ {self.name} 共享令牌桶不可用，{REDIS_RETRY_INTERVAL:.0f}秒内使用进程内令牌桶: {e}")
+                self._redis_disabled_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                self._script = None
+        return self._reserve_local(cost)
+
+    def _reserve_local(self, cost: float) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= cost
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def _get_redis(self):
+        if not self.distributed or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is not None:
+            return self._redis
+        try:
+            from app.core import redis_client
+            return redis_client.redis_client
+        except Exception:
+            return None
+
+    def _record(self, cost: float, wait_time: float):
+        with self.lock:
             now = time.time()
-            
-            # 移除时间窗口外的旧调用记录
+            self.calls.append(now + wait_time)
             while self.calls and self.calls[0] <= now - self.time_window:
                 self.calls.popleft()
-            
-            # 如果当前窗口内调用次数已达上限，需要等待
-            if len(self.calls) >= self.max_calls:
-                # 计算需要等待的时间
-                oldest_call = self.calls[0]
-                wait_time = oldest_call + self.time_window - now + 0.01  # 加一点缓冲
-                
-                if wait_time > 0:
-                    self.total_waits += 1
-                    self.total_wait_time += wait_time
-                    
-                    logger.debug(f"⏳ {self.name} 达到速率限制，等待 {wait_time:.2f}秒")
-                    await asyncio.sleep(wait_time)
-                    
-                    # 重新获取当前时间
-                    now = time.time()
-                    
-                    # 再次清理旧记录
-                    while self.calls and self.calls[0] <= now - self.time_window:
-                        self.calls.popleft()
-            
-            # 记录本次调用
-            self.calls.append(now)
             self.total_calls += 1
-    
+            self.total_cost += cost
+            self._wait_samples.append(wait_time)
+            if wait_time > 0:
+                self.total_waits += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+                self._current_burst = 0
+            else:
+                self.burst_calls += 1
+                self._current_burst += 1
+                self.max_burst = max(self.max_burst, self._current_burst)
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._get_redis() is not None else "local"
+
     def get_stats(self) -> dict:
         """获取统计信息"""
-        return {
-            "name": self.name,
-            "max_calls": self.max_calls,
-            "time_window": self.time_window,
-            "current_calls": len(self.calls),
-            "total_calls": self.total_calls,
-            "total_waits": self.total_waits,
-            "total_wait_time": self.total_wait_time,
-            "avg_wait_time": self.total_wait_time / self.total_waits if self.total_waits > 0 else 0
-        }
-    
+        with self.lock:
+            now = time.time()
+            while self.calls and self.calls[0] <= now - self.time_window:
+                self.calls.popleft()
+            samples = sorted(self._wait_samples)
+            tokens = min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+            return {
+                "name": self.name,
+                "backend": self.backend,
+                "max_calls": self.max_calls,
+                "time_window": self.time_window,
+                "rate_per_second": self.rate,
+                "burst_capacity": self.capacity,
+                "tokens_available": round(tokens, 2) if self.backend == "local" else None,
+                "current_calls": len(self.calls),
+                "total_calls": self.total_calls,
+                "total_cost": self.total_cost,
+                "burst_calls": self.burst_calls,
+                "max_burst": self.max_burst,
+                "total_waits": self.total_waits,
+                "total_wait_time": self.total_wait_time,
+                "avg_wait_time": self.total_wait_time / self.total_waits if self.total_waits > 0 else 0,
+                "max_wait_time": self.max_wait_time,
+                "p95_wait_time": samples[min(len(samples) - 1, math.ceil(len(samples) * 0.95) - 1)] if samples else 0,
+            }
+
     def reset_stats(self):
         """重置统计信息"""
-        self.total_calls = 0
-        self.total_waits = 0
-        self.total_wait_time = 0.0
+        with self.lock:
+            self.calls.clear()
+            self.total_calls = 0
+            self.total_cost = 0.0
+            self.total_waits = 0
+            self.total_wait_time = 0.0
+            self.max_wait_time = 0.0
+            self.burst_calls = 0
+            self.max_burst = 0
+            self._current_burst = 0
+            self._wait_samples.clear()
         logger.info(f"🔄 {self.name} 统计信息已重置")
 
 
 class TushareRateLimiter(RateLimiter):
     """
     Tushare专用速率限制器
-    
+
     根据Tushare的积分等级自动调整限流策略
     """
-    
+
     # Tushare积分等级对应的限流配置
     TIER_LIMITS = {
         "free": {"max_calls": 100, "time_window": 60},      # 免费用户: 100次/分钟
@@ -112,11 +264,26 @@ class TushareRateLimiter(RateLimiter):
         "premium": {"max_calls": 600, "time_window": 60},   # 高级用户: 600次/分钟
         "vip": {"max_calls": 800, "time_window": 60},       # VIP用户: 800次/分钟
     }
-    
+
+    # 各接口的令牌消耗（分钟线、财务报表等重接口按更高权重计）
+    API_COSTS = {
+        # ts.pro_bar(adj='qfq') 内部调用 daily + adj_factor
+        "pro_bar": 2,
+        "stk_mins": 5,
+        "income": 2,
+        "balancesheet": 2,
+        "cashflow": 2,
+        "fina_indicator": 2,
+        # provider.get_financial_data 依次调用 income/balancesheet/cashflow/fina_indicator
+        "financial_data": 8,
+        # provider.get_market_daily 依次调用 daily/adj_factor/daily_basic
+        "market_daily": 3,
+    }
+
     def __init__(self, tier: str = "standard", safety_margin: float = 0.8):
         """
         初始化Tushare速率限制器
-        
+
         Args:
             tier: 积分等级 (free/basic/standard/premium/vip)
             safety_margin: 安全边际（0-1），实际限制为理论限制的百分比
@@ -124,22 +291,23 @@ class TushareRateLimiter(RateLimiter):
         if tier not in self.TIER_LIMITS:
             logger.warning(f"⚠️ 未知的Tushare积分等级: {tier}，使用默认值 'standard'")
             tier = "standard"
-        
+
         limits = self.TIER_LIMITS[tier]
-        
+
         # 应用安全边际
         max_calls = int(limits["max_calls"] * safety_margin)
         time_window = limits["time_window"]
-        
+
         super().__init__(
             max_calls=max_calls,
             time_window=time_window,
-            name=f"TushareRateLimiter({tier})"
+            name=f"TushareRateLimiter({tier})",
+            api_costs=self.API_COSTS,
         )
-        
+
         self.tier = tier
         self.safety_margin = safety_margin
-        
+
         logger.info(f"✅ Tushare速率限制器已配置: {tier}等级, "
                    f"{max_calls}次/{time_window}秒 (安全边际: {safety_margin*100:.0f}%)")
 
@@ -147,14 +315,14 @@ class TushareRateLimiter(RateLimiter):
 class AKShareRateLimiter(RateLimiter):
     """
     AKShare专用速率限制器
-    
+
     AKShare没有明确的限流规则，使用保守的限流策略
     """
-    
+
     def __init__(self, max_calls: int = 60, time_window: float = 60):
         """
         初始化AKShare速率限制器
-        
+
         Args:
             max_calls: 时间窗口内最大调用次数（默认60次/分钟）
             time_window: 时间窗口大小（秒）
@@ -162,21 +330,23 @@ class AKShareRateLimiter(RateLimiter):
         super().__init__(
             max_calls=max_calls,
             time_window=time_window,
-            name="AKShareRateLimiter"
+            name="AKShareRateLimiter",
+            # 全市场快照/列表类接口一次返回数千行，按更高权重计
+            api_costs={"stock_zh_a_spot_em": 5, "stock_info_a_code_name": 5},
         )
 
 
 class BaoStockRateLimiter(RateLimiter):
     """
     BaoStock专用速率限制器
-    
+
     BaoStock没有明确的限流规则，使用保守的限流策略
     """
-    
+
     def __init__(self, max_calls: int = 100, time_window: float = 60):
         """
         初始化BaoStock速率限制器
-        
+
         Args:
             max_calls: 时间窗口内最大调用次数（默认100次/分钟）
             time_window: 时间窗口大小（秒）
@@ -188,10 +358,20 @@ class BaoStockRateLimiter(RateLimiter):
         )
 
 
+# 其他数据源的默认限流配置（次/时间窗口秒）
+PROVIDER_LIMITS = {
+    "yfinance": {"max_calls": 60, "time_window": 60},
+    "finnhub": {"max_calls": 50, "time_window": 60},   # 免费版 60次/分钟
+    "example_sdk": {"max_calls": 100, "time_window": 60},
+    "news": {"max_calls": 60, "time_window": 60},
+}
+
+
 # 全局速率限制器实例
 _tushare_limiter: Optional[TushareRateLimiter] = None
 _akshare_limiter: Optional[AKShareRateLimiter] = None
 _baostock_limiter: Optional[BaoStockRateLimiter] = None
+_provider_limiters: Dict[str, RateLimiter] = {}
 
 
 def get_tushare_rate_limiter(tier: str = "standard", safety_margin: float = 0.8) -> TushareRateLimiter:
@@ -218,11 +398,27 @@ def get_baostock_rate_limiter() -> BaoStockRateLimiter:
     return _baostock_limiter
 
 
+def get_provider_rate_limiter(provider: str) -> RateLimiter:
+    """获取数据源的速率限制器（按名称单例），tushare/akshare/baostock 返回各自的专用限制器"""
+    if provider == "tushare":
+        return get_tushare_rate_limiter()
+    if provider == "akshare":
+        return get_akshare_rate_limiter()
+    if provider == "baostock":
+        return get_baostock_rate_limiter()
+    limiter = _provider_limiters.get(provider)
+    if limiter is None:
+        limits = PROVIDER_LIMITS.get(provider, {"max_calls": 60, "time_window": 60})
+        limiter = RateLimiter(name=f"{provider}RateLimiter", **limits)
+        _provider_limiters[provider] = limiter
+    return limiter
+
+
 def reset_all_limiters():
     """重置所有速率限制器"""
     global _tushare_limiter, _akshare_limiter, _baostock_limiter
     _tushare_limiter = None
     _akshare_limiter = None
     _baostock_limiter = None
+    _provider_limiters.clear()
     logger.info("🔄 所有速率限制器已重置")
-
@@ -253,6 +253,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.getLogger("webapi").warning(f"Failed to apply dynamic settings: {e}")
 
+    # 启动操作日志异步写入器
+    try:
+        from app.services.operation_log_writer import get_operation_log_writer
+        await get_operation_log_writer().start()
+    except Exception as e:
+        logger.warning(f"⚠️ 操作日志异步写入器启动失败，将同步写入: {e}")
+
     # 显示配置摘要
     await _print_config_summary(logger)
 
@@ -703,6 +710,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"UserService cleanup error: {e}")
 
+        # 写完缓冲中的操作日志（需在关闭数据库连接之前）
+        try:
+            from app.services.operation_log_writer import get_operation_log_writer
+            await get_operation_log_writer().stop()
+        except Exception as e:
+            logger.warning(f"OperationLogWriter shutdown error: {e}")
+
         await close_db()
         logger.info("TradingAgents FastAPI backend stopped")
 
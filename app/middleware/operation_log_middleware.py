@@ -10,8 +10,9 @@ from typing import Optional, Dict, Any
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
-from app.services.operation_log_service import log_operation
-from app.models.operation_log import ActionType
+from app.services.operation_log_service import build_log_doc, get_operation_log_service
+from app.services.operation_log_writer import get_operation_log_writer
+from app.models.operation_log import ActionType, OperationLogCreate
 
 logger = logging.getLogger("webapi")
 
@@ -77,7 +78,7 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
         # 计算耗时
         duration_ms = int((time.time() - start_time) * 1000)
 
-        # 异步记录操作日志
+        # 记录操作日志（写入器运行时只入队，不等待写库）
         if user_info:
             try:
                 await self._log_operation(
@@ -260,10 +261,7 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
             if not success:
                 error_message = f"HTTP {response.status_code}"
 
-            # 记录操作日志
-            await log_operation(
-                user_id=user_info.get("id", ""),
-                username=user_info.get("username", "unknown"),
+            log_data = OperationLogCreate(
                 action_type=action_type,
                 action=action,
                 details=details,
@@ -274,11 +272,24 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
                 user_agent=user_agent,
                 session_id=user_info.get("session_id")
             )
+            await _write_log(
+                user_info.get("id", ""), user_info.get("username", "unknown"), log_data, ip_address, user_agent
+            )
 
         except Exception as e:
             logger.error(f"记录操作日志失败: {e}")
 
 
+async def _write_log(user_id: str, username: str, log_data: OperationLogCreate,
+                     ip_address: Optional[str], user_agent: Optional[str]):
+    """写入操作日志：写入器运行时入队批量写入，否则（如脚本/测试环境）直接写库"""
+    writer = get_operation_log_writer()
+    if writer.running:
+        writer.enqueue(build_log_doc(user_id, username, log_data, ip_address, user_agent))
+        return
+    await get_operation_log_service().create_log(user_id, username, log_data, ip_address, user_agent)
+
+
 # 便捷函数：手动记录操作日志
 async def manual_log_operation(
     request: Request,
@@ -295,9 +306,7 @@ async def manual_log_operation(
         ip_address = request.client.host if request.client else "unknown"
         user_agent = request.headers.get("user-agent", "")
 
-        await log_operation(
-            user_id=user_info.get("id", ""),
-            username=user_info.get("username", "unknown"),
+        log_data = OperationLogCreate(
             action_type=action_type,
             action=action,
             details=details,
@@ -308,5 +317,8 @@ async def manual_log_operation(
             user_agent=user_agent,
             session_id=user_info.get("session_id")
         )
+        await _write_log(
+            user_info.get("id", ""), user_info.get("username", "unknown"), log_data, ip_address, user_agent
+        )
     except Exception as e:
         logger.error(f"手动记录操作日志失败: {e}")
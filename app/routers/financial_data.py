@@ -31,7 +31,12 @@ class FinancialSyncRequest(BaseModel):
         description="报告类型列表 (quarterly/annual)"
     )
     batch_size: int = Field(50, description="批处理大小", ge=1, le=200)
-    delay_seconds: float = Field(1.0, description="API调用延迟秒数", ge=0.1, le=10.0)
+    delay_seconds: Optional[float] = Field(
+        None,
+        description="同一数据源两次API调用之间的最小间隔秒数（在数据源速率限制之外额外限速），为空则只按数据源速率限制",
+        ge=0.1,
+        le=10.0
+    )
 
 
 class SingleStockSyncRequest(BaseModel):
@@ -9,7 +9,7 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 
-from app.worker.multi_period_sync_service import get_multi_period_sync_service
+from app.worker.multi_period_sync_service import default_sync_periods, get_multi_period_sync_service
 
 logger = logging.getLogger(__name__)
 
@@ -176,7 +176,7 @@ async def start_all_history_sync(
         background_tasks.add_task(
             service.sync_multi_period_data,
             symbols=symbols,
-            periods=periods or ["daily", "weekly", "monthly"],
+            periods=periods or default_sync_periods(),
             data_sources=data_sources or ["tushare", "akshare", "baostock"],
             all_history=True
         )
@@ -186,7 +186,7 @@ async def start_all_history_sync(
             message="全历史数据同步已启动（从1990年开始）",
             data={
                 "sync_type": "all_history",
-                "periods": periods or ["daily", "weekly", "monthly"],
+                "periods": periods or default_sync_periods(),
                 "data_sources": data_sources or ["tushare", "akshare", "baostock"],
                 "date_range": "1990-01-01 到 今天",
                 "start_time": datetime.utcnow().isoformat(),
@@ -326,13 +326,13 @@ async def get_supported_periods():
                 {
                     "code": "weekly",
                     "name": "周线",
-                    "description": "每周交易数据",
+                    "description": "每周交易数据（未同步时由日线重采样生成）",
                     "supported_sources": ["tushare", "akshare", "baostock"]
                 },
                 {
                     "code": "monthly",
                     "name": "月线",
-                    "description": "每月交易数据",
+                    "description": "每月交易数据（未同步时由日线重采样生成）",
                     "supported_sources": ["tushare", "akshare", "baostock"]
                 }
             ],
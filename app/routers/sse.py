@@ -1,25 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 import asyncio
 import json
 import logging
 import time
+from typing import Optional
 
 from app.routers.auth_db import get_current_user
 from app.core.database import get_redis_client
 from app.core.config import settings
 
 from app.services.queue_service import get_queue_service, QueueService
+from app.services.progress.stream import (
+    TERMINAL_STATUSES,
+    aread_progress_events,
+    aread_progress_snapshot,
+    is_terminal,
+)
+from app.services.progress.tracker import RedisProgressTracker
 
 router = APIRouter()
 logger = logging.getLogger("webapi.sse")
 
 
-async def task_progress_generator(task_id: str, user_id: str):
-    """Generate SSE events for task progress updates"""
+async def task_progress_generator(task_id: str, user_id: str, last_event_id: Optional[str] = None):
+    """Generate SSE events from the task's progress event stream
+
+    连接时先推送折叠后的快照（event: snapshot），之后 XREAD 阻塞读取事件流，
+    只推送增量（event: delta）和外部进度消息（event: progress）。
+    断线重连时浏览器会带上 Last-Event-ID，从该事件之后继续推送，不再重复快照。
+    """
     r = get_redis_client()
-    pubsub = None
-    channel = f"task_progress:{task_id}"
 
     try:
         # Load dynamic SSE settings
@@ -34,80 +45,51 @@ async def task_progress_generator(task_id: str, user_id: str):
             heartbeat_every = int(getattr(settings, "SSE_HEARTBEAT_INTERVAL_SECONDS", 10))
             max_idle_seconds = int(getattr(settings, "SSE_TASK_MAX_IDLE_SECONDS", 300))
 
-        # 🔥 修复：创建 PubSub 连接
-        pubsub = r.pubsub()
-        logger.info(f"📡 [SSE-Task] 创建 PubSub 连接: task={task_id}, user={user_id}")
-
-        # 🔥 修复：订阅频道（可能失败，需要确保 pubsub 被清理）
-        try:
-            await pubsub.subscribe(channel)
-            logger.info(f"✅ [SSE-Task] 订阅频道成功: {channel}")
-            # Send initial connection confirmation
-            yield f"event: connected\ndata: {{\"task_id\": \"{task_id}\", \"message\": \"已连接进度流\"}}\n\n"
-        except Exception as subscribe_error:
-            # 🔥 订阅失败时立即清理 pubsub 连接
-            logger.error(f"❌ [SSE-Task] 订阅频道失败: {subscribe_error}")
-            try:
-                await pubsub.close()
-                logger.info(f"🧹 [SSE-Task] 订阅失败后已关闭 PubSub 连接")
-            except Exception as close_error:
-                logger.error(f"❌ [SSE-Task] 关闭 PubSub 连接失败: {close_error}")
-            # 重新抛出异常，让外层 except 处理
-            raise
-
-        # Listen for progress updates
+        logger.info(f"📡 [SSE-Task] 订阅进度事件流: task={task_id}, user={user_id}, last_event_id={last_event_id}")
+        # Send initial connection confirmation
+        yield f"event: connected\ndata: {{\"task_id\": \"{task_id}\", \"message\": \"已连接进度流\"}}\n\n"
+
+        cursor = last_event_id
+        if not cursor:
+            snapshot, cursor = await aread_progress_snapshot(r, task_id)
+            if snapshot:
+                snapshot = RedisProgressTracker._calculate_static_time_estimates(snapshot)
+                yield f"id: {cursor}\nevent: snapshot\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+                if snapshot.get("status") in TERMINAL_STATUSES:
+                    yield f"event: finished\ndata: {json.dumps({'task_id': task_id, 'status': snapshot.get('status')})}\n\n"
+                    return
+        cursor = cursor or "0-0"
+
+        # Listen for progress events
         idle_elapsed = 0.0
         last_hb = time.monotonic()
+        block_ms = max(1, int(poll_timeout * 1000))
 
         while idle_elapsed < max_idle_seconds:
-            try:
-                message = await asyncio.wait_for(pubsub.get_message(ignore_subscribe_messages=True), timeout=poll_timeout)
-                if message and message['type'] == 'message':
-                    # Reset idle timer on valid message
-                    idle_elapsed = 0.0
-                    try:
-                        progress_data = json.loads(message['data'])
-                        yield f"event: progress\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
-                    except json.JSONDecodeError:
-                        logger.warning(f"Invalid JSON in progress message: {message['data']}")
-                else:
-                    # No update: accumulate idle time and send heartbeat if due
-                    idle_elapsed += poll_timeout
-                    now = time.monotonic()
-                    if now - last_hb >= heartbeat_every:
-                        yield f"event: heartbeat\ndata: {{\"timestamp\": \"{asyncio.get_event_loop().time()}\"}}\n\n"
-                        last_hb = now
-
-            except asyncio.TimeoutError:
+            events = await aread_progress_events(r, task_id, cursor, block_ms=block_ms)
+            if not events:
+                # No update: accumulate idle time and send heartbeat if due
                 idle_elapsed += poll_timeout
+                now = time.monotonic()
+                if now - last_hb >= heartbeat_every:
+                    yield f"event: heartbeat\ndata: {{\"timestamp\": \"{asyncio.get_event_loop().time()}\"}}\n\n"
+                    last_hb = now
                 continue
 
+            idle_elapsed = 0.0
+            for event_id, event_type, data in events:
+                cursor = event_id
+                sse_event = "progress" if event_type == "message" else "delta"
+                yield f"id: {event_id}\nevent: {sse_event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if is_terminal(event_type, data):
+                    yield f"event: finished\ndata: {json.dumps({'task_id': task_id, 'status': data.get('status')})}\n\n"
+                    return
+
     except Exception as e:
         logger.exception(f"SSE error for task {task_id}: {e}")
         yield f"event: error\ndata: {{\"error\": \"连接异常: {str(e)}\"}}\n\n"
     finally:
-        # 🔥 修复：确保在所有情况下都释放连接
-        if pubsub:
-            logger.info(f"🧹 [SSE-Task] 清理 PubSub 连接: task={task_id}")
-
-            # 分步骤关闭，确保即使 unsubscribe 失败也能关闭连接
-            try:
-                await pubsub.unsubscribe(channel)
-                logger.debug(f"✅ [SSE-Task] 已取消订阅频道: {channel}")
-            except Exception as e:
-                logger.warning(f"⚠️ [SSE-Task] 取消订阅失败（将继续关闭连接）: {e}")
-
-            try:
-                await pubsub.close()
-                logger.info(f"✅ [SSE-Task] PubSub 连接已关闭: task={task_id}")
-            except Exception as e:
-                logger.error(f"❌ [SSE-Task] 关闭 PubSub 连接失败: {e}", exc_info=True)
-                # 即使关闭失败，也尝试重置连接
-                try:
-                    await pubsub.reset()
-                    logger.info(f"🔄 [SSE-Task] PubSub 连接已重置: task={task_id}")
-                except Exception as reset_error:
-                    logger.error(f"❌ [SSE-Task] 重置 PubSub 连接也失败: {reset_error}")
+        logger.info(f"🧹 [SSE-Task] 进度流结束: task={task_id}")
 
 
 async def batch_progress_generator(batch_id: str, user_id: str):
@@ -222,7 +204,12 @@ async def batch_progress_generator(batch_id: str, user_id: str):
 
 
 @router.get("/tasks/{task_id}")
-async def stream_task_progress(task_id: str, user: dict = Depends(get_current_user), svc: QueueService = Depends(get_queue_service)):
+async def stream_task_progress(
+    task_id: str,
+    user: dict = Depends(get_current_user),
+    svc: QueueService = Depends(get_queue_service),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
     """Stream real-time progress updates for a specific task"""
     # Verify task exists and belongs to user
     task_data = await svc.get_task(task_id)
@@ -230,7 +217,7 @@ async def stream_task_progress(task_id: str, user: dict = Depends(get_current_us
         raise HTTPException(status_code=404, detail="Task not found")
 
     return StreamingResponse(
-        task_progress_generator(task_id, user["id"]),
+        task_progress_generator(task_id, user["id"], last_event_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
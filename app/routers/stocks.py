@@ -5,7 +5,7 @@
 - 路径前缀在 main.py 中挂载为 /api，当前路由自身前缀为 /stocks
 """
 from typing import Optional, Dict, Any, List, Tuple
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 import logging
 import re
 
@@ -421,10 +421,13 @@ async def get_fundamentals(
 @router.get("/{code}/kline", response_model=dict)
 async def get_kline(
     code: str,
+    request: Request,
+    response: Response,
     period: str = "day",
     limit: int = 120,
     adj: str = "none",
     force_refresh: bool = Query(False, description="是否强制刷新（跳过缓存）"),
+    fmt: str = Query("rows", alias="format", description="返回格式：rows（items 行数组）/ columns（列式数组）"),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -433,6 +436,9 @@ async def get_kline(
     period: day/week/month/5m/15m/30m/60m
     adj: none/qfq/hfq
     force_refresh: 是否强制刷新（跳过缓存）
+    format: rows 返回 items；columns 返回 columns={time,open,high,low,close,volume,amount} 各一个数组
+
+    响应带 ETag，请求头 If-None-Match 命中时返回 304（图表定时刷新时不重复传输数据）
 
     🔥 新增功能：当天实时K线数据
     - 交易时间内（09:30-15:00）：从 market_quotes 获取实时数据
@@ -446,6 +452,8 @@ async def get_kline(
     valid_periods = {"day","week","month","5m","15m","30m","60m"}
     if period not in valid_periods:
         raise HTTPException(status_code=400, detail=f"不支持的period: {period}")
+    if fmt not in ("rows", "columns"):
+        raise HTTPException(status_code=400, detail=f"不支持的format: {fmt}")
 
     # 检测市场类型
     market, normalized_code = _detect_market_and_code(code)
@@ -459,18 +467,17 @@ async def get_kline(
 
         try:
             kline_data = await service.get_kline(market, normalized_code, period, limit, force_refresh)
-            return ok(data={
-                'code': normalized_code,
-                'period': period,
-                'items': kline_data,
-                'source': 'cache_or_api'
-            })
         except Exception as e:
             logger.error(f"获取{market}股票{code}K线数据失败: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"获取K线数据失败: {str(e)}"
             )
+        return _kline_response(request, response, {
+            'code': normalized_code,
+            'period': period,
+            'source': 'cache_or_api'
+        }, kline_data, fmt)
 
     # A股：使用现有逻辑
     code_padded = normalized_code
@@ -497,33 +504,24 @@ async def get_kline(
     today_str_yyyymmdd = now.strftime("%Y%m%d")  # 格式：20251028（用于查询）
     today_str_formatted = now.strftime("%Y-%m-%d")  # 格式：2025-10-28（用于返回）
 
-    # 1. 优先从 MongoDB 缓存获取
+    # 1. 优先从 MongoDB 缓存获取（Motor 异步查询，一次查询覆盖所有数据源）
     try:
         from tradingagents.dataflows.cache.mongodb_cache_adapter import get_mongodb_cache_adapter
-        adapter = get_mongodb_cache_adapter()
-
-        # 计算日期范围
-        end_date = now.strftime("%Y-%m-%d")
-        start_date = (now - timedelta(days=limit * 2)).strftime("%Y-%m-%d")
+        from app.services.kline_service import get_kline_service
 
-        logger.info(f"🔍 尝试从 MongoDB 获取 K 线数据: {code_padded}, period={period} (MongoDB: {mongodb_period}), limit={limit}")
-        df = adapter.get_historical_data(code_padded, start_date, end_date, period=mongodb_period)
+        if get_mongodb_cache_adapter().use_app_cache:
+            # 计算日期范围
+            end_date = now.strftime("%Y-%m-%d")
+            start_date = (now - timedelta(days=limit * 2)).strftime("%Y-%m-%d")
 
-        if df is not None and not df.empty:
-            # 转换 DataFrame 为列表格式
-            items = []
-            for _, row in df.tail(limit).iterrows():
-                items.append({
-                    "time": row.get("trade_date", row.get("date", "")),  # 前端期望 time 字段
-                    "open": float(row.get("open", 0)),
-                    "high": float(row.get("high", 0)),
-                    "low": float(row.get("low", 0)),
-                    "close": float(row.get("close", 0)),
-                    "volume": float(row.get("volume", row.get("vol", 0))),
-                    "amount": float(row.get("amount", 0)) if "amount" in row else None,
-                })
-            source = "mongodb"
-            logger.info(f"✅ 从 MongoDB 获取到 {len(items)} 条 K 线数据")
+            logger.info(f"🔍 尝试从 MongoDB 获取 K 线数据: {code_padded}, period={period} (MongoDB: {mongodb_period}), limit={limit}")
+            cached = await get_kline_service().get_cached_bars(
+                code_padded, mongodb_period, limit, start_date=start_date, end_date=end_date
+            )
+            if cached:
+                items = cached["items"]
+                source = "mongodb"
+                logger.info(f"✅ 从 MongoDB 获取到 {len(items)} 条 K 线数据")
     except Exception as e:
         logger.warning(f"⚠️ MongoDB 获取 K 线失败: {e}")
 
@@ -616,8 +614,28 @@ async def get_kline(
         "limit": limit,
         "adj": adj if adj else "none",
         "source": source,
-        "items": items or []
     }
+    return _kline_response(request, response, data, items, fmt)
+
+
+def _kline_response(request: Request, response: Response, data: Dict[str, Any],
+                    items: Optional[List[Dict[str, Any]]], fmt: str):
+    """组装K线响应：按 format 输出行或列式数据，并处理 ETag / If-None-Match"""
+    from app.services.kline_service import compute_etag, etag_matches, to_columns
+
+    items = items or []
+    if fmt == "columns":
+        data["columns"] = to_columns(items)
+    else:
+        data["items"] = items
+
+    etag = compute_etag(data)
+    # no-cache：浏览器每次都带 If-None-Match 重新验证，内容未变时只返回 304
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
     return ok(data)
 
 
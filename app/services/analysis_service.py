@@ -20,7 +20,7 @@ sys.path.insert(0, str(project_root))
 from tradingagents.utils.logging_init import init_logging
 init_logging()
 
-from tradingagents.graph.trading_graph import TradingAgentsGraph
+from tradingagents.graph.graph_pool import get_trading_graph_pool
 from tradingagents.default_config import DEFAULT_CONFIG
 from app.services.simple_analysis_service import create_analysis_config, get_provider_by_model_name
 from app.models.analysis import (
@@ -34,6 +34,7 @@ from app.core.redis_client import get_redis_service, RedisKeys
 from app.services.queue_service import QueueService
 from app.core.database import get_redis_client
 from app.services.redis_progress_tracker import RedisProgressTracker
+from app.services.progress_log_handler import register_analysis_tracker, unregister_analysis_tracker
 from app.services.config_provider import provider as config_provider
 from app.services.queue import DEFAULT_USER_CONCURRENT_LIMIT, GLOBAL_CONCURRENT_LIMIT, VISIBILITY_TIMEOUT_SECONDS
 from app.services.usage_statistics_service import UsageStatisticsService
@@ -52,7 +53,6 @@ class AnalysisService:
         self.queue_service = QueueService(redis_client)
         # 初始化使用统计服务
         self.usage_service = UsageStatisticsService()
-        self._trading_graph_cache = {}
         # 进度跟踪器缓存
         self._progress_trackers: Dict[str, RedisProgressTracker] = {}
 
@@ -79,23 +79,6 @@ class AnalysisService:
             logger.warning(f"⚠️ 生成新的用户ID: {new_object_id}")
             return PyObjectId(new_object_id)
     
-    def _get_trading_graph(self, config: Dict[str, Any]) -> TradingAgentsGraph:
-        """获取或创建TradingAgents图实例（带缓存）- 与单股分析保持一致"""
-        config_key = json.dumps(config, sort_keys=True)
-
-        if config_key not in self._trading_graph_cache:
-            # 直接使用完整配置，不再合并DEFAULT_CONFIG（因为create_analysis_config已经处理了）
-            # 这与单股分析服务和web目录的方式一致
-            self._trading_graph_cache[config_key] = TradingAgentsGraph(
-                selected_analysts=config.get("selected_analysts", ["market", "fundamentals"]),
-                debug=config.get("debug", False),
-                config=config
-            )
-
-            logger.info(f"创建新的TradingAgents实例: {config.get('llm_provider', 'default')}")
-
-        return self._trading_graph_cache[config_key]
-
     def _execute_analysis_sync_with_progress(self, task: AnalysisTask, progress_tracker: RedisProgressTracker) -> AnalysisResult:
         """同步执行分析任务（在线程池中运行，带进度跟踪）"""
         try:
@@ -185,13 +168,12 @@ class AnalysisService:
                 quick_model_config=quick_model_config,  # 传递模型配置
                 deep_model_config=deep_model_config     # 传递模型配置
             )
+            # 模型确定后按历史耗时刷新预估总时长
+            progress_tracker.apply_llm_config(config)
 
             # 启动引擎
             progress_tracker.update_progress("🚀 初始化AI分析引擎")
 
-            # 获取TradingAgents实例
-            trading_graph = self._get_trading_graph(config)
-
             # 执行分析
             from datetime import timezone
             start_time = datetime.now(timezone.utc)
@@ -201,8 +183,17 @@ class AnalysisService:
             def progress_callback(message: str):
                 progress_tracker.update_progress(message)
 
-            # 调用现有的分析方法（同步调用，传递进度回调）
-            _, decision = trading_graph.propagate(task.symbol, analysis_date, progress_callback)
+            # 获取TradingAgents实例并调用现有的分析方法（同步调用，传递进度回调）
+            # 订阅本任务的图节点进度事件
+            register_analysis_tracker(task.task_id, progress_tracker)
+            try:
+                # 同一配置的图实例由全局图实例池（有界 LRU）共享，运行状态保存在线程本地的 RunContext 中
+                trading_graph = get_trading_graph_pool().get(config)
+                _, decision = trading_graph.propagate(
+                    task.symbol, analysis_date, progress_callback, task_id=task.task_id
+                )
+            finally:
+                unregister_analysis_tracker(task.task_id)
 
             execution_time = (datetime.now(timezone.utc) - start_time).total_seconds()
 
@@ -308,15 +299,13 @@ class AnalysisService:
                 deep_model_config=deep_model_config     # 传递模型配置
             )
 
-            # 获取TradingAgents实例
-            trading_graph = self._get_trading_graph(config)
-
             # 执行分析
             from datetime import timezone
             start_time = datetime.now(timezone.utc)
             analysis_date = task.parameters.analysis_date or datetime.now().strftime("%Y-%m-%d")
 
-            # 调用现有的分析方法（同步调用）
+            # 获取TradingAgents实例并调用现有的分析方法（同步调用）
+            trading_graph = get_trading_graph_pool().get(config)
             _, decision = trading_graph.propagate(task.symbol, analysis_date)
 
             execution_time = (datetime.now(timezone.utc) - start_time).total_seconds()
@@ -676,9 +665,6 @@ class AnalysisService:
             if progress_callback:
                 progress_callback(30, "创建分析图...")
             
-            # 获取TradingAgents实例
-            trading_graph = self._get_trading_graph(config)
-            
             if progress_callback:
                 progress_callback(50, "执行股票分析...")
             
@@ -686,8 +672,11 @@ class AnalysisService:
             start_time = datetime.utcnow()
             analysis_date = task.parameters.analysis_date or datetime.now().strftime("%Y-%m-%d")
             
-            # 调用现有的分析方法
-            _, decision = trading_graph.propagate(task.symbol, analysis_date)
+            # 调用现有的分析方法（在线程中执行，避免阻塞事件循环；同一 Worker 的多个槽位可并发分析）
+            def run_analysis():
+                return get_trading_graph_pool().get(config).propagate(task.symbol, analysis_date)
+
+            _, decision = await asyncio.get_running_loop().run_in_executor(None, run_analysis)
             
             execution_time = (datetime.utcnow() - start_time).total_seconds()
             
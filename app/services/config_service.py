@@ -21,6 +21,21 @@ from app.models.config import (
 logger = logging.getLogger(__name__)
 
 
+async def _notify_datasource_config_changed() -> None:
+    """通知数据源配置已变更
+
+    本进程直接丢弃配置快照；其他进程（Worker、分析进程）通过 Redis 版本号感知变更，
+    见 tradingagents/config/datasource_snapshot.py
+    """
+    try:
+        from tradingagents.config.datasource_snapshot import VERSION_KEY, invalidate_datasource_config
+        invalidate_datasource_config()
+        from app.core.database import get_redis_client
+        await get_redis_client().incr(VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ 通知数据源配置变更失败（其他进程将在快照过期后刷新）: {e}")
+
+
 class ConfigService:
     """配置管理服务类"""
 
@@ -197,6 +212,7 @@ class ConfigService:
                 return False
 
             await groupings_collection.insert_one(grouping.model_dump())
+            await _notify_datasource_config_changed()
             return True
         except Exception as e:
             print(f"❌ 添加数据源到分类失败: {e}")
@@ -212,6 +228,8 @@ class ConfigService:
                 "data_source_name": data_source_name,
                 "market_category_id": category_id
             })
+            if result.deleted_count > 0:
+                await _notify_datasource_config_changed()
             return result.deleted_count > 0
         except Exception as e:
             print(f"❌ 从分类中移除数据源失败: {e}")
@@ -280,6 +298,8 @@ class ConfigService:
                     else:
                         logger.warning(f"⚠️ [优先级同步] 未找到匹配的数据源配置: {data_source_name}")
 
+            if result.modified_count > 0:
+                await _notify_datasource_config_changed()
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"❌ 更新数据源分组关系失败: {e}")
@@ -352,6 +372,7 @@ class ConfigService:
             else:
                 print(f"⚠️ [优先级同步] 未找到激活的系统配置")
 
+            await _notify_datasource_config_changed()
             return True
         except Exception as e:
             print(f"❌ 更新分类数据源排序失败: {e}")
@@ -484,7 +505,9 @@ class ConfigService:
                 "enable_monitoring": True,
                 # Worker/Queue intervals
                 "worker_heartbeat_interval_seconds": 30,
+                "worker_concurrency": 1,
                 "queue_poll_interval_seconds": 1.0,
+                "queue_block_timeout_seconds": 5.0,
                 "queue_cleanup_interval_seconds": 60.0,
                 # SSE intervals
                 "sse_poll_timeout_seconds": 1.0,
@@ -552,6 +575,7 @@ class ConfigService:
 
             insert_result = await config_collection.insert_one(config_dict)
             print(f"📝 新配置ID: {insert_result.inserted_id}")
+            await _notify_datasource_config_changed()
 
             # 验证保存结果
             saved_config = await config_collection.find_one({"_id": insert_result.inserted_id})
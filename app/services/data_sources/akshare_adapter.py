@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import pandas as pd
 
 from .base import DataSourceAdapter
+from app.services.quotes_normalizer import frame_to_quotes_map, normalize_quotes_frame
 
 logger = logging.getLogger(__name__)
 
@@ -202,6 +203,17 @@ class AKShareAdapter(DataSourceAdapter):
         Returns:
             Dict[str, Dict]: {code: {close, pct_chg, amount, ...}}
         """
+        frame = self.get_realtime_quotes_df(source=source)
+        if frame is None:
+            return None
+        return frame_to_quotes_map(frame)
+
+    def get_realtime_quotes_df(self, source: str = "eastmoney") -> Optional[pd.DataFrame]:
+        """
+        获取全市场实时快照，返回标准化的 DataFrame（code + close/pct_chg/amount/volume/open/high/low/pre_close）
+
+        列名兼容、代码补齐和数值转换都是整列运算，见 app.services.quotes_normalizer。
+        """
         if not self.is_available():
             return None
 
@@ -220,73 +232,13 @@ class AKShareAdapter(DataSourceAdapter):
                 logger.warning(f"AKShare {source} 返回空数据")
                 return None
 
-            # 列名兼容（两个接口的列名可能不同）
-            code_col = next((c for c in ["代码", "code", "symbol", "股票代码"] if c in df.columns), None)
-            price_col = next((c for c in ["最新价", "现价", "最新价(元)", "price", "最新", "trade"] if c in df.columns), None)
-            pct_col = next((c for c in ["涨跌幅", "涨跌幅(%)", "涨幅", "pct_chg", "changepercent"] if c in df.columns), None)
-            amount_col = next((c for c in ["成交额", "成交额(元)", "amount", "成交额(万元)", "amount(万元)"] if c in df.columns), None)
-            open_col = next((c for c in ["今开", "开盘", "open", "今开(元)"] if c in df.columns), None)
-            high_col = next((c for c in ["最高", "high"] if c in df.columns), None)
-            low_col = next((c for c in ["最低", "low"] if c in df.columns), None)
-            pre_close_col = next((c for c in ["昨收", "昨收(元)", "pre_close", "昨收价", "settlement"] if c in df.columns), None)
-            volume_col = next((c for c in ["成交量", "成交量(手)", "volume", "成交量(股)", "vol"] if c in df.columns), None)
-
-            if not code_col or not price_col:
-                logger.error(f"AKShare {source} 缺少必要列: code={code_col}, price={price_col}, columns={list(df.columns)}")
+            frame = normalize_quotes_frame(df)
+            if frame is None:
+                logger.error(f"AKShare {source} 缺少必要列: columns={list(df.columns)}")
                 return None
 
-            result: Dict[str, Dict[str, Optional[float]]] = {}
-            for _, row in df.iterrows():  # type: ignore
-                code_raw = row.get(code_col)
-                if not code_raw:
-                    continue
-                # 标准化股票代码：处理交易所前缀（如 sz000001, sh600036）
-                code_str = str(code_raw).strip()
-
-                # 如果代码长度超过6位，去掉前面的交易所前缀（如 sz, sh）
-                if len(code_str) > 6:
-                    # 去掉前面的非数字字符（通常是2个字符的交易所代码）
-                    code_str = ''.join(filter(str.isdigit, code_str))
-
-                # 如果是纯数字，移除前导0后补齐到6位
-                if code_str.isdigit():
-                    code_clean = code_str.lstrip('0') or '0'  # 移除前导0，如果全是0则保留一个0
-                    code = code_clean.zfill(6)  # 补齐到6位
-                else:
-                    # 如果不是纯数字，尝试提取数字部分
-                    code_digits = ''.join(filter(str.isdigit, code_str))
-                    if code_digits:
-                        code = code_digits.zfill(6)
-                    else:
-                        # 无法提取有效代码，跳过
-                        continue
-
-                close = self._safe_float(row.get(price_col))
-                pct = self._safe_float(row.get(pct_col)) if pct_col else None
-                amt = self._safe_float(row.get(amount_col)) if amount_col else None
-                op = self._safe_float(row.get(open_col)) if open_col else None
-                hi = self._safe_float(row.get(high_col)) if high_col else None
-                lo = self._safe_float(row.get(low_col)) if low_col else None
-                pre = self._safe_float(row.get(pre_close_col)) if pre_close_col else None
-                vol = self._safe_float(row.get(volume_col)) if volume_col else None
-
-                # 🔥 日志：记录AKShare返回的成交量
-                if code in ["300750", "000001", "600000"]:  # 只记录几个示例股票
-                    logger.info(f"📊 [AKShare实时] {code} - volume_col={volume_col}, vol={vol}, amount={amt}")
-
-                result[code] = {
-                    "close": close,
-                    "pct_chg": pct,
-                    "amount": amt,
-                    "volume": vol,
-                    "open": op,
-                    "high": hi,
-                    "low": lo,
-                    "pre_close": pre
-                }
-
-            logger.info(f"✅ AKShare {source} 获取到 {len(result)} 只股票的实时行情")
-            return result
+            logger.info(f"✅ AKShare {source} 获取到 {len(frame)} 只股票的实时行情")
+            return frame
 
         except Exception as e:
             logger.error(f"获取AKShare {source} 实时快照失败: {e}")
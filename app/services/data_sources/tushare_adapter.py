@@ -7,9 +7,23 @@ from datetime import datetime, timedelta
 import pandas as pd
 
 from .base import DataSourceAdapter
+from app.services.quotes_normalizer import fill_pct_chg, frame_to_quotes_map, normalize_quotes_frame
 
 logger = logging.getLogger(__name__)
 
+# rt_k 列名（tushare 实时快照的成交量可能为 'vol' 或 'volume'）
+_RT_K_COLUMNS = {
+    'code': ['ts_code'],
+    'close': ['close'],
+    'pct_chg': ['pct_chg'],
+    'amount': ['amount'],
+    'volume': ['vol', 'volume'],
+    'open': ['open'],
+    'high': ['high'],
+    'low': ['low'],
+    'pre_close': ['pre_close'],
+}
+
 
 class TushareAdapter(DataSourceAdapter):
     """Tusharedata source adapter"""
@@ -98,9 +112,18 @@ class TushareAdapter(DataSourceAdapter):
 
 
     def get_realtime_quotes(self):
-        """Get full-market near real-time quotes via Tushare rt_k fallback
+        """Get full-market near real-time quotes via Tushare rt_k fallback
         Returns dict keyed by 6-digit code: {'000001': {'close': ..., 'pct_chg': ..., 'amount': ...}}
         """
+        frame = self.get_realtime_quotes_df()
+        if frame is None:
+            return None
+        return frame_to_quotes_map(frame)
+
+    def get_realtime_quotes_df(self) -> Optional[pd.DataFrame]:
+        """Get full-market near real-time quotes via Tushare rt_k as a normalized DataFrame
+        Columns: code + close/pct_chg/amount/volume/open/high/low/pre_close (whole-column conversion)
+        """
         if not self.is_available():
             return None
         try:
@@ -112,56 +135,12 @@ class TushareAdapter(DataSourceAdapter):
             if 'ts_code' not in df.columns or 'close' not in df.columns:
                 logger.error(f'Tushare rt_k missing columns: {list(df.columns)}')
                 return None
-            result: Dict[str, Dict[str, Optional[float]]] = {}
-            for _, row in df.iterrows():  # type: ignore
-                ts_code = str(row.get('ts_code') or '')
-                if not ts_code or '.' not in ts_code:
-                    continue
-                code6 = ts_code.split('.')[0].zfill(6)
-                close = self._safe_float(row.get('close')) if hasattr(self, '_safe_float') else float(row.get('close')) if row.get('close') is not None else None
-                pre_close = self._safe_float(row.get('pre_close')) if hasattr(self, '_safe_float') else (float(row.get('pre_close')) if row.get('pre_close') is not None else None)
-                amount = self._safe_float(row.get('amount')) if hasattr(self, '_safe_float') else (float(row.get('amount')) if row.get('amount') is not None else None)
-                # pct_chg may not be provided; compute if possible
-                pct_chg = None
-                if 'pct_chg' in df.columns and row.get('pct_chg') is not None:
-                    try:
-                        pct_chg = float(row.get('pct_chg'))
-                    except Exception:
-                        pct_chg = None
-                if pct_chg is None and close is not None and pre_close is not None and pre_close not in (0, 0.0):
-                    try:
-                        pct_chg = (close / pre_close - 1.0) * 100.0
-                    except Exception:
-                        pct_chg = None
-                # optional OHLC + volume
-                op = None
-                hi = None
-                lo = None
-                vol = None
-                try:
-                    if 'open' in df.columns:
-                        op = float(row.get('open')) if row.get('open') is not None else None
-                    if 'high' in df.columns:
-                        hi = float(row.get('high')) if row.get('high') is not None else None
-                    if 'low' in df.columns:
-                        lo = float(row.get('low')) if row.get('low') is not None else None
-                    # tushare 实时快照可能为 'vol' 或 'volume'
-                    # 🔥 成交量单位转换：Tushare 返回的是手，需要转换为股
-                    if 'vol' in df.columns:
-                        vol = float(row.get('vol')) if row.get('vol') is not None else None
-                        if vol is not None:
-                            vol = vol * 100  # 手 -> 股
-                    elif 'volume' in df.columns:
-                        vol = float(row.get('volume')) if row.get('volume') is not None else None
-                        if vol is not None:
-                            vol = vol * 100  # 手 -> 股
-                except Exception:
-                    op = op or None
-                    hi = hi or None
-                    lo = lo or None
-                    vol = vol or None
-                result[code6] = {'close': close, 'pct_chg': pct_chg, 'amount': amount, 'volume': vol, 'open': op, 'high': hi, 'low': lo, 'pre_close': pre_close}
-            return result
+            # 🔥 成交量单位转换：Tushare 返回的是手，需要转换为股
+            frame = normalize_quotes_frame(df, aliases=_RT_K_COLUMNS, scale={'volume': 100})
+            if frame is None:
+                return None
+            # pct_chg may not be provided; compute from close / pre_close
+            return fill_pct_chg(frame)
         except Exception as e:
             logger.error(f'Failed to fetch realtime quotes from Tushare rt_k: {e}')
             return None
@@ -68,6 +68,13 @@ class FinancialDataService:
             # 6. 更新时间索引（数据维护）
             await collection.create_index([("updated_at", -1)], name="updated_at_index", background=True)
 
+            # 7. 复合索引：代码+数据源+报告期（缓存适配器按数据源优先级取最新一期）
+            await collection.create_index([
+                ("code", 1),
+                ("data_source", 1),
+                ("report_period", -1)
+            ], name="code_source_period_index", background=True)
+
             logger.info("✅ 财务数据索引检查完成")
         except Exception as e:
             # 索引创建失败不应该阻止服务启动
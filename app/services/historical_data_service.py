@@ -9,6 +9,7 @@ from datetime import datetime, date
 from typing import Dict, Any, List, Optional, Union
 import pandas as pd
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
 
 from app.core.database import get_database
 
@@ -62,6 +63,14 @@ class HistoricalDataService:
                 ("trade_date", -1)
             ], name="symbol_date_index", background=True)
 
+            # 5. 复合索引：股票代码+周期+数据源+交易日期（缓存适配器的 data_source $in 查询，按数据源+交易日期排序）
+            await self.collection.create_index([
+                ("symbol", 1),
+                ("period", 1),
+                ("data_source", 1),
+                ("trade_date", -1)
+            ], name="symbol_period_source_date_idx", background=True)
+
             logger.info("✅ 历史数据索引检查完成")
         except Exception as e:
             # 索引创建失败不应该阻止服务启动
@@ -73,17 +82,20 @@ class HistoricalDataService:
         data: pd.DataFrame,
         data_source: str,
         market: str = "CN",
-        period: str = "daily"
+        period: str = "daily",
+        symbol_column: Optional[str] = None
     ) -> int:
         """
         保存历史数据到数据库
 
         Args:
-            symbol: 股票代码
+            symbol: 股票代码（指定 symbol_column 时仅用于日志）
             data: 历史数据DataFrame
             data_source: 数据源 (tushare/akshare/baostock)
             market: 市场类型 (CN/HK/US)
             period: 数据周期 (daily/weekly/monthly)
+            symbol_column: 多只股票的截面数据（如按交易日获取的全市场日线）中存放股票代码的列名，
+                为 None 时所有记录都属于 symbol
 
         Returns:
             保存的记录数量
@@ -96,93 +108,25 @@ class HistoricalDataService:
                 logger.warning(f"⚠️ {symbol} 历史数据为空，跳过保存")
                 return 0
 
-            from datetime import datetime
             total_start = datetime.now()
 
             logger.info(f"💾 开始保存 {symbol} 历史数据: {len(data)}条记录 (数据源: {data_source})")
 
-            # ⏱️ 性能监控：单位转换
-            convert_start = datetime.now()
-            # 🔥 在 DataFrame 层面做单位转换（向量化操作，比逐行快得多）
-            if data_source == "tushare":
-                # 成交额：千元 -> 元
-                if 'amount' in data.columns:
-                    data['amount'] = data['amount'] * 1000
-                elif 'turnover' in data.columns:
-                    data['turnover'] = data['turnover'] * 1000
-
-                # 成交量：手 -> 股
-                if 'volume' in data.columns:
-                    data['volume'] = data['volume'] * 100
-                elif 'vol' in data.columns:
-                    data['vol'] = data['vol'] * 100
-
-            # 🔥 港股/美股数据：添加 pre_close 字段（从前一天的 close 获取）
-            if market in ["HK", "US"] and 'pre_close' not in data.columns and 'close' in data.columns:
-                # 使用 shift(1) 将 close 列向下移动一行，得到前一天的收盘价
-                data['pre_close'] = data['close'].shift(1)
-                logger.debug(f"✅ {symbol} 添加 pre_close 字段（从前一天的 close 获取）")
-
-            convert_duration = (datetime.now() - convert_start).total_seconds()
-
-            # ⏱️ 性能监控：构建操作列表
+            # ⏱️ 性能监控：单位转换 + 构建文档
             prepare_start = datetime.now()
-            # 准备批量操作
-            operations = []
-            saved_count = 0
-            batch_size = 200  # 进一步减小批量大小，避免超时（从500改为200）
-
-            for date_index, row in data.iterrows():
-                try:
-                    # 标准化数据（传递日期索引）
-                    doc = self._standardize_record(symbol, row, data_source, market, period, date_index)
-
-                    # 创建upsert操作
-                    filter_doc = {
-                        "symbol": doc["symbol"],
-                        "trade_date": doc["trade_date"],
-                        "data_source": doc["data_source"],
-                        "period": doc["period"]
-                    }
-
-                    from pymongo import ReplaceOne
-                    operations.append(ReplaceOne(
-                        filter=filter_doc,
-                        replacement=doc,
-                        upsert=True
-                    ))
-
-                    # 批量执行（每200条）
-                    if len(operations) >= batch_size:
-                        batch_write_start = datetime.now()
-                        batch_saved = await self._execute_bulk_write_with_retry(symbol, operations)
-                        batch_write_duration = (datetime.now() - batch_write_start).total_seconds()
-                        logger.debug(f"   批量写入 {len(operations)} 条，耗时 {batch_write_duration:.2f}秒")
-                        saved_count += batch_saved
-                        operations = []
-
-                except Exception as e:
-                    # 获取日期信息用于错误日志
-                    date_str = str(date_index) if hasattr(date_index, '__str__') else 'unknown'
-                    logger.error(f"❌ 处理记录失败 {symbol} {date_str}: {e}")
-                    continue
-
+            docs = self.build_documents(symbol, data, data_source, market, period, symbol_column)
             prepare_duration = (datetime.now() - prepare_start).total_seconds()
 
-            # ⏱️ 性能监控：最后一批写入
-            final_write_start = datetime.now()
-            # 执行剩余操作
-            if operations:
-                saved_count += await self._execute_bulk_write_with_retry(
-                    symbol, operations
-                )
-            final_write_duration = (datetime.now() - final_write_start).total_seconds()
+            # ⏱️ 性能监控：批量写入
+            write_start = datetime.now()
+            saved_count = await self.upsert_documents(symbol, docs)
+            write_duration = (datetime.now() - write_start).total_seconds()
 
             total_duration = (datetime.now() - total_start).total_seconds()
             logger.info(
                 f"✅ {symbol} 历史数据保存完成: {saved_count}条记录，"
                 f"总耗时 {total_duration:.2f}秒 "
-                f"(转换: {convert_duration:.3f}秒, 准备: {prepare_duration:.2f}秒, 最后写入: {final_write_duration:.2f}秒)"
+                f"(准备: {prepare_duration:.2f}秒, 写入: {write_duration:.2f}秒)"
             )
             return saved_count
             
@@ -190,6 +134,99 @@ class HistoricalDataService:
             logger.error(f"❌ 保存历史数据失败 {symbol}: {e}")
             return 0
 
+    def build_documents(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        data_source: str,
+        market: str = "CN",
+        period: str = "daily",
+        symbol_column: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        把历史数据 DataFrame 标准化为待写入的文档
+
+        只做 CPU 计算、不访问数据库，可以放到线程池中执行（见 historical_sync_pipeline）。
+        注意：单位转换直接修改传入的 DataFrame。
+
+        Args:
+            参数含义同 save_historical_data
+
+        Returns:
+            标准化后的文档列表
+        """
+        if data is None or data.empty:
+            return []
+
+        # 🔥 在 DataFrame 层面做单位转换（向量化操作，比逐行快得多）
+        if data_source == "tushare":
+            # 成交额：千元 -> 元
+            if 'amount' in data.columns:
+                data['amount'] = data['amount'] * 1000
+            elif 'turnover' in data.columns:
+                data['turnover'] = data['turnover'] * 1000
+
+            # 成交量：手 -> 股
+            if 'volume' in data.columns:
+                data['volume'] = data['volume'] * 100
+            elif 'vol' in data.columns:
+                data['vol'] = data['vol'] * 100
+
+        # 🔥 港股/美股数据：添加 pre_close 字段（从前一天的 close 获取）
+        if market in ["HK", "US"] and 'pre_close' not in data.columns and 'close' in data.columns:
+            # 使用 shift(1) 将 close 列向下移动一行，得到前一天的收盘价
+            data['pre_close'] = data['close'].shift(1)
+            logger.debug(f"✅ {symbol} 添加 pre_close 字段（从前一天的 close 获取）")
+
+        docs = []
+        for date_index, row in data.iterrows():
+            try:
+                # 标准化数据（传递日期索引）
+                row_symbol = str(row[symbol_column]) if symbol_column else symbol
+                docs.append(self._standardize_record(row_symbol, row, data_source, market, period, date_index))
+            except Exception as e:
+                # 获取日期信息用于错误日志
+                date_str = str(date_index) if hasattr(date_index, '__str__') else 'unknown'
+                logger.error(f"❌ 处理记录失败 {symbol} {date_str}: {e}")
+                continue
+
+        return docs
+
+    async def upsert_documents(self, label: str, docs: List[Dict[str, Any]], batch_size: int = 200) -> int:
+        """
+        按 (symbol, trade_date, data_source, period) 批量 upsert 文档
+
+        Args:
+            label: 日志标签（股票代码或批次描述）
+            docs: build_documents 生成的文档，可以来自多只股票
+            batch_size: 每次 bulk_write 的文档数（默认200，避免超时）
+
+        Returns:
+            新增 + 更新的记录数
+        """
+        if self.collection is None:
+            await self.initialize()
+
+        saved_count = 0
+        for i in range(0, len(docs), batch_size):
+            operations = [
+                ReplaceOne(
+                    filter={
+                        "symbol": doc["symbol"],
+                        "trade_date": doc["trade_date"],
+                        "data_source": doc["data_source"],
+                        "period": doc["period"]
+                    },
+                    replacement=doc,
+                    upsert=True
+                )
+                for doc in docs[i:i + batch_size]
+            ]
+            batch_write_start = datetime.now()
+            saved_count += await self._execute_bulk_write_with_retry(label, operations)
+            logger.debug(f"   批量写入 {len(operations)} 条，耗时 {(datetime.now() - batch_write_start).total_seconds():.2f}秒")
+        return saved_count
+
     async def _execute_bulk_write_with_retry(
         self,
         symbol: str,
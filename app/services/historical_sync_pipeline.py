@@ -0,0 +1,302 @@
+"""
+历史数据并发同步流水线
+
+逐只股票 获取 → 标准化 → 写库 的串行循环，全市场刷新的耗时取决于每只股票的往返延迟。
+流水线把三个阶段拆开，用有界队列连接（队列满时上游阻塞，形成背压）：
+1. 获取：fetch_concurrency 个协程并发拉取，每次调用前向数据源的 rate_limiter 预约令牌
+2. 标准化：在线程池中把 DataFrame 转成文档（HistoricalDataService.build_documents），不阻塞事件循环
+3. 写入：单个写协程把多只股票的文档合并成大批量 bulk_write
+
+全市场刷新的吞吐因此只受数据源配额限制。
+
+使用方法：
+    pipeline = HistoricalSyncPipeline(
+        fetch=lambda code: provider.get_historical_data(code, start_date, end_date, period),
+        data_source="akshare",
+        period=period,
+        rate_limiter=get_akshare_rate_limiter(),
+        should_stop=lambda: self._should_stop(job_id),
+        on_progress=lambda r: self._update_progress(job_id, int(r.completed / r.total * 100), "..."),
+    )
+    result = await pipeline.run(symbols)
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.services.historical_data_service import get_historical_data_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineResult:
+    """流水线同步结果"""
+    total: int = 0
+    completed: int = 0
+    success_count: int = 0
+    empty_count: int = 0
+    error_count: int = 0
+    total_records: int = 0
+    write_batches: int = 0
+    stopped: bool = False
+    duration: float = 0.0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    records: Dict[str, int] = field(default_factory=dict)  # 各股票写入的记录数
+    latest_dates: Dict[str, str] = field(default_factory=dict)  # 各股票写入的最新交易日
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class HistoricalSyncPipeline:
+    """获取 / 标准化 / 写入 三阶段并发的历史数据同步流水线"""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Optional[pd.DataFrame]]],
+        data_source: str,
+        market: str = "CN",
+        period: str = "daily",
+        rate_limiter=None,
+        api: Optional[str] = None,
+        fetch_concurrency: int = 8,
+        parse_workers: int = 2,
+        write_batch_size: int = 200,
+        queue_size: int = 32,
+        flush_interval: float = 2.0,
+        progress_interval: float = 2.0,
+        stop_check_interval: float = 1.0,
+        should_stop: Optional[Callable[[], Awaitable[bool]]] = None,
+        on_progress: Optional[Callable[[PipelineResult], Awaitable[None]]] = None,
+        historical_service=None,
+    ):
+        """
+        Args:
+            fetch: 获取单只股票历史数据的协程函数，返回 DataFrame 或 None
+            data_source: 数据源 (tushare/akshare/baostock)
+            market: 市场类型 (CN/HK/US)
+            period: 数据周期 (daily/weekly/monthly)
+            rate_limiter: 数据源速率限制器，每次 fetch 前 acquire(api)
+            api: 传给 rate_limiter.acquire 的接口名（用于权重）
+            fetch_concurrency: 并发获取的协程数（数据源 SDK 非线程安全时设为 1）
+            parse_workers: 标准化线程池大小
+            write_batch_size: 合并写入的文档数（默认200，与 HistoricalDataService.upsert_documents 一致，避免单次 bulk_write 超时）
+            queue_size: 阶段之间队列的容量（背压）
+            flush_interval: 写队列空闲多久后写出未满的批次（秒）
+            progress_interval: on_progress 的最小调用间隔（秒），最后一次总会调用
+            stop_check_interval: should_stop 的最小检查间隔（秒）
+            should_stop: 返回 True 时停止获取新股票（已获取的数据仍会写完）
+            on_progress: 进度回调，参数为当前的 PipelineResult（completed/total 等）；抛出异常会中止流水线
+            historical_service: HistoricalDataService，默认使用全局实例
+        """
+        self.fetch = fetch
+        self.data_source = data_source
+        self.market = market
+        self.period = period
+        self.rate_limiter = rate_limiter
+        self.api = api
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.parse_workers = max(1, parse_workers)
+        self.write_batch_size = write_batch_size
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.progress_interval = progress_interval
+        self.stop_check_interval = stop_check_interval
+        self.should_stop = should_stop
+        self.on_progress = on_progress
+        self.historical_service = historical_service
+
+        self._result = PipelineResult()
+        self._last_progress = 0.0
+        self._last_stop_check = 0.0
+        self._stopping = False
+
+    async def run(self, symbols: List[str]) -> PipelineResult:
+        """同步给定股票的历史数据，返回统计结果"""
+        if self.historical_service is None:
+            self.historical_service = await get_historical_data_service()
+
+        self._result = result = PipelineResult(total=len(symbols))
+        self._stopping = False
+        started = time.monotonic()
+
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pending = iter(symbols)
+        executor = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix="hist-parse")
+
+        fetchers = [asyncio.create_task(self._fetch_worker(pending, parse_queue)) for _ in range(self.fetch_concurrency)]
+        parsers = [asyncio.create_task(self._parse_worker(parse_queue, write_queue, executor)) for _ in range(self.parse_workers)]
+        writer = asyncio.create_task(self._write_worker(write_queue))
+
+        async def _drain():
+            # 上游全部结束后依次通知下游退出
+            await asyncio.gather(*fetchers)
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+            await write_queue.put(None)
+
+        tasks = fetchers + parsers + [writer, asyncio.create_task(_drain())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=False)
+            result.duration = time.monotonic() - started
+
+        logger.info(
+            f"✅ {self.data_source} 历史数据流水线完成: 股票 {result.success_count}/{result.total}, "
+            f"空数据 {result.empty_count}, 错误 {result.error_count}, 记录 {result.total_records} 条, "
+            f"写入批次 {result.write_batches}, 耗时 {result.duration:.2f}秒"
+            + ("（已停止）" if result.stopped else "")
+        )
+        return result
+
+    # ------------------------------------------------------------------
+    # 阶段
+    # ------------------------------------------------------------------
+
+    async def _fetch_worker(self, pending, parse_queue: asyncio.Queue):
+        for symbol in pending:
+            if await self._check_stop():
+                break
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire(self.api)
+                df = await self.fetch(symbol)
+            except Exception as e:
+                await self._fail(symbol, e, "fetch")
+                continue
+
+            if df is None or df.empty:
+                self._result.empty_count += 1
+                await self._complete(1)
+                continue
+            await parse_queue.put((symbol, df))
+
+    async def _parse_worker(self, parse_queue: asyncio.Queue, write_queue: asyncio.Queue, executor: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+            symbol, df = item
+            try:
+                docs = await loop.run_in_executor(
+                    executor,
+                    self.historical_service.build_documents,
+                    symbol, df, self.data_source, self.market, self.period
+                )
+            except Exception as e:
+                await self._fail(symbol, e, "parse")
+                continue
+
+            if not docs:
+                self._result.empty_count += 1
+                await self._complete(1)
+                continue
+            await write_queue.put((symbol, docs))
+
+    async def _write_worker(self, write_queue: asyncio.Queue):
+        batch: List[Tuple[str, List[Dict[str, Any]]]] = []
+        batch_size = 0
+        while True:
+            try:
+                item = await asyncio.wait_for(write_queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                # 上游暂时没有数据，先写出已积累的部分，避免进度停滞
+                if batch:
+                    await self._flush(batch)
+                    batch, batch_size = [], 0
+                continue
+
+            if item is None:
+                break
+            batch.append(item)
+            batch_size += len(item[1])
+            if batch_size >= self.write_batch_size:
+                await self._flush(batch)
+                batch, batch_size = [], 0
+
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, List[Dict[str, Any]]]]):
+        """把多只股票的文档合并写入，按 write_batch_size 分块"""
+        docs: List[Dict[str, Any]] = []
+        owners: List[str] = []
+        for symbol, symbol_docs in batch:
+            docs.extend(symbol_docs)
+            owners.extend([symbol] * len(symbol_docs))
+
+        failed = set()
+        label = f"{self.data_source} {len(batch)}只股票"
+        for i in range(0, len(docs), self.write_batch_size):
+            chunk = docs[i:i + self.write_batch_size]
+            saved = await self.historical_service.upsert_documents(label, chunk, batch_size=len(chunk))
+            self._result.write_batches += 1
+            self._result.total_records += saved
+            if saved == 0:
+                # 文档带有 updated_at，正常写入不会出现 0 条变更，视为写入失败
+                failed.update(owners[i:i + self.write_batch_size])
+
+        for symbol, symbol_docs in batch:
+            if symbol in failed:
+                self._result.error_count += 1
+                self._result.errors.append({"code": symbol, "error": "批量写入失败", "stage": "write"})
+                continue
+            self._result.success_count += 1
+            self._result.records[symbol] = len(symbol_docs)
+            self._result.latest_dates[symbol] = max(doc["trade_date"] for doc in symbol_docs)
+        await self._complete(len(batch))
+
+    # ------------------------------------------------------------------
+    # 任务钩子
+    # ------------------------------------------------------------------
+
+    async def _check_stop(self) -> bool:
+        if self._stopping:
+            return True
+        if self.should_stop is None:
+            return False
+        now = time.monotonic()
+        if now - self._last_stop_check < self.stop_check_interval:
+            return False
+        self._last_stop_check = now
+        if await self.should_stop():
+            logger.warning(f"⚠️ {self.data_source} 历史数据流水线收到停止信号，写完已获取的数据后退出")
+            self._stopping = True
+            self._result.stopped = True
+        return self._stopping
+
+    async def _fail(self, symbol: str, error: Exception, stage: str):
+        logger.error(f"❌ {symbol} 历史数据同步失败 ({stage}): {error}")
+        self._result.error_count += 1
+        self._result.errors.append({
+            "code": symbol,
+            "error": str(error),
+            "error_type": type(error).__name__,
+            "stage": stage,
+        })
+        await self._complete(1)
+
+    async def _complete(self, count: int):
+        self._result.completed += count
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if self._result.completed >= self._result.total or now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            await self.on_progress(self._result)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+K线查询服务（异步）
+
+股票详情页的 K 线接口以前在 async 路由里同步调用 MongoDBCacheAdapter.get_historical_data：
+pymongo 查询阻塞事件循环，按数据源优先级最多串行 3 次 find 并返回完整文档，
+路由再用 DataFrame.iterrows() 逐行组装响应。
+
+这里改为：
+- 使用 Motor 异步查询，一次 ``data_source: {$in: 优先级列表}`` 查询 + OHLCV 字段投影，
+  按 (数据源, 交易日期倒序) 排序（走 symbol_period_source_date_idx 索引，不在内存中排序），
+  在内存中选出优先级最高且有数据的数据源，只保留它最近的 limit 条
+- 数据源优先级在内存中解析（配置来自进程内数据源配置快照）
+- 结果直接组装为行或列式数据，不经过 pandas
+- 提供列式载荷（time/open/high/low/close/volume/amount 各一个数组）和基于内容的 ETag
+- 没有存储周线/月线/分钟线时，由日线/1分钟线重采样（见 tradingagents/dataflows/resample.py）；
+  周线/月线不再同步时（MULTI_PERIOD_SYNC_RESAMPLE_DERIVED，默认开启）始终优先由日线重采样，
+  不读取存储中已停止更新的周线/月线
+
+使用方法：
+    service = get_kline_service()
+    bars = await service.get_cached_bars("000001", "daily", limit=120, start_date=..., end_date=...)
+    if bars:
+        items = bars["items"]          # 行格式（兼容旧响应）
+        columns = to_columns(items)    # 列式格式
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_mongo_db
+
+logger = logging.getLogger(__name__)
+
+# 列式载荷中的列（time 为交易日期）
+KLINE_COLUMNS = ("time", "open", "high", "low", "close", "volume", "amount")
+
+# 查询 stock_daily_quotes 时只取这些字段
+KLINE_PROJECTION = {
+    "_id": 0,
+    "trade_date": 1,
+    "data_source": 1,
+    "open": 1,
+    "high": 1,
+    "low": 1,
+    "close": 1,
+    "volume": 1,
+    "vol": 1,
+    "amount": 1,
+}
+
+
+def _to_float(value, default: Optional[float] = 0.0) -> Optional[float]:
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def doc_to_bar(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """stock_daily_quotes 文档 -> K线行（与旧响应字段一致）"""
+    volume = doc.get("volume")
+    if volume is None:
+        volume = doc.get("vol")
+    return {
+        "time": doc.get("trade_date", doc.get("date", "")),  # 前端期望 time 字段
+        "open": _to_float(doc.get("open")),
+        "high": _to_float(doc.get("high")),
+        "low": _to_float(doc.get("low")),
+        "close": _to_float(doc.get("close")),
+        "volume": _to_float(volume),
+        "amount": _to_float(doc.get("amount"), None),
+    }
+
+
+def to_columns(items: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """行格式 -> 列式格式 {time: [...], open: [...], ...}"""
+    return {column: [item.get(column) for item in items] for column in KLINE_COLUMNS}
+
+
+def compute_etag(payload: Any) -> str:
+    """基于响应内容计算弱 ETag（内容不变时 ETag 不变）"""
+    body = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return 'W/"' + hashlib.blake2b(body.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # 弱比较：忽略 W/ 前缀
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any((c[2:] if c.startswith("W/") else c) == bare for c in candidates)
+
+
+def pick_priority_source(groups: Dict[str, List[Dict[str, Any]]], priority: List[str],
+                         current: Optional[str] = None) -> Optional[str]:
+    """
+    在按数据源分组的查询结果中选择优先级最高且有数据的数据源
+
+    结果按 data_source 升序读取时，current 为正在读取的数据源，名称小于它的数据源已读完；
+    更高优先级的数据源还没读完时返回 None（还不能确定）。current 为 None 表示全部读完。
+    """
+    for source in priority:
+        if current is not None and source >= current:
+            return None
+        if groups.get(source):
+            return source
+    return None
+
+
+class KlineService:
+    """基于 Motor 的 K 线缓存查询"""
+
+    def __init__(self, db=None):
+        self.db = db
+
+    def _get_db(self):
+        if self.db is None:
+            self.db = get_mongo_db()
+        return self.db
+
+    async def get_source_priority(self, market_category: str = "a_shares") -> List[str]:
+        """按数据源配置解析缓存数据的数据源优先级"""
+        from tradingagents.config.datasource_snapshot import get_datasource_config_snapshot
+        from tradingagents.dataflows.cache.mongodb_cache_adapter import (
+            DEFAULT_SOURCE_PRIORITY,
+            resolve_source_priority,
+        )
+
+        # 快照过期时会同步读取 MongoDB，放到线程中避免阻塞事件循环
+        snapshot = await asyncio.to_thread(get_datasource_config_snapshot)
+        priority = snapshot.memoize(
+            ("cache_priority", market_category),
+            lambda: resolve_source_priority(snapshot.data_source_configs, market_category),
+        )
+        return list(priority or DEFAULT_SOURCE_PRIORITY)
+
+    async def get_cached_bars(
+        self,
+        code: str,
+        period: str = "daily",
+        limit: int = 120,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        market_category: str = "a_shares",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        从 stock_daily_quotes 读取最近 limit 根K线
+
+        Args:
+            code: 6位股票代码
+            period: MongoDB 中的周期（daily/weekly/monthly/5min/...）
+            limit: 返回条数
+            start_date / end_date: 交易日期范围（YYYY-MM-DD）
+            market_category: 用于解析数据源优先级的市场分类
+
+        Returns:
+            {"source": 数据源, "items": [按时间升序的K线行]}；没有缓存数据时返回 None
+        """
+        from tradingagents.dataflows.resample import prefer_resampled
+
+        priority = await self.get_source_priority(market_category)
+
+        # 周线/月线不再同步时，存储中的周线/月线可能已过期，先由日线重采样
+        resample_first = prefer_resampled(period, getattr(settings, "MULTI_PERIOD_SYNC_RESAMPLE_DERIVED", True))
+        if resample_first:
+            result = await self._get_resampled_bars(code, period, limit, priority, start_date, end_date)
+            if result is not None:
+                return result
+
+        source, docs = await self._query_bars(code, period, limit, priority, start_date, end_date)
+        if source is None:
+            result = None
+            if not resample_first:
+                result = await self._get_resampled_bars(code, period, limit, priority, start_date, end_date)
+            if result is None:
+                logger.info(f"⚠️ [K线] MongoDB 中所有数据源({', '.join(priority)})都没有{period}数据: {code}")
+            return result
+
+        items = [doc_to_bar(doc) for doc in reversed(docs)]
+        logger.info(f"✅ [K线] 从 MongoDB-{source} 获取 {len(items)} 条{period}数据: {code}")
+        return {"source": source, "items": items}
+
+    async def _query_bars(
+        self,
+        code: str,
+        period: str,
+        limit: int,
+        priority: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        projection: Dict[str, Any] = None,
+    ):
+        """
+        一次查询读取优先数据源最近的 limit 条（按时间倒序），返回 (数据源, 文档列表)
+
+        ``data_source: {$in: priority}`` + 投影，按 (data_source 升序, trade_date 倒序) 排序，
+        与 (symbol, period, data_source, trade_date -1) 复合索引的顺序一致；数据源优先级在内存中比较，
+        优先级更高的数据源都已读完时提前关闭游标。
+        """
+        query: Dict[str, Any] = {
+            "symbol": code,
+            "period": period,
+            "data_source": {"$in": priority},
+        }
+        if start_date or end_date:
+            date_filter = {}
+            if start_date:
+                date_filter["$gte"] = start_date
+            if end_date:
+                date_filter["$lte"] = end_date
+            query["trade_date"] = date_filter
+
+        sort = [("data_source", 1), ("trade_date", -1)]
+        if period.endswith("min"):
+            # 分钟线同一交易日有多根，再按时间排序
+            sort.append(("trade_time", -1))
+
+        cursor = self._get_db().stock_daily_quotes.find(query, projection or KLINE_PROJECTION).sort(sort)
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        current = None
+        try:
+            async for doc in cursor:
+                source = doc.get("data_source")
+                if source != current:
+                    current = source
+                    if pick_priority_source(groups, priority, current) is not None:
+                        break
+                group = groups.setdefault(source, [])
+                if len(group) < limit:
+                    group.append(doc)
+        finally:
+            await cursor.close()
+
+        source = pick_priority_source(groups, priority)
+        return (source, groups[source]) if source else (None, [])
+
+    async def _get_resampled_bars(
+        self,
+        code: str,
+        period: str,
+        limit: int,
+        priority: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """由日线/1分钟线重采样出最近 limit 根K线"""
+        from tradingagents.dataflows.resample import (
+            BASE_BARS_PER_BAR,
+            base_period_for,
+            get_bar_resampler,
+            resample_enabled,
+        )
+
+        base_period = base_period_for(period)
+        if base_period is None or not resample_enabled():
+            return None
+
+        # 多取一根目标K线的基础数据，丢弃可能不完整的第一根
+        base_limit = (limit + 1) * BASE_BARS_PER_BAR[period]
+        projection = {**KLINE_PROJECTION, "trade_time": 1, "pre_close": 1}
+        source, docs = await self._query_bars(code, base_period, base_limit, priority,
+                                              end_date=end_date, projection=projection)
+        if source is None:
+            return None
+
+        import pandas as pd
+
+        docs.reverse()
+        df = pd.DataFrame(docs)
+        resampled = get_bar_resampler().resample(df, period, cache_key=(code, source, base_period))
+        if len(docs) == base_limit and len(resampled) > 1:
+            resampled = resampled.iloc[1:]
+        if start_date and "trade_date" in resampled.columns:
+            resampled = resampled[resampled["trade_date"] >= start_date]
+        resampled = resampled.tail(limit)
+        if resampled.empty:
+            return None
+
+        time_column = "trade_time" if "trade_time" in resampled.columns else "trade_date"
+        items = []
+        for record in resampled.to_dict("records"):
+            bar = doc_to_bar(record)
+            bar["time"] = record.get(time_column, bar["time"])
+            items.append(bar)
+        logger.info(f"✅ [K线] 由 MongoDB-{source} {base_period} 数据重采样得到 {len(items)} 条{period}数据: {code}")
+        return {"source": source, "items": items}
+
+
+_kline_service: Optional[KlineService] = None
+
+
+def get_kline_service() -> KlineService:
+    """获取K线查询服务实例"""
+    global _kline_service
+    if _kline_service is None:
+        _kline_service = KlineService()
+    return _kline_service
@@ -21,6 +21,33 @@ from app.utils.timezone import now_tz
 logger = logging.getLogger("webapi")
 
 
+def build_log_doc(
+    user_id: str,
+    username: str,
+    log_data: OperationLogCreate,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None
+) -> Dict[str, Any]:
+    """构建操作日志文档"""
+    # 🔥 使用 naive datetime（不带时区信息），MongoDB 会按原样存储，不会转换为 UTC
+    current_time = now_tz().replace(tzinfo=None)  # 移除时区信息，保留本地时间值
+    return {
+        "user_id": user_id,
+        "username": username,
+        "action_type": log_data.action_type,
+        "action": log_data.action,
+        "details": log_data.details or {},
+        "success": log_data.success,
+        "error_message": log_data.error_message,
+        "duration_ms": log_data.duration_ms,
+        "ip_address": ip_address or log_data.ip_address,
+        "user_agent": user_agent or log_data.user_agent,
+        "session_id": log_data.session_id,
+        "timestamp": current_time,  # naive datetime，MongoDB 按原样存储
+        "created_at": current_time  # naive datetime，MongoDB 按原样存储
+    }
+
+
 class OperationLogService:
     """操作日志服务"""
     
@@ -38,25 +65,7 @@ class OperationLogService:
         """创建操作日志"""
         try:
             db = get_mongo_db()
-
-            # 构建日志文档
-            # 🔥 使用 naive datetime（不带时区信息），MongoDB 会按原样存储，不会转换为 UTC
-            current_time = now_tz().replace(tzinfo=None)  # 移除时区信息，保留本地时间值
-            log_doc = {
-                "user_id": user_id,
-                "username": username,
-                "action_type": log_data.action_type,
-                "action": log_data.action,
-                "details": log_data.details or {},
-                "success": log_data.success,
-                "error_message": log_data.error_message,
-                "duration_ms": log_data.duration_ms,
-                "ip_address": ip_address or log_data.ip_address,
-                "user_agent": user_agent or log_data.user_agent,
-                "session_id": log_data.session_id,
-                "timestamp": current_time,  # naive datetime，MongoDB 按原样存储
-                "created_at": current_time  # naive datetime，MongoDB 按原样存储
-            }
+            log_doc = build_log_doc(user_id, username, log_data, ip_address, user_agent)
             
             # 插入数据库
             result = await db[self.collection_name].insert_one(log_doc)
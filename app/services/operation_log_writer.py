@@ -0,0 +1,268 @@
+"""
+操作日志异步写入器（write-behind）
+
+请求路径上只做 O(1) 入队，后台任务按数量/时间阈值批量 insert_many 到 MongoDB，
+请求延迟不再包含审计日志的写库耗时。缓冲区有上限，溢出时按策略丢弃或落盘到本地 JSONL，
+落盘的日志在下次启动时回放。
+
+入队时为每条日志分配固定的 _id，重试（写库失败放回缓冲、回放部分失败的落盘文件）时
+已写入的日志只会触发重复键错误并按已写入处理，不会产生重复记录；批量写入部分失败时
+按 BulkWriteError 的明细只重试失败的日志。
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.core.database import get_mongo_db
+
+logger = logging.getLogger("webapi")
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_SPILL = "spill"
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class OperationLogWriter:
+    """操作日志批量写入器"""
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        overflow_policy: str = OVERFLOW_DROP,
+        spill_path: str = "data/logs/operation_log_spill.jsonl",
+        collection_name: str = "operation_logs",
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spill_path = spill_path
+        self.collection_name = collection_name
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def enqueue(self, doc: Dict[str, Any]) -> bool:
+        """入队一条日志（O(1)，不等待写库）；缓冲区已满时按溢出策略处理，返回是否进入缓冲"""
+        doc.setdefault("_id", ObjectId())
+        if len(self._buffer) >= self.max_size:
+            if self.overflow_policy == OVERFLOW_SPILL:
+                self._spill([doc])
+            else:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"⚠️ 操作日志缓冲区已满({self.max_size})，已丢弃 {self.dropped} 条")
+            return False
+        self._buffer.append(doc)
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        await self._replay_spill()
+        self._task = asyncio.create_task(self._run(), name="operation-log-writer")
+        logger.info(
+            f"📝 操作日志异步写入已启动: batch={self.batch_size}, interval={self.flush_interval}s, "
+            f"max={self.max_size}, overflow={self.overflow_policy}"
+        )
+
+    async def stop(self):
+        """停止后台任务并写完缓冲区中的全部日志"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._buffer:
+            if not await self.flush():
+                # 关闭时写库失败，剩余日志落盘，避免丢失
+                self._spill(list(self._buffer))
+                self._buffer.clear()
+        logger.info(f"🛑 操作日志异步写入已停止: 写入 {self.written}, 丢弃 {self.dropped}, 落盘 {self.spilled}")
+
+    async def flush(self) -> bool:
+        """写入一批日志，失败的日志放回缓冲区头部（超出容量的部分按溢出策略处理）"""
+        if not self._buffer:
+            return True
+        batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+        try:
+            db = get_mongo_db()
+            await db[self.collection_name].insert_many(batch, ordered=False)
+            self.written += len(batch)
+            return True
+        except Exception as e:
+            failed = _failed_docs(batch, e)
+            self.written += len(batch) - len(failed)
+            if not failed:
+                return True
+            logger.error(f"批量写入操作日志失败({len(failed)}/{len(batch)} 条): {e}")
+            room = max(self.max_size - len(self._buffer), 0)
+            self._buffer.extendleft(reversed(failed[:room]))
+            overflow = failed[room:]
+            if overflow:
+                if self.overflow_policy == OVERFLOW_SPILL:
+                    self._spill(overflow)
+                else:
+                    self.dropped += len(overflow)
+            return False
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffer:
+                if not await self.flush():
+                    break
+                if len(self._buffer) < self.batch_size:
+                    # 不足一批时等下一个时间窗口再写，合并更多日志
+                    break
+
+    def _spill(self, docs: List[Dict[str, Any]]):
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for doc in docs:
+                    f.write(json.dumps(doc, ensure_ascii=False, default=_json_default) + "\n")
+            self.spilled += len(docs)
+        except Exception as e:
+            self.dropped += len(docs)
+            logger.error(f"操作日志落盘失败，丢弃 {len(docs)} 条: {e}")
+
+    async def _replay_spill(self):
+        """
+        启动时回放落盘的日志
+
+        落盘文件先改名为唯一的 .replay.<时间戳> 文件再回放，之前回放失败保留下来的
+        .replay* 文件一并回放；部分失败时只把未写入的日志写回该文件。
+        """
+        if os.path.exists(self.spill_path):
+            try:
+                os.replace(self.spill_path, f"{self.spill_path}.replay.{time.time_ns()}")
+            except Exception as e:
+                logger.error(f"回放落盘操作日志失败（保留 {self.spill_path}）: {e}")
+
+        for replay_path in sorted(glob.glob(glob.escape(self.spill_path) + ".replay*")):
+            if not replay_path.endswith(".tmp"):
+                await self._replay_file(replay_path)
+
+    async def _replay_file(self, replay_path: str):
+        try:
+            with open(replay_path, "r", encoding="utf-8") as f:
+                docs = [_restore_doc(json.loads(line)) for line in f if line.strip()]
+        except Exception as e:
+            logger.error(f"读取落盘操作日志失败（保留 {replay_path}）: {e}")
+            return
+
+        remaining: List[Dict[str, Any]] = []
+        try:
+            db = get_mongo_db()
+            for i in range(0, len(docs), self.batch_size):
+                chunk = docs[i:i + self.batch_size]
+                try:
+                    await db[self.collection_name].insert_many(chunk, ordered=False)
+                except BulkWriteError as e:
+                    remaining.extend(_failed_docs(chunk, e))
+                except Exception:
+                    remaining.extend(docs[i:])
+                    raise
+        except Exception as e:
+            logger.error(f"回放落盘操作日志失败（{len(remaining)} 条保留在 {replay_path}）: {e}")
+
+        try:
+            if remaining:
+                tmp_path = replay_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for doc in remaining:
+                        f.write(json.dumps(doc, ensure_ascii=False, default=_json_default) + "\n")
+                os.replace(tmp_path, replay_path)
+            else:
+                os.remove(replay_path)
+        except Exception as e:
+            logger.error(f"更新落盘操作日志文件失败: {replay_path}: {e}")
+            return
+
+        replayed = len(docs) - len(remaining)
+        if replayed:
+            logger.info(f"📝 已回放 {replayed} 条落盘的操作日志: {replay_path}")
+
+
+def _failed_docs(batch: List[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+    """
+    insert_many(ordered=False) 失败后需要重试的日志
+
+    BulkWriteError 按明细只返回失败的日志（重复键说明该日志已写入，不再重试）；
+    其他异常（连接失败等）无法确定写入了哪些，整批重试（固定 _id 保证不会重复写入）。
+    """
+    if not isinstance(error, BulkWriteError):
+        return list(batch)
+    failed = {
+        err["index"] for err in error.details.get("writeErrors", [])
+        if err.get("code") != DUPLICATE_KEY_ERROR
+    }
+    return [doc for index, doc in enumerate(batch) if index in failed]
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return str(value)
+
+
+def _restore_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    value = doc.get("_id")
+    doc["_id"] = ObjectId(value["$oid"]) if isinstance(value, dict) and "$oid" in value else ObjectId()
+    for key in ("timestamp", "created_at"):
+        value = doc.get(key)
+        if isinstance(value, dict) and "$date" in value:
+            doc[key] = datetime.fromisoformat(value["$date"])
+    return doc
+
+
+_operation_log_writer: Optional[OperationLogWriter] = None
+
+
+def get_operation_log_writer() -> OperationLogWriter:
+    """获取全局操作日志写入器（参数来自 settings）"""
+    global _operation_log_writer
+    if _operation_log_writer is None:
+        from app.core.config import settings
+        _operation_log_writer = OperationLogWriter(
+            max_size=getattr(settings, "OPLOG_BUFFER_MAX_SIZE", 10000),
+            batch_size=getattr(settings, "OPLOG_FLUSH_BATCH_SIZE", 200),
+            flush_interval=getattr(settings, "OPLOG_FLUSH_INTERVAL_SECONDS", 1.0),
+            overflow_policy=getattr(settings, "OPLOG_OVERFLOW_POLICY", OVERFLOW_DROP),
+            spill_path=getattr(settings, "OPLOG_SPILL_PATH", "data/logs/operation_log_spill.jsonl"),
+        )
+    return _operation_log_writer
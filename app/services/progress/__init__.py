@@ -3,6 +3,7 @@ Progress 子包（过渡期）：对进度跟踪与日志处理进行结构化
 当前阶段采用“新路径重导出到旧实现”的方式，保持 API 稳定。
 """
 from .tracker import RedisProgressTracker, get_progress_by_id
+from .stream import ProgressStreamWriter, read_progress_snapshot
 from .log_handler import (
     ProgressLogHandler,
     get_progress_log_handler,
@@ -0,0 +1,302 @@
+"""
+进度事件流
+
+旧实现每次更新都重新计算全部步骤，把完整进度文档序列化后 SET 到 Redis（或重写 JSON 文件），
+步骤越多写放大越严重，前端还需要轮询读取完整文档。
+
+现在每个任务的进度是一条只追加的事件流，事件只携带变化的字段：
+- Redis 模式：Redis Stream ``progress_stream:{task_id}``（XADD），设置过期时间
+- 文件模式：``./data/progress/{task_id}.events.jsonl``，每个事件追加一行
+
+事件类型：
+- snapshot: 第一个事件，完整的进度文档
+- delta: 与上一次写出相比变化的字段；``steps`` 只包含变化的步骤 ``{"3": {...}}``
+- final: 终态（完成/失败）的增量，总是立即写出
+- message: 外部进程（如 app/worker.py）发布的独立进度消息，读取快照时合并为 last_message
+
+写入按 min_interval 合并：间隔内的多次更新只保留最新状态，由定时器补写尾部更新。
+读取时才把事件折叠为快照（read_progress_snapshot）。Redis 模式下折叠结果连同最后的事件 ID
+缓存在 ``progress:{task_id}``（与旧的完整文档键相同，旧读取方仍可用），之后只折叠新增事件。
+SSE 与 WebSocket 直接 XREAD 事件流推送增量，客户端不再轮询。
+
+环境变量：
+- PROGRESS_STREAM_MIN_INTERVAL: 两次写出的最小间隔（秒，默认 0.5）
+- PROGRESS_STREAM_TTL: 事件流与快照的过期时间（秒，默认 3600）
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("app.services.progress.stream")
+
+STREAM_KEY_PREFIX = "progress_stream:"
+SNAPSHOT_KEY_PREFIX = "progress:"
+SNAPSHOT_ID_FIELD = "_stream_id"
+DEFAULT_FILE_DIR = "./data/progress"
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# (事件ID, 事件类型, 数据)
+ProgressEvent = Tuple[str, str, Dict[str, Any]]
+
+
+def progress_stream_key(task_id: str) -> str:
+    return f"{STREAM_KEY_PREFIX}{task_id}"
+
+
+def progress_snapshot_key(task_id: str) -> str:
+    return f"{SNAPSHOT_KEY_PREFIX}{task_id}"
+
+
+def _min_interval() -> float:
+    return float(os.getenv("PROGRESS_STREAM_MIN_INTERVAL", "0.5"))
+
+
+def progress_stream_ttl() -> int:
+    return int(os.getenv("PROGRESS_STREAM_TTL", "3600"))
+
+
+# ----------------------------------------------------------------------
+# 增量计算与折叠
+# ----------------------------------------------------------------------
+
+def compute_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """计算 current 相对 previous 变化的字段（steps 按索引只保留变化的步骤）"""
+    delta: Dict[str, Any] = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if key == "steps" and isinstance(value, list) and isinstance(old, list) and len(old) == len(value):
+            changed = {str(i): step for i, step in enumerate(value) if old[i] != step}
+            if changed:
+                delta["steps"] = changed
+        elif key not in previous or old != value:
+            delta[key] = value
+    return delta
+
+
+def apply_delta(snapshot: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """把增量合并到快照（原地修改并返回）"""
+    for key, value in delta.items():
+        if key == "steps" and isinstance(value, dict) and isinstance(snapshot.get("steps"), list):
+            steps = snapshot["steps"]
+            for index, step in value.items():
+                i = int(index)
+                if 0 <= i < len(steps):
+                    steps[i] = step
+        else:
+            snapshot[key] = value
+    return snapshot
+
+
+def fold_events(events: Iterable[ProgressEvent], snapshot: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """按顺序把事件折叠为进度快照"""
+    for _, event_type, data in events:
+        if event_type == "snapshot":
+            snapshot = dict(data)
+            continue
+        if snapshot is None:
+            snapshot = {}
+        if event_type == "message":
+            snapshot["last_message"] = data.get("message", snapshot.get("last_message"))
+            for key in ("progress", "step", "total_steps", "timestamp"):
+                if key in data:
+                    snapshot[key] = data[key]
+        else:
+            apply_delta(snapshot, data)
+    return snapshot
+
+
+def _decode_entries(entries) -> List[ProgressEvent]:
+    events = []
+    for event_id, fields in entries or []:
+        try:
+            events.append((event_id, fields.get("type", "delta"), json.loads(fields.get("data") or "{}")))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ [进度流] 无法解析事件 {event_id}: {e}")
+    return events
+
+
+# ----------------------------------------------------------------------
+# 写入
+# ----------------------------------------------------------------------
+
+class ProgressStreamWriter:
+    """把进度文档以增量事件追加到 Redis Stream 或 JSONL 文件（线程安全）"""
+
+    def __init__(
+        self,
+        task_id: str,
+        redis_client=None,
+        file_dir: str = DEFAULT_FILE_DIR,
+        min_interval: Optional[float] = None,
+        ttl: Optional[int] = None,
+    ):
+        """
+        Args:
+            task_id: 任务ID
+            redis_client: 同步 Redis 客户端（decode_responses=True），为 None 时写文件
+            file_dir: 文件模式下事件文件所在目录
+            min_interval: 两次写出的最小间隔（秒），默认读取 PROGRESS_STREAM_MIN_INTERVAL
+            ttl: Redis 事件流过期时间（秒），默认读取 PROGRESS_STREAM_TTL
+        """
+        self.task_id = task_id
+        self.redis_client = redis_client
+        self.file_path = os.path.join(file_dir, f"{task_id}.events.jsonl")
+        self.min_interval = _min_interval() if min_interval is None else min_interval
+        self.ttl = progress_stream_ttl() if ttl is None else ttl
+
+        self._lock = threading.Lock()
+        self._last_document: Optional[Dict[str, Any]] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self.events_written = 0
+        self.bytes_written = 0
+
+        if redis_client is None:
+            os.makedirs(file_dir, exist_ok=True)
+
+    def publish(self, document: Dict[str, Any], final: bool = False) -> None:
+        """提交最新的进度文档；间隔内的更新会被合并，final=True 时立即写出"""
+        with self._lock:
+            self._pending = document
+            wait = self.min_interval - (time.monotonic() - self._last_flush)
+            if final or self._last_document is None or wait <= 0:
+                self._flush_locked(final)
+            elif self._timer is None:
+                # 尾部更新：间隔结束后把最后一次状态写出，避免停在旧进度
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """立即写出尚未写出的更新"""
+        with self._lock:
+            self._flush_locked(False)
+
+    def close(self) -> None:
+        self.flush()
+
+    def _flush_locked(self, final: bool) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        document = self._pending
+        if document is None:
+            return
+        self._pending = None
+
+        if self._last_document is None:
+            event_type, data = "snapshot", document
+        else:
+            data = compute_delta(self._last_document, document)
+            if not data and not final:
+                return
+            event_type = "final" if final else "delta"
+
+        try:
+            self._append(event_type, data)
+        except Exception as e:
+            logger.error(f"[进度流] 写入失败: {self.task_id} - {e}")
+            return
+        # 写出的文档由调用方新建，这里直接持有引用作为下一次比较的基准
+        self._last_document = document
+        self._last_flush = time.monotonic()
+
+    def _append(self, event_type: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False)
+        if self.redis_client is not None:
+            key = progress_stream_key(self.task_id)
+            pipe = self.redis_client.pipeline()
+            pipe.xadd(key, {"type": event_type, "data": payload})
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        else:
+            line = json.dumps({"type": event_type, "data": data}, ensure_ascii=False)
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        self.events_written += 1
+        self.bytes_written += len(payload)
+
+
+# ----------------------------------------------------------------------
+# 读取（读取时才折叠为快照）
+# ----------------------------------------------------------------------
+
+def _load_cached_snapshot(raw: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    if not raw:
+        return None, None
+    try:
+        snapshot = json.loads(raw)
+    except ValueError:
+        return None, None
+    return snapshot, snapshot.pop(SNAPSHOT_ID_FIELD, None)
+
+
+def _new_events(entries, last_id: Optional[str]) -> List[ProgressEvent]:
+    events = _decode_entries(entries)
+    # XRANGE 的起点是闭区间，跳过已折叠的那一条
+    if last_id and events and events[0][0] == last_id:
+        events = events[1:]
+    return events
+
+
+def _compact(snapshot: Dict[str, Any], last_id: str) -> str:
+    return json.dumps({**snapshot, SNAPSHOT_ID_FIELD: last_id}, ensure_ascii=False)
+
+
+def read_progress_snapshot(task_id: str, redis_client=None, file_dir: str = DEFAULT_FILE_DIR) -> Optional[Dict[str, Any]]:
+    """读取并折叠任务的进度事件流，返回快照；没有事件流时返回 None"""
+    if redis_client is not None:
+        snapshot, last_id = _load_cached_snapshot(redis_client.get(progress_snapshot_key(task_id)))
+        entries = redis_client.xrange(progress_stream_key(task_id), min=last_id or "-", max="+")
+        events = _new_events(entries, last_id)
+        if events:
+            snapshot = fold_events(events, snapshot)
+            redis_client.set(progress_snapshot_key(task_id), _compact(snapshot, events[-1][0]), ex=progress_stream_ttl())
+        return snapshot
+
+    path = os.path.join(file_dir, f"{task_id}.events.jsonl")
+    if not os.path.exists(path):
+        return None
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # 进程中断可能留下半行，忽略
+                continue
+            events.append((str(line_no), event.get("type", "delta"), event.get("data") or {}))
+    return fold_events(events)
+
+
+async def aread_progress_snapshot(redis, task_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """异步版本，返回 (快照, 最后一个事件ID)，供 SSE / WebSocket 作为增量推送的起点"""
+    snapshot, last_id = _load_cached_snapshot(await redis.get(progress_snapshot_key(task_id)))
+    entries = await redis.xrange(progress_stream_key(task_id), min=last_id or "-", max="+")
+    events = _new_events(entries, last_id)
+    if events:
+        snapshot = fold_events(events, snapshot)
+        last_id = events[-1][0]
+        await redis.set(progress_snapshot_key(task_id), _compact(snapshot, last_id), ex=progress_stream_ttl())
+    return snapshot, last_id
+
+
+async def aread_progress_events(redis, task_id: str, last_id: str, block_ms: int = 1000, count: int = 100) -> List[ProgressEvent]:
+    """阻塞读取 last_id 之后的新事件（XREAD BLOCK），超时返回空列表"""
+    result = await redis.xread({progress_stream_key(task_id): last_id or "0-0"}, count=count, block=block_ms)
+    events: List[ProgressEvent] = []
+    for _, entries in result or []:
+        events.extend(_decode_entries(entries))
+    return events
+
+
+def is_terminal(event_type: str, data: Dict[str, Any]) -> bool:
+    return event_type == "final" or data.get("status") in TERMINAL_STATUSES
@@ -2,6 +2,7 @@
 进度跟踪器（过渡期）
 - 暂时从旧模块导入 RedisProgressTracker 类
 - 在本模块内提供 get_progress_by_id 的实现（与旧实现一致，修正 cls 引用）
+- 进度以增量事件追加到事件流（见 app.services.progress.stream），读取时才折叠为快照
 """
 from typing import Any, Dict, Optional, List
 import json
@@ -16,6 +17,12 @@ logger = logging.getLogger("app.services.progress.tracker")
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from .stream import ProgressStreamWriter, read_progress_snapshot
+from tradingagents.graph.latency_model import get_latency_model, profile_from_config
+
+# 读取时由 start_time / estimated_total_time 重新计算，不写入事件流（否则每次更新都会产生增量）
+STREAM_VOLATILE_FIELDS = ("elapsed_time", "remaining_time")
+
 
 @dataclass
 class AnalysisStep:
@@ -46,15 +53,19 @@ def safe_serialize(data):
 class RedisProgressTracker:
     """Redis进度跟踪器"""
 
-    def __init__(self, task_id: str, analysts: List[str], research_depth: str, llm_provider: str):
+    def __init__(self, task_id: str, analysts: List[str], research_depth: str, llm_provider: str, model: Optional[str] = None):
         self.task_id = task_id
         self.analysts = analysts
         self.research_depth = research_depth
         self.llm_provider = llm_provider
+        self.model = model
+        # 历史耗时预估（样本不足时为 None，使用经验公式）
+        self._latency_estimate = self._load_latency_estimate()
 
         # Redis连接
         self.redis_client = None
         self.use_redis = self._init_redis()
+        self._stream = ProgressStreamWriter(task_id, redis_client=self.redis_client if self.use_redis else None)
 
         # 进度数据
         self.progress_data = {
@@ -195,7 +206,29 @@ class RedisProgressTracker:
         """估算步骤执行时间（秒）"""
         return self._get_base_total_time() * step.weight
 
+    def _load_latency_estimate(self):
+        try:
+            return get_latency_model().estimate(self.analysts, self.research_depth, self.llm_provider, self.model)
+        except Exception as e:
+            logger.debug(f"[RedisProgress] 读取耗时模型失败: {e}")
+            return None
+
+    def apply_llm_config(self, config: Dict[str, Any]) -> None:
+        """分析配置确定后（供应商、模型）按精确画像刷新预估总时长"""
+        self.llm_provider, self.model = profile_from_config(config)
+        self._latency_estimate = self._load_latency_estimate()
+        elapsed, remaining, est_total = self._calculate_time_estimates()
+        self.progress_data['remaining_time'] = remaining
+        self.progress_data['estimated_total_time'] = est_total
+        self._save_progress()
+
     def _get_base_total_time(self) -> float:
+        """预估总时长（秒）：有足够的历史运行记录时取同画像的耗时中位数，否则使用经验公式"""
+        if self._latency_estimate is not None:
+            return self._latency_estimate.total_p50
+        return self._get_heuristic_total_time()
+
+    def _get_heuristic_total_time(self) -> float:
         """
         根据分析师数量、研究深度、模型类型预估总时长（秒）
 
@@ -265,6 +298,10 @@ class RedisProgressTracker:
             # 任务已完成
             est_total = elapsed
             remaining = 0
+        elif self._latency_estimate is not None and elapsed > 0:
+            # 按已运行时间条件化：同画像中比当前更慢的历史运行还需要多久
+            remaining = self._latency_estimate.remaining(elapsed)
+            est_total = elapsed + remaining
         else:
             # 使用预估的总时长（固定值）
             est_total = base_total
@@ -332,9 +369,6 @@ class RedisProgressTracker:
             self.progress_data['remaining_time'] = remaining
             self.progress_data['estimated_total_time'] = est_total
 
-            # 更新 progress_data 中的 steps
-            self.progress_data['steps'] = [asdict(step) for step in self.analysis_steps]
-
             self._save_progress()
             logger.debug(f"[RedisProgress] updated: {self.task_id} - {self.progress_data.get('progress_percentage', 0)}%")
             return self.progress_data
@@ -403,18 +437,13 @@ class RedisProgressTracker:
                 return step
         return None
 
-    def _save_progress(self) -> None:
+    def _save_progress(self, final: bool = False) -> None:
+        """把当前进度提交到事件流（只写出变化的字段，按最小间隔合并）"""
         try:
-            progress_copy = self.to_dict()
-            serialized = json.dumps(progress_copy)
-            if self.use_redis and self.redis_client:
-                key = f"progress:{self.task_id}"
-                self.redis_client.set(key, serialized)
-                self.redis_client.expire(key, 3600)
-            else:
-                os.makedirs("./data/progress", exist_ok=True)
-                with open(f"./data/progress/{self.task_id}.json", 'w', encoding='utf-8') as f:
-                    f.write(serialized)
+            document = self.to_dict()
+            for key in STREAM_VOLATILE_FIELDS:
+                document.pop(key, None)
+            self._stream.publish(document, final=final)
         except Exception as e:
             logger.error(f"[RedisProgress] save progress failed: {self.task_id} - {e}")
 
@@ -428,7 +457,7 @@ class RedisProgressTracker:
                 if step.status != 'failed':
                     step.status = 'completed'
                     step.end_time = step.end_time or time.time()
-            self._save_progress()
+            self._save_progress(final=True)
             return self.progress_data
         except Exception as e:
             logger.error(f"[RedisProgress] mark completed failed: {self.task_id} - {e}")
@@ -444,7 +473,7 @@ class RedisProgressTracker:
                 if step.status not in ('completed', 'failed'):
                     step.status = 'failed'
                     step.end_time = step.end_time or time.time()
-            self._save_progress()
+            self._save_progress(final=True)
             return self.progress_data
         except Exception as e:
             logger.error(f"[RedisProgress] mark failed failed: {self.task_id} - {e}")
@@ -452,7 +481,7 @@ class RedisProgressTracker:
 
     def to_dict(self) -> Dict[str, Any]:
         try:
-            return {
+            data = {
                 'task_id': self.task_id,
                 'analysts': self.analysts,
                 'research_depth': self.research_depth,
@@ -464,8 +493,17 @@ class RedisProgressTracker:
                 'estimated_total_time': self.progress_data.get('estimated_total_time', 0),
                 'progress_percentage': self.progress_data.get('progress_percentage', 0),
                 'status': self.progress_data.get('status', 'pending'),
-                'current_step': self.progress_data.get('current_step')
+                'current_step': self.progress_data.get('current_step'),
+                'total_steps': len(self.analysis_steps),
+                'current_step_name': self.progress_data.get('current_step_name'),
+                'current_step_description': self.progress_data.get('current_step_description'),
+                'last_message': self.progress_data.get('last_message'),
+                'last_update': self.progress_data.get('last_update'),
             }
+            for key in ('completed', 'failed', 'failed_reason', 'completed_time'):
+                if key in self.progress_data:
+                    data[key] = self.progress_data[key]
+            return data
         except Exception as e:
             logger.error(f"[RedisProgress] to_dict failed: {self.task_id} - {e}")
             return self.progress_data
@@ -508,16 +546,20 @@ def get_progress_by_id(task_id: str) -> Optional[Dict[str, Any]]:
                         decode_responses=True
                     )
 
-                key = f"progress:{task_id}"
-                data = redis_client.get(key)
-                if data:
-                    progress_data = json.loads(data)
+                # 折叠事件流（兼容只有旧的 progress:{task_id} 完整文档的情况）
+                progress_data = read_progress_snapshot(task_id, redis_client=redis_client)
+                if progress_data:
                     progress_data = RedisProgressTracker._calculate_static_time_estimates(progress_data)
                     return progress_data
             except Exception as e:
                 logger.debug(f"📊 [Redis进度] Redis读取失败: {e}")
 
-        # 尝试从文件读取
+        # 尝试从文件事件流读取
+        progress_data = read_progress_snapshot(task_id)
+        if progress_data:
+            return RedisProgressTracker._calculate_static_time_estimates(progress_data)
+
+        # 兼容旧的完整文档文件
         progress_file = f"./data/progress/{task_id}.json"
         if os.path.exists(progress_file):
             with open(progress_file, 'r', encoding='utf-8') as f:
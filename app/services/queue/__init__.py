@@ -2,6 +2,7 @@
 Queue 子包
 - keys: Redis 键名与常量
 - helpers: 队列相关的 Redis 操作辅助函数
+- scripts: 原子出队认领等 Lua 脚本
 """
 from .keys import (
     READY_LIST,
@@ -14,9 +15,16 @@ from .keys import (
     USER_PROCESSING_PREFIX,
     GLOBAL_CONCURRENT_KEY,
     VISIBILITY_TIMEOUT_PREFIX,
+    INFLIGHT_PREFIX,
+    WORKER_HEARTBEAT_KEY,
+    READY_ZSET,
     DEFAULT_USER_CONCURRENT_LIMIT,
     GLOBAL_CONCURRENT_LIMIT,
     VISIBILITY_TIMEOUT_SECONDS,
+    QUEUE_BLOCK_TIMEOUT_SECONDS,
+    SCHEDULING_FIFO,
+    SCHEDULING_SEJF,
+    DEFAULT_SEJF_AGING_RATE,
 )
 
 from .helpers import (
@@ -28,3 +36,4 @@ from .helpers import (
     clear_visibility_timeout,
 )
 
+from .scripts import CLAIM_TASK_LUA, POP_SHORTEST_LUA
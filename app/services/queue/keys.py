@@ -16,9 +16,23 @@ BATCH_TASKS_PREFIX = "qa:batch_tasks:"
 USER_PROCESSING_PREFIX = "qa:user_processing:"
 GLOBAL_CONCURRENT_KEY = "qa:global_concurrent"
 VISIBILITY_TIMEOUT_PREFIX = "qa:visibility:"
+# BLMOVE 取出后、Lua 认领前任务所在的 Worker 私有列表（Worker 崩溃时可回收）
+INFLIGHT_PREFIX = "qa:inflight:"
+# Worker 心跳键（由 Worker 定期写入并设置 TTL），心跳过期即视为 Worker 已退出
+WORKER_HEARTBEAT_KEY = "worker:{worker_id}:heartbeat"  # 与 RedisKeys.WORKER_HEARTBEAT 一致
+# 最短预期任务优先调度的就绪有序集合（score = 预期耗时 + 老化系数 × 入队时间）
+READY_ZSET = "qa:ready:sejf"
 
 # 配置常量 - 开源版限制
 DEFAULT_USER_CONCURRENT_LIMIT = 3
 GLOBAL_CONCURRENT_LIMIT = 3  # 开源版全局最大并发限制为3
 VISIBILITY_TIMEOUT_SECONDS = 300  # 5分钟
+# 阻塞出队的最长等待时间（秒），需小于 Redis 连接的 socket_timeout
+QUEUE_BLOCK_TIMEOUT_SECONDS = 5
+
+# 调度策略：fifo（默认）或 sejf（最短预期任务优先 + 老化）
+SCHEDULING_FIFO = "fifo"
+SCHEDULING_SEJF = "sejf"
+# 老化系数：每等待 1 秒，任务的排序耗时减少的秒数
+DEFAULT_SEJF_AGING_RATE = 1.0
 
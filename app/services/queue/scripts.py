@@ -0,0 +1,91 @@
+"""
+队列服务用到的 Lua 脚本
+
+认领脚本在一次 Redis 调用内完成：并发限制检查、标记处理中、设置可见性超时、
+更新任务状态并返回任务数据，替代原先 rpop 之后的 6~8 次往返和非原子的"超限放回"。
+
+最短预期任务优先（sejf）调度时，出队脚本从有序集合取出排序耗时最小的任务并原子地移入
+inflight 列表。
+"""
+
+# KEYS[1] = Worker 私有 inflight 列表
+# KEYS[2] = 就绪队列
+# KEYS[3] = 全局处理中集合
+# KEYS[4] = sejf 就绪有序集合
+# KEYS[5] = 任务哈希
+# KEYS[6] = 任务所属用户的处理中集合
+# KEYS[7] = 任务的可见性超时键
+# ARGV = task_id, worker_id, user, user_limit, global_limit, visibility_timeout, now, sejf_aging_rate
+#        （fifo 调度时 sejf_aging_rate 为空串）
+#
+# 脚本访问的键全部通过 KEYS 传入（Redis Cluster 按 KEYS 路由并校验），
+# 因此调用方需先读出任务所属用户；脚本内再次校验，用户不一致时按任务不存在处理。
+#
+# 返回:
+#   {1, HGETALL(task)}  认领成功
+#   {0, user}           超过并发限制，任务已放回就绪队列
+#   {-1}                任务数据不存在
+#   {-2}                任务已取消
+CLAIM_TASK_LUA = """
+local task_id = ARGV[1]
+local task_key = KEYS[5]
+redis.call('LREM', KEYS[1], 1, task_id)
+
+local user = redis.call('HGET', task_key, 'user')
+if not user or user ~= ARGV[3] then
+    return {-1}
+end
+if redis.call('HGET', task_key, 'status') == 'cancelled' then
+    return {-2}
+end
+
+local user_key = KEYS[6]
+if redis.call('SCARD', user_key) >= tonumber(ARGV[4])
+    or redis.call('SCARD', KEYS[3]) >= tonumber(ARGV[5]) then
+    if ARGV[8] ~= '' then
+        -- 按当前时间重新计算排序耗时（相当于 FIFO 放回队尾），避免受限任务一直占据队首
+        local expected = tonumber(redis.call('HGET', task_key, 'expected_duration') or '0') or 0
+        redis.call('ZADD', KEYS[4], expected + tonumber(ARGV[8]) * tonumber(ARGV[7]), task_id)
+    else
+        redis.call('LPUSH', KEYS[2], task_id)
+    end
+    return {0, user}
+end
+
+redis.call('SADD', user_key, task_id)
+redis.call('SADD', KEYS[3], task_id)
+
+local visibility_key = KEYS[7]
+local timeout = tonumber(ARGV[6])
+redis.call('HSET', visibility_key,
+    'task_id', task_id,
+    'worker_id', ARGV[2],
+    'timeout_at', tostring(tonumber(ARGV[7]) + timeout))
+redis.call('EXPIRE', visibility_key, timeout)
+
+redis.call('HSET', task_key,
+    'status', 'processing',
+    'worker_id', ARGV[2],
+    'started_at', ARGV[7])
+return {1, redis.call('HGETALL', task_key)}
+"""
+
+
+# KEYS[1] = 就绪队列（回收的 inflight 任务、过期重新入队的任务）
+# KEYS[2] = sejf 就绪有序集合
+# KEYS[3] = Worker 私有 inflight 列表
+#
+# 就绪队列中的任务都已等待过一轮，优先于有序集合取出。
+# 返回 task_id；两者都为空时返回 nil
+POP_SHORTEST_LUA = """
+local task_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[3])
+if task_id then
+    return task_id
+end
+local popped = redis.call('ZPOPMIN', KEYS[2])
+if popped[1] then
+    redis.call('LPUSH', KEYS[3], popped[1])
+    return popped[1]
+end
+return false
+"""
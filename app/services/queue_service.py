@@ -1,9 +1,19 @@
 """
 增强版队列服务
 基于现有实现，添加并发控制、优先级队列、可见性超时等功能
+
+调度策略（环境变量 QUEUE_SCHEDULING）：
+- fifo（默认）：就绪列表先进先出
+- sejf：最短预期任务优先 + 老化。入队时由耗时模型（tradingagents.graph.latency_model）
+  预估任务耗时，任务进入有序集合，score = 预期耗时 + 老化系数 × 入队时间。
+  排序值"预期耗时 - 老化系数 × 已等待时间"与 score 只差一个对所有任务相同的项，
+  因此静态 score 就能实现随等待时间提升优先级，快速分析不必排在深度分析之后，
+  而深度分析最多被推迟 (预期耗时差 / 老化系数) 秒。
+  老化系数由 QUEUE_SEJF_AGING_RATE 配置（默认 1.0）。
 """
 
 import json
+import os
 import time
 import uuid
 import asyncio
@@ -12,6 +22,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 
 from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
 from app.core.database import get_redis_client
 
@@ -26,6 +37,9 @@ from app.services.queue import (
     USER_PROCESSING_PREFIX,
     GLOBAL_CONCURRENT_KEY,
     VISIBILITY_TIMEOUT_PREFIX,
+    INFLIGHT_PREFIX,
+    WORKER_HEARTBEAT_KEY,
+    READY_ZSET,
     DEFAULT_USER_CONCURRENT_LIMIT,
     GLOBAL_CONCURRENT_LIMIT,
     VISIBILITY_TIMEOUT_SECONDS,
@@ -35,6 +49,11 @@ from app.services.queue import (
     unmark_task_processing,
     set_visibility_timeout,
     clear_visibility_timeout,
+    SCHEDULING_FIFO,
+    SCHEDULING_SEJF,
+    DEFAULT_SEJF_AGING_RATE,
+    CLAIM_TASK_LUA,
+    POP_SHORTEST_LUA,
 )
 
 logger = logging.getLogger(__name__)
@@ -45,20 +64,34 @@ logger = logging.getLogger(__name__)
 class QueueService:
     """增强版队列服务类"""
 
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Redis, scheduling: Optional[str] = None, aging_rate: Optional[float] = None):
         self.r = redis
         self.user_concurrent_limit = DEFAULT_USER_CONCURRENT_LIMIT
         self.global_concurrent_limit = GLOBAL_CONCURRENT_LIMIT
         self.visibility_timeout = VISIBILITY_TIMEOUT_SECONDS
+        self.scheduling = (scheduling or os.getenv("QUEUE_SCHEDULING", SCHEDULING_FIFO)).lower()
+        if aging_rate is None:
+            aging_rate = float(os.getenv("QUEUE_SEJF_AGING_RATE", str(DEFAULT_SEJF_AGING_RATE)))
+        self.aging_rate = aging_rate
+        self._claim_script = redis.register_script(CLAIM_TASK_LUA)
+        self._pop_script = redis.register_script(POP_SHORTEST_LUA)
+        # 服务端能力探测结果（旧版 Redis 不支持 BLMOVE / 未启用 Lua 时自动降级）
+        self._blmove_supported = True
+        self._lua_supported = True
 
     async def enqueue_task(
         self,
         user_id: str,
         symbol: str,
         params: Dict[str, Any],
-        batch_id: Optional[str] = None
+        batch_id: Optional[str] = None,
+        expected_duration: Optional[float] = None
     ) -> str:
-        """任务入队，支持并发控制（开源版FIFO队列）"""
+        """任务入队，支持并发控制（默认FIFO队列，sejf 调度时按预期耗时排序）
+
+        Args:
+            expected_duration: 预期耗时（秒），sejf 调度时为空则按参数预估
+        """
 
         # 检查用户并发限制
         if not await self._check_user_concurrent_limit(user_id):
@@ -85,11 +118,21 @@ class QueueService:
         if batch_id:
             mapping["batch_id"] = batch_id
 
+        sejf = self.scheduling == SCHEDULING_SEJF
+        if sejf:
+            if expected_duration is None:
+                expected_duration = await self.estimate_duration(params or {})
+            mapping["expected_duration"] = str(round(expected_duration, 2))
+
         # 保存任务数据
         await self.r.hset(key, mapping=mapping)
 
-        # 添加到FIFO队列
-        await self.r.lpush(READY_LIST, task_id)
+        if sejf:
+            # 最短预期任务优先，入队时间越早 score 越小（老化）
+            await self.r.zadd(READY_ZSET, {task_id: expected_duration + self.aging_rate * now})
+        else:
+            # 添加到FIFO队列
+            await self.r.lpush(READY_LIST, task_id)
 
         if batch_id:
             await self.r.sadd(BATCH_TASKS_PREFIX + batch_id, task_id)
@@ -97,49 +140,212 @@ class QueueService:
         logger.info(f"任务已入队: {task_id}")
         return task_id
 
-    async def dequeue_task(self, worker_id: str) -> Optional[Dict[str, Any]]:
-        """从FIFO队列中取出任务"""
+    async def estimate_duration(self, params: Dict[str, Any]) -> float:
+        """预估任务耗时（秒）：有历史记录时取同画像的中位数，否则使用经验公式"""
+        from app.services.memory_state_manager import estimate_analysis_duration
+        # 耗时模型可能需要读取 Redis（同步客户端），放到线程中执行
+        return await asyncio.to_thread(estimate_analysis_duration, params)
+
+    async def dequeue_task(self, worker_id: str, block_timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        从队列中取出任务（fifo 取最早入队的，sejf 取排序耗时最小的）
+
+        任务先通过 BLMOVE（旧版 Redis 为 BRPOPLPUSH）原子地移入 Worker 私有的
+        inflight 列表，再由 Lua 脚本一次完成并发限制检查、处理中标记、可见性超时
+        和状态更新，每个任务只需 2 次往返。
+
+        Args:
+            worker_id: Worker ID
+            block_timeout: 队列为空时阻塞等待的秒数，0 表示不阻塞
+
+        Returns:
+            任务数据；队列为空或受并发限制时返回 None
+        """
         try:
-            # 从FIFO队列获取任务
-            task_id = await self.r.rpop(READY_LIST)
+            inflight_key = INFLIGHT_PREFIX + worker_id
+            task_id = await self._move_to_inflight(inflight_key, block_timeout)
             if not task_id:
                 return None
 
-            # 获取任务详情
-            task_data = await self.get_task(task_id)
-            if not task_data:
-                logger.warning(f"任务数据不存在: {task_id}")
-                return None
+            return await self._claim_task(task_id, worker_id, inflight_key)
 
-            user_id = task_data.get("user")
+        except Exception as e:
+            logger.error(f"出队失败: {e}")
+            return None
 
-            # 再次检查并发限制（防止竞态条件）
-            if not await self._check_user_concurrent_limit(user_id):
-                # 如果超过限制，将任务放回队列
-                await self.r.lpush(READY_LIST, task_id)
-                logger.warning(f"用户 {user_id} 并发限制，任务重新入队: {task_id}")
-                return None
+    async def _move_to_inflight(self, inflight_key: str, block_timeout: float) -> Optional[str]:
+        """将队首任务移入 inflight 列表"""
+        if self.scheduling == SCHEDULING_SEJF:
+            return await self._move_shortest_to_inflight(inflight_key, block_timeout)
 
-            # 标记任务为处理中
-            await self._mark_task_processing(task_id, user_id, worker_id)
+        if block_timeout <= 0:
+            return await self.r.rpoplpush(READY_LIST, inflight_key)
 
-            # 设置可见性超时
-            await self._set_visibility_timeout(task_id, worker_id)
+        if self._blmove_supported:
+            try:
+                return await self.r.blmove(READY_LIST, inflight_key, block_timeout, "RIGHT", "LEFT")
+            except ResponseError as e:
+                if "unknown command" not in str(e).lower():
+                    raise
+                logger.info("Redis 不支持 BLMOVE，改用 BRPOPLPUSH")
+                self._blmove_supported = False
+        # BRPOPLPUSH 在 Redis 6.0 之前只接受整数秒
+        return await self.r.brpoplpush(READY_LIST, inflight_key, max(1, int(block_timeout)))
+
+    async def _move_shortest_to_inflight(self, inflight_key: str, block_timeout: float) -> Optional[str]:
+        """sejf：将排序耗时最小的任务移入 inflight 列表"""
+        task_id = await self._pop_shortest(inflight_key)
+        if task_id or block_timeout <= 0:
+            return task_id
+
+        # 队列为空时阻塞等待新任务。BZPOPMIN 与 LPUSH 之间不是原子的，
+        # 这个窗口内 Worker 崩溃会丢失该任务（任务数据仍保留为 queued）
+        popped = await self.r.bzpopmin(READY_ZSET, max(1, int(block_timeout)))
+        if not popped:
+            return None
+        task_id = popped[1]
+        await self.r.lpush(inflight_key, task_id)
+        return task_id
 
-            # 更新任务状态
-            await self.r.hset(TASK_PREFIX + task_id, mapping={
-                "status": "processing",
-                "worker_id": worker_id,
-                "started_at": str(int(time.time()))
-            })
+    async def _pop_shortest(self, inflight_key: str) -> Optional[str]:
+        if self._lua_supported:
+            try:
+                return await self._pop_script(keys=[READY_LIST, READY_ZSET, inflight_key])
+            except ResponseError as e:
+                if "unknown command" not in str(e).lower():
+                    raise
+                logger.warning("Redis 未启用 Lua 脚本，出队改用多次往返的非原子模式")
+                self._lua_supported = False
+
+        task_id = await self.r.rpoplpush(READY_LIST, inflight_key)
+        if task_id:
+            return task_id
+        popped = await self.r.zpopmin(READY_ZSET)
+        if not popped:
+            return None
+        task_id = popped[0][0]
+        await self.r.lpush(inflight_key, task_id)
+        return task_id
 
-            logger.info(f"任务已出队: {task_id} -> Worker: {worker_id}")
-            return task_data
+    async def _requeue(self, task_id: str) -> None:
+        """受并发限制的任务放回队列（sejf 按当前时间重新计算 score，相当于放回队尾）"""
+        if self.scheduling == SCHEDULING_SEJF:
+            expected = float(await self.r.hget(TASK_PREFIX + task_id, "expected_duration") or 0)
+            await self.r.zadd(READY_ZSET, {task_id: expected + self.aging_rate * int(time.time())})
+        else:
+            await self.r.lpush(READY_LIST, task_id)
 
-        except Exception as e:
-            logger.error(f"出队失败: {e}")
+    async def _claim_task(self, task_id: str, worker_id: str, inflight_key: str) -> Optional[Dict[str, Any]]:
+        """原子认领已移入 inflight 列表的任务"""
+        if not self._lua_supported:
+            return await self._claim_task_without_lua(task_id, worker_id, inflight_key)
+
+        # 任务所属用户决定了脚本要访问的用户处理中集合，需作为 KEYS 传入脚本
+        user_id = await self.r.hget(TASK_PREFIX + task_id, "user")
+        if not user_id:
+            await self.r.lrem(inflight_key, 1, task_id)
+            logger.warning(f"任务数据不存在: {task_id}")
+            return None
+
+        try:
+            result = await self._claim_script(
+                keys=[
+                    inflight_key,
+                    READY_LIST,
+                    SET_PROCESSING,
+                    READY_ZSET,
+                    TASK_PREFIX + task_id,
+                    USER_PROCESSING_PREFIX + user_id,
+                    VISIBILITY_TIMEOUT_PREFIX + task_id,
+                ],
+                args=[
+                    task_id,
+                    worker_id,
+                    user_id,
+                    self.user_concurrent_limit,
+                    self.global_concurrent_limit,
+                    self.visibility_timeout,
+                    int(time.time()),
+                    str(self.aging_rate) if self.scheduling == SCHEDULING_SEJF else "",
+                ],
+            )
+        except ResponseError as e:
+            if "unknown command" not in str(e).lower():
+                raise
+            logger.warning("Redis 未启用 Lua 脚本，出队改用多次往返的非原子模式")
+            self._lua_supported = False
+            return await self._claim_task_without_lua(task_id, worker_id, inflight_key)
+
+        code = int(result[0])
+        if code == -1:
+            logger.warning(f"任务数据不存在: {task_id}")
+            return None
+        if code == -2:
+            logger.info(f"任务已取消，跳过: {task_id}")
+            return None
+        if code == 0:
+            logger.warning(f"用户 {result[1]} 并发限制，任务重新入队: {task_id}")
+            return None
+
+        flat = result[1]
+        task_data = self._parse_task(dict(zip(flat[::2], flat[1::2])))
+        logger.info(f"任务已出队: {task_id} -> Worker: {worker_id}")
+        return task_data
+
+    async def _claim_task_without_lua(self, task_id: str, worker_id: str, inflight_key: str) -> Optional[Dict[str, Any]]:
+        """不支持 Lua 时的认领流程（与旧版 rpop 出队逻辑一致）"""
+        await self.r.lrem(inflight_key, 1, task_id)
+
+        task_data = await self.get_task(task_id)
+        if not task_data:
+            logger.warning(f"任务数据不存在: {task_id}")
             return None
 
+        user_id = task_data.get("user")
+
+        # 再次检查并发限制（防止竞态条件）
+        if not await self._check_user_concurrent_limit(user_id):
+            # 如果超过限制，将任务放回队列
+            await self._requeue(task_id)
+            logger.warning(f"用户 {user_id} 并发限制，任务重新入队: {task_id}")
+            return None
+
+        # 标记任务为处理中
+        await self._mark_task_processing(task_id, user_id, worker_id)
+
+        # 设置可见性超时
+        await self._set_visibility_timeout(task_id, worker_id)
+
+        # 更新任务状态
+        await self.r.hset(TASK_PREFIX + task_id, mapping={
+            "status": "processing",
+            "worker_id": worker_id,
+            "started_at": str(int(time.time()))
+        })
+
+        logger.info(f"任务已出队: {task_id} -> Worker: {worker_id}")
+        return task_data
+
+    async def recover_inflight_tasks(self, worker_id: str) -> int:
+        """将 Worker 上次异常退出时遗留在 inflight 列表中的任务放回就绪队列"""
+        inflight_key = INFLIGHT_PREFIX + worker_id
+        recovered = 0
+        while await self.r.rpoplpush(inflight_key, READY_LIST):
+            recovered += 1
+        if recovered:
+            logger.warning(f"回收 inflight 任务 {recovered} 个 -> Worker: {worker_id}")
+        return recovered
+
+    async def recover_orphaned_inflight_tasks(self) -> int:
+        """回收心跳已过期的 Worker 遗留的 inflight 列表（Worker 崩溃后不再以同一 ID 启动时）"""
+        recovered = 0
+        async for inflight_key in self.r.scan_iter(match=INFLIGHT_PREFIX + "*", count=100):
+            worker_id = inflight_key[len(INFLIGHT_PREFIX):]
+            if await self.r.exists(WORKER_HEARTBEAT_KEY.format(worker_id=worker_id)):
+                continue
+            recovered += await self.recover_inflight_tasks(worker_id)
+        return recovered
+
     async def ack_task(self, task_id: str, success: bool = True) -> bool:
         """确认任务完成"""
         try:
@@ -187,8 +393,11 @@ class QueueService:
             "submitted": str(len(symbols)),
             "created_at": str(now),
         })
+        # 同一批次参数相同，预期耗时只需预估一次
+        expected = await self.estimate_duration(params or {}) if self.scheduling == SCHEDULING_SEJF else None
         for s in symbols:
-            await self.enqueue_task(user_id=user_id, symbol=s, params=params, batch_id=batch_id)
+            await self.enqueue_task(user_id=user_id, symbol=s, params=params, batch_id=batch_id,
+                                    expected_duration=expected)
         return batch_id, len(symbols)
 
     async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
@@ -196,6 +405,10 @@ class QueueService:
         data = await self.r.hgetall(key)
         if not data:
             return None
+        return self._parse_task(data)
+
+    @staticmethod
+    def _parse_task(data: Dict[str, Any]) -> Dict[str, Any]:
         # parse fields
         if "params" in data:
             try:
@@ -223,7 +436,7 @@ class QueueService:
         return data
 
     async def stats(self) -> Dict[str, int]:
-        queued = await self.r.llen(READY_LIST)
+        queued = int(await self.r.llen(READY_LIST) or 0) + int(await self.r.zcard(READY_ZSET) or 0)
         processing = await self.r.scard(SET_PROCESSING)
         completed = await self.r.scard(SET_COMPLETED)
         failed = await self.r.scard(SET_FAILED)
@@ -255,6 +468,10 @@ class QueueService:
         """设置可见性超时（委托 helpers）"""
         await set_visibility_timeout(self.r, task_id, worker_id, self.visibility_timeout)
 
+    async def extend_visibility_timeout(self, task_id: str, worker_id: str):
+        """延长处理中任务的可见性超时（长时间分析的 Worker 定期调用）"""
+        await set_visibility_timeout(self.r, task_id, worker_id, self.visibility_timeout)
+
     async def _clear_visibility_timeout(self, task_id: str):
         """清除可见性超时"""
         await clear_visibility_timeout(self.r, task_id)
@@ -345,6 +562,7 @@ class QueueService:
             elif status == "queued":
                 # 如果在队列中，从队列移除
                 await self.r.lrem(READY_LIST, 0, task_id)
+                await self.r.zrem(READY_ZSET, task_id)
 
             # 更新任务状态
             await self.r.hset(TASK_PREFIX + task_id, mapping={
@@ -1,14 +1,17 @@
 import logging
 from datetime import datetime, time as dtime, timedelta
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List, Union
 from zoneinfo import ZoneInfo
 from collections import deque
 
-from pymongo import UpdateOne
+import numpy as np
+import pandas as pd
+from pymongo import UpdateMany, UpdateOne
 
 from app.core.config import settings
 from app.core.database import get_mongo_db
 from app.services.data_sources.manager import DataSourceManager
+from app.services.quotes_normalizer import QUOTE_FIELDS, quotes_map_to_frame
 
 logger = logging.getLogger(__name__)
 
@@ -364,50 +367,91 @@ class QuotesIngestionService:
         except Exception:
             return True
 
-    async def _bulk_upsert(self, quotes_map: Dict[str, Dict], trade_date: str, source: Optional[str] = None) -> None:
+    async def _changed_rows(self, coll, frame: pd.DataFrame, trade_date: str) -> np.ndarray:
+        """
+        与库中已有文档逐列对比，返回每行是否有变化的布尔掩码
+
+        对比的是 MongoDB 中的当前值（而非进程内缓存），其他进程或补数任务写入的变更同样能被识别；
+        库中不存在、交易日不同或任一字段不同的行视为有变化。读取失败时全部视为有变化。
+        """
+        try:
+            cursor = coll.find(
+                {"code": {"$in": frame["code"].tolist()}, "trade_date": trade_date},
+                {"_id": 0, "code": 1, **{field: 1 for field in QUOTE_FIELDS}},
+            )
+            docs = await cursor.to_list(length=None)
+        except Exception as e:
+            logger.warning(f"读取已入库行情失败，全部按有变化写入（忽略）: {e}")
+            return np.ones(len(frame), dtype=bool)
+
+        if not docs:
+            return np.ones(len(frame), dtype=bool)
+        stored = (
+            pd.DataFrame(docs, columns=["code", *QUOTE_FIELDS])
+            .drop_duplicates("code")
+            .set_index("code")
+        )
+        current = frame[QUOTE_FIELDS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+        previous = (
+            stored.reindex(frame["code"].to_numpy())[QUOTE_FIELDS]
+            .apply(pd.to_numeric, errors="coerce")
+            .to_numpy(dtype="float64")
+        )
+        same = ((current == previous) | (np.isnan(current) & np.isnan(previous))).all(axis=1)
+        same &= frame["code"].isin(stored.index).to_numpy()
+        return ~same
+
+    async def _bulk_upsert(self, quotes: Union[pd.DataFrame, Dict[str, Dict]], trade_date: str, source: Optional[str] = None) -> None:
+        """
+        批量写入行情
+
+        Args:
+            quotes: 标准化快照（code + QUOTE_FIELDS 列），或 {code: {...}} 字典
+            trade_date: 交易日
+            source: 数据源名称
+        """
+        # 使用标准化方法处理股票代码（去掉交易所前缀，如 sz000001 -> 000001）
+        frame = quotes if isinstance(quotes, pd.DataFrame) else quotes_map_to_frame(quotes)
+        if frame is None or frame.empty:
+            logger.info("无可写入的数据，跳过")
+            return
+
         db = get_mongo_db()
         coll = db[self.collection_name]
-        ops = []
+        mask = await self._changed_rows(coll, frame, trade_date)
+        changed = frame[mask]
+        unchanged_codes = frame.loc[~mask, "code"].tolist()
+
+        # 🔥 日志：记录写入的成交量值（只记录几个示例股票）
+        for row in changed[changed["code"].isin(["300750", "000001", "600000"])].itertuples(index=False):
+            logger.info(f"📊 [写入market_quotes] {row.code} - volume={row.volume}, amount={row.amount}, source={source}")
+
+        # 直接从列数组生成写入操作，NaN 写为 None
+        codes = changed["code"].to_numpy()
+        values = changed[QUOTE_FIELDS]
+        values = values.astype(object).where(values.notna(), None).to_numpy()
         updated_at = datetime.now(self.tz)
-        for code, q in quotes_map.items():
-            if not code:
-                continue
-            # 使用标准化方法处理股票代码（去掉交易所前缀，如 sz000001 -> 000001）
-            code6 = self._normalize_stock_code(code)
-            if not code6:
-                continue
-
-            # 🔥 日志：记录写入的成交量值
-            volume = q.get("volume")
-            if code6 in ["300750", "000001", "600000"]:  # 只记录几个示例股票
-                logger.info(f"📊 [写入market_quotes] {code6} - volume={volume}, amount={q.get('amount')}, source={source}")
-
-            ops.append(
-                UpdateOne(
-                    {"code": code6},
-                    {"$set": {
-                        "code": code6,
-                        "symbol": code6,  # 添加 symbol 字段，与 code 保持一致
-                        "close": q.get("close"),
-                        "pct_chg": q.get("pct_chg"),
-                        "amount": q.get("amount"),
-                        "volume": volume,
-                        "open": q.get("open"),
-                        "high": q.get("high"),
-                        "low": q.get("low"),
-                        "pre_close": q.get("pre_close"),
-                        "trade_date": trade_date,
-                        "updated_at": updated_at,
-                    }},
-                    upsert=True,
-                )
+        ops = [
+            UpdateOne(
+                {"code": code6},
+                {"$set": {
+                    "code": code6,
+                    "symbol": code6,  # 添加 symbol 字段，与 code 保持一致
+                    **dict(zip(QUOTE_FIELDS, row)),
+                    "trade_date": trade_date,
+                    "updated_at": updated_at,
+                }},
+                upsert=True,
             )
-        if not ops:
-            logger.info("无可写入的数据，跳过")
-            return
+            for code6, row in zip(codes, values)
+        ]
+        # 未变化的行只刷新 updated_at（路由以此展示最近更新时间），一条 UpdateMany 完成
+        if unchanged_codes:
+            ops.append(UpdateMany({"code": {"$in": unchanged_codes}}, {"$set": {"updated_at": updated_at}}))
+
         result = await coll.bulk_write(ops, ordered=False)
         logger.info(
-            f"✅ 行情入库完成 source={source}, matched={result.matched_count}, upserted={len(result.upserted_ids) if result.upserted_ids else 0}, modified={result.modified_count}"
+            f"✅ 行情入库完成 source={source}, changed={len(changed)}/{len(frame)}, matched={result.matched_count}, upserted={len(result.upserted_ids) if result.upserted_ids else 0}, modified={result.modified_count}"
         )
 
     async def backfill_from_historical_data(self) -> None:
@@ -534,7 +578,7 @@ class QuotesIngestionService:
         except Exception as e:
             logger.warning(f"backfill 触发检查失败（忽略）: {e}")
 
-    def _fetch_quotes_from_source(self, source_type: str, akshare_api: Optional[str] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    def _fetch_quotes_from_source(self, source_type: str, akshare_api: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
         """
         从指定数据源获取行情
 
@@ -543,7 +587,7 @@ class QuotesIngestionService:
             akshare_api: "eastmoney" | "sina" (仅当 source_type="akshare" 时有效)
 
         Returns:
-            (quotes_map, source_name)
+            (标准化快照 DataFrame, source_name)
         """
         try:
             if source_type == "tushare":
@@ -559,11 +603,11 @@ class QuotesIngestionService:
                     return None, None
 
                 logger.info("📊 使用 Tushare rt_k 接口获取实时行情")
-                quotes_map = adapter.get_realtime_quotes()
+                quotes = adapter.get_realtime_quotes_df()
 
-                if quotes_map:
+                if quotes is not None and not quotes.empty:
                     self._record_tushare_call()
-                    return quotes_map, "tushare"
+                    return quotes, "tushare"
                 else:
                     logger.warning("Tushare rt_k 返回空数据")
                     return None, None
@@ -578,10 +622,10 @@ class QuotesIngestionService:
 
                 api_name = akshare_api or "eastmoney"
                 logger.info(f"📊 使用 AKShare {api_name} 接口获取实时行情")
-                quotes_map = adapter.get_realtime_quotes(source=api_name)
+                quotes = adapter.get_realtime_quotes_df(source=api_name)
 
-                if quotes_map:
-                    return quotes_map, f"akshare_{api_name}"
+                if quotes is not None and not quotes.empty:
+                    return quotes, f"akshare_{api_name}"
                 else:
                     logger.warning(f"AKShare {api_name} 返回空数据")
                     return None, None
@@ -631,9 +675,9 @@ class QuotesIngestionService:
             source_type, akshare_api = self._get_next_source()
 
             # 尝试获取行情
-            quotes_map, source_name = self._fetch_quotes_from_source(source_type, akshare_api)
+            quotes, source_name = self._fetch_quotes_from_source(source_type, akshare_api)
 
-            if not quotes_map:
+            if quotes is None or quotes.empty:
                 logger.warning(f"⚠️ {source_name or source_type} 未获取到行情数据，跳过本次入库")
                 # 记录失败状态
                 await self._record_sync_status(
@@ -652,13 +696,13 @@ class QuotesIngestionService:
                 trade_date = datetime.now(self.tz).strftime("%Y%m%d")
 
             # 入库
-            await self._bulk_upsert(quotes_map, trade_date, source_name)
+            await self._bulk_upsert(quotes, trade_date, source_name)
 
             # 记录成功状态
             await self._record_sync_status(
                 success=True,
                 source=source_name,
-                records_count=len(quotes_map),
+                records_count=len(quotes),
                 error_msg=None
             )
 
@@ -0,0 +1,133 @@
+"""
+全市场快照的向量化标准化
+
+各数据源返回的全市场快照（5000+ 行）统一在这里转换为标准列：
+- 列名别名解析（东方财富/新浪/Tushare 等不同接口的列名）
+- 股票代码整列标准化为6位（去掉 sh/sz/bj 前缀和 .SZ 等后缀）
+- 数值列整列转换（逗号、百分号、'-'、空串 → NaN）和单位换算
+
+全部是整列的 pandas/NumPy 运算，不逐行调用 Python 函数。
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 标准字段 -> 候选列名（按优先级）
+QUOTE_COLUMN_ALIASES: Dict[str, List[str]] = {
+    "code": ["代码", "代码code", "code", "symbol", "股票代码", "ts_code"],
+    "close": ["最新价", "现价", "最新价(元)", "price", "最新", "trade", "close"],
+    "pct_chg": ["涨跌幅", "涨跌幅(%)", "涨幅", "pct_chg", "changepercent"],
+    "amount": ["成交额", "成交额(元)", "amount", "成交额(万元)", "amount(万元)"],
+    "volume": ["成交量", "成交量(手)", "volume", "成交量(股)", "vol"],
+    "open": ["今开", "开盘", "open", "今开(元)"],
+    "high": ["最高", "high"],
+    "low": ["最低", "low"],
+    "pre_close": ["昨收", "昨收(元)", "pre_close", "昨收价", "settlement"],
+}
+
+QUOTE_FIELDS = ["close", "pct_chg", "amount", "volume", "open", "high", "low", "pre_close"]
+
+
+def resolve_columns(df: pd.DataFrame, aliases: Dict[str, List[str]] = None) -> Dict[str, str]:
+    """解析标准字段对应的实际列名，返回 {标准字段: 实际列名}（缺失的字段不出现）"""
+    aliases = aliases or QUOTE_COLUMN_ALIASES
+    resolved = {}
+    for field, candidates in aliases.items():
+        col = next((c for c in candidates if c in df.columns), None)
+        if col is not None:
+            resolved[field] = col
+    return resolved
+
+
+def normalize_code_series(codes: pd.Series) -> pd.Series:
+    """
+    整列标准化股票代码为6位数字字符串
+
+    - sz000001 / 000001.SZ / 1 -> 000001
+    - 无法提取数字的代码变为空串（调用方据此丢弃）
+    """
+    s = codes.astype(str).str.strip()
+    # 去掉 .SZ/.SH/.BJ 后缀，再去掉所有非数字字符（交易所前缀）
+    s = s.str.split(".", n=1).str[0].str.replace(r"\D", "", regex=True)
+    stripped = s.str.lstrip("0")
+    s = stripped.where(stripped != "", np.where(s == "", "", "0"))
+    return s.str.zfill(6).where(s != "", "")
+
+
+def coerce_numeric_series(values: pd.Series) -> pd.Series:
+    """整列转换为 float64：数值列直接转换，文本列去掉逗号/百分号，无法解析的值为 NaN"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    s = values.astype(str).str.strip().str.replace(",", "", regex=False).str.rstrip("%")
+    return pd.to_numeric(s, errors="coerce").astype("float64")
+
+
+def normalize_quotes_frame(
+    df: pd.DataFrame,
+    aliases: Dict[str, List[str]] = None,
+    scale: Optional[Dict[str, float]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    将全市场快照标准化为 code + QUOTE_FIELDS 列的 DataFrame
+
+    Args:
+        df: 数据源返回的原始快照
+        aliases: 列名别名表，默认 QUOTE_COLUMN_ALIASES
+        scale: 单位换算系数，如 {"volume": 100} 表示手 -> 股
+
+    Returns:
+        标准化后的 DataFrame（code 去重，缺失字段为 NaN）；缺少代码列或价格列时返回 None
+    """
+    if df is None or df.empty:
+        return None
+    columns = resolve_columns(df, aliases)
+    if "code" not in columns or "close" not in columns:
+        return None
+
+    out = pd.DataFrame({"code": normalize_code_series(df[columns["code"]]).to_numpy()})
+    for field in QUOTE_FIELDS:
+        if field in columns:
+            values = coerce_numeric_series(df[columns[field]]).to_numpy()
+            if scale and field in scale:
+                values = values * scale[field]
+        else:
+            values = np.full(len(df), np.nan)
+        out[field] = values
+
+    out = out[out["code"] != ""]
+    return out.drop_duplicates("code", keep="last").reset_index(drop=True)
+
+
+def fill_pct_chg(frame: pd.DataFrame) -> pd.DataFrame:
+    """涨跌幅缺失时按 close / pre_close 计算（pre_close 为 0 或缺失时保持 NaN）"""
+    pre_close = frame["pre_close"].where(frame["pre_close"] != 0)
+    computed = (frame["close"] / pre_close - 1.0) * 100.0
+    frame["pct_chg"] = frame["pct_chg"].fillna(computed)
+    return frame
+
+
+def frame_to_quotes_map(frame: Optional[pd.DataFrame], fields: List[str] = None) -> Dict[str, Dict[str, Optional[float]]]:
+    """将标准化快照转换为 {code: {field: value}} 字典，NaN 转为 None"""
+    if frame is None or frame.empty:
+        return {}
+    fields = fields or QUOTE_FIELDS
+    values = frame[fields].astype(object)
+    values = values.where(frame[fields].notna(), None)
+    values.index = frame["code"].to_numpy()
+    return values.to_dict("index")
+
+
+def quotes_map_to_frame(quotes_map: Dict[str, Dict]) -> pd.DataFrame:
+    """将 {code: {field: value}} 字典转换为标准化快照（用于旧接口返回的字典）"""
+    if not quotes_map:
+        return pd.DataFrame(columns=["code"] + QUOTE_FIELDS)
+    frame = pd.DataFrame.from_dict(quotes_map, orient="index")
+    frame = frame.reindex(columns=QUOTE_FIELDS)
+    for field in QUOTE_FIELDS:
+        frame[field] = coerce_numeric_series(frame[field])
+    frame.insert(0, "code", normalize_code_series(pd.Series(frame.index, index=frame.index)))
+    frame = frame[frame["code"] != ""]
+    return frame.drop_duplicates("code", keep="last").reset_index(drop=True)
@@ -1,103 +1,54 @@
 """
-QuotesService: 提供A股批量实时快照获取（AKShare东方财富 spot 接口），带内存TTL缓存。
+QuotesService: 提供A股批量实时快照获取（AKShare东方财富 spot 接口），读取跨进程共享的全市场快照。
 - 不使用通达信（TDX）作为兜底数据源。
 - 仅用于筛选返回前对 items 进行行情富集。
 """
 from __future__ import annotations
 
 import asyncio
-import time
 import logging
 from typing import Dict, List, Optional
 
-logger = logging.getLogger(__name__)
-
+from app.services.quotes_normalizer import frame_to_quotes_map, normalize_quotes_frame
+from tradingagents.dataflows.cache.market_snapshot import MarketSnapshotStore, get_market_snapshot_store
 
-def _safe_float(v) -> Optional[float]:
-    try:
-        if v is None:
-            return None
-        # 处理字符串中的逗号/百分号/空白
-        if isinstance(v, str):
-            s = v.strip().replace(",", "")
-            if s.endswith("%"):
-                s = s[:-1]
-            if s == "-" or s == "":
-                return None
-            return float(s)
-        # 处理 pandas/numpy 数值
-        return float(v)
-    except Exception:
-        return None
+logger = logging.getLogger(__name__)
 
 
 class QuotesService:
-    def __init__(self, ttl_seconds: int = 30) -> None:
-        self._ttl = ttl_seconds
-        self._cache_ts: float = 0.0
-        self._cache: Dict[str, Dict[str, Optional[float]]] = {}
-        self._lock = asyncio.Lock()
+    def __init__(self, store: Optional[MarketSnapshotStore] = None) -> None:
+        self._store = store
+
+    @property
+    def store(self) -> MarketSnapshotStore:
+        if self._store is None:
+            self._store = get_market_snapshot_store()
+        return self._store
 
     async def get_quotes(self, codes: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
         """获取一批股票的近实时快照（最新价、涨跌幅、成交额）。
-        - 优先使用缓存；缓存超时或为空则刷新一次全市场快照。
+        - 读取跨进程共享的全市场快照；快照过期时由其中一个进程刷新一次。
         - 返回仅包含请求的 codes。
         """
         codes = [c.strip() for c in codes if c]
-        now = time.time()
-        async with self._lock:
-            if self._cache and (now - self._cache_ts) < self._ttl:
-                return {c: q for c, q in self._cache.items() if c in codes and q}
-            # 刷新缓存（阻塞IO放到线程）
-            data = await asyncio.to_thread(self._fetch_spot_akshare)
-            self._cache = data
-            self._cache_ts = time.time()
-            return {c: q for c, q in self._cache.items() if c in codes and q}
-
-    def _fetch_spot_akshare(self) -> Dict[str, Dict[str, Optional[float]]]:
-        """通过 AKShare 东方财富全市场快照接口拉取行情，并标准化为字典。
-        预期列（常见）：代码、名称、最新价、涨跌幅、成交额。
-        不同版本可能有差异，做多列名兼容。
-        """
-        try:
-            import akshare as ak  # 已在项目中使用，不额外安装
-            df = ak.stock_zh_a_spot_em()
-            if df is None or getattr(df, "empty", True):
-                logger.warning("AKShare spot 返回空数据")
-                return {}
-            # 兼容常见列名
-            code_col = next((c for c in ["代码", "代码code", "symbol", "股票代码"] if c in df.columns), None)
-            price_col = next((c for c in ["最新价", "现价", "最新价(元)", "price", "最新"] if c in df.columns), None)
-            pct_col = next((c for c in ["涨跌幅", "涨跌幅(%)", "涨幅", "pct_chg"] if c in df.columns), None)
-            amount_col = next((c for c in ["成交额", "成交额(元)", "amount", "成交额(万元)"] if c in df.columns), None)
-
-            if not code_col or not price_col:
-                logger.error(f"AKShare spot 缺少必要列: code={code_col}, price={price_col}")
-                return {}
-
-            result: Dict[str, Dict[str, Optional[float]]] = {}
-            for _, row in df.iterrows():  # type: ignore
-                code_raw = row.get(code_col)
-                if not code_raw:
-                    continue
-                # 标准化股票代码：移除前导0，然后补齐到6位
-                code_str = str(code_raw).strip()
-                # 如果是纯数字，移除前导0后补齐到6位
-                if code_str.isdigit():
-                    code_clean = code_str.lstrip('0') or '0'  # 移除前导0，如果全是0则保留一个0
-                    code = code_clean.zfill(6)  # 补齐到6位
-                else:
-                    code = code_str.zfill(6)
-                close = _safe_float(row.get(price_col))
-                pct = _safe_float(row.get(pct_col)) if pct_col else None
-                amt = _safe_float(row.get(amount_col)) if amount_col else None
-                # 若成交额单位为万元，统一转换为元（部分接口是万元，这里不强转，保持原样由前端展示单位）
-                result[code] = {"close": close, "pct_chg": pct, "amount": amt}
-            logger.info(f"AKShare spot 拉取完成: {len(result)} 条")
-            return result
-        except Exception as e:
-            logger.error(f"获取AKShare实时快照失败: {e}")
+        if not codes:
+            return {}
+        # 读取/刷新快照可能阻塞（网络、Redis），放到线程
+        snapshot = await asyncio.to_thread(self.store.get_snapshot)
+        if snapshot is None:
+            return {}
+        return self._normalize_rows(snapshot.select(codes))
+
+    @staticmethod
+    def _normalize_rows(df) -> Dict[str, Dict[str, Optional[float]]]:
+        """将快照行标准化为字典（整列向量化转换，列名别名见 QUOTE_COLUMN_ALIASES）。"""
+        frame = normalize_quotes_frame(df)
+        if frame is None:
+            if df is not None and not df.empty:
+                logger.error(f"全市场快照缺少必要列: {list(df.columns)}")
             return {}
+        # 成交额单位保持原样（部分接口是万元），由前端展示单位
+        return frame_to_quotes_map(frame, ["close", "pct_chg", "amount"])
 
 
 _quotes_service: Optional[QuotesService] = None
@@ -106,6 +57,6 @@ _quotes_service: Optional[QuotesService] = None
 def get_quotes_service() -> QuotesService:
     global _quotes_service
     if _quotes_service is None:
-        _quotes_service = QuotesService(ttl_seconds=30)
+        _quotes_service = QuotesService()
     return _quotes_service
 
@@ -157,6 +157,92 @@ def evaluate_conditions(
     return False
 
 
+def evaluate_conditions_frame(
+    last: pd.DataFrame,
+    prev: pd.DataFrame,
+    node: Dict[str, Any],
+    allowed_fields: Iterable[str],
+    allowed_ops: Iterable[str],
+) -> pd.Series:
+    """Vectorized counterpart of ``evaluate_conditions``.
+
+    ``last``/``prev`` hold the latest and previous bar of every symbol (index=symbol,
+    columns=fields). Returns a boolean Series with the same semantics per symbol.
+    """
+    index = last.index
+    if not node:
+        return pd.Series(True, index=index)
+    # group 节点
+    if node.get("op") == "group" or "children" in node:
+        logic = (node.get("logic") or "AND").upper()
+        children = node.get("children", [])
+        if logic not in {"AND", "OR"}:
+            logic = "AND"
+        mask = pd.Series(logic == "AND", index=index)
+        for c in children:
+            flags = evaluate_conditions_frame(last, prev, c, allowed_fields, allowed_ops)
+            mask = (mask & flags) if logic == "AND" else (mask | flags)
+        return mask
+
+    false = pd.Series(False, index=index)
+    field = node.get("field")
+    op = node.get("op")
+    if field not in allowed_fields or op not in set(allowed_ops):
+        return false
+
+    def column(frame: pd.DataFrame, name: str) -> pd.Series:
+        if name in frame.columns:
+            return frame[name].reindex(index).astype(float)
+        return pd.Series(np.nan, index=index)
+
+    # 交叉：比较最近两行
+    if op in {"cross_up", "cross_down"}:
+        right_field = node.get("right_field")
+        if right_field not in allowed_fields:
+            return false
+        a0, b0 = column(last, field), column(last, right_field)
+        a1, b1 = column(prev, field), column(prev, right_field)
+        valid = a0.notna() & a1.notna() & b0.notna() & b1.notna()
+        if op == "cross_up":
+            return valid & (a1 <= b1) & (a0 > b0)
+        return valid & (a1 >= b1) & (a0 < b0)
+
+    # 普通比较：最近一行
+    left = column(last, field)
+    valid = left.notna()
+
+    if node.get("right_field"):
+        rf = node.get("right_field")
+        if rf not in allowed_fields or op == "between":
+            return false
+        right: Any = column(last, rf)
+    else:
+        right = node.get("value")
+        try:
+            if op == "between":
+                lo, hi = right if isinstance(right, (list, tuple)) and len(right) == 2 else (None, None)
+                if lo is None or hi is None:
+                    return false
+                return valid & (left >= float(lo)) & (left <= float(hi))
+            right = float(right)
+        except Exception:
+            return false
+
+    if op == ">":
+        return valid & (left > right)
+    if op == "<":
+        return valid & (left < right)
+    if op == ">=":
+        return valid & (left >= right)
+    if op == "<=":
+        return valid & (left <= right)
+    if op == "==":
+        return valid & (left == right)
+    if op == "!=":
+        return valid & (left != right)
+    return false
+
+
 def safe_float(v: Any) -> Optional[float]:
     try:
         if v is None or (isinstance(v, float) and np.isnan(v)):
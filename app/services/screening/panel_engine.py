@@ -0,0 +1,246 @@
+"""
+Vectorized screening engine.
+
+Loads daily bars for the whole universe in symbol chunks (projected to the panel
+fields, suspended symbols dropped), lays them out as a (bar × symbol) panel and computes the screening indicators column-wise, so a
+full-market screen costs a handful of NumPy/pandas passes instead of one
+DataFrame pipeline per symbol.
+
+The panel is aligned by bar position (each symbol's latest bar is the last row,
+earlier rows are left-padded with NaN), so rolling windows and EMAs see exactly
+the same sequence as the per-symbol path in ``tradingagents.tools.analysis.indicators``.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("agents")
+
+# 各市场的日线集合（与 UnifiedStockService 保持一致）
+DAILY_COLLECTIONS = {
+    "CN": "stock_daily_quotes",
+    "HK": "stock_daily_quotes_hk",
+    "US": "stock_daily_quotes_us",
+}
+
+# 同一股票同一交易日存在多个数据源时的取值优先级
+SOURCE_PRIORITY = ["tushare", "akshare", "baostock"]
+
+PANEL_FIELDS = ("open", "high", "low", "close", "vol", "amount")
+
+# 按股票分批加载日线时每批的股票数
+LOAD_CHUNK_SYMBOLS = 500
+
+
+def _bars_frame(docs: List[Dict[str, Any]]) -> pd.DataFrame:
+    """查询结果 -> 去重后的长表（多数据源按优先级保留一条）"""
+    bars = pd.DataFrame(docs).rename(columns={"volume": "vol"})
+    for col in PANEL_FIELDS:
+        if col not in bars.columns:
+            bars[col] = np.nan
+        bars[col] = pd.to_numeric(bars[col], errors="coerce")
+
+    rank = {src: i for i, src in enumerate(SOURCE_PRIORITY)}
+    bars["_rank"] = bars.get("data_source", pd.Series(index=bars.index, dtype=object)).map(rank).fillna(len(rank))
+    bars = (
+        bars.sort_values(["symbol", "trade_date", "_rank"])
+        .drop_duplicates(["symbol", "trade_date"], keep="first")
+        .drop(columns=["_rank"])
+    )
+    return bars[["symbol", "trade_date", *PANEL_FIELDS]]
+
+
+def load_daily_bars(
+    db,
+    market: str,
+    start_date: str,
+    end_date: str,
+    symbols: Optional[Iterable[str]] = None,
+    chunk_size: int = LOAD_CHUNK_SYMBOLS,
+    drop_suspended: bool = True,
+) -> pd.DataFrame:
+    """
+    按股票分批加载区间内的日线（长表：symbol, trade_date, open, high, low, close, vol, amount）
+
+    只投影面板需要的字段，每批 chunk_size 只股票查询一次并立即转换为紧凑的 DataFrame，
+    内存峰值为一批文档而不是全市场文档。
+
+    Args:
+        db: 同步 pymongo Database
+        market: CN / HK / US
+        start_date: 开始日期 YYYY-MM-DD
+        end_date: 结束日期 YYYY-MM-DD
+        symbols: 限定股票代码，None 表示不限
+        chunk_size: 每批查询的股票数
+        drop_suspended: 是否丢弃最新K线不在面板结束日（区间内最新交易日）的股票（停牌/退市）
+    """
+    collection = db[DAILY_COLLECTIONS.get(market, DAILY_COLLECTIONS["CN"])]
+    query: Dict[str, Any] = {
+        "period": "daily",
+        "trade_date": {"$gte": start_date, "$lte": end_date},
+    }
+    if symbols is not None:
+        query["symbol"] = {"$in": list(symbols)}
+    empty = pd.DataFrame(columns=["symbol", "trade_date", *PANEL_FIELDS])
+
+    latest = collection.find_one(query, {"_id": 0, "trade_date": 1}, sort=[("trade_date", -1)])
+    if not latest:
+        return empty
+    panel_end = latest["trade_date"]
+    universe = sorted(collection.distinct("symbol", query))
+
+    projection = {
+        "_id": 0, "symbol": 1, "trade_date": 1, "data_source": 1,
+        "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1, "amount": 1,
+    }
+    frames = []
+    suspended = 0
+    for i in range(0, len(universe), chunk_size):
+        chunk = universe[i:i + chunk_size]
+        docs = list(collection.find({**query, "symbol": {"$in": chunk}}, projection).batch_size(20000))
+        if not docs:
+            continue
+        bars = _bars_frame(docs)
+        if drop_suspended:
+            last_date = bars.groupby("symbol", sort=False)["trade_date"].transform("max")
+            active = (last_date == panel_end).to_numpy()
+            suspended += bars.loc[~active, "symbol"].nunique()
+            bars = bars[active]
+        frames.append(bars)
+
+    if suspended:
+        logger.info(f"⏸️ 丢弃 {suspended} 只最新K线不在 {panel_end} 的股票（停牌/退市）")
+    if not frames:
+        return empty
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_panel(bars: pd.DataFrame, fields: Iterable[str] = PANEL_FIELDS) -> Dict[str, pd.DataFrame]:
+    """
+    长表 -> 按K线位置右对齐的宽表 {field: DataFrame(index=bar位置, columns=symbol)}
+
+    bars 需已按 (symbol, trade_date) 升序排列。
+    """
+    if bars.empty:
+        return {f: pd.DataFrame() for f in fields}
+
+    codes, symbols = pd.factorize(bars["symbol"], sort=False)
+    counts = np.bincount(codes)
+    max_len = int(counts.max())
+    # 每只股票的第 i 根K线放在 max_len - count + i 行，最新一根总在最后一行
+    position = bars.groupby(codes).cumcount().to_numpy() + (max_len - counts[codes])
+
+    panel = {}
+    for field in fields:
+        values = np.full((max_len, len(symbols)), np.nan)
+        values[position, codes] = bars[field].to_numpy(dtype=float)
+        panel[field] = pd.DataFrame(values, columns=symbols)
+    return panel
+
+
+def _kdj_panel(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame,
+               n: int = 9, m1: int = 3, m2: int = 3) -> Dict[str, pd.DataFrame]:
+    lowest_low = low.rolling(window=n, min_periods=n).min()
+    highest_high = high.rolling(window=n, min_periods=n).max()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = ((close - lowest_low) / (highest_high - lowest_low) * 100).to_numpy()
+    rsv[~np.isfinite(rsv)] = np.nan
+
+    # 递推沿时间方向进行，每一步对所有股票同时计算（初始化 50，遇到 NaN 保持上一值）
+    alpha_k = 1 / float(m1)
+    alpha_d = 1 / float(m2)
+    k = np.full(rsv.shape, np.nan)
+    d = np.full(rsv.shape, np.nan)
+    last_k = np.full(rsv.shape[1], 50.0)
+    last_d = np.full(rsv.shape[1], 50.0)
+    for i in range(rsv.shape[0]):
+        rv = rsv[i]
+        valid = ~np.isnan(rv)
+        curr_k = (1 - alpha_k) * last_k + alpha_k * rv
+        curr_d = (1 - alpha_d) * last_d + alpha_d * curr_k
+        k[i] = np.where(valid, curr_k, np.nan)
+        d[i] = np.where(valid, curr_d, np.nan)
+        last_k = np.where(valid, curr_k, last_k)
+        last_d = np.where(valid, curr_d, last_d)
+
+    columns = close.columns
+    k_df = pd.DataFrame(k, index=close.index, columns=columns)
+    d_df = pd.DataFrame(d, index=close.index, columns=columns)
+    return {"kdj_k": k_df, "kdj_d": d_df, "kdj_j": 3 * k_df - 2 * d_df}
+
+
+def compute_panel_indicators(panel: Dict[str, pd.DataFrame], fields: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """
+    在宽表上向量化计算筛选所需的字段（参数与 ScreeningService 的单股路径一致）
+
+    Returns:
+        新增字段后的 panel（原 panel 不修改）
+    """
+    fields = set(fields)
+    out = dict(panel)
+    close = panel["close"]
+
+    out["pct_chg"] = (close / close.shift(1) - 1) * 100.0
+
+    for n in (5, 10, 20, 60):
+        if f"ma{n}" in fields:
+            out[f"ma{n}"] = close.rolling(window=n, min_periods=1).mean()
+
+    need_macd = bool(fields & {"dif", "dea", "macd_hist"})
+    if need_macd or "ema12" in fields or "ema26" in fields:
+        ema12 = close.ewm(span=12, adjust=False).mean()
+        ema26 = close.ewm(span=26, adjust=False).mean()
+        out["ema12"], out["ema26"] = ema12, ema26
+        if need_macd:
+            dif = ema12 - ema26
+            dea = dif.ewm(span=9, adjust=False).mean()
+            out["dif"], out["dea"], out["macd_hist"] = dif, dea, dif - dea
+
+    if "rsi14" in fields:
+        delta = close.diff()
+        listed = close.notna()
+        # 上市前的填充行保持 NaN，首根K线的涨跌记为 0（与单股 rsi() 一致）
+        gain = delta.where(delta > 0, 0).where(listed)
+        loss = (-delta.where(delta < 0, 0)).where(listed)
+        avg_gain = gain.ewm(alpha=1 / 14.0, adjust=False).mean()
+        avg_loss = loss.ewm(alpha=1 / 14.0, adjust=False).mean()
+        rs = avg_gain / avg_loss.replace(0, np.nan)
+        out["rsi14"] = 100 - (100 / (1 + rs))
+
+    if fields & {"boll_mid", "boll_upper", "boll_lower"}:
+        mid = close.rolling(window=20, min_periods=1).mean()
+        std = close.rolling(window=20, min_periods=1).std()
+        out["boll_mid"], out["boll_upper"], out["boll_lower"] = mid, mid + 2.0 * std, mid - 2.0 * std
+
+    if "atr14" in fields:
+        high, low = panel["high"], panel["low"]
+        prev_close = close.shift(1)
+        tr = np.fmax(np.fmax((high - low).abs(), (high - prev_close).abs()), (low - prev_close).abs())
+        out["atr14"] = tr.rolling(window=14, min_periods=14).mean()
+
+    if fields & {"kdj_k", "kdj_d", "kdj_j"}:
+        out.update(_kdj_panel(panel["high"], panel["low"], close))
+
+    return out
+
+
+def snapshot(panel: Dict[str, pd.DataFrame], fields: Iterable[str], offset: int = 1) -> pd.DataFrame:
+    """取每只股票倒数第 offset 根K线的字段值，返回 DataFrame(index=symbol, columns=fields)"""
+    columns = {}
+    for field in fields:
+        frame = panel.get(field)
+        if frame is None or len(frame) < offset:
+            continue
+        columns[field] = frame.iloc[-offset]
+    if not columns:
+        return pd.DataFrame()
+    return pd.DataFrame(columns)
+
+
+def screening_fields(needed: Iterable[str], result_fields: Iterable[str]) -> List[str]:
+    """合并条件/排序字段与结果展示字段，保持顺序去重"""
+    return list(dict.fromkeys([*PANEL_FIELDS, "pct_chg", *needed, *result_fields]))
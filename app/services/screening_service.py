@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
@@ -17,9 +18,11 @@ from tradingagents.dataflows.providers.china.fundamentals_snapshot import get_cn
 from app.services.screening.eval_utils import (
     collect_fields_from_conditions as _collect_fields_from_conditions_util,
     evaluate_conditions as _evaluate_conditions_util,
+    evaluate_conditions_frame as _evaluate_conditions_frame_util,
     evaluate_fund_conditions as _evaluate_fund_conditions_util,
     safe_float as _safe_float_util,
 )
+from app.services.screening import panel_engine
 
 # --- DSL 约束 ---
 ALLOWED_FIELDS = {
@@ -54,6 +57,9 @@ FUND_FIELDS = {"pe", "pb", "roe", "market_cap"}
 
 ALLOWED_OPS = {">", "<", ">=", "<=", "==", "!=", "between", "cross_up", "cross_down"}
 
+# 结果中附带的技术指标字段（仅在条件涉及技术指标时填充）
+RESULT_TECH_FIELDS = ("ma20", "rsi14", "kdj_k", "kdj_d", "kdj_j", "dif", "dea", "macd_hist")
+
 
 @dataclass
 class ScreeningParams:
@@ -75,19 +81,12 @@ class ScreeningService:
 
     # --- 公共入口 ---
     def run(self, conditions: Dict[str, Any], params: ScreeningParams) -> Dict[str, Any]:
-        # 根據市場類型獲取股票列表
         market = params.market if params.market else "CN"
-        symbols = self._get_universe(market)
-        # 为控制时长，先限制样本规模（后续用批量/缓存优化）
-        symbols = symbols[:120]
-
         end_date = datetime.now()
         start_date = end_date - timedelta(days=220)
         end_s = end_date.strftime("%Y-%m-%d")
         start_s = start_date.strftime("%Y-%m-%d")
 
-        results: List[Dict[str, Any]] = []
-
         # 解析条件中涉及的字段，决定是否需要技术指标/行情
         needed_fields = self._collect_fields_from_conditions(conditions)
         order_fields = {o.get("field") for o in (params.order_by or []) if o.get("field")}
@@ -96,6 +95,52 @@ class ScreeningService:
         need_base = any(f in BASE_FIELDS for f in all_needed) or need_tech
         need_fund = any(f in FUND_FIELDS for f in all_needed)
 
+        results: Optional[List[Dict[str, Any]]] = None
+        if need_base and self._vectorized_enabled():
+            # 全市场分批加载日线 + 向量化指标
+            results = self._run_vectorized(conditions, market, start_s, end_s, all_needed, need_tech)
+
+        if results is None:
+            # 根據市場類型獲取股票列表
+            symbols = self._get_universe(market)
+            # 为控制时长，先限制样本规模
+            symbols = symbols[:120]
+            results = self._run_per_symbol(
+                conditions, symbols, market, start_s, end_s, need_base, need_tech, need_fund
+            )
+
+        total = len(results)
+        # 排序
+        if params.order_by:
+            for order in reversed(params.order_by):  # 后者优先级低
+                f = order.get("field")
+                d = order.get("direction", "desc").lower()
+                if f in ALLOWED_FIELDS:
+                    results.sort(key=lambda x: (x.get(f) is None, x.get(f)), reverse=(d == "desc"))
+
+        # 分页
+        start = params.offset or 0
+        end = start + (params.limit or 50)
+        page_items = results[start:end]
+
+        return {
+            "total": total,
+            "items": page_items,
+        }
+
+    def _run_per_symbol(
+        self,
+        conditions: Dict[str, Any],
+        symbols: List[str],
+        market: str,
+        start_s: str,
+        end_s: str,
+        need_base: bool,
+        need_tech: bool,
+        need_fund: bool,
+    ) -> List[Dict[str, Any]]:
+        """逐只股票评估条件（纯基本面条件，或数据库无日线数据时的兜底路径）"""
+        results: List[Dict[str, Any]] = []
         for code in symbols:
             try:
                 dfc = None
@@ -144,6 +189,7 @@ class ScreeningService:
                             IndicatorSpec("ma", {"n": 5}),
                             IndicatorSpec("ma", {"n": 10}),
                             IndicatorSpec("ma", {"n": 20}),
+                            IndicatorSpec("ma", {"n": 60}),
                             IndicatorSpec("ema", {"n": 12}),
                             IndicatorSpec("ema", {"n": 26}),
                             IndicatorSpec("macd"),
@@ -190,24 +236,68 @@ class ScreeningService:
             except Exception:
                 continue
 
-        total = len(results)
-        # 排序
-        if params.order_by:
-            for order in reversed(params.order_by):  # 后者优先级低
-                f = order.get("field")
-                d = order.get("direction", "desc").lower()
-                if f in ALLOWED_FIELDS:
-                    results.sort(key=lambda x: (x.get(f) is None, x.get(f)), reverse=(d == "desc"))
+        return results
+
+    def _run_vectorized(
+        self,
+        conditions: Dict[str, Any],
+        market: str,
+        start_s: str,
+        end_s: str,
+        all_needed: set,
+        need_tech: bool,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """从 MongoDB 批量加载日线，构建面板后向量化计算指标和条件
+
+        Returns:
+            命中的结果列表；数据库不可用或无日线数据时返回 None（由调用方退回逐只计算）
+        """
+        try:
+            from app.core.database import get_mongo_db_sync
+
+            started = time.perf_counter()
+            bars = panel_engine.load_daily_bars(get_mongo_db_sync(), market, start_s, end_s)
+            if bars.empty:
+                logger.warning(f"⚠️ {market} 日线集合在 {start_s}~{end_s} 无数据，退回逐只计算")
+                return None
+            loaded = time.perf_counter()
+
+            panel = panel_engine.build_panel(bars)
+            fields = panel_engine.screening_fields(all_needed, RESULT_TECH_FIELDS if need_tech else ())
+            panel = panel_engine.compute_panel_indicators(panel, fields)
+            last = panel_engine.snapshot(panel, fields, offset=1)
+            prev = panel_engine.snapshot(panel, fields, offset=2)
+            mask = _evaluate_conditions_frame_util(last, prev, conditions, ALLOWED_FIELDS, ALLOWED_OPS)
+            hits = last[mask.to_numpy()]
+        except Exception as e:
+            logger.warning(f"⚠️ 向量化选股失败，退回逐只计算: {e}")
+            return None
 
-        # 分页
-        start = params.offset or 0
-        end = start + (params.limit or 50)
-        page_items = results[start:end]
+        results: List[Dict[str, Any]] = []
+        for code, row in zip(hits.index, hits.to_dict("records")):
+            item = {
+                "code": code,
+                "close": self._safe_float(row.get("close")),
+                "pct_chg": self._safe_float(row.get("pct_chg")),
+                "amount": self._safe_float(row.get("amount")),
+            }
+            for f in RESULT_TECH_FIELDS:
+                item[f] = self._safe_float(row.get(f)) if need_tech else None
+            results.append(item)
+
+        logger.info(
+            f"📊 向量化选股: {last.shape[0]} 只股票, {len(bars)} 根K线, 命中 {len(results)}, "
+            f"加载 {loaded - started:.2f}s, 计算 {time.perf_counter() - loaded:.2f}s"
+        )
+        return results
+
+    def _vectorized_enabled(self) -> bool:
+        try:
+            from app.core.config import settings
+            return bool(getattr(settings, "SCREENING_VECTORIZED_ENABLED", True))
+        except Exception:
+            return True
 
-        return {
-            "total": total,
-            "items": page_items,
-        }
     def _evaluate_fund_conditions(self, snap: Dict[str, Any], node: Dict[str, Any]) -> bool:
         """Delegate fundamental condition evaluation to utils to keep service slim."""
         return _evaluate_fund_conditions_util(snap, node, FUND_FIELDS)
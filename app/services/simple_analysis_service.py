@@ -7,7 +7,7 @@ import asyncio
 import uuid
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Dict, Any, Optional, List
 from pathlib import Path
 import sys
 
@@ -19,8 +19,12 @@ sys.path.insert(0, str(project_root))
 from tradingagents.utils.logging_init import init_logging
 init_logging()
 
-from tradingagents.graph.trading_graph import TradingAgentsGraph
+from tradingagents.graph.graph_pool import get_trading_graph_pool
 from tradingagents.default_config import DEFAULT_CONFIG
+
+if TYPE_CHECKING:
+    # 图实例由 graph_pool 按需创建，模块导入时不加载全部智能体和 LLM SDK
+    from tradingagents.graph.trading_graph import TradingAgentsGraph
 from app.models.analysis import (
     AnalysisTask, AnalysisStatus, SingleAnalysisRequest, AnalysisParameters
 )
@@ -592,20 +596,21 @@ class SimpleAnalysisService:
     """简化的股票分析服务类"""
 
     def __init__(self):
-        self._trading_graph_cache = {}
         self.memory_manager = get_memory_state_manager()
 
         # 进度跟踪器缓存
         self._progress_trackers: Dict[str, RedisProgressTracker] = {}
 
         # 🔧 创建共享的线程池，支持并发执行多个分析任务
-        # 默认最多同时执行3个分析任务（可根据服务器资源调整）
+        # 默认最多同时执行3个分析任务（ANALYSIS_THREAD_POOL_SIZE 可根据服务器资源调整）
         import concurrent.futures
-        self._thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+        from app.core.config import settings
+        pool_size = max(1, int(getattr(settings, 'ANALYSIS_THREAD_POOL_SIZE', 3)))
+        self._thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size)
 
         logger.info(f"🔧 [服务初始化] SimpleAnalysisService 实例ID: {id(self)}")
         logger.info(f"🔧 [服务初始化] 内存管理器实例ID: {id(self.memory_manager)}")
-        logger.info(f"🔧 [服务初始化] 线程池最大并发数: 3")
+        logger.info(f"🔧 [服务初始化] 线程池最大并发数: {pool_size}")
 
         # 设置 WebSocket 管理器
         # 简单的股票名称缓存，减少重复查询
@@ -704,26 +709,16 @@ class SimpleAnalysisService:
             logger.warning(f"⚠️ 生成新的用户ID: {new_object_id}")
             return PyObjectId(new_object_id)
 
-    def _get_trading_graph(self, config: Dict[str, Any]) -> TradingAgentsGraph:
+    def _get_trading_graph(self, config: Dict[str, Any]) -> "TradingAgentsGraph":
         """获取或创建TradingAgents实例
 
-        ⚠️ 注意：为了避免并发执行时的数据混淆，每次都创建新实例
-        虽然这会增加一些初始化开销，但可以确保线程安全
-
-        TradingAgentsGraph 实例包含可变状态（self.ticker, self.curr_state等），
-        如果多个线程共享同一个实例，会导致数据混淆。
+        每次运行的状态（ticker、curr_state 等）保存在线程本地的 RunContext 中，
+        编译好的图可以被并发任务安全共享。相同配置（分析师、供应商、模型、研究深度）
+        的实例从全局图实例池复用，省去 LLM 客户端创建和图编译的开销。
         """
-        # 🔧 [并发安全] 每次都创建新实例，避免多线程共享状态
-        # 不再使用缓存，因为 TradingAgentsGraph 有可变的实例变量
-        logger.info(f"🔧 创建新的TradingAgents实例（并发安全模式）...")
-
-        trading_graph = TradingAgentsGraph(
-            selected_analysts=config.get("selected_analysts", ["market", "fundamentals"]),
-            debug=config.get("debug", False),
-            config=config
-        )
+        trading_graph = get_trading_graph_pool().get(config)
 
-        logger.info(f"✅ TradingAgents实例创建成功（实例ID: {id(trading_graph)}）")
+        logger.info(f"✅ TradingAgents实例就绪（实例ID: {id(trading_graph)}）")
 
         return trading_graph
 
@@ -915,7 +910,7 @@ class SimpleAnalysisService:
             # 缓存进度跟踪器
             self._progress_trackers[task_id] = progress_tracker
 
-            # 注册到日志监控
+            # 订阅本任务的图节点进度事件
             register_analysis_tracker(task_id, progress_tracker)
 
             # 初始化进度（在线程中执行）
@@ -1249,6 +1244,10 @@ class SimpleAnalysisService:
             config["deep_backend_url"] = deep_backend_url
             config["backend_url"] = quick_backend_url  # 保持向后兼容
 
+            # 模型确定后按历史耗时刷新预估总时长
+            if progress_tracker:
+                progress_tracker.apply_llm_config(config)
+
             # 🔍 验证配置中的模型
             logger.info(f"🔍 [模型验证] 配置中的快速模型: {config.get('quick_think_llm')}")
             logger.info(f"🔍 [模型验证] 配置中的深度模型: {config.get('deep_think_llm')}")
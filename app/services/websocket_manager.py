@@ -1,14 +1,25 @@
 """
 WebSocket 连接管理器
 用于实时推送分析进度更新
+
+任务有连接时，管理器直接 XREAD 该任务的进度事件流（app.services.progress.stream），
+把增量合并后推送给所有连接；分析在其他进程（Worker）中执行时同样能收到进度。
 """
 
 import asyncio
 import json
 import logging
-from typing import Dict, Set, Any
+from datetime import datetime
+from typing import Dict, Set, Any, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 
+from app.services.progress.stream import (
+    aread_progress_events,
+    aread_progress_snapshot,
+    fold_events,
+    is_terminal,
+)
+
 logger = logging.getLogger(__name__)
 
 class WebSocketManager:
@@ -18,6 +29,8 @@ class WebSocketManager:
         # 存储活跃连接：{task_id: {websocket1, websocket2, ...}}
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self._lock = asyncio.Lock()
+        # 每个有连接的任务一个进度事件流转发协程：{task_id: Task}
+        self._relays: Dict[str, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket, task_id: str):
         """建立 WebSocket 连接"""
@@ -27,6 +40,8 @@ class WebSocketManager:
             if task_id not in self.active_connections:
                 self.active_connections[task_id] = set()
             self.active_connections[task_id].add(websocket)
+            if task_id not in self._relays:
+                self._relays[task_id] = asyncio.create_task(self._relay_progress_stream(task_id))
         
         logger.info(f"🔌 WebSocket 连接建立: {task_id}")
     
@@ -58,6 +73,60 @@ class WebSocketManager:
                     if task_id in self.active_connections:
                         self.active_connections[task_id].discard(connection)
     
+    async def _relay_progress_stream(self, task_id: str):
+        """读取任务的进度事件流并推送给该任务的连接，连接全部断开或任务结束后退出"""
+        try:
+            from app.core.database import get_redis_client
+            redis = get_redis_client()
+        except Exception as e:
+            logger.debug(f"📡 Redis 不可用，跳过进度事件流转发: {task_id} - {e}")
+            self._relays.pop(task_id, None)
+            return
+
+        try:
+            snapshot, cursor = await aread_progress_snapshot(redis, task_id)
+            cursor = cursor or "0-0"
+            if snapshot:
+                await self.send_progress_update(task_id, self._progress_message(task_id, snapshot, cursor))
+
+            while await self.get_connection_count(task_id) > 0:
+                events = await aread_progress_events(redis, task_id, cursor, block_ms=1000)
+                if not events:
+                    continue
+                delta: Dict[str, Any] = {}
+                finished = False
+                for event_id, event_type, data in events:
+                    cursor = event_id
+                    snapshot = fold_events([(event_id, event_type, data)], snapshot)
+                    if isinstance(data.get("steps"), dict) and isinstance(delta.get("steps"), dict):
+                        data = {**data, "steps": {**delta["steps"], **data["steps"]}}
+                    delta.update(data)
+                    finished = finished or is_terminal(event_type, data)
+                await self.send_progress_update(task_id, self._progress_message(task_id, snapshot, cursor, delta))
+                if finished:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ 进度事件流转发失败: {task_id} - {e}")
+        finally:
+            self._relays.pop(task_id, None)
+
+    @staticmethod
+    def _progress_message(task_id: str, snapshot: Dict[str, Any], event_id: str, delta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """把折叠后的进度转换为前端使用的 progress_update 消息（delta 为本次变化的字段）"""
+        return {
+            "type": "progress_update",
+            "task_id": task_id,
+            "status": snapshot.get("status"),
+            "progress": snapshot.get("progress_percentage", snapshot.get("progress")),
+            "message": snapshot.get("last_message"),
+            "current_step": snapshot.get("current_step_name") or snapshot.get("current_step"),
+            "event_id": event_id,
+            "delta": delta if delta is not None else snapshot,
+            "timestamp": datetime.now().isoformat()
+        }
+
     async def broadcast_to_user(self, user_id: str, message: Dict[str, Any]):
         """向用户的所有连接广播消息"""
         # 这里可以扩展为按用户ID管理连接
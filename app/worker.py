@@ -21,6 +21,7 @@ sys.path.insert(0, str(project_root))
 from app.core.logging_config import setup_logging
 from app.core.database import init_db, close_db, get_redis_client
 from app.core.config import settings
+from app.services.progress.stream import progress_stream_key, progress_stream_ttl
 
 # Redis keys (must match queue_service)
 READY_LIST = "qa:ready"
@@ -33,7 +34,7 @@ logger = logging.getLogger("worker")
 
 
 async def publish_progress(task_id: str, message: str, step: Optional[int] = None, total_steps: Optional[int] = None):
-    """Publish progress updates to Redis pubsub for SSE streaming"""
+    """Append a progress message to the task's progress event stream for SSE streaming"""
     r = get_redis_client()
     progress_data = {
         "task_id": task_id,
@@ -46,7 +47,9 @@ async def publish_progress(task_id: str, message: str, step: Optional[int] = Non
         progress_data["progress"] = round((step / total_steps) * 100, 1)
 
     try:
-        await r.publish(f"task_progress:{task_id}", json.dumps(progress_data, ensure_ascii=False))
+        key = progress_stream_key(task_id)
+        await r.xadd(key, {"type": "message", "data": json.dumps(progress_data, ensure_ascii=False)})
+        await r.expire(key, progress_stream_ttl())
     except Exception as e:
         logger.warning(f"Failed to publish progress for task {task_id}: {e}")
 
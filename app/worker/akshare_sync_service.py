@@ -8,7 +8,9 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
 from app.core.database import get_mongo_db
+from app.core.rate_limiter import get_akshare_rate_limiter
 from app.services.historical_data_service import get_historical_data_service
+from app.services.historical_sync_pipeline import HistoricalSyncPipeline
 from app.services.news_data_service import get_news_data_service
 from tradingagents.dataflows.providers.china.akshare import get_akshare_provider
 
@@ -32,7 +34,7 @@ class AKShareSyncService:
         self.news_service = None  # 延迟初始化
         self.db = None
         self.batch_size = 100
-        self.rate_limit_delay = 0.2  # AKShare建议的延迟
+        self.rate_limiter = get_akshare_rate_limiter()
     
     async def initialize(self):
         """初始化同步服务"""
@@ -84,6 +86,7 @@ class AKShareSyncService:
         
         try:
             # 1. 获取股票列表
+            await self.rate_limiter.acquire("stock_info_a_code_name")
             stock_list = await self.provider.get_stock_list()
             if not stock_list:
                 logger.warning("⚠️ 未获取到股票列表")
@@ -107,10 +110,6 @@ class AKShareSyncService:
                 progress = min(i + self.batch_size, len(stock_list))
                 logger.info(f"📈 基础信息同步进度: {progress}/{len(stock_list)} "
                            f"(成功: {stats['success_count']}, 错误: {stats['error_count']})")
-                
-                # API限流
-                if i + self.batch_size < len(stock_list):
-                    await asyncio.sleep(self.rate_limit_delay)
             
             # 3. 完成统计
             stats["end_time"] = datetime.utcnow()
@@ -151,6 +150,7 @@ class AKShareSyncService:
                         continue
                 
                 # 获取详细基础信息
+                await self.rate_limiter.acquire()
                 basic_info = await self.provider.get_stock_basic_info(code)
                 
                 if basic_info:
@@ -312,10 +312,6 @@ class AKShareSyncService:
                         progress = min(i + self.batch_size, len(symbols))
                         logger.info(f"📈 行情同步进度: {progress}/{len(symbols)} "
                                    f"(成功: {stats['success_count']}, 错误: {stats['error_count']})")
-
-                        # API限流
-                        if i + self.batch_size < len(symbols):
-                            await asyncio.sleep(self.rate_limit_delay)
                 else:
                     # 3. 使用获取到的全市场数据，分批保存到数据库
                     logger.info(f"✅ 获取到 {len(quotes_map)} 只股票的行情数据，开始保存...")
@@ -460,7 +456,7 @@ class AKShareSyncService:
             "errors": []
         }
 
-        # 逐个获取行情数据（添加延迟避免频率限制）
+        # 逐个获取行情数据（由 rate_limiter 控制频率）
         for symbol in batch:
             try:
                 success = await self._get_and_save_quotes(symbol)
@@ -474,9 +470,6 @@ class AKShareSyncService:
                         "context": "_process_quotes_batch_fallback"
                     })
 
-                # 添加延迟避免频率限制
-                await asyncio.sleep(0.1)
-
             except Exception as e:
                 batch_stats["error_count"] += 1
                 batch_stats["errors"].append({
@@ -490,6 +483,7 @@ class AKShareSyncService:
     async def _get_and_save_quotes(self, symbol: str) -> bool:
         """获取并保存单个股票行情"""
         try:
+            await self.rate_limiter.acquire()
             quotes = await self.provider.get_stock_quotes(symbol)
             if quotes:
                 # 转换为字典格式
@@ -590,27 +584,42 @@ class AKShareSyncService:
 
             logger.info(f"📊 历史数据同步: 结束日期={end_date}, 股票数量={len(symbols)}, 模式={'增量' if incremental else '全量'}")
 
-            # 4. 批量处理
-            for i in range(0, len(symbols), self.batch_size):
-                batch = symbols[i:i + self.batch_size]
-                batch_stats = await self._process_historical_batch(
-                    batch, start_date, end_date, period, incremental
-                )
+            # 4. 流水线同步：并发获取（受 rate_limiter 限制）、线程池标准化、合并批量写入
+            async def fetch(symbol: str):
+                symbol_start_date = start_date
+                if not symbol_start_date:
+                    if incremental:
+                        # 增量同步：获取该股票的最后日期
+                        symbol_start_date = await self._get_last_sync_date(symbol)
+                    else:
+                        # 全量同步：最近1年
+                        symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+                return await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period)
 
-                # 更新统计
-                stats["success_count"] += batch_stats["success_count"]
-                stats["error_count"] += batch_stats["error_count"]
-                stats["total_records"] += batch_stats["total_records"]
-                stats["errors"].extend(batch_stats["errors"])
+            async def on_progress(progress):
+                logger.info(f"📈 历史数据同步进度: {progress.completed}/{progress.total} "
+                           f"(成功: {progress.success_count}, 记录: {progress.total_records})")
 
-                # 进度日志
-                progress = min(i + self.batch_size, len(symbols))
-                logger.info(f"📈 历史数据同步进度: {progress}/{len(symbols)} "
-                           f"(成功: {stats['success_count']}, 记录: {stats['total_records']})")
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
 
-                # API限流
-                if i + self.batch_size < len(symbols):
-                    await asyncio.sleep(self.rate_limit_delay)
+            pipeline = HistoricalSyncPipeline(
+                fetch=fetch,
+                data_source="akshare",
+                historical_service=self.historical_service,
+                market="CN",
+                period=period,
+                rate_limiter=self.rate_limiter,
+                on_progress=on_progress,
+                progress_interval=10.0,
+            )
+            pipeline_result = await pipeline.run(symbols)
+
+            stats["success_count"] = pipeline_result.success_count
+            # 空数据与之前一样计为错误
+            stats["error_count"] = pipeline_result.error_count + pipeline_result.empty_count
+            stats["total_records"] = pipeline_result.total_records
+            stats["errors"].extend(pipeline_result.errors)
 
             # 4. 完成统计
             stats["end_time"] = datetime.utcnow()
@@ -629,72 +638,6 @@ class AKShareSyncService:
             stats["errors"].append({"error": str(e), "context": "sync_historical_data"})
             return stats
 
-    async def _process_historical_batch(
-        self,
-        batch: List[str],
-        start_date: str,
-        end_date: str,
-        period: str = "daily",
-        incremental: bool = False
-    ) -> Dict[str, Any]:
-        """处理历史数据批次"""
-        batch_stats = {
-            "success_count": 0,
-            "error_count": 0,
-            "total_records": 0,
-            "errors": []
-        }
-
-        for symbol in batch:
-            try:
-                # 确定该股票的起始日期
-                symbol_start_date = start_date
-                if not symbol_start_date:
-                    if incremental:
-                        # 增量同步：获取该股票的最后日期
-                        symbol_start_date = await self._get_last_sync_date(symbol)
-                        logger.debug(f"📅 {symbol}: 从 {symbol_start_date} 开始同步")
-                    else:
-                        # 全量同步：最近1年
-                        symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-
-                # 获取历史数据
-                hist_data = await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period)
-
-                if hist_data is not None and not hist_data.empty:
-                    # 保存到统一历史数据集合
-                    if self.historical_service is None:
-                        self.historical_service = await get_historical_data_service()
-
-                    saved_count = await self.historical_service.save_historical_data(
-                        symbol=symbol,
-                        data=hist_data,
-                        data_source="akshare",
-                        market="CN",
-                        period=period
-                    )
-
-                    batch_stats["success_count"] += 1
-                    batch_stats["total_records"] += saved_count
-                    logger.debug(f"✅ {symbol}历史数据同步成功: {saved_count}条记录")
-                else:
-                    batch_stats["error_count"] += 1
-                    batch_stats["errors"].append({
-                        "code": symbol,
-                        "error": "历史数据为空",
-                        "context": "_process_historical_batch"
-                    })
-
-            except Exception as e:
-                batch_stats["error_count"] += 1
-                batch_stats["errors"].append({
-                    "code": symbol,
-                    "error": str(e),
-                    "context": "_process_historical_batch"
-                })
-
-        return batch_stats
-
     async def _get_last_sync_date(self, symbol: str = None) -> str:
         """
         获取最后同步日期
@@ -811,10 +754,6 @@ class AKShareSyncService:
                 logger.info(f"📈 财务数据同步进度: {progress}/{len(symbols)} "
                            f"(成功: {stats['success_count']}, 错误: {stats['error_count']})")
 
-                # API限流
-                if i + self.batch_size < len(symbols):
-                    await asyncio.sleep(self.rate_limit_delay)
-
             # 3. 完成统计
             stats["end_time"] = datetime.utcnow()
             stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
@@ -843,6 +782,7 @@ class AKShareSyncService:
         for symbol in batch:
             try:
                 # 获取财务数据
+                await self.rate_limiter.acquire()
                 financial_data = await self.provider.get_financial_data(symbol)
 
                 if financial_data:
@@ -1067,10 +1007,6 @@ class AKShareSyncService:
                 logger.info(f"📈 新闻同步进度: {progress}/{len(symbols)} "
                            f"(成功: {stats['success_count']}, 新闻: {stats['news_count']})")
 
-                # API限流
-                if i + self.batch_size < len(symbols):
-                    await asyncio.sleep(self.rate_limit_delay)
-
             # 3. 完成统计
             stats["end_time"] = datetime.utcnow()
             stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
@@ -1105,6 +1041,7 @@ class AKShareSyncService:
         for symbol in batch:
             try:
                 # 从AKShare获取新闻数据
+                await self.rate_limiter.acquire()
                 news_data = await self.provider.get_stock_news(
                     symbol=symbol,
                     limit=max_news_per_stock
@@ -1126,9 +1063,6 @@ class AKShareSyncService:
                     logger.debug(f"⚠️ {symbol} 未获取到新闻数据")
                     batch_stats["success_count"] += 1  # 没有新闻也算成功
 
-                # 🔥 API限流：成功后休眠
-                await asyncio.sleep(0.2)
-
             except Exception as e:
                 batch_stats["error_count"] += 1
                 error_msg = f"{symbol}: {str(e)}"
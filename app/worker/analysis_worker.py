@@ -5,13 +5,16 @@
 
 import asyncio
 import logging
+import os
 import signal
+import socket
 import sys
-import uuid
+import time
 import traceback
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
@@ -24,25 +27,50 @@ from app.core.redis_client import init_redis, close_redis
 from app.core.config import settings
 from app.models.analysis import AnalysisTask, AnalysisParameters
 from app.services.config_provider import provider as config_provider
-from app.services.queue import DEFAULT_USER_CONCURRENT_LIMIT, GLOBAL_CONCURRENT_LIMIT, VISIBILITY_TIMEOUT_SECONDS
+from app.services.queue import DEFAULT_USER_CONCURRENT_LIMIT, GLOBAL_CONCURRENT_LIMIT, VISIBILITY_TIMEOUT_SECONDS, QUEUE_BLOCK_TIMEOUT_SECONDS, WORKER_HEARTBEAT_KEY
 
 logger = logging.getLogger(__name__)
 
 
+def default_worker_id() -> str:
+    """
+    Worker ID
+
+    优先使用环境变量 WORKER_ID；设置了 WORKER_SLOT 时为 "worker-<主机名>-<WORKER_SLOT>"，
+    这两种 ID 重启后不变，启动时直接回收上次崩溃遗留的 inflight 列表。
+    都未设置时为 "worker-<主机名>-<进程号>"，同一主机的多个 Worker 互不冲突；
+    崩溃遗留的 inflight 列表在心跳过期后由其他 Worker 回收（recover_orphaned_inflight_tasks）。
+    """
+    worker_id = os.getenv("WORKER_ID", "").strip()
+    if worker_id:
+        return worker_id
+    slot = os.getenv("WORKER_SLOT", "").strip()
+    return f"worker-{socket.gethostname()}-{slot or os.getpid()}"
+
+
 class AnalysisWorker:
     """分析任务Worker类"""
 
     def __init__(self, worker_id: Optional[str] = None):
-        self.worker_id = worker_id or f"worker-{uuid.uuid4().hex[:8]}"
+        self.worker_id = worker_id or default_worker_id()
         self.queue_service = None
         self.running = False
-        self.current_task = None
+        self.current_task = None  # 兼容字段：任一槽位正在处理的任务
 
         # 配置参数（可由系统设置覆盖）
         self.heartbeat_interval = int(getattr(settings, 'WORKER_HEARTBEAT_INTERVAL', 30))
         self.max_retries = int(getattr(settings, 'QUEUE_MAX_RETRIES', 3))
         self.poll_interval = float(getattr(settings, 'QUEUE_POLL_INTERVAL_SECONDS', 1))  # 队列轮询间隔（秒）
+        self.block_timeout = float(getattr(settings, 'QUEUE_BLOCK_TIMEOUT_SECONDS', QUEUE_BLOCK_TIMEOUT_SECONDS))  # 阻塞出队等待（秒），0 为轮询模式
         self.cleanup_interval = float(getattr(settings, 'QUEUE_CLEANUP_INTERVAL_SECONDS', 60))
+        self.concurrency = max(1, int(getattr(settings, 'WORKER_CONCURRENCY', 1)))  # 同时执行的分析任务数
+
+        # 槽位状态（在 start() 中按最终的 concurrency 初始化）
+        self.slots: List[Dict[str, Any]] = []
+        self._free_slots: List[int] = []
+        self._slot_semaphore: Optional[asyncio.BoundedSemaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._owns_heartbeat = False  # 确认 Worker ID 未被占用后才写入/删除心跳
 
         # 注册信号处理器
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -82,8 +110,25 @@ class AnalysisWorker:
                 self.heartbeat_interval = int(effective_settings.get("worker_heartbeat_interval_seconds", self.heartbeat_interval))
                 self.poll_interval = float(effective_settings.get("queue_poll_interval_seconds", self.poll_interval))
                 self.cleanup_interval = float(effective_settings.get("queue_cleanup_interval_seconds", self.cleanup_interval))
+                self.block_timeout = float(effective_settings.get("queue_block_timeout_seconds", self.block_timeout))
+                self.concurrency = max(1, int(effective_settings.get("worker_concurrency", self.concurrency)))
             except Exception:
                 pass
+
+            self._init_slots()
+
+            # 同一 ID 的存活 Worker 共享 inflight 列表，回收时会把对方进行中的任务放回队列
+            await self._ensure_worker_id_free()
+
+            # 先写入心跳，再回收遗留任务：其他 Worker 扫描孤儿 inflight 列表时不会误回收本 Worker 的列表
+            await self._send_heartbeat()
+
+            # 回收上次异常退出时遗留在 inflight 列表中的任务（本 Worker 的，以及心跳已过期的其他 Worker 的）
+            try:
+                await self.queue_service.recover_inflight_tasks(self.worker_id)
+                await self.queue_service.recover_orphaned_inflight_tasks()
+            except Exception as e:
+                logger.warning(f"回收 inflight 任务失败: {e}")
             # 启动心跳任务
             heartbeat_task = asyncio.create_task(self._heartbeat_loop())
 
@@ -109,36 +154,115 @@ class AnalysisWorker:
         finally:
             await self._cleanup()
 
+    def _init_slots(self):
+        """按并发度初始化槽位"""
+        self.slots = [
+            {
+                "slot": i,
+                "task_id": None,
+                "symbol": None,
+                "started_at": None,
+                "busy_seconds": 0.0,
+                "tasks_completed": 0,
+                "tasks_failed": 0,
+                "last_queue_wait_seconds": None,
+            }
+            for i in range(self.concurrency)
+        ]
+        self._free_slots = list(reversed(range(self.concurrency)))
+        self._slot_semaphore = asyncio.BoundedSemaphore(self.concurrency)
+        logger.info(f"🧵 Worker {self.worker_id} 并发槽位数: {self.concurrency}")
+
     async def _work_loop(self):
-        """主工作循环"""
+        """主工作循环：有空闲槽位时才出队，任务在独立的协程中执行"""
         logger.info(f"✅ Worker {self.worker_id} 开始工作")
+        if not self.slots:
+            self._init_slots()
 
         while self.running:
+            await self._slot_semaphore.acquire()
+            dispatched = False
             try:
-                # 从队列获取任务
-                task_data = await self.queue_service.dequeue_task(self.worker_id)
+                if not self.running:
+                    break
+
+                # 从队列获取任务（队列为空时在 Redis 端阻塞等待，新任务到达即被唤醒）
+                started = asyncio.get_running_loop().time()
+                task_data = await self.queue_service.dequeue_task(
+                    self.worker_id, block_timeout=self.block_timeout
+                )
 
                 if task_data:
-                    await self._process_task(task_data)
-                else:
-                    # 没有任务，短暂休眠
+                    slot_id = self._free_slots.pop()
+                    slot_task = asyncio.create_task(self._run_slot(slot_id, task_data))
+                    self._inflight.add(slot_task)
+                    slot_task.add_done_callback(self._inflight.discard)
+                    dispatched = True
+                elif asyncio.get_running_loop().time() - started < self.poll_interval:
+                    # 轮询模式或任务受并发限制被放回，短暂休眠避免空转
                     await asyncio.sleep(self.poll_interval)
 
             except Exception as e:
                 logger.error(f"工作循环异常: {e}")
                 await asyncio.sleep(5)  # 异常后等待5秒再继续
+            finally:
+                if not dispatched:
+                    self._slot_semaphore.release()
+
+        # 优雅退出：等待所有槽位中的任务完成（期间可见性超时仍会续期）
+        if self._inflight:
+            logger.info(f"⏳ Worker {self.worker_id} 等待 {len(self._inflight)} 个进行中的任务完成...")
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
 
         logger.info(f"🔄 Worker {self.worker_id} 工作循环结束")
 
-    async def _process_task(self, task_data: Dict[str, Any]):
-        """处理单个任务"""
+    async def _run_slot(self, slot_id: int, task_data: Dict[str, Any]):
+        """在指定槽位中执行任务，并负责续期可见性超时和记录槽位指标"""
+        slot = self.slots[slot_id]
+        task_id = task_data.get("id")
+        now = time.time()
+        slot.update(task_id=task_id, symbol=task_data.get("symbol"), started_at=now)
+        try:
+            slot["last_queue_wait_seconds"] = round(now - float(task_data.get("enqueued_at")), 3)
+        except (TypeError, ValueError):
+            slot["last_queue_wait_seconds"] = None
+        self.current_task = task_id
+
+        extender = asyncio.create_task(self._visibility_loop(task_id))
+        try:
+            success = await self._process_task(task_data)
+            slot["tasks_completed" if success else "tasks_failed"] += 1
+        finally:
+            extender.cancel()
+            try:
+                await extender
+            except asyncio.CancelledError:
+                pass
+            slot["busy_seconds"] += time.time() - now
+            slot.update(task_id=None, symbol=None, started_at=None)
+            busy = [s["task_id"] for s in self.slots if s["task_id"]]
+            self.current_task = busy[0] if busy else None
+            self._free_slots.append(slot_id)
+            self._slot_semaphore.release()
+
+    async def _visibility_loop(self, task_id: str):
+        """任务执行期间定期延长可见性超时，避免长时间分析被清理任务重新入队"""
+        interval = max(1.0, self.queue_service.visibility_timeout / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.queue_service.extend_visibility_timeout(task_id, self.worker_id)
+            except Exception as e:
+                logger.warning(f"延长可见性超时失败: {task_id} - {e}")
+
+    async def _process_task(self, task_data: Dict[str, Any]) -> bool:
+        """处理单个任务，返回是否成功"""
         task_id = task_data.get("id")
         stock_code = task_data.get("symbol")
         user_id = task_data.get("user")
 
         logger.info(f"📊 开始处理任务: {task_id} - {stock_code}")
 
-        self.current_task = task_id
         success = False
 
         try:
@@ -153,6 +277,7 @@ class AnalysisWorker:
             task = AnalysisTask(
                 task_id=task_id,
                 user_id=user_id,
+                symbol=stock_code,
                 stock_code=stock_code,
                 batch_id=task_data.get("batch_id"),
                 parameters=parameters
@@ -161,7 +286,7 @@ class AnalysisWorker:
             # 执行分析
             result = await get_analysis_service().execute_analysis_task(
                 task,
-                progress_callback=self._progress_callback
+                progress_callback=partial(self._progress_callback, task_id)
             )
 
             success = True
@@ -178,15 +303,54 @@ class AnalysisWorker:
             except Exception as e:
                 logger.error(f"确认任务失败: {task_id} - {e}")
 
-            self.current_task = None
+        return success
 
-    def _progress_callback(self, progress: int, message: str):
+    def _progress_callback(self, task_id: str, progress: int, message: str):
         """进度回调函数"""
-        logger.debug(f"任务进度 {self.current_task}: {progress}% - {message}")
+        logger.debug(f"任务进度 {task_id}: {progress}% - {message}")
+
+    def _slot_metrics(self) -> List[Dict[str, Any]]:
+        """槽位指标快照（进行中任务的耗时计入 busy_seconds）"""
+        now = time.time()
+        metrics = []
+        for slot in self.slots:
+            running = now - slot["started_at"] if slot["started_at"] else 0.0
+            metrics.append({
+                "slot": slot["slot"],
+                "task_id": slot["task_id"],
+                "symbol": slot["symbol"],
+                "running_seconds": round(running, 1),
+                "busy_seconds": round(slot["busy_seconds"] + running, 1),
+                "tasks_completed": slot["tasks_completed"],
+                "tasks_failed": slot["tasks_failed"],
+                "last_queue_wait_seconds": slot["last_queue_wait_seconds"],
+            })
+        return metrics
+
+    async def _ensure_worker_id_free(self):
+        """
+        确认没有存活的 Worker 使用同一 ID
+
+        崩溃遗留的心跳最多在一个 TTL（2 个心跳间隔）后过期；超过这个时间心跳仍存在，
+        说明它在被持续刷新，拒绝启动。
+        """
+        from app.core.redis_client import get_redis_service
+        redis = get_redis_service().redis
+
+        heartbeat_key = WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id)
+        deadline = time.monotonic() + self.heartbeat_interval * 2 + 1
+        while await redis.exists(heartbeat_key):
+            if time.monotonic() >= deadline:
+                raise RuntimeError(
+                    f"Worker ID {self.worker_id} 正被另一个存活的 Worker 使用，请设置不同的 WORKER_ID 或 WORKER_SLOT"
+                )
+            logger.info(f"⏳ Worker ID {self.worker_id} 的心跳仍存在，等待过期...")
+            await asyncio.sleep(1)
+        self._owns_heartbeat = True
 
     async def _heartbeat_loop(self):
-        """心跳循环"""
-        while self.running:
+        """心跳循环（退出时继续发送，直到进行中的任务全部完成）"""
+        while self.running or self._inflight:
             try:
                 await self._send_heartbeat()
                 await asyncio.sleep(self.heartbeat_interval)
@@ -202,14 +366,19 @@ class AnalysisWorker:
             from app.core.redis_client import get_redis_service
             redis_service = get_redis_service()
 
+            slots = self._slot_metrics()
             heartbeat_data = {
                 "worker_id": self.worker_id,
                 "timestamp": datetime.utcnow().isoformat(),
                 "current_task": self.current_task,
+                "current_tasks": [slot["task_id"] for slot in slots if slot["task_id"]],
+                "concurrency": self.concurrency,
+                "busy_slots": sum(1 for slot in slots if slot["task_id"]),
+                "slots": slots,
                 "status": "active" if self.running else "stopping"
             }
 
-            heartbeat_key = f"worker:{self.worker_id}:heartbeat"
+            heartbeat_key = WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id)
             await redis_service.set_json(heartbeat_key, heartbeat_data, ttl=self.heartbeat_interval * 2)
 
         except Exception as e:
@@ -222,6 +391,7 @@ class AnalysisWorker:
                 await asyncio.sleep(self.cleanup_interval)  # 清理间隔（秒），可配
                 if self.queue_service:
                     await self.queue_service.cleanup_expired_tasks()
+                    await self.queue_service.recover_orphaned_inflight_tasks()
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -232,11 +402,12 @@ class AnalysisWorker:
         logger.info(f"🧹 清理Worker资源: {self.worker_id}")
 
         try:
-            # 清理心跳记录
-            from app.core.redis_client import get_redis_service
-            redis_service = get_redis_service()
-            heartbeat_key = f"worker:{self.worker_id}:heartbeat"
-            await redis_service.redis.delete(heartbeat_key)
+            # 清理心跳记录（ID 被占用而拒绝启动时，心跳属于另一个 Worker，不能删除）
+            if self._owns_heartbeat:
+                from app.core.redis_client import get_redis_service
+                redis_service = get_redis_service()
+                heartbeat_key = WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id)
+                await redis_service.redis.delete(heartbeat_key)
         except Exception as e:
             logger.error(f"清理心跳记录失败: {e}")
 
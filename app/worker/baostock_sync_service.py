@@ -9,9 +9,13 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
+from pymongo import UpdateOne
+
 from app.core.config import get_settings
 from app.core.database import get_database
+from app.core.rate_limiter import get_baostock_rate_limiter
 from app.services.historical_data_service import get_historical_data_service
+from app.services.historical_sync_pipeline import HistoricalSyncPipeline
 from tradingagents.dataflows.providers.china.baostock import BaoStockProvider
 
 logger = logging.getLogger(__name__)
@@ -43,6 +47,7 @@ class BaoStockSyncService:
         try:
             self.settings = get_settings()
             self.provider = BaoStockProvider()
+            self.rate_limiter = get_baostock_rate_limiter()
             self.historical_service = None  # 延迟初始化
             self.db = None  # 🔥 延迟初始化，在 initialize() 中设置
 
@@ -84,6 +89,7 @@ class BaoStockSyncService:
             logger.info("🔄 开始BaoStock股票基础信息同步...")
             
             # 获取股票列表
+            await self.rate_limiter.acquire()
             stock_list = await self.provider.get_stock_list()
             if not stock_list:
                 logger.warning("⚠️ BaoStock股票列表为空")
@@ -102,9 +108,6 @@ class BaoStockSyncService:
                 logger.info(f"📊 批次进度: {i + len(batch)}/{len(stock_list)}, "
                           f"成功: {batch_stats.basic_info_count}, "
                           f"错误: {len(batch_stats.errors)}")
-                
-                # 避免API限制
-                await asyncio.sleep(0.1)
             
             logger.info(f"✅ BaoStock基础信息同步完成: {stats.basic_info_count}条记录")
             return stats
@@ -123,6 +126,7 @@ class BaoStockSyncService:
                 code = stock['code']
 
                 # 1. 获取基础信息
+                await self.rate_limiter.acquire()
                 basic_info = await self.provider.get_stock_basic_info(code)
 
                 if not basic_info:
@@ -131,6 +135,7 @@ class BaoStockSyncService:
 
                 # 2. 获取估值数据（PE、PB、PS、PCF等）
                 try:
+                    await self.rate_limiter.acquire()
                     valuation_data = await self.provider.get_valuation_data(code)
                     if valuation_data:
                         # 合并估值数据到基础信息
@@ -181,6 +186,7 @@ class BaoStockSyncService:
         """
         try:
             # 尝试从财务数据获取总股本
+            await self.rate_limiter.acquire()
             financial_data = await self.provider.get_financial_data(code)
 
             if financial_data:
@@ -292,9 +298,6 @@ class BaoStockSyncService:
                           f"成功: {batch_stats.quotes_count}, "
                           f"错误: {len(batch_stats.errors)}")
 
-                # 避免API限制
-                await asyncio.sleep(0.2)
-
             logger.info(f"✅ BaoStock日K线同步完成: {stats.quotes_count}条记录")
             return stats
 
@@ -310,6 +313,7 @@ class BaoStockSyncService:
         for code in code_batch:
             try:
                 # 注意：get_stock_quotes 实际返回的是最新日K线数据，不是实时行情
+                await self.rate_limiter.acquire()
                 quotes = await self.provider.get_stock_quotes(code)
 
                 if quotes:
@@ -351,7 +355,7 @@ class BaoStockSyncService:
 
         Args:
             days: 同步天数（如果>=3650则同步全历史，如果<0则使用增量模式）
-            batch_size: 批处理大小
+            batch_size: 已弃用，保留兼容；写入批次由流水线合并
             period: 数据周期 (daily/weekly/monthly)
             incremental: 是否增量同步（每只股票从自己的最后日期开始）
 
@@ -387,109 +391,83 @@ class BaoStockSyncService:
 
             logger.info(f"📊 开始同步{len(stock_codes)}只股票的历史数据...")
 
-            # 批量处理
-            for i in range(0, len(stock_codes), batch_size):
-                batch = stock_codes[i:i + batch_size]
-                batch_stats = await self._sync_historical_batch(batch, days, end_date, period, use_incremental)
-                
-                stats.historical_records += batch_stats.historical_records
-                stats.errors.extend(batch_stats.errors)
-                
-                logger.info(f"📊 批次进度: {i + len(batch)}/{len(stock_codes)}, "
-                          f"记录: {batch_stats.historical_records}, "
-                          f"错误: {len(batch_stats.errors)}")
-                
-                # 避免API限制
-                await asyncio.sleep(0.5)
-            
-            logger.info(f"✅ BaoStock历史数据同步完成: {stats.historical_records}条记录")
-            return stats
-            
-        except Exception as e:
-            logger.error(f"❌ BaoStock历史数据同步失败: {e}")
-            stats.errors.append(str(e))
-            return stats
-    
-    async def _sync_historical_batch(
-        self,
-        code_batch: List[str],
-        days: int,
-        end_date: str,
-        period: str = "daily",
-        incremental: bool = False
-    ) -> BaoStockSyncStats:
-        """同步历史数据批次"""
-        stats = BaoStockSyncStats()
-
-        for code in code_batch:
-            try:
-                # 确定该股票的起始日期
-                if incremental:
+            # 流水线同步：获取、标准化与合并批量写入并行进行
+            # BaoStock SDK 使用进程级全局会话（login/logout），获取阶段只能单并发
+            async def fetch(code: str):
+                if use_incremental:
                     # 增量同步：获取该股票的最后日期
                     start_date = await self._get_last_sync_date(code)
-                    logger.debug(f"📅 {code}: 从 {start_date} 开始同步")
                 elif days >= 3650:
                     # 全历史同步
                     start_date = "1990-01-01"
                 else:
                     # 固定天数同步
                     start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+                return await self.provider.get_historical_data(code, start_date, end_date, period)
 
-                hist_data = await self.provider.get_historical_data(code, start_date, end_date, period)
-
-                if hist_data is not None and not hist_data.empty:
-                    # 更新数据库
-                    records_count = await self._update_historical_data(code, hist_data, period)
-                    stats.historical_records += records_count
-                else:
-                    stats.errors.append(f"获取{code}历史数据失败")
+            async def on_progress(progress):
+                logger.info(f"📊 历史数据同步进度: {progress.completed}/{progress.total}, "
+                          f"记录: {progress.total_records}, "
+                          f"错误: {progress.error_count}")
 
-            except Exception as e:
-                stats.errors.append(f"处理{code}历史数据失败: {e}")
-
-        return stats
-
-    async def _update_historical_data(self, code: str, hist_data, period: str = "daily") -> int:
-        """更新历史数据到数据库"""
-        try:
-            if hist_data is None or hist_data.empty:
-                logger.warning(f"⚠️ {code} 历史数据为空，跳过保存")
-                return 0
-
-            # 初始化历史数据服务
             if self.historical_service is None:
                 self.historical_service = await get_historical_data_service()
 
-            # 保存到统一历史数据集合
-            saved_count = await self.historical_service.save_historical_data(
-                symbol=code,
-                data=hist_data,
+            pipeline = HistoricalSyncPipeline(
+                fetch=fetch,
                 data_source="baostock",
+                historical_service=self.historical_service,
                 market="CN",
-                period=period
+                period=period,
+                rate_limiter=self.rate_limiter,
+                fetch_concurrency=1,
+                on_progress=on_progress,
+                progress_interval=10.0,
+            )
+            result = await pipeline.run(stock_codes)
+
+            stats.historical_records += result.total_records
+            failed_codes = {e["code"] for e in result.errors}
+            stats.errors.extend(f"处理{e['code']}历史数据失败: {e['error']}" for e in result.errors)
+            stats.errors.extend(
+                f"获取{code}历史数据失败"
+                for code in stock_codes
+                if code not in result.records and code not in failed_codes
             )
 
-            # 同时更新market_quotes集合的元信息（保持兼容性）
-            if self.db is not None:
-                collection = self.db.market_quotes
-                latest_record = hist_data.iloc[-1] if not hist_data.empty else None
+            # 同时更新market_quotes集合的元信息（保持兼容性），一次批量写入
+            await self._update_historical_meta(result)
 
-                await collection.update_one(
+            logger.info(f"✅ BaoStock历史数据同步完成: {stats.historical_records}条记录")
+            return stats
+            
+        except Exception as e:
+            logger.error(f"❌ BaoStock历史数据同步失败: {e}")
+            stats.errors.append(str(e))
+            return stats
+    
+    async def _update_historical_meta(self, result) -> None:
+        """把流水线写入的各股票最新日期和记录数批量更新到 market_quotes"""
+        if self.db is None or not result.records:
+            return
+        try:
+            now = datetime.now()
+            operations = [
+                UpdateOne(
                     {"code": code},
                     {"$set": {
-                        "historical_data_updated": datetime.now(),
-                        "latest_historical_date": latest_record.get('date') if latest_record is not None else None,
-                        "historical_records_count": saved_count
+                        "historical_data_updated": now,
+                        "latest_historical_date": result.latest_dates.get(code),
+                        "historical_records_count": count
                     }},
                     upsert=True
                 )
-
-            return saved_count
-
+                for code, count in result.records.items()
+            ]
+            await self.db.market_quotes.bulk_write(operations, ordered=False)
         except Exception as e:
-            logger.error(f"❌ 更新历史数据到数据库失败: {e}")
-            return 0
-    
+            logger.error(f"❌ 更新历史数据元信息失败: {e}")
+
     async def _get_last_sync_date(self, symbol: str = None) -> str:
         """
         获取最后同步日期
@@ -15,6 +15,7 @@ from typing import List, Dict, Any, Optional
 import os
 from app.services.stock_data_service import get_stock_data_service
 from app.core.database import get_mongo_db
+from app.core.rate_limiter import get_provider_rate_limiter
 from tradingagents.dataflows.providers.examples.example_sdk import ExampleSDKProvider
 
 logger = logging.getLogger(__name__)
@@ -42,6 +43,8 @@ class ExampleSDKSyncService:
         self.provider = ExampleSDKProvider()
         # 使用app层的数据服务 (数据库操作)
         self.stock_service = get_stock_data_service()
+        # 数据源速率限制器（可跨进程共享）
+        self.rate_limiter = get_provider_rate_limiter("example_sdk")
         
         # 同步配置
         self.batch_size = int(os.getenv("EXAMPLE_SDK_BATCH_SIZE", "100"))
@@ -98,6 +101,7 @@ class ExampleSDKSyncService:
         
         try:
             # 获取股票列表
+            await self.rate_limiter.acquire()
             stock_list = await self.provider.get_stock_list()
             
             if not stock_list:
@@ -114,9 +118,6 @@ class ExampleSDKSyncService:
                 # 进度日志
                 processed = min(i + self.batch_size, len(stock_list))
                 logger.info(f"📈 基础信息同步进度: {processed}/{len(stock_list)}")
-                
-                # 避免API限制
-                await asyncio.sleep(0.1)
             
             logger.info(f"✅ 股票基础信息同步完成: {self.sync_stats['basic_info']['success']}/{self.sync_stats['basic_info']['total']}")
             
@@ -147,9 +148,6 @@ class ExampleSDKSyncService:
                 # 进度日志
                 processed = min(i + self.batch_size, len(stock_codes))
                 logger.info(f"📈 实时行情同步进度: {processed}/{len(stock_codes)}")
-                
-                # 避免API限制
-                await asyncio.sleep(0.1)
             
             logger.info(f"✅ 实时行情同步完成: {self.sync_stats['quotes']['success']}/{self.sync_stats['quotes']['total']}")
             
@@ -177,10 +175,9 @@ class ExampleSDKSyncService:
             
             self.sync_stats["financial"]["total"] = len(stock_codes)
             
-            # 逐个处理（财务数据通常API限制更严格）
+            # 逐个处理（财务数据通常API限制更严格，按更高权重预约令牌）
             for code in stock_codes:
                 await self._process_financial_data(code)
-                await asyncio.sleep(1)  # 更长的延迟
             
             logger.info(f"✅ 财务数据同步完成: {self.sync_stats['financial']['success']}/{self.sync_stats['financial']['total']}")
             
@@ -213,6 +210,7 @@ class ExampleSDKSyncService:
         for code in batch:
             try:
                 # 获取实时行情
+                await self.rate_limiter.acquire()
                 quotes = await self.provider.get_stock_quotes(code)
                 
                 if quotes:
@@ -235,6 +233,7 @@ class ExampleSDKSyncService:
         """处理财务数据"""
         try:
             # 获取财务数据
+            await self.rate_limiter.acquire(cost=5)
             financial_data = await self.provider.get_financial_data(code)
             
             if financial_data:
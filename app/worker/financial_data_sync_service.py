@@ -10,6 +10,12 @@ from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field
 
 from app.core.database import get_mongo_db
+from app.core.rate_limiter import (
+    RateLimiter,
+    get_akshare_rate_limiter,
+    get_baostock_rate_limiter,
+    get_tushare_rate_limiter,
+)
 from app.services.financial_data_service import get_financial_data_service
 from tradingagents.dataflows.providers.china.tushare import get_tushare_provider
 from tradingagents.dataflows.providers.china.akshare import get_akshare_provider
@@ -78,7 +84,7 @@ class FinancialDataSyncService:
         data_sources: List[str] = None,
         report_types: List[str] = None,
         batch_size: int = 50,
-        delay_seconds: float = 1.0
+        delay_seconds: Optional[float] = None
     ) -> Dict[str, FinancialSyncStats]:
         """
         同步财务数据
@@ -88,7 +94,8 @@ class FinancialDataSyncService:
             data_sources: 数据源列表 ["tushare", "akshare", "baostock"]
             report_types: 报告类型列表 ["quarterly", "annual"]
             batch_size: 批处理大小
-            delay_seconds: API调用延迟
+            delay_seconds: 同一数据源两次调用之间的最小间隔（秒），在数据源速率限制之外额外限速；
+                为空时只按数据源的 rate_limiter 限速
             
         Returns:
             各数据源的同步统计结果
@@ -146,7 +153,7 @@ class FinancialDataSyncService:
         symbols: List[str],
         report_types: List[str],
         batch_size: int,
-        delay_seconds: float
+        delay_seconds: Optional[float]
     ) -> FinancialSyncStats:
         """同步单个数据源的财务数据"""
         stats = FinancialSyncStats()
@@ -162,6 +169,17 @@ class FinancialDataSyncService:
             stats.end_time = datetime.now(timezone.utc)
             return stats
         
+        # 调用方指定了调用间隔时，本次同步额外按 1次/delay_seconds 限速（进程内，不共享）
+        pacer = None
+        if delay_seconds:
+            pacer = RateLimiter(
+                max_calls=1,
+                time_window=delay_seconds,
+                name=f"FinancialSync({data_source})",
+                burst=1,
+                distributed=False,
+            )
+
         # 批量处理股票
         for i in range(0, len(symbols), batch_size):
             batch_symbols = symbols[i:i + batch_size]
@@ -176,7 +194,8 @@ class FinancialDataSyncService:
                     symbol=symbol,
                     data_source=data_source,
                     provider=provider,
-                    report_types=report_types
+                    report_types=report_types,
+                    pacer=pacer
                 )
                 tasks.append(task)
             
@@ -203,9 +222,6 @@ class FinancialDataSyncService:
                     stats.skipped_count += 1
                     logger.debug(f"⏭️ {symbol} 财务数据跳过 ({data_source})")
             
-            # API限流延迟
-            if i + batch_size < len(symbols):
-                await asyncio.sleep(delay_seconds)
         
         stats.end_time = datetime.now(timezone.utc)
         stats.duration = (stats.end_time - stats.start_time).total_seconds()
@@ -217,10 +233,16 @@ class FinancialDataSyncService:
         symbol: str,
         data_source: str,
         provider: Any,
-        report_types: List[str]
+        report_types: List[str],
+        pacer: Optional[RateLimiter] = None
     ) -> bool:
         """同步单只股票的财务数据"""
         try:
+            # 速率限制：批次内的并发任务各自预约令牌，互不阻塞
+            if pacer is not None:
+                await pacer.acquire()
+            await self._get_rate_limiter(data_source).acquire("financial_data")
+
             # 获取财务数据
             financial_data = await provider.get_financial_data(symbol)
             
@@ -244,7 +266,16 @@ class FinancialDataSyncService:
         except Exception as e:
             logger.error(f"❌ {symbol} 财务数据同步异常 ({data_source}): {e}")
             raise
-    
+
+    @staticmethod
+    def _get_rate_limiter(data_source: str):
+        """获取数据源对应的速率限制器"""
+        if data_source == "tushare":
+            return get_tushare_rate_limiter()
+        if data_source == "akshare":
+            return get_akshare_rate_limiter()
+        return get_baostock_rate_limiter()
+
     async def _get_stock_symbols(self) -> List[str]:
         """获取股票代码列表"""
         try:
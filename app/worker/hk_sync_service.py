@@ -30,6 +30,7 @@ sys.path.insert(0, str(project_root))
 from tradingagents.dataflows.providers.hk.hk_stock import HKStockProvider
 from tradingagents.dataflows.providers.hk.improved_hk import ImprovedHKStockProvider
 from app.core.database import get_mongo_db
+from app.core.rate_limiter import get_provider_rate_limiter
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -183,6 +184,7 @@ class HKDataService:
         for stock_code in stock_list:
             try:
                 # 从数据源获取数据
+                await get_provider_rate_limiter(source).acquire()
                 stock_info = provider.get_stock_info(stock_code)
 
                 if not stock_info or not stock_info.get('name'):
@@ -399,6 +401,7 @@ class HKDataService:
         for stock_code in self.hk_stock_list:
             try:
                 # 获取实时价格
+                await get_provider_rate_limiter(source).acquire()
                 quote = provider.get_real_time_price(stock_code)
                 
                 if not quote or not quote.get('price'):
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
+from app.core.config import settings
 from app.services.historical_data_service import get_historical_data_service
 from app.worker.tushare_sync_service import TushareSyncService
 from app.worker.akshare_sync_service import AKShareSyncService
@@ -17,6 +18,13 @@ from app.worker.baostock_sync_service import BaoStockSyncService
 logger = logging.getLogger(__name__)
 
 
+def default_sync_periods() -> List[str]:
+    """默认同步的周期：周线/月线由日线重采样时只同步日线"""
+    if getattr(settings, "MULTI_PERIOD_SYNC_RESAMPLE_DERIVED", True):
+        return ["daily"]
+    return ["daily", "weekly", "monthly"]
+
+
 @dataclass
 class MultiPeriodSyncStats:
     """多周期同步统计"""
@@ -77,7 +85,7 @@ class MultiPeriodSyncService:
 
         Args:
             symbols: 股票代码列表，None表示所有股票
-            periods: 周期列表 (daily/weekly/monthly)
+            periods: 周期列表 (daily/weekly/monthly)，None 时见 default_sync_periods()
             data_sources: 数据源列表 (tushare/akshare/baostock)
             start_date: 开始日期
             end_date: 结束日期
@@ -88,7 +96,7 @@ class MultiPeriodSyncService:
         
         # 默认参数
         if periods is None:
-            periods = ["daily", "weekly", "monthly"]
+            periods = default_sync_periods()
         if data_sources is None:
             data_sources = ["tushare", "akshare", "baostock"]
         if symbols is None:
@@ -180,9 +188,6 @@ class MultiPeriodSyncService:
                 # 进度日志
                 progress = min(i + batch_size, len(symbols))
                 logger.info(f"📊 {data_source}-{period}进度: {progress}/{len(symbols)}")
-                
-                # API限流
-                await asyncio.sleep(0.5)
             
             return stats
             
@@ -205,6 +210,9 @@ class MultiPeriodSyncService:
         
         for symbol in symbols:
             try:
+                # 速率限制（各数据源同步服务共享同一个限制器）
+                await service.rate_limiter.acquire()
+
                 # 获取历史数据
                 if data_source == "tushare":
                     hist_data = await service.provider.get_historical_data(
@@ -365,10 +373,16 @@ async def run_daily_sync():
 
 
 async def run_weekly_sync():
-    """APScheduler任务：周线数据同步"""
+    """APScheduler任务：周线数据同步（周线由日线重采样时跳过）"""
+    if "weekly" not in default_sync_periods():
+        logger.info("⏭️ 周线由日线重采样生成，跳过周线同步")
+        return None
     return await run_multi_period_sync(["weekly"])
 
 
 async def run_monthly_sync():
-    """APScheduler任务：月线数据同步"""
+    """APScheduler任务：月线数据同步（月线由日线重采样时跳过）"""
+    if "monthly" not in default_sync_periods():
+        logger.info("⏭️ 月线由日线重采样生成，跳过月线同步")
+        return None
     return await run_multi_period_sync(["monthly"])
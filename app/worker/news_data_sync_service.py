@@ -8,6 +8,7 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 
+from app.core.rate_limiter import get_provider_rate_limiter
 from app.services.news_data_service import get_news_data_service
 from tradingagents.dataflows.providers.china.tushare import get_tushare_provider
 from tradingagents.dataflows.providers.china.akshare import get_akshare_provider
@@ -195,6 +196,7 @@ class NewsDataSyncService:
                 return []
 
             # 获取新闻数据，传递hours_back参数
+            await get_provider_rate_limiter("tushare").acquire("news")
             news_data = await provider.get_stock_news(
                 symbol=symbol,
                 limit=max_news,
@@ -239,6 +241,7 @@ class NewsDataSyncService:
                 return []
             
             # 获取新闻数据
+            await get_provider_rate_limiter("akshare").acquire()
             news_data = await provider.get_stock_news(symbol, limit=max_news)
             
             if news_data:
@@ -7,9 +7,13 @@ from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 import logging
 
+import pandas as pd
+from pymongo import UpdateMany
+
 from tradingagents.dataflows.providers.china.tushare import TushareProvider
 from app.services.stock_data_service import get_stock_data_service
 from app.services.historical_data_service import get_historical_data_service
+from app.services.historical_sync_pipeline import HistoricalSyncPipeline
 from app.services.news_data_service import get_news_data_service
 from app.core.database import get_mongo_db
 from app.core.config import settings
@@ -22,6 +26,77 @@ logger = logging.getLogger(__name__)
 UTC_8 = timezone(timedelta(hours=8))
 
 
+# 按交易日同步时，一个交易日在库中的日线记录数低于该值视为只同步了部分股票，需要重新获取
+MARKET_DAILY_MIN_RECORDS = 3000
+
+# 前复权换算的价格列（与 ts.pro_bar(adj='qfq') 一致）
+QFQ_PRICE_COLUMNS = ("open", "high", "low", "close", "pre_close")
+
+
+def apply_qfq(df: pd.DataFrame, latest_factors: pd.Series) -> pd.DataFrame:
+    """
+    把全市场不复权日线换算为前复权
+
+    价格 × 当日复权因子 / 最新复权因子，保留两位小数，与 ts.pro_bar(adj='qfq') 的算法一致；
+    缺少复权因子的股票保持原价。
+
+    Args:
+        df: get_market_daily 返回的截面数据（含 code、adj_factor 列）
+        latest_factors: 各股票的最新复权因子（索引为6位代码）
+    """
+    ratio = (df["adj_factor"] / df["code"].map(latest_factors)).fillna(1.0)
+    df = df.copy()
+    for col in QFQ_PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = (df[col] * ratio).round(2)
+    return df
+
+
+def find_adjusted_symbols(previous_factors: Optional[pd.Series], latest_factors: pd.Series) -> List[str]:
+    """找出复权因子发生变化（除权除息）的股票，这些股票已入库的前复权历史需要重算"""
+    if previous_factors is None or previous_factors.empty:
+        return []
+    common = latest_factors.index.intersection(previous_factors.index)
+    changed = (latest_factors[common] - previous_factors[common]).abs() > 1e-9
+    return sorted(common[changed.to_numpy()])
+
+
+def build_rebase_updates(
+    previous_factors: pd.Series,
+    latest_factors: pd.Series,
+    symbols: List[str],
+    end_date: str,
+    synced_dates: List[str],
+) -> List[UpdateMany]:
+    """
+    除权除息后重算已入库前复权历史的批量更新
+
+    前复权价 = 原价 × 当日复权因子 / 最新复权因子，最新复权因子由 previous 变为 latest 后，
+    已入库的历史价格整体乘以 previous / latest 即为新基准下的前复权价，无需重新拉取全部历史。
+    本次已按新基准写入的交易日（synced_dates）不再重算；空值字段保持不变。
+    """
+    updates = []
+    for symbol in symbols:
+        ratio = float(previous_factors[symbol]) / float(latest_factors[symbol])
+        updates.append(UpdateMany(
+            {
+                "symbol": symbol,
+                "data_source": "tushare",
+                "period": "daily",
+                "trade_date": {"$lte": end_date, "$nin": synced_dates},
+            },
+            [{"$set": {
+                col: {"$cond": [
+                    {"$in": [{"$type": f"${col}"}, ["double", "int", "long", "decimal"]]},
+                    {"$round": [{"$multiply": [f"${col}", ratio]}, 2 if col != "change" else 4]},
+                    f"${col}",
+                ]}
+                for col in (*QFQ_PRICE_COLUMNS, "change")
+            }}],
+        ))
+    return updates
+
+
 def get_utc8_now():
     """
     获取 UTC+8 当前时间（naive datetime）
@@ -48,7 +123,6 @@ class TushareSyncService:
 
         # 同步配置
         self.batch_size = 100  # 批量处理大小
-        self.rate_limit_delay = 0.1  # API调用间隔(秒) - 已弃用，使用rate_limiter
         self.max_retries = 3  # 最大重试次数
 
         # 速率限制器（从环境变量读取配置）
@@ -96,6 +170,7 @@ class TushareSyncService:
         
         try:
             # 1. 从Tushare获取股票列表
+            await self.rate_limiter.acquire("stock_basic")
             stock_list = await self.provider.get_stock_list(market="CN")
             if not stock_list:
                 logger.error("❌ 无法获取股票列表")
@@ -134,10 +209,6 @@ class TushareSyncService:
                         progress_percent,
                         f"已处理 {progress}/{len(stock_list)} 只股票"
                     )
-
-                # API限流
-                if i + self.batch_size < len(stock_list):
-                    await asyncio.sleep(self.rate_limit_delay)
             
             # 3. 完成统计
             stats["end_time"] = datetime.utcnow()
@@ -517,6 +588,7 @@ class TushareSyncService:
     async def _get_and_save_quotes(self, symbol: str) -> bool:
         """获取并保存单个股票行情"""
         try:
+            await self.rate_limiter.acquire("daily")
             quotes = await self.provider.get_stock_quotes(symbol)
             if quotes:
                 # 转换为字典格式（如果是Pydantic模型）
@@ -548,7 +620,8 @@ class TushareSyncService:
         incremental: bool = True,
         all_history: bool = False,
         period: str = "daily",
-        job_id: str = None
+        job_id: str = None,
+        by_trade_date: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         同步历史数据
@@ -561,10 +634,29 @@ class TushareSyncService:
             all_history: 是否同步所有历史数据
             period: 数据周期 (daily/weekly/monthly)
             job_id: 任务ID（用于进度跟踪）
+            by_trade_date: 是否按交易日使用全市场接口同步（见 sync_historical_data_by_trade_date）；
+                None 表示自动选择：全市场日线增量同步走按交易日模式，其余（深度回补、指定股票、周/月线）逐只股票同步
 
         Returns:
             同步结果统计
         """
+        if by_trade_date is None:
+            by_trade_date = (
+                incremental and not all_history and symbols is None
+                and period == "daily" and not start_date
+            )
+        if by_trade_date:
+            result = await self.sync_historical_data_by_trade_date(
+                start_date=start_date, end_date=end_date, job_id=job_id
+            )
+            if result is None:
+                logger.info("ℹ️ 库中还没有 Tushare 日线数据，改用逐只股票模式回补")
+            elif result.get("failed"):
+                # 交易日历/全市场接口无权限或调用失败时，退回逐只股票模式
+                logger.warning("⚠️ 按交易日同步失败，改用逐只股票模式同步")
+            else:
+                return result
+
         period_name = {"daily": "日线", "weekly": "周线", "monthly": "月线"}.get(period, period)
         logger.info(f"🔄 开始同步{period_name}历史数据...")
 
@@ -624,108 +716,66 @@ class TushareSyncService:
 
             logger.info(f"📊 历史数据同步: 结束日期={end_date}, 股票数量={len(symbols)}, 模式={'增量' if incremental else '全量'}")
 
-            # 4. 批量处理
-            for i, symbol in enumerate(symbols):
-                # 记录单个股票开始时间
-                stock_start_time = datetime.now()
+            # 4. 流水线同步：并发获取（受 rate_limiter 限制）、线程池标准化、合并批量写入
+            async def fetch(symbol: str):
+                # 确定该股票的起始日期
+                symbol_start_date = start_date
+                if not symbol_start_date:
+                    if all_history:
+                        symbol_start_date = "1990-01-01"
+                    elif incremental:
+                        # 增量同步：获取该股票的最后日期
+                        symbol_start_date = await self._get_last_sync_date(symbol)
+                    else:
+                        symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
 
-                try:
-                    # 检查是否需要退出
-                    if job_id and await self._should_stop(job_id):
-                        logger.warning(f"⚠️ 任务 {job_id} 收到停止信号，正在退出...")
-                        stats["stopped"] = True
-                        break
-
-                    # 速率限制
-                    await self.rate_limiter.acquire()
-
-                    # 确定该股票的起始日期
-                    symbol_start_date = start_date
-                    if not symbol_start_date:
-                        if all_history:
-                            symbol_start_date = "1990-01-01"
-                        elif incremental:
-                            # 增量同步：获取该股票的最后日期
-                            symbol_start_date = await self._get_last_sync_date(symbol)
-                            logger.debug(f"📅 {symbol}: 从 {symbol_start_date} 开始同步")
-                        else:
-                            symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+                logger.debug(
+                    f"🔍 {symbol}: 请求{period_name}数据 "
+                    f"start={symbol_start_date}, end={end_date}, period={period}"
+                )
+                return await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period=period)
 
-                    # 记录请求参数
-                    logger.debug(
-                        f"🔍 {symbol}: 请求{period_name}数据 "
-                        f"start={symbol_start_date}, end={end_date}, period={period}"
+            async def on_progress(progress):
+                progress_percent = int(progress.completed / max(progress.total, 1) * 100)
+                if job_id:
+                    await self._update_progress(
+                        job_id,
+                        progress_percent,
+                        f"已同步 {progress.completed}/{progress.total} 只股票"
                     )
 
-                    # ⏱️ 性能监控：API 调用
-                    api_start = datetime.now()
-                    df = await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period=period)
-                    api_duration = (datetime.now() - api_start).total_seconds()
-
-                    if df is not None and not df.empty:
-                        # ⏱️ 性能监控：数据保存
-                        save_start = datetime.now()
-                        records_saved = await self._save_historical_data(symbol, df, period=period)
-                        save_duration = (datetime.now() - save_start).total_seconds()
-
-                        stats["success_count"] += 1
-                        stats["total_records"] += records_saved
-
-                        # 计算单个股票耗时
-                        stock_duration = (datetime.now() - stock_start_time).total_seconds()
-                        logger.info(
-                            f"✅ {symbol}: 保存 {records_saved} 条{period_name}记录，"
-                            f"总耗时 {stock_duration:.2f}秒 "
-                            f"(API: {api_duration:.2f}秒, 保存: {save_duration:.2f}秒)"
-                        )
-                    else:
-                        stock_duration = (datetime.now() - stock_start_time).total_seconds()
-                        logger.warning(
-                            f"⚠️ {symbol}: 无{period_name}数据 "
-                            f"(start={symbol_start_date}, end={end_date})，耗时 {stock_duration:.2f}秒"
-                        )
-
-                    # 每个股票都更新进度
-                    progress_percent = int(((i + 1) / len(symbols)) * 100)
-
-                    # 更新任务进度
-                    if job_id:
-                        await self._update_progress(
-                            job_id,
-                            progress_percent,
-                            f"正在同步 {symbol} ({i + 1}/{len(symbols)})"
-                        )
-
-                    # 每50个股票输出一次详细日志
-                    if (i + 1) % 50 == 0 or (i + 1) == len(symbols):
-                        logger.info(f"📈 {period_name}数据同步进度: {i + 1}/{len(symbols)} ({progress_percent}%) "
-                                   f"(成功: {stats['success_count']}, 记录: {stats['total_records']})")
+                limiter_stats = self.rate_limiter.get_stats()
+                logger.info(f"📈 {period_name}数据同步进度: {progress.completed}/{progress.total} ({progress_percent}%) "
+                           f"(成功: {progress.success_count}, 记录: {progress.total_records})")
+                logger.info(f"   速率限制: {limiter_stats['current_calls']}/{limiter_stats['max_calls']}次, "
+                           f"等待次数: {limiter_stats['total_waits']}, "
+                           f"总等待时间: {limiter_stats['total_wait_time']:.1f}秒")
 
-                        # 输出速率限制器统计
-                        limiter_stats = self.rate_limiter.get_stats()
-                        logger.info(f"   速率限制: {limiter_stats['current_calls']}/{limiter_stats['max_calls']}次, "
-                                   f"等待次数: {limiter_stats['total_waits']}, "
-                                   f"总等待时间: {limiter_stats['total_wait_time']:.1f}秒")
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
 
-                except Exception as e:
-                    import traceback
-                    error_details = traceback.format_exc()
-                    stats["error_count"] += 1
-                    stats["errors"].append({
-                        "code": symbol,
-                        "error": str(e),
-                        "error_type": type(e).__name__,
-                        "context": f"sync_historical_data_{period}",
-                        "traceback": error_details
-                    })
-                    logger.error(
-                        f"❌ {symbol} {period_name}数据同步失败\n"
-                        f"   参数: start={symbol_start_date if 'symbol_start_date' in locals() else 'N/A'}, "
-                        f"end={end_date}, period={period}\n"
-                        f"   错误类型: {type(e).__name__}\n"
-                        f"   错误信息: {str(e)}\n"
-                        f"   堆栈跟踪:\n{error_details}"
-                    )
+            pipeline = HistoricalSyncPipeline(
+                fetch=fetch,
+                data_source="tushare",
+                historical_service=self.historical_service,
+                market="CN",
+                period=period,
+                rate_limiter=self.rate_limiter,
+                api="pro_bar",
+                should_stop=(lambda: self._should_stop(job_id)) if job_id else None,
+                on_progress=on_progress,
+                progress_interval=5.0,
+            )
+            result = await pipeline.run(symbols)
+
+            stats["success_count"] = result.success_count
+            stats["error_count"] = result.error_count
+            stats["total_records"] = result.total_records
+            stats["errors"].extend(
+                {**error, "context": f"sync_historical_data_{period}"} for error in result.errors
+            )
+            if result.stopped:
+                stats["stopped"] = True
 
             # 4. 完成统计
             stats["end_time"] = datetime.utcnow()
@@ -756,6 +806,194 @@ class TushareSyncService:
             })
             return stats
 
+    async def sync_historical_data_by_trade_date(
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        lookback_days: int = 30,
+        resync_adjusted: bool = True,
+        job_id: str = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        按交易日同步全市场日线
+
+        从 stock_daily_quotes 找出缺失的交易日，每个交易日只调用一次 daily/adj_factor/daily_basic
+        全市场接口，换算为前复权后批量写入。日常增量同步从逐只股票的数千次调用降到每个交易日 3 次。
+
+        前复权以本次获取的最新复权因子为基准（与 pro_bar 增量同步一致）；窗口内发生除权除息的股票，
+        已入库的前复权历史会失效，resync_adjusted=True 时按新旧复权因子之比在库中批量重算这些股票的
+        前复权历史（一次 bulk_write，不再逐只股票重新拉取全部历史）。
+
+        Args:
+            start_date: 检查缺失的起始日期，默认取最后入库日期的下一天与 lookback_days 天前中较早者
+            end_date: 结束日期，默认今天
+            lookback_days: 回看天数，用于补齐窗口内的缺失交易日
+            resync_adjusted: 是否重算复权因子变化的股票已入库的前复权历史
+            job_id: 任务ID（用于进度跟踪）
+
+        Returns:
+            同步结果统计；未指定 start_date 且库中还没有 Tushare 日线数据时返回 None（需要逐只股票回补）；
+            同步过程抛出异常（如 trade_cal 无权限）时统计中 failed=True
+        """
+        logger.info("🔄 开始按交易日同步日线历史数据...")
+
+        stats = {
+            "mode": "trade_date",
+            "total_processed": 0,
+            "success_count": 0,
+            "error_count": 0,
+            "total_records": 0,
+            "api_calls": 0,
+            "trade_dates": [],
+            "adjusted_symbols": [],
+            "start_time": datetime.utcnow(),
+            "errors": []
+        }
+
+        try:
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
+
+            # 1. 确定检查窗口
+            if not end_date:
+                end_date = datetime.now().strftime('%Y-%m-%d')
+            if not start_date:
+                latest = await self.db.stock_daily_quotes.find_one(
+                    {"data_source": "tushare", "period": "daily"},
+                    {"trade_date": 1},
+                    sort=[("trade_date", -1)]
+                )
+                if not latest:
+                    return None
+                next_day = (datetime.strptime(latest["trade_date"], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+                window_start = (datetime.now() - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+                start_date = min(next_day, window_start)
+
+            # 2. 交易日历（多取 20 天，用于找到窗口前的最后一个交易日）
+            calendar_start = (datetime.strptime(start_date, '%Y-%m-%d') - timedelta(days=20)).strftime('%Y-%m-%d')
+            await self.rate_limiter.acquire("trade_cal")
+            stats["api_calls"] += 1
+            open_dates = await self.provider.get_trade_dates(calendar_start, end_date)
+            if open_dates is None:
+                raise RuntimeError("获取交易日历失败")
+
+            # 3. 找出缺失（或只同步了部分股票）的交易日
+            counts = await self.db.stock_daily_quotes.aggregate([
+                {"$match": {
+                    "data_source": "tushare",
+                    "period": "daily",
+                    "trade_date": {"$gte": start_date, "$lte": end_date}
+                }},
+                {"$group": {"_id": "$trade_date", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+            complete = {doc["_id"] for doc in counts if doc["count"] >= MARKET_DAILY_MIN_RECORDS}
+            missing = [d for d in open_dates if start_date <= d <= end_date and d not in complete]
+
+            stats["total_processed"] = len(missing)
+            logger.info(f"📊 按交易日同步: 窗口 {start_date}~{end_date}, 缺失 {len(missing)} 个交易日")
+            if not missing:
+                stats["end_time"] = datetime.utcnow()
+                stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+                return stats
+
+            # 4. 逐个交易日获取全市场日线
+            frames = []
+            for i, trade_date in enumerate(missing):
+                if job_id and await self._should_stop(job_id):
+                    logger.warning(f"⚠️ 任务 {job_id} 收到停止信号，正在退出...")
+                    stats["stopped"] = True
+                    break
+
+                await self.rate_limiter.acquire("market_daily")
+                stats["api_calls"] += 3
+                df = await self.provider.get_market_daily(trade_date)
+                if df is None or df.empty:
+                    # 当天尚未收盘入库或接口暂时无数据，下次同步再补
+                    logger.info(f"ℹ️ {trade_date}: 暂无全市场日线数据，跳过")
+                else:
+                    frames.append((trade_date, df))
+
+                if job_id:
+                    await self._update_progress(
+                        job_id,
+                        int((i + 1) / len(missing) * 90),
+                        f"已获取 {i + 1}/{len(missing)} 个交易日"
+                    )
+
+            if not frames:
+                stats["end_time"] = datetime.utcnow()
+                stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+                return stats
+
+            # 5. 前复权换算并写入（以本次获取的最新复权因子为基准）
+            latest_factors = pd.concat(
+                [df.set_index("code")["adj_factor"] for _, df in frames]
+            ).dropna().groupby(level=0).last()
+
+            for trade_date, df in frames:
+                try:
+                    saved = await self.historical_service.save_historical_data(
+                        symbol=f"全市场 {trade_date}",
+                        data=apply_qfq(df, latest_factors),
+                        data_source="tushare",
+                        market="CN",
+                        period="daily",
+                        symbol_column="code"
+                    )
+                    stats["success_count"] += 1
+                    stats["total_records"] += saved
+                    stats["trade_dates"].append(trade_date)
+                    logger.info(f"✅ {trade_date}: 保存 {saved} 条日线记录")
+                except Exception as e:
+                    stats["error_count"] += 1
+                    stats["errors"].append({
+                        "trade_date": trade_date,
+                        "error": str(e),
+                        "context": "sync_historical_data_by_trade_date"
+                    })
+                    logger.error(f"❌ {trade_date} 日线保存失败: {e}")
+
+            # 6. 除权除息的股票：已入库的前复权历史需要按新基准重算
+            previous_dates = [d for d in open_dates if d < frames[0][0]]
+            if resync_adjusted and previous_dates:
+                await self.rate_limiter.acquire("adj_factor")
+                stats["api_calls"] += 1
+                previous_factors = await self.provider.get_adj_factor(previous_dates[-1])
+                adjusted = find_adjusted_symbols(previous_factors, latest_factors)
+                stats["adjusted_symbols"] = adjusted
+                if adjusted:
+                    updates = build_rebase_updates(
+                        previous_factors, latest_factors, adjusted, end_date, [d for d, _ in frames]
+                    )
+                    result = await self.db.stock_daily_quotes.bulk_write(updates, ordered=False)
+                    stats["rebased_records"] = result.modified_count
+                    logger.info(f"🔁 {len(adjusted)} 只股票复权因子变化，已按新基准重算 "
+                                f"{result.modified_count} 条前复权历史")
+
+            stats["end_time"] = datetime.utcnow()
+            stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+
+            limiter_stats = self.rate_limiter.get_stats()
+            logger.info(f"✅ 按交易日同步完成: "
+                       f"交易日 {stats['success_count']}/{stats['total_processed']}, "
+                       f"记录 {stats['total_records']} 条, "
+                       f"API调用 {stats['api_calls']} 次, "
+                       f"限流等待 {limiter_stats['total_wait_time']:.1f}秒, "
+                       f"耗时 {stats['duration']:.2f} 秒")
+            return stats
+
+        except Exception as e:
+            logger.error(f"❌ 按交易日同步日线失败: {e}")
+            stats["failed"] = True
+            stats["errors"].append({
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "context": "sync_historical_data_by_trade_date"
+            })
+            stats["end_time"] = datetime.utcnow()
+            stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+            return stats
+
     async def _save_historical_data(self, symbol: str, df, period: str = "daily") -> int:
         """保存历史数据到数据库"""
         try:
@@ -876,8 +1114,8 @@ class TushareSyncService:
             # 批量处理
             for i, symbol in enumerate(symbols):
                 try:
-                    # 速率限制
-                    await self.rate_limiter.acquire()
+                    # 速率限制（一次财务同步包含多个报表接口，按合计权重预约）
+                    await self.rate_limiter.acquire("financial_data")
 
                     # 获取财务数据（指定获取期数）
                     financial_data = await self.provider.get_financial_data(symbol, limit=limit)
@@ -1096,10 +1334,6 @@ class TushareSyncService:
                         f"已处理 {progress}/{len(symbols)} 只股票，获取 {stats['news_count']} 条新闻"
                     )
 
-                # API限流
-                if i + self.batch_size < len(symbols):
-                    await asyncio.sleep(self.rate_limit_delay)
-
             # 3. 完成统计
             stats["end_time"] = datetime.utcnow()
             stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
@@ -1135,6 +1369,7 @@ class TushareSyncService:
         for symbol in batch:
             try:
                 # 从Tushare获取新闻数据
+                await self.rate_limiter.acquire("news")
                 news_data = await self.provider.get_stock_news(
                     symbol=symbol,
                     limit=max_news_per_stock,
@@ -1157,9 +1392,6 @@ class TushareSyncService:
                     logger.debug(f"⚠️ {symbol} 未获取到新闻数据")
                     batch_stats["success_count"] += 1  # 没有新闻也算成功
 
-                # 🔥 API限流：成功后休眠
-                await asyncio.sleep(0.2)
-
             except Exception as e:
                 batch_stats["error_count"] += 1
                 error_msg = f"{symbol}: {str(e)}"
@@ -28,6 +28,7 @@ sys.path.insert(0, str(project_root))
 
 from tradingagents.dataflows.providers.us.yfinance import YFinanceUtils
 from app.core.database import get_mongo_db
+from app.core.rate_limiter import get_provider_rate_limiter
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -42,6 +43,7 @@ class USSyncService:
 
         # 数据提供器
         self.yfinance_provider = YFinanceUtils()
+        self.rate_limiter = get_provider_rate_limiter("yfinance")
 
         # 美股列表缓存（从 Finnhub 动态获取）
         self.us_stock_list = []
@@ -210,6 +212,7 @@ class USSyncService:
         for stock_code in stock_list:
             try:
                 # 从 yfinance 获取数据
+                await self.rate_limiter.acquire()
                 stock_info = self.yfinance_provider.get_stock_info(stock_code)
                 
                 if not stock_info or not stock_info.get('shortName'):
@@ -319,6 +322,7 @@ class USSyncService:
             try:
                 # 获取最近1天的数据作为实时行情
                 import yfinance as yf
+                await self.rate_limiter.acquire()
                 ticker = yf.Ticker(stock_code)
                 data = ticker.history(period="1d")
                 
@@ -36,7 +36,6 @@ from cli.utils import (
     select_shallow_thinking_agent,
 )
 from tradingagents.default_config import DEFAULT_CONFIG
-from tradingagents.graph.trading_graph import TradingAgentsGraph
 from tradingagents.utils.logging_manager import get_logger
 
 # 加载环境变量
@@ -1074,6 +1073,9 @@ def run_analysis():
     # Initialize the graph
     ui.show_progress("正在初始化分析系统...")
     try:
+        # 延迟导入：加载全部智能体和 LLM SDK，只有真正运行分析时才需要
+        from tradingagents.graph.trading_graph import TradingAgentsGraph
+
         graph = TradingAgentsGraph(
             [analyst.value for analyst in selections["analysts"]], config=config, debug=True
         )
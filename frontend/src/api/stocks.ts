@@ -59,7 +59,19 @@ export interface KlineResponse {
   limit: number
   adj: 'none'|'qfq'|'hfq'
   source?: string
-  items: KlineBar[]
+  items?: KlineBar[]           // format=rows
+  columns?: KlineColumns       // format=columns
+}
+
+// 列式K线：每列一个数组，下标对齐
+export interface KlineColumns {
+  time: string[]
+  open: (number | null)[]
+  high: (number | null)[]
+  low: (number | null)[]
+  close: (number | null)[]
+  volume: (number | null)[]
+  amount: (number | null)[]
 }
 
 export interface NewsItem {
@@ -105,7 +117,7 @@ export const stocksApi = {
    * @param adj 复权方式
    */
   async getKline(symbol: string, period: KlineResponse['period'] = 'day', limit = 120, adj: KlineResponse['adj'] = 'none') {
-    return ApiClient.get<KlineResponse>(`/api/stocks/${symbol}/kline`, { period, limit, adj })
+    return ApiClient.get<KlineResponse>(`/api/stocks/${symbol}/kline`, { period, limit, adj, format: 'columns' })
   },
 
   /**
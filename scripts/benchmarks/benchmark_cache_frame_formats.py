@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+缓存 DataFrame 格式基准测试
+
+对比 csv（旧格式）与 feather / parquet / pickle 的加载延迟和磁盘占用。
+默认数据规模：5000 只股票 × 10 年日线（约 2500 根K线/只）。
+
+用法：
+    python scripts/benchmarks/benchmark_cache_frame_formats.py --symbols 5000 --years 10
+    python scripts/benchmarks/benchmark_cache_frame_formats.py --symbols 500 --float32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tradingagents.dataflows.cache import serializers
+
+
+def _make_bars(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    index = pd.bdate_range(end="2024-12-31", periods=rows, name="date")
+    close = 10 + np.cumsum(rng.normal(0, 0.2, rows))
+    return pd.DataFrame({
+        "open": close + rng.normal(0, 0.05, rows),
+        "high": close + np.abs(rng.normal(0, 0.1, rows)),
+        "low": close - np.abs(rng.normal(0, 0.1, rows)),
+        "close": close,
+        "volume": rng.integers(1_000, 1_000_000, rows),
+        "amount": rng.normal(1e8, 1e7, rows),
+        "pct_chg": rng.normal(0, 2, rows),
+    }, index=index)
+
+
+def bench_format(fmt: str, frames, workdir: Path, load_sample: int):
+    serializer = serializers.get_serializer(fmt)
+    out_dir = workdir / fmt
+    out_dir.mkdir()
+
+    t0 = time.perf_counter()
+    paths = []
+    for i, df in enumerate(frames):
+        path, used = serializers.dump_frame(df, out_dir / f"{i:06d}", serializer)
+        paths.append((path, used))
+    write_time = time.perf_counter() - t0
+
+    size = sum(p.stat().st_size for p, _ in paths)
+
+    sample = paths[:load_sample]
+    t0 = time.perf_counter()
+    for path, used in sample:
+        serializers.load_frame(path, used)
+    load_time = (time.perf_counter() - t0) / max(len(sample), 1)
+    return write_time, load_time, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存 DataFrame 格式基准测试")
+    parser.add_argument('--symbols', type=int, default=5000, help='股票数量')
+    parser.add_argument('--years', type=int, default=10, help='每只股票的年数')
+    parser.add_argument('--load-sample', type=int, default=500, help='测量加载延迟的文件数')
+    parser.add_argument('--float32', action='store_true', help='启用 TA_CACHE_FLOAT32')
+    args = parser.parse_args()
+
+    if args.float32:
+        os.environ["TA_CACHE_FLOAT32"] = "true"
+
+    rows = args.years * 250
+    rng = np.random.default_rng(42)
+    # 所有股票共享少量模板，避免生成数据本身占用过多内存
+    templates = [_make_bars(rows, rng) for _ in range(16)]
+    frames = [templates[i % len(templates)] for i in range(args.symbols)]
+
+    formats = [f for f in ("csv", "json", "pickle", "feather", "parquet") if serializers.get_serializer(f)]
+
+    print("=" * 72)
+    print(f"🚀 缓存格式基准: {args.symbols:,} 只股票 × {rows:,} 根K线"
+          f"{'（float32）' if args.float32 else ''}")
+    print("=" * 72)
+    print(f"{'格式':<10}{'写入总耗时(s)':>16}{'单文件加载(ms)':>18}{'磁盘占用(MB)':>16}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            write_time, load_time, size = bench_format(fmt, frames, Path(tmp), args.load_sample)
+            results[fmt] = (load_time, size)
+            print(f"{fmt:<10}{write_time:>16.2f}{load_time * 1e3:>18.2f}{size / 1024 / 1024:>16.1f}")
+
+    if "csv" in results:
+        csv_load, csv_size = results["csv"]
+        for fmt, (load_time, size) in results.items():
+            if fmt == "csv":
+                continue
+            print(f"📈 {fmt}: 加载快 {csv_load / load_time:.1f}x, 体积为 csv 的 {size / csv_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
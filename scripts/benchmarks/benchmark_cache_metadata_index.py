@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+文件缓存元数据索引基准测试
+
+对比两种"精确键未命中"时的查找方式：
+1. 旧方式：遍历 metadata 目录下所有 *_meta.json 并逐个解析
+2. 新方式：CacheMetadataIndex（SQLite 复合索引）
+
+用法：
+    python scripts/benchmarks/benchmark_cache_metadata_index.py --entries 100000 --legacy-sample 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tradingagents.dataflows.cache.metadata_index import CacheMetadataIndex
+
+
+def _make_metadata(i: int) -> dict:
+    symbol = f"{i:06d}"
+    return {
+        'symbol': symbol,
+        'data_type': 'stock_data',
+        'market_type': 'china',
+        'start_date': '2024-01-01',
+        'end_date': '2024-12-31',
+        'data_source': random.choice(['tushare', 'akshare', 'baostock']),
+        'file_path': f"/tmp/{symbol}.csv",
+        'file_format': 'csv',
+        'content_length': 1024,
+        'cached_at': datetime.now().isoformat(),
+    }
+
+
+def bench_index(entries: int, lookups: int, workdir: Path):
+    index = CacheMetadataIndex(workdir / "metadata_index.sqlite3")
+    batch = []
+    t0 = time.perf_counter()
+    for i in range(entries):
+        batch.append((f"{i:06d}_stock_data_{i:012x}", _make_metadata(i)))
+        if len(batch) >= 5000:
+            index.upsert_many(batch)
+            batch = []
+    if batch:
+        index.upsert_many(batch)
+    build_time = time.perf_counter() - t0
+
+    symbols = [f"{random.randrange(entries):06d}" for _ in range(lookups)]
+    t0 = time.perf_counter()
+    for symbol in symbols:
+        index.find(symbol, 'stock_data', market_type='china')
+    lookup_time = (time.perf_counter() - t0) / lookups
+    index.close()
+    return build_time, lookup_time
+
+
+def bench_legacy_glob(entries: int, lookups: int, workdir: Path):
+    metadata_dir = workdir / "metadata"
+    metadata_dir.mkdir()
+    for i in range(entries):
+        with open(metadata_dir / f"{i:06d}_stock_data_{i:012x}_meta.json", 'w', encoding='utf-8') as f:
+            json.dump(_make_metadata(i), f)
+
+    symbols = [f"{random.randrange(entries):06d}" for _ in range(lookups)]
+    t0 = time.perf_counter()
+    for symbol in symbols:
+        for metadata_file in metadata_dir.glob("*_meta.json"):
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            if metadata.get('symbol') == symbol and metadata.get('data_type') == 'stock_data':
+                break
+    return (time.perf_counter() - t0) / lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存元数据索引基准测试")
+    parser.add_argument('--entries', type=int, default=100_000, help='索引中的元数据条数')
+    parser.add_argument('--lookups', type=int, default=2000, help='索引查找次数')
+    parser.add_argument('--legacy-sample', type=int, default=10_000,
+                        help='旧方式使用的元数据文件数（写10万个文件较慢，按线性外推）')
+    parser.add_argument('--legacy-lookups', type=int, default=5, help='旧方式查找次数')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 缓存元数据索引基准测试")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_time, lookup_time = bench_index(args.entries, args.lookups, Path(tmp))
+    print(f"📦 索引构建: {args.entries:,} 条, 耗时 {build_time:.2f}s")
+    print(f"⚡ 索引查找: 平均 {lookup_time * 1e6:.1f}µs/次 ({args.lookups} 次)")
+
+    if args.legacy_sample > 0:
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_time = bench_legacy_glob(args.legacy_sample, args.legacy_lookups, Path(tmp))
+        extrapolated = legacy_time * args.entries / args.legacy_sample
+        print(f"🐢 目录遍历: {args.legacy_sample:,} 个文件平均 {legacy_time * 1e3:.1f}ms/次, "
+              f"外推到 {args.entries:,} 条约 {extrapolated:.2f}s/次")
+        if lookup_time > 0:
+            print(f"📈 加速比: 约 {extrapolated / lookup_time:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+分析任务启动开销基准测试
+
+对比每个分析任务获取 TradingAgentsGraph 的两种方式：
+1. 每任务新建：创建 LLM 客户端、记忆集合、工具节点并编译图（旧行为）
+2. 图实例池：相同配置复用已编译的图和 LLM 客户端
+
+只测量 propagate 之前的准备时间，不调用任何模型接口（构造 LLM 客户端不会发起请求）。
+
+用法：
+    python scripts/benchmarks/benchmark_graph_setup.py --tasks 20 --provider dashscope
+    # 包含记忆集合的创建（需要 ChromaDB 和嵌入服务配置）
+    python scripts/benchmarks/benchmark_graph_setup.py --memory
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.graph.graph_pool import TradingGraphPool
+from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+PROVIDER_MODELS = {
+    "dashscope": ("qwen-turbo", "qwen-plus", "DASHSCOPE_API_KEY"),
+    "deepseek": ("deepseek-chat", "deepseek-chat", "DEEPSEEK_API_KEY"),
+    "openai": ("gpt-4o-mini", "gpt-4o", "OPENAI_API_KEY"),
+}
+
+
+def _make_config(provider: str, memory: bool) -> dict:
+    quick, deep, key_env = PROVIDER_MODELS[provider]
+    # 构造客户端时只校验 API Key 是否存在，不会发起请求
+    os.environ.setdefault(key_env, "sk-benchmark")
+    config = DEFAULT_CONFIG.copy()
+    config.update({
+        "llm_provider": provider,
+        "quick_think_llm": quick,
+        "deep_think_llm": deep,
+        "research_depth": "标准",
+        "memory_enabled": memory,
+        "selected_analysts": ["market", "fundamentals"],
+        "debug": False,
+    })
+    return config
+
+
+def bench_fresh(config: dict, tasks: int):
+    timings = []
+    for _ in range(tasks):
+        started = time.perf_counter()
+        TradingAgentsGraph(
+            selected_analysts=config["selected_analysts"],
+            debug=False,
+            config=dict(config),
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_pooled(config: dict, tasks: int):
+    pool = TradingGraphPool(max_size=4)
+    timings = []
+    for _ in range(tasks):
+        started = time.perf_counter()
+        # 每个任务都重新生成一份内容相同的配置，与分析服务的调用方式一致
+        pool.get(dict(config))
+        timings.append(time.perf_counter() - started)
+    return timings, pool.stats()
+
+
+def _report(name: str, timings):
+    p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"{name:<12}{statistics.mean(timings) * 1e3:>12.1f}{statistics.median(timings) * 1e3:>12.1f}"
+          f"{p95 * 1e3:>12.1f}{sum(timings):>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TradingAgentsGraph 启动开销基准测试")
+    parser.add_argument("--tasks", type=int, default=20, help="模拟的分析任务数")
+    parser.add_argument("--provider", choices=sorted(PROVIDER_MODELS), default="dashscope")
+    parser.add_argument("--memory", action="store_true", help="启用记忆集合（默认关闭，避免依赖嵌入服务）")
+    args = parser.parse_args()
+
+    config = _make_config(args.provider, args.memory)
+
+    print("=" * 60)
+    print(f"🚀 图启动开销基准: {args.tasks} 个任务, 供应商 {args.provider}, 记忆 {'开启' if args.memory else '关闭'}")
+    print("=" * 60)
+    print(f"{'模式':<12}{'平均(ms)':>12}{'中位数(ms)':>12}{'P95(ms)':>12}{'总计(s)':>12}")
+
+    _report("每任务新建", bench_fresh(config, args.tasks))
+    pooled, stats = bench_pooled(config, args.tasks)
+    _report("图实例池", pooled)
+
+    print(f"\n池统计: 命中 {stats['hits']}, 未命中 {stats['misses']}, 实例数 {stats['size']}")
+
+
+if __name__ == "__main__":
+    main()
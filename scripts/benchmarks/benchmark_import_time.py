@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+冷启动导入耗时基准测试
+
+在独立的子进程中导入 API 应用、worker、CLI 以及 tradingagents 的几个包，测量导入耗时，
+并检查不应被连带加载的重量级依赖（数据源 SDK、chromadb、stockstats、LLM SDK）是否出现在
+sys.modules 中。耗时超过预算或加载了禁止的模块时以非零状态退出，可直接放在 CI 中使用。
+
+用法：
+    python scripts/benchmarks/benchmark_import_time.py
+    python scripts/benchmarks/benchmark_import_time.py --repeat 5 --target tradingagents.dataflows
+    # CI 机器较慢时按比例放宽耗时预算（禁止模块检查不受影响）
+    IMPORT_TIME_BUDGET_SCALE=2 python scripts/benchmarks/benchmark_import_time.py
+    # 只输出结果，不因超预算失败
+    python scripts/benchmarks/benchmark_import_time.py --no-check
+    # 依赖没装全的环境中跳过导入失败的模块
+    python scripts/benchmarks/benchmark_import_time.py --skip-import-errors
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_SOURCE_SDKS = ("akshare", "tushare", "baostock", "yfinance", "finnhub", "stockstats")
+LLM_SDKS = ("langchain_anthropic", "langchain_google_genai", "dashscope", "chromadb")
+
+# 模块 -> (耗时预算 ms, 导入后不应出现在 sys.modules 中的模块)
+TARGETS = {
+    "app.main": (6000, ("chromadb", "langchain_anthropic", "langchain_google_genai")),
+    "app.worker.tushare_sync_service": (4000, ("stockstats", *LLM_SDKS)),
+    "cli.main": (4000, ("chromadb", "langgraph", "langchain_anthropic", "langchain_google_genai")),
+    "tradingagents.dataflows": (1500, (*DATA_SOURCE_SDKS, *LLM_SDKS, "tradingagents.dataflows.interface")),
+    "tradingagents.dataflows.providers.china.tushare": (
+        3000, ("akshare", "baostock", "yfinance", "stockstats", *LLM_SDKS),
+    ),
+    "tradingagents.graph.progress_events": (1000, ("langgraph", "langchain_openai", "tradingagents.agents", *LLM_SDKS)),
+    "tradingagents.agents.utils.memory": (3000, LLM_SDKS + ("openai",)),
+}
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, forbidden, repeat: int):
+    """在新的解释器中导入 module，返回 (耗时中位数 ms, 被加载的禁止模块)"""
+    timings, loaded = [], set()
+    for _ in range(repeat):
+        code = _PROBE.format(root=PROJECT_ROOT, module=module, forbidden=tuple(forbidden))
+        proc = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=300
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        timings.append(result["elapsed"] * 1e3)
+        loaded.update(result["loaded"])
+    return statistics.median(timings), sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动导入耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块测量次数（取中位数）")
+    parser.add_argument("--target", action="append", help="只测量指定模块（可重复）")
+    parser.add_argument("--no-check", action="store_true", help="只输出结果，不因超预算失败")
+    parser.add_argument("--skip-import-errors", action="store_true", help="导入失败的模块记为跳过而不是失败")
+    args = parser.parse_args()
+
+    scale = float(os.getenv("IMPORT_TIME_BUDGET_SCALE", "1"))
+    targets = {name: TARGETS[name] for name in (args.target or TARGETS)}
+    failures = []
+
+    print(f"{'module':<52}{'median ms':>12}{'budget ms':>12}  status")
+    for module, (budget_ms, forbidden) in targets.items():
+        budget = budget_ms * scale
+        try:
+            elapsed, loaded = measure(module, forbidden, args.repeat)
+        except Exception as e:
+            status = "SKIP" if args.skip_import_errors else "FAIL"
+            print(f"{module:<52}{'-':>12}{budget:>12.0f}  {status} ({e})")
+            if not args.skip_import_errors:
+                failures.append(module)
+            continue
+
+        problems = []
+        if elapsed > budget:
+            problems.append("over budget")
+        if loaded:
+            problems.append("loaded " + ", ".join(loaded))
+        print(f"{module:<52}{elapsed:>12.1f}{budget:>12.0f}  {'; '.join(problems) or 'ok'}")
+        if problems:
+            failures.append(module)
+
+    if failures and not args.no_check:
+        print(f"\n❌ 冷启动导入回归: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
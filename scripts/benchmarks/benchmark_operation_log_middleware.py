@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+操作日志中间件压测
+
+用一个极简的 POST 接口对比三种模式下的请求延迟（p50/p99）：
+1. off：关闭操作日志
+2. inline：每个请求同步等待 insert_one（旧行为）
+3. write-behind：请求只入队，后台批量 insert_many
+
+MongoDB 写入用带固定延迟的假集合模拟（--insert-latency-ms），不需要真实数据库。
+
+用法：
+    python scripts/benchmarks/benchmark_operation_log_middleware.py --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+from fastapi import FastAPI, Request
+
+import app.middleware.operation_log_middleware as oplog_middleware
+import app.services.operation_log_service as oplog_service
+import app.services.operation_log_writer as oplog_writer
+from app.middleware.operation_log_middleware import OperationLogMiddleware, set_operation_log_enabled
+from app.services.operation_log_writer import OperationLogWriter
+
+
+class LatencyCollection:
+    """模拟 MongoDB 往返延迟的集合"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.inserted = 0
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(self.latency)
+        self.inserted += 1
+        return type("Result", (), {"inserted_id": self.inserted})()
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.latency)
+        self.inserted += len(docs)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(OperationLogMiddleware)
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user = {"id": "admin", "username": "admin"}
+        return await call_next(request)
+
+    @app.post("/api/screening/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run_mode(mode: str, args) -> dict:
+    collection = LatencyCollection(args.insert_latency_ms / 1000.0)
+    db = {"operation_logs": collection}
+    oplog_service.get_mongo_db = lambda: db
+    oplog_writer.get_mongo_db = lambda: db
+
+    writer = OperationLogWriter(spill_path=os.devnull + ".spill")
+    oplog_middleware.get_operation_log_writer = lambda: writer
+    set_operation_log_enabled(mode != "off")
+    if mode == "write-behind":
+        await writer.start()
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                resp = await client.post("/api/screening/ping")
+                latencies.append(time.perf_counter() - started)
+                assert resp.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    if mode == "write-behind":
+        await writer.stop()
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1e3,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+        "rps": args.requests / elapsed,
+        "inserted": collection.inserted,
+    }
+
+
+async def main_async(args):
+    print("=" * 64)
+    print(f"🚀 操作日志中间件压测: {args.requests} 请求, 并发 {args.concurrency}, "
+          f"模拟写库延迟 {args.insert_latency_ms}ms")
+    print("=" * 64)
+    print(f"{'模式':<14}{'p50(ms)':>10}{'p99(ms)':>10}{'RPS':>10}{'写入日志':>10}")
+    for mode in ("off", "inline", "write-behind"):
+        result = await run_mode(mode, args)
+        print(f"{mode:<14}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['rps']:>10.0f}{result['inserted']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作日志中间件压测")
+    parser.add_argument('--requests', type=int, default=2000, help='请求总数')
+    parser.add_argument('--concurrency', type=int, default=50, help='并发请求数')
+    parser.add_argument('--insert-latency-ms', type=float, default=5.0, help='模拟的 MongoDB 写入延迟（毫秒）')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+分析任务队列出队基准测试
+
+对比两种出队方式的取件延迟（入队 → Worker 拿到任务）和每个任务的 Redis 往返次数：
+1. 轮询模式：非阻塞出队 + 多次往返认领，队列为空时 sleep poll_interval（旧行为）
+2. 阻塞模式：BLMOVE + Lua 原子认领
+
+用法：
+    # 本地 redis-server（推荐，使用独立的 db 并在结束后清空）
+    python scripts/benchmarks/benchmark_queue_dequeue.py --redis-url redis://localhost:6379/15
+
+    # 无 redis-server 时使用 fakeredis（fakeredis 的异步客户端不模拟阻塞等待，只有往返次数有参考意义）
+    python scripts/benchmarks/benchmark_queue_dequeue.py --tasks 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.queue_service import QueueService
+
+
+class CountingRedis:
+    """统计命令往返次数的 Redis 代理（EVALSHA 失败后的 EVAL 重试也会计入）"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self.calls = 0
+        original = redis.execute_command
+
+        async def execute_command(*args, **kwargs):
+            self.calls += 1
+            return await original(*args, **kwargs)
+
+        redis.execute_command = execute_command
+
+    def __getattr__(self, name):
+        return getattr(self._redis, name)
+
+
+async def _make_redis(url: str):
+    if url:
+        from redis.asyncio import Redis
+        redis = Redis.from_url(url, decode_responses=True)
+        await redis.ping()
+        return redis, f"redis-server ({url})"
+    import fakeredis
+    return fakeredis.aioredis.FakeRedis(decode_responses=True), "fakeredis"
+
+
+async def run_mode(redis, mode: str, tasks: int, poll_interval: float, max_gap: float):
+    await redis.flushdb()
+    producer_svc = QueueService(redis)
+    consumer_svc = QueueService(redis)
+    for svc in (producer_svc, consumer_svc):
+        svc.user_concurrent_limit = tasks + 1
+        svc.global_concurrent_limit = tasks + 1
+    if mode == "poll":
+        consumer_svc._lua_supported = False
+        block_timeout = 0
+    else:
+        block_timeout = 1.0
+
+    enqueued_at = {}
+    latencies = []
+    counter = CountingRedis(redis)
+
+    async def producer():
+        for i in range(tasks):
+            await asyncio.sleep(random.uniform(0, max_gap))
+            task_id = await producer_svc.enqueue_task(f"user{i % 5}", f"{i:06d}", {})
+            enqueued_at[task_id] = time.perf_counter()
+
+    stats = {"claim_calls": 0, "empty_calls": 0}
+
+    async def consumer():
+        done = 0
+        while done < tasks:
+            started = time.perf_counter()
+            before = counter.calls
+            task = await consumer_svc.dequeue_task("bench-worker", block_timeout=block_timeout)
+            if task:
+                latencies.append(time.perf_counter() - enqueued_at.get(task["id"], time.perf_counter()))
+                stats["claim_calls"] += counter.calls - before
+                done += 1
+                # 立即释放并发占用，避免触发并发限制
+                await redis.srem("qa:processing", task["id"])
+                await redis.srem(f"qa:user_processing:{task['user']}", task["id"])
+            else:
+                stats["empty_calls"] += counter.calls - before
+                if time.perf_counter() - started < poll_interval:
+                    await asyncio.sleep(poll_interval)
+
+    await asyncio.gather(producer(), consumer())
+    return latencies, stats
+
+
+async def main_async(args):
+    redis, backend = await _make_redis(args.redis_url)
+    print("=" * 64)
+    print(f"🚀 队列出队基准: {args.tasks} 个任务, 后端 {backend}")
+    print(f"   轮询间隔 {args.poll_interval}s, 入队间隔 0~{args.max_gap}s")
+    print("=" * 64)
+    print(f"{'模式':<10}{'平均延迟(ms)':>14}{'P95延迟(ms)':>14}{'认领往返/任务':>14}{'空轮询往返':>12}")
+    try:
+        for mode in ("poll", "blocking"):
+            latencies, stats = await run_mode(redis, mode, args.tasks, args.poll_interval, args.max_gap)
+            p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+            print(f"{mode:<10}{statistics.mean(latencies) * 1e3:>14.1f}{p95 * 1e3:>14.1f}"
+                  f"{stats['claim_calls'] / args.tasks:>14.1f}{stats['empty_calls']:>12}")
+    finally:
+        await redis.flushdb()
+        await redis.aclose()
+    if backend == "fakeredis":
+        print("⚠️ fakeredis 不模拟阻塞等待，延迟对比请使用 --redis-url 连接本地 redis-server")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析任务队列出队基准测试")
+    parser.add_argument('--redis-url', default='', help='本地 Redis 地址（会清空该 db），为空时使用 fakeredis')
+    parser.add_argument('--tasks', type=int, default=200, help='任务数')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='轮询模式的休眠间隔（秒）')
+    parser.add_argument('--max-gap', type=float, default=0.05, help='相邻两次入队的最大间隔（秒）')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+行情快照入库基准测试
+
+在同一份合成的东方财富全市场快照上，对比完整的 快照 → MongoDB 写入路径：
+1. legacy：iterrows 逐行标准化成字典，再逐个 code 构建 UpdateOne（旧路径）
+2. vectorized：整列标准化 + 从列数组生成 UpdateOne（首轮全量写入）
+3. vectorized（无变化）：同一快照再写一次，与库中已有值对比后跳过未变化的行（只刷新 updated_at）
+
+MongoDB 用内存中的假集合代替，不包含网络往返。
+
+用法：
+    python scripts/benchmarks/benchmark_quotes_ingestion.py --rows 5500 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from pymongo import UpdateOne
+
+import app.services.quotes_ingestion_service as qis_mod
+from app.services.quotes_ingestion_service import QuotesIngestionService
+from app.services.quotes_normalizer import normalize_quotes_frame
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class CountingCollection:
+    """记录逐行写入条数、并在内存中保存写入值的假集合"""
+
+    def __init__(self):
+        self.ops = 0
+        self.docs: Dict[str, Dict] = {}
+
+    def find(self, query, projection=None):
+        codes = set(query["code"]["$in"])
+        return _Cursor([
+            doc for code, doc in self.docs.items()
+            if code in codes and doc.get("trade_date") == query["trade_date"]
+        ])
+
+    async def bulk_write(self, ops, ordered=False):
+        for op in ops:
+            if isinstance(op, UpdateOne):
+                self.ops += 1
+                self.docs.setdefault(op._filter["code"], {}).update(op._doc["$set"])
+        return type("Result", (), {"matched_count": 0, "modified_count": 0, "upserted_ids": {}})()
+
+
+def make_snapshot(rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成与 stock_zh_a_spot_em 列名、类型相近的快照（含 '-' 和空值）"""
+    rng = np.random.default_rng(seed)
+    codes = [str(c).zfill(6) for c in rng.choice(np.arange(1, 999999), size=rows, replace=False)]
+    close = np.round(rng.uniform(2, 200, rows), 2)
+    df = pd.DataFrame({
+        "序号": np.arange(1, rows + 1),
+        "代码": codes,
+        "名称": [f"股票{c}" for c in codes],
+        "最新价": close.astype(object),
+        "涨跌幅": np.round(rng.normal(0, 2, rows), 2),
+        "涨跌额": np.round(rng.normal(0, 0.5, rows), 2),
+        "成交量": rng.integers(0, 10_000_000, rows).astype(float),
+        "成交额": np.round(rng.uniform(1e6, 1e10, rows), 0),
+        "最高": close * 1.02,
+        "最低": close * 0.98,
+        "今开": close * 1.001,
+        "昨收": close * 0.99,
+    })
+    # 停牌股：价格为 '-'
+    suspended = rng.choice(rows, size=max(rows // 50, 1), replace=False)
+    df.loc[suspended, "最新价"] = "-"
+    return df
+
+
+def _safe_float(value) -> Optional[float]:
+    try:
+        if value is None or value == '' or value == 'None':
+            return None
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def legacy_quotes_map(df: pd.DataFrame) -> Dict[str, Dict]:
+    """旧版 AKShareAdapter.get_realtime_quotes 的逐行标准化"""
+    result = {}
+    for _, row in df.iterrows():
+        code_str = str(row.get("代码")).strip()
+        if len(code_str) > 6:
+            code_str = ''.join(filter(str.isdigit, code_str))
+        if not code_str.isdigit():
+            continue
+        code = (code_str.lstrip('0') or '0').zfill(6)
+        result[code] = {
+            "close": _safe_float(row.get("最新价")),
+            "pct_chg": _safe_float(row.get("涨跌幅")),
+            "amount": _safe_float(row.get("成交额")),
+            "volume": _safe_float(row.get("成交量")),
+            "open": _safe_float(row.get("今开")),
+            "high": _safe_float(row.get("最高")),
+            "low": _safe_float(row.get("最低")),
+            "pre_close": _safe_float(row.get("昨收")),
+        }
+    return result
+
+
+async def legacy_bulk_upsert(coll: CountingCollection, quotes_map: Dict[str, Dict], trade_date: str):
+    """旧版 _bulk_upsert：逐个 code 标准化并构建 UpdateOne"""
+    ops = []
+    updated_at = pd.Timestamp.now()
+    for code, q in quotes_map.items():
+        code6 = QuotesIngestionService._normalize_stock_code(code)
+        if not code6:
+            continue
+        ops.append(UpdateOne({"code": code6}, {"$set": {
+            "code": code6, "symbol": code6,
+            "close": q.get("close"), "pct_chg": q.get("pct_chg"), "amount": q.get("amount"),
+            "volume": q.get("volume"), "open": q.get("open"), "high": q.get("high"),
+            "low": q.get("low"), "pre_close": q.get("pre_close"),
+            "trade_date": trade_date, "updated_at": updated_at,
+        }}, upsert=True))
+    await coll.bulk_write(ops, ordered=False)
+
+
+async def run(args):
+    snapshot = make_snapshot(args.rows)
+    coll = CountingCollection()
+    qis_mod.get_mongo_db = lambda: {"market_quotes": coll}
+
+    timings = {"legacy": [], "vectorized (首轮)": [], "vectorized (无变化)": []}
+    written = {name: 0 for name in timings}
+    for _ in range(args.repeat):
+        coll.ops = 0
+        started = time.perf_counter()
+        await legacy_bulk_upsert(coll, legacy_quotes_map(snapshot), "20240102")
+        timings["legacy"].append(time.perf_counter() - started)
+        written["legacy"] = coll.ops
+
+        svc = QuotesIngestionService()
+        coll.ops, coll.docs = 0, {}
+        started = time.perf_counter()
+        await svc._bulk_upsert(normalize_quotes_frame(snapshot), "20240102", "bench")
+        timings["vectorized (首轮)"].append(time.perf_counter() - started)
+        written["vectorized (首轮)"] = coll.ops
+
+        coll.ops = 0
+        started = time.perf_counter()
+        await svc._bulk_upsert(normalize_quotes_frame(snapshot), "20240102", "bench")
+        timings["vectorized (无变化)"].append(time.perf_counter() - started)
+        written["vectorized (无变化)"] = coll.ops
+
+    print("=" * 64)
+    print(f"🚀 行情快照入库基准: {args.rows} 行, 重复 {args.repeat} 次（取中位数）")
+    print("=" * 64)
+    baseline = np.median(timings["legacy"])
+    for name, values in timings.items():
+        median = np.median(values)
+        print(f"{name:<20}{median * 1e3:>10.1f} ms{baseline / median:>8.1f}x  写入 {written[name]} 条")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情快照入库基准测试")
+    parser.add_argument('--rows', type=int, default=5500, help='快照行数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+选股引擎基准测试
+
+对比两种计算方式在同一份合成日线数据上的耗时（不含数据获取）：
+1. 逐只计算：每只股票单独 compute_many + evaluate_conditions（旧路径）
+2. 面板计算：build_panel + 向量化指标 + 布尔掩码条件
+
+并校验两种方式命中的股票集合一致。
+
+用法：
+    python scripts/benchmarks/benchmark_screening_panel.py --symbols 5000 --days 150
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.screening import panel_engine
+from app.services.screening.eval_utils import evaluate_conditions, evaluate_conditions_frame
+from app.services.screening_service import ALLOWED_FIELDS, ALLOWED_OPS, TECH_FIELDS
+from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many
+
+SPECS = [
+    IndicatorSpec("ma", {"n": 5}),
+    IndicatorSpec("ma", {"n": 10}),
+    IndicatorSpec("ma", {"n": 20}),
+    IndicatorSpec("ma", {"n": 60}),
+    IndicatorSpec("ema", {"n": 12}),
+    IndicatorSpec("ema", {"n": 26}),
+    IndicatorSpec("macd"),
+    IndicatorSpec("rsi", {"n": 14}),
+    IndicatorSpec("boll", {"n": 20, "k": 2}),
+    IndicatorSpec("atr", {"n": 14}),
+    IndicatorSpec("kdj", {"n": 9, "m1": 3, "m2": 3}),
+]
+
+CONDITIONS = {
+    "op": "group", "logic": "AND", "children": [
+        {"field": "close", "op": ">", "right_field": "ma20"},
+        {"field": "rsi14", "op": "between", "value": [45, 75]},
+        {"op": "group", "logic": "OR", "children": [
+            {"field": "dif", "op": "cross_up", "right_field": "dea"},
+            {"field": "kdj_j", "op": ">", "value": 80},
+        ]},
+    ],
+}
+
+
+def make_bars(symbols: int, days: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-06-28", periods=days).strftime("%Y-%m-%d")
+    close = 10 + np.cumsum(rng.normal(0, 0.3, (symbols, days)), axis=1)
+    spread = np.abs(rng.normal(0, 0.4, (symbols, days)))
+    return pd.DataFrame({
+        "symbol": np.repeat([f"{i:06d}" for i in range(symbols)], days),
+        "trade_date": np.tile(dates, symbols),
+        "open": (close - 0.05).ravel(),
+        "high": (close + spread).ravel(),
+        "low": (close - spread).ravel(),
+        "close": close.ravel(),
+        "vol": rng.integers(1_000, 100_000, symbols * days).astype(float),
+        "amount": (close * 1e4).ravel(),
+    })
+
+
+def run_per_symbol(bars: pd.DataFrame):
+    hits = []
+    for symbol, group in bars.groupby("symbol", sort=False):
+        df = group.reset_index(drop=True)
+        df["pct_chg"] = df["close"].pct_change() * 100.0
+        dfc = compute_many(df, SPECS)
+        if evaluate_conditions(dfc, CONDITIONS, ALLOWED_FIELDS, ALLOWED_OPS):
+            hits.append(symbol)
+    return hits
+
+
+def run_panel(bars: pd.DataFrame):
+    fields = panel_engine.screening_fields(TECH_FIELDS, ())
+    panel = panel_engine.compute_panel_indicators(panel_engine.build_panel(bars), fields)
+    last = panel_engine.snapshot(panel, fields, offset=1)
+    prev = panel_engine.snapshot(panel, fields, offset=2)
+    mask = evaluate_conditions_frame(last, prev, CONDITIONS, ALLOWED_FIELDS, ALLOWED_OPS)
+    return list(last.index[mask.to_numpy()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="选股引擎基准测试")
+    parser.add_argument('--symbols', type=int, default=5000, help='股票数量')
+    parser.add_argument('--days', type=int, default=150, help='每只股票的K线数量')
+    parser.add_argument('--legacy-sample', type=int, default=500,
+                        help='逐只计算只跑前 N 只并按比例外推（0 表示全量）')
+    args = parser.parse_args()
+
+    bars = make_bars(args.symbols, args.days)
+    print("=" * 64)
+    print(f"🚀 选股引擎基准: {args.symbols} 只股票 × {args.days} 根K线 = {len(bars)} 行")
+    print("=" * 64)
+
+    started = time.perf_counter()
+    panel_hits = run_panel(bars)
+    panel_seconds = time.perf_counter() - started
+    print(f"面板计算: {panel_seconds:.2f}s, 命中 {len(panel_hits)}")
+
+    sample = args.legacy_sample or args.symbols
+    sample_symbols = [f"{i:06d}" for i in range(min(sample, args.symbols))]
+    sample_bars = bars[bars["symbol"].isin(sample_symbols)]
+    started = time.perf_counter()
+    legacy_hits = run_per_symbol(sample_bars)
+    legacy_seconds = (time.perf_counter() - started) * args.symbols / len(sample_symbols)
+    note = "" if len(sample_symbols) == args.symbols else f"（按 {len(sample_symbols)} 只外推）"
+    print(f"逐只计算: {legacy_seconds:.2f}s{note}, 加速 {legacy_seconds / panel_seconds:.1f}x")
+
+    expected = set(panel_hits) & set(sample_symbols)
+    status = "✅ 一致" if expected == set(legacy_hits) else "❌ 不一致"
+    print(f"命中校验（前 {len(sample_symbols)} 只）: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -86,6 +86,12 @@ async def create_optimized_indexes(collection):
             "keys": [("symbol", 1), ("data_source", 1), ("trade_date", -1), ("period", 1)],
             "unique": False,
             "description": "🔥 慢查询优化索引：匹配 update 操作的查询条件顺序"
+        },
+        {
+            "name": "symbol_period_source_date_idx",
+            "keys": [("symbol", 1), ("period", 1), ("data_source", 1), ("trade_date", -1)],
+            "unique": False,
+            "description": "查询优化索引：缓存适配器的 data_source $in 查询，按数据源+交易日期排序"
         }
     ]
     
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """
 启动分析Worker的脚本
+
+Worker ID 默认为 worker-<主机名>-<进程号>，崩溃遗留的 inflight 任务在心跳过期后由其他 Worker 回收。
+设置环境变量 WORKER_ID 或 WORKER_SLOT（worker-<主机名>-<WORKER_SLOT>）可使 ID 在重启后保持不变，
+重启的 Worker 直接回收自己遗留的任务；同一 ID 已有存活的 Worker 时拒绝启动。
 """
 
 import asyncio
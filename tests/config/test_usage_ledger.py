@@ -0,0 +1,158 @@
+import json
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from tradingagents.config.runtime_settings import get_timezone_name
+from tradingagents.config.usage_ledger import UsageLedger
+from tradingagents.config.usage_models import UsageRecord
+
+
+def _record(hours_ago=0, provider="dashscope", cost=0.5, session="s1"):
+    ts = datetime.now(ZoneInfo(get_timezone_name())) - timedelta(hours=hours_ago)
+    return UsageRecord(
+        timestamp=ts.isoformat(), provider=provider, model_name="qwen-turbo",
+        input_tokens=100, output_tokens=50, cost=cost, session_id=session,
+    )
+
+
+def _lines(path):
+    return path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+
+
+def test_append_buffers_and_flushes_in_batches(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(path, batch_size=3, flush_interval=3600)
+
+    ledger.append(_record())
+    ledger.append(_record())
+    assert _lines(path) == []
+
+    ledger.append(_record())
+    assert len(_lines(path)) == 3
+
+    ledger.append(_record())
+    assert len(ledger.load_records()) == 4  # load 会先落盘缓冲
+    assert len(_lines(path)) == 4
+
+
+def test_statistics_are_incremental_and_windowed(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl", batch_size=100, flush_interval=3600)
+    ledger.append(_record(hours_ago=0, cost=1.0))
+    ledger.append(_record(hours_ago=0, provider="deepseek", cost=2.0, session="s2"))
+    ledger.append(_record(hours_ago=24 * 10, cost=4.0))
+
+    today = ledger.statistics(1)
+    month = ledger.statistics(30)
+
+    assert today["total_requests"] == 2
+    assert today["total_cost"] == 3.0
+    assert today["provider_stats"]["deepseek"]["requests"] == 1
+    assert month["total_requests"] == 3
+    assert month["total_input_tokens"] == 300
+    assert ledger.session_cost("s1") == 5.0
+
+
+def test_restart_rebuilds_aggregates_and_migrates_legacy_json(tmp_path):
+    legacy = tmp_path / "usage.json"
+    legacy.write_text(json.dumps([vars(_record(cost=1.0)), vars(_record(cost=2.0))]), encoding="utf-8")
+
+    ledger = UsageLedger(tmp_path / "usage.jsonl", legacy_path=legacy, batch_size=1)
+    ledger.append(_record(cost=3.0))
+
+    assert not legacy.exists()
+    reopened = UsageLedger(tmp_path / "usage.jsonl", legacy_path=legacy)
+    assert reopened.statistics(1)["total_cost"] == 6.0
+    assert len(reopened.load_records()) == 3
+
+
+def test_file_is_compacted_to_max_records(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(path, max_records=10, batch_size=1)
+    for i in range(16):
+        ledger.append(_record(cost=float(i)))
+
+    assert len(_lines(path)) <= 15
+    records = ledger.load_records()
+    assert len(records) == 10
+    assert records[-1].cost == 15.0
+
+
+def test_mongodb_path_uses_batched_insert(tmp_path):
+    class FakeStorage:
+        def __init__(self):
+            self.batches = []
+            self.since = []
+
+        def is_connected(self):
+            return True
+
+        def save_usage_records(self, records):
+            self.batches.append(list(records))
+            return True
+
+        def get_hourly_provider_statistics(self, since_hour=None):
+            self.since.append(since_hour)
+            rows = {}
+            for batch in self.batches:
+                for r in batch:
+                    hour = r.timestamp[:13]
+                    if since_hour and hour < since_hour:
+                        continue
+                    row = rows.setdefault((hour, r.provider), {"hour": hour, "provider": r.provider, "cost": 0.0,
+                                                               "input_tokens": 0, "output_tokens": 0, "requests": 0})
+                    row["cost"] += r.cost
+                    row["requests"] += 1
+            return list(rows.values())
+
+    storage = FakeStorage()
+    ledger = UsageLedger(tmp_path / "usage.jsonl", batch_size=2, flush_interval=3600, mongodb_storage=storage)
+    for _ in range(5):
+        ledger.append(_record(cost=1.0))
+
+    assert [len(b) for b in storage.batches] == [2, 2]
+    assert not (tmp_path / "usage.jsonl").exists()
+    # 已落盘的 4 条来自 MongoDB 聚合，缓冲中的 1 条增量补上
+    assert ledger.statistics(1)["total_requests"] == 5
+
+    # 其他进程写入的记录在下次统计时计入，且只重新聚合最近的小时
+    storage.batches.append([_record(cost=1.0, session="other")])
+    assert ledger.statistics(1)["total_requests"] == 6
+    assert storage.since[0] is None and storage.since[1] is not None
+    assert ledger.statistics(30)["total_requests"] == 6
+
+
+def test_statistics_include_records_appended_by_other_processes(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    api = UsageLedger(path, batch_size=1, flush_interval=3600)
+    worker = UsageLedger(path, batch_size=1, flush_interval=3600)
+
+    api.append(_record(cost=1.0))
+    worker.append(_record(cost=2.0))
+    worker.append(_record(cost=3.0))
+
+    assert api.statistics(1)["total_cost"] == 6.0
+    assert api.statistics(1)["total_requests"] == 3
+    # 会话成本只按本进程写入的记录统计
+    assert api.session_cost("s1") == 1.0
+
+
+def test_partial_batch_is_flushed_in_background(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(path, batch_size=100, flush_interval=0.05)
+    ledger.append(_record())
+
+    deadline = time.monotonic() + 2
+    while not _lines(path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(_lines(path)) == 1
+    ledger.close()
+
+
+def test_session_costs_are_bounded(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl", batch_size=100, flush_interval=3600, max_sessions=2)
+    for session in ("s1", "s2", "s3"):
+        ledger.append(_record(cost=1.0, session=session))
+
+    assert ledger.session_cost("s1") == 0.0
+    assert ledger.session_cost("s3") == 1.0
@@ -0,0 +1,104 @@
+"""
+测试缓存 DataFrame 序列化层
+"""
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingagents.dataflows.cache import serializers
+from tradingagents.dataflows.cache.file_cache import StockDataCache
+
+
+def _bars():
+    index = pd.date_range("2024-01-01", periods=5, freq="D", name="date")
+    return pd.DataFrame({
+        "open": np.arange(5, dtype="float64"),
+        "close": np.arange(5, dtype="float64") + 0.5,
+        "volume": np.arange(5, dtype="int64") * 100,
+    }, index=index)
+
+
+@pytest.mark.parametrize("fmt", sorted(set(serializers._SERIALIZERS) - {"csv"}))
+def test_round_trip_keeps_dtypes_and_index(tmp_path, fmt):
+    df = _bars()
+    path, used = serializers.dump_frame(df, tmp_path / "bars", serializers.get_serializer(fmt))
+    assert used == fmt
+
+    loaded = serializers.load_frame(path, used)
+    pd.testing.assert_frame_equal(loaded, df, check_freq=False)
+
+    if fmt == "pickle":
+        return
+    data, used = serializers.dumps_frame(df, serializers.get_serializer(fmt))
+    pd.testing.assert_frame_equal(serializers.loads_frame(data, used), df, check_freq=False)
+
+
+def test_shared_stores_refuse_pickle(tmp_path, monkeypatch):
+    monkeypatch.setenv("TA_CACHE_FRAME_FORMAT", "pickle")
+
+    # 本地缓存可以显式使用 pickle，共享存储自动改用 json
+    assert serializers.dump_frame(_bars(), tmp_path / "local")[1] == "pickle"
+    data, fmt = serializers.dumps_frame(_bars())
+    assert fmt == "json"
+    path, fmt = serializers.dump_frame(_bars(), tmp_path / "shared", shared=True)
+    assert fmt == "json"
+
+    with pytest.raises(ValueError):
+        serializers.loads_frame(pickle.dumps(_bars()), "pickle")
+    with pytest.raises(ValueError):
+        serializers.load_frame(tmp_path / "local.pkl", "pickle", shared=True)
+    with pytest.raises(ValueError):
+        serializers.dumps_frame(_bars(), serializers.get_serializer("pickle"))
+
+
+def test_format_change_removes_old_data_file(tmp_path):
+    old_path, _ = serializers.dump_frame(_bars(), tmp_path / "bars", serializers.get_serializer("pickle"))
+    new_path, fmt = serializers.dump_frame(_bars(), tmp_path / "bars", serializers.get_serializer("json"))
+
+    assert not old_path.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [new_path.name]
+
+
+def test_serializer_base_is_abstract():
+    with pytest.raises(TypeError):
+        serializers.FrameSerializer()
+
+
+def test_float32_option(tmp_path, monkeypatch):
+    monkeypatch.setenv("TA_CACHE_FLOAT32", "true")
+    path, fmt = serializers.dump_frame(_bars(), tmp_path / "bars")
+    loaded = serializers.load_frame(path, fmt)
+    assert loaded["close"].dtype == np.float32
+    assert loaded["volume"].dtype == np.int64
+
+
+@pytest.mark.skipif(not serializers.PYARROW_AVAILABLE, reason="需要 pyarrow")
+def test_unsupported_columns_fall_back_to_json(tmp_path):
+    df = pd.DataFrame({"mixed": [1, "a", {"k": 1}]})
+    path, fmt = serializers.dump_frame(df, tmp_path / "mixed")
+    assert fmt == "json"
+    assert path.suffix == ".json"
+    assert serializers.load_frame(path, fmt)["mixed"].tolist() == [1, "a", {"k": 1}]
+
+
+def test_file_cache_reads_legacy_csv_entries(tmp_path):
+    cache = StockDataCache(cache_dir=str(tmp_path))
+    df = _bars()
+
+    key = cache.save_stock_data("000001", df, "2024-01-01", "2024-01-05", data_source="tushare")
+    loaded = cache.load_stock_data(key)
+    pd.testing.assert_frame_equal(loaded, df, check_freq=False)
+
+    # 模拟旧版本写入的 CSV 缓存
+    legacy_path = tmp_path / "china_stocks" / "legacy.csv"
+    df.to_csv(legacy_path, index=True)
+    meta_path = cache._get_metadata_path(key)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta.update(file_path=str(legacy_path), file_format="csv")
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    legacy = cache.load_stock_data(key)
+    assert legacy["close"].tolist() == df["close"].tolist()
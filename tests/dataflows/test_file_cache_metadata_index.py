@@ -0,0 +1,68 @@
+"""
+测试文件缓存的元数据索引
+"""
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from tradingagents.dataflows.cache.file_cache import StockDataCache
+from tradingagents.dataflows.cache.metadata_index import CacheMetadataIndex
+
+
+def test_save_updates_index_and_find_uses_it(tmp_path):
+    cache = StockDataCache(cache_dir=str(tmp_path))
+    df = pd.DataFrame({"close": [1.0, 2.0]}, index=["2024-01-02", "2024-01-03"])
+
+    key = cache.save_stock_data("000001", df, "2024-01-01", "2024-01-31", data_source="tushare")
+
+    assert cache.metadata_index.get(key)["symbol"] == "000001"
+    # 不同日期区间 -> 精确键未命中，通过索引找到部分匹配
+    found = cache.find_cached_stock_data("000001", "2023-01-01", "2023-12-31", data_source="tushare")
+    assert found == key
+    assert cache.find_cached_stock_data("000001", data_source="akshare") is None
+    assert cache.find_cached_stock_data("600000") is None
+
+
+def test_find_fundamentals_skips_expired_entries(tmp_path):
+    cache = StockDataCache(cache_dir=str(tmp_path))
+    key = cache.save_fundamentals_data("AAPL", "fundamentals", data_source="openai")
+    assert cache.find_cached_fundamentals_data("AAPL", data_source="openai") == key
+
+    stale = (datetime.now() - timedelta(days=3)).isoformat()
+    meta_path = cache._get_metadata_path(key)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["cached_at"] = stale
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    cache.metadata_index.upsert(key, meta)
+
+    assert cache.find_cached_fundamentals_data("AAPL", data_source="openai") is None
+
+
+def test_migrates_existing_metadata_directory_once(tmp_path):
+    metadata_dir = tmp_path / "metadata"
+    metadata_dir.mkdir()
+    for i in range(3):
+        (metadata_dir / f"00000{i}_stock_data_abc_meta.json").write_text(json.dumps({
+            "symbol": f"00000{i}",
+            "data_type": "stock_data",
+            "market_type": "china",
+            "data_source": "akshare",
+            "cached_at": datetime.now().isoformat(),
+        }), encoding="utf-8")
+    (metadata_dir / "broken_meta.json").write_text("{", encoding="utf-8")
+
+    index = CacheMetadataIndex(tmp_path / "index.sqlite3")
+    assert index.migrate_from_directory(metadata_dir) == 3
+    assert index.migrate_from_directory(metadata_dir) == 0
+    rows = index.find("000001", "stock_data", market_type="china")
+    assert [r["cache_key"] for r in rows] == ["000001_stock_data_abc"]
+
+
+def test_default_cache_keeps_index_outside_source_tree(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRADINGAGENTS_CACHE_INDEX_DIR", str(tmp_path / "index"))
+    cache = StockDataCache()
+
+    assert cache.metadata_index.db_path.parent == tmp_path / "index"
+    assert cache.metadata_index.db_path.name.startswith("metadata_index_")
+    assert cache.cache_dir not in cache.metadata_index.db_path.parents
@@ -0,0 +1,90 @@
+"""
+测试跨进程共享的全市场快照
+"""
+import threading
+import time
+
+import pandas as pd
+
+from tradingagents.dataflows.cache.market_snapshot import MarketSnapshotStore
+
+
+class _FakeSpot:
+    """模拟 stock_zh_a_spot_em，记录调用次数"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return pd.DataFrame({
+            "代码": ["000001", "600000", "sz300750"],
+            "名称": ["平安银行", "浦发银行", "宁德时代"],
+            "最新价": ["10.5", "-", "180.2"],
+            "涨跌幅": [1.2, -0.5, 3.0],
+        })
+
+
+def test_rows_are_indexed_by_normalized_code(tmp_path):
+    store = MarketSnapshotStore(fetcher=_FakeSpot(), cache_dir=str(tmp_path), backend="file")
+    snapshot = store.get_snapshot()
+
+    assert snapshot.get_row("000001")["最新价"] == 10.5
+    assert pd.isna(snapshot.get_row("600000")["最新价"])
+    assert snapshot.get_row("300750")["名称"] == "宁德时代"
+    assert snapshot.get_row("999999") is None
+    assert sorted(snapshot.select(["600000", "000001", "999999"]).index) == ["000001", "600000"]
+
+
+def test_concurrent_lookups_fetch_once(tmp_path):
+    spot = _FakeSpot(delay=0.2)
+    store = MarketSnapshotStore(fetcher=spot, cache_dir=str(tmp_path), backend="file")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_snapshot())) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert spot.calls == 1
+    assert all(r is not None and len(r) == 3 for r in results)
+
+
+def test_stores_sharing_a_directory_refresh_once(tmp_path):
+    # 两个 store 共用一个目录，相当于 API 进程和 Worker 进程
+    spot_a, spot_b = _FakeSpot(delay=0.3), _FakeSpot(delay=0.3)
+    store_a = MarketSnapshotStore(fetcher=spot_a, cache_dir=str(tmp_path), backend="file")
+    store_b = MarketSnapshotStore(fetcher=spot_b, cache_dir=str(tmp_path), backend="file")
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda: results.setdefault("a", store_a.get_snapshot())),
+        threading.Thread(target=lambda: results.setdefault("b", store_b.get_snapshot())),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert spot_a.calls + spot_b.calls == 1
+    assert results["a"].fetched_at == results["b"].fetched_at
+
+
+def test_failed_refresh_serves_stale_snapshot(tmp_path):
+    spot = _FakeSpot()
+    store = MarketSnapshotStore(fetcher=spot, ttl_seconds=0.1, cache_dir=str(tmp_path), backend="file")
+    first = store.get_snapshot()
+
+    time.sleep(0.15)
+    spot.fail = True
+    second = store.get_snapshot()
+
+    assert spot.calls == 2
+    assert second is not None and second.fetched_at == first.fetched_at
+    assert store.get_stats()["stale"] == 1
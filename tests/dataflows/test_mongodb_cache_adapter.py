@@ -0,0 +1,166 @@
+"""
+测试 MongoDB 缓存适配器按数据源优先级的单次查询
+"""
+import numpy as np
+
+from tradingagents.dataflows.cache import mongodb_cache_adapter as adapter_module
+from tradingagents.dataflows.cache.mongodb_cache_adapter import MongoDBCacheAdapter
+
+PRIORITY = ["tushare", "akshare", "baostock"]
+
+
+def _sort_docs(docs, keys):
+    for key, direction in reversed(keys):
+        docs.sort(key=lambda d: d.get(key) or "", reverse=direction < 0)
+    return docs
+
+
+def _project(docs, projection):
+    if projection and any(v == 1 for v in projection.values()):
+        return [{k: v for k, v in doc.items() if projection.get(k)} for doc in docs]
+    return [{k: v for k, v in doc.items() if k != "_id"} for doc in docs]
+
+
+class _FakeCursor:
+    def __init__(self, docs, sorts):
+        self.docs = docs
+        self.sorts = sorts
+
+    def sort(self, keys):
+        self.sorts.append(list(keys))
+        _sort_docs(self.docs, keys)
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class _FakeCollection:
+    """按适配器用到的查询条件（等值/$in/$gte/$lte）执行 find 和 $sort/$group/$first 聚合，记录每次查询"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+        self.sorts = []
+
+    @staticmethod
+    def _matches(doc, match):
+        for key, cond in match.items():
+            value = doc.get(key)
+            if not isinstance(cond, dict):
+                if value != cond:
+                    return False
+            elif "$in" in cond and value not in cond["$in"]:
+                return False
+            elif ("$gte" in cond and value < cond["$gte"]) or ("$lte" in cond and value > cond["$lte"]):
+                return False
+        return True
+
+    def find(self, match, projection=None):
+        self.queries.append(match)
+        return _FakeCursor(_project([d for d in self.docs if self._matches(d, match)], projection), self.sorts)
+
+    def aggregate(self, pipeline):
+        stages = {name: spec for stage in pipeline for name, spec in stage.items()}
+        self.queries.append(stages["$match"])
+        self.sorts.append(list(stages["$sort"].items()))
+        docs = _sort_docs([d for d in self.docs if self._matches(d, stages["$match"])], list(stages["$sort"].items()))
+        field = stages["$group"]["_id"].lstrip("$")
+        first = {}
+        for doc in docs:
+            first.setdefault(doc.get(field), doc)
+        return iter(_project(list(first.values()), stages["$project"]))
+
+
+class _FakeDb:
+    def __init__(self, **collections):
+        for name, docs in collections.items():
+            setattr(self, name, _FakeCollection(docs))
+
+
+def _adapter(monkeypatch, db):
+    monkeypatch.setattr(adapter_module, "use_app_cache_enabled", lambda default=False: False)
+    adapter = MongoDBCacheAdapter()
+    adapter.use_app_cache, adapter.db = True, db
+    monkeypatch.setattr(adapter, "_get_data_source_priority", lambda symbol: list(PRIORITY))
+    return adapter
+
+
+def _bar(source, day, close, period="daily"):
+    return {
+        "symbol": "000001", "period": period, "data_source": source, "trade_date": f"2024-06-{day:02d}",
+        "open": close, "high": close, "low": close, "close": close, "vol": 100, "name": "平安银行",
+    }
+
+
+def test_history_reads_all_sources_in_one_query_and_picks_priority_in_memory(monkeypatch):
+    docs = [_bar("baostock", d, 30.0 + d) for d in range(1, 11)] + [_bar("akshare", d, 10.0 + d) for d in range(1, 6)]
+    db = _FakeDb(stock_daily_quotes=docs)
+    adapter = _adapter(monkeypatch, db)
+
+    df = adapter.get_historical_data("000001", "2024-06-02", "2024-06-04")
+
+    # 主数据源（tushare）没有数据：一次 $in 查询，内存中选出 akshare
+    assert db.stock_daily_quotes.queries == [{
+        "symbol": "000001", "period": "daily", "data_source": {"$in": PRIORITY},
+        "trade_date": {"$gte": "2024-06-02", "$lte": "2024-06-04"},
+    }]
+    # 只按索引字段排序：(data_source -1, trade_date 1) 是 (data_source 1, trade_date -1) 索引的反向遍历
+    assert db.stock_daily_quotes.sorts == [[("data_source", -1), ("trade_date", 1)]]
+    assert list(df["data_source"].unique()) == ["akshare"]
+    assert list(df["trade_date"]) == ["2024-06-02", "2024-06-03", "2024-06-04"]
+    assert list(df["close"]) == [12.0, 13.0, 14.0]
+
+    df = adapter.get_historical_data("000001", "2024-06-01", "2024-06-10", columns=["trade_date", "close"])
+    assert list(df.columns) == ["data_source", "trade_date", "close"]
+    assert len(df) == 5
+    # 数值列直接解码为 float64 数组
+    assert df["close"].dtype == np.float64
+
+
+def test_financial_data_takes_latest_period_of_best_source(monkeypatch):
+    docs = [
+        {"code": "000001", "data_source": "akshare", "report_period": "20240331", "roe": 1.0},
+        {"code": "000001", "data_source": "akshare", "report_period": "20231231", "roe": 2.0},
+        {"code": "000001", "data_source": "baostock", "report_period": "20240630", "roe": 3.0},
+    ]
+    db = _FakeDb(stock_financial_data=docs)
+    adapter = _adapter(monkeypatch, db)
+
+    assert adapter.get_financial_data("000001")["roe"] == 1.0
+    assert adapter.get_financial_data("000001", report_period="20231231")["roe"] == 2.0
+    assert adapter.get_financial_data("000002") is None
+    # 每次调用一次查询，每个数据源只取最新一期；按 (data_source 1, report_period -1) 索引顺序排序
+    assert len(db.stock_financial_data.queries) == 3
+    assert db.stock_financial_data.sorts[0] == [("data_source", 1), ("report_period", -1)]
+
+
+def test_basic_info_falls_back_to_legacy_docs_last(monkeypatch):
+    db = _FakeDb(stock_basic_info=[
+        {"code": "000001", "name": "旧数据"},
+        {"code": "000001", "source": "akshare", "name": "平安银行"},
+        {"code": "000002", "name": "万科A"},
+    ])
+    adapter = _adapter(monkeypatch, db)
+
+    assert adapter.get_stock_basic_info("000001")["name"] == "平安银行"
+    assert adapter.get_stock_basic_info("000002")["name"] == "万科A"
+    assert adapter.get_stock_basic_info("000003") is None
+    # 包含旧数据（没有 source）时不按数据源过滤，旧数据在所有数据源之后选用
+    assert db.stock_basic_info.queries == [{"code": "000001"}, {"code": "000002"}, {"code": "000003"}]
+
+
+def test_weekly_history_is_resampled_instead_of_stale_stored_bars(monkeypatch):
+    days = [3, 4, 5, 6, 7, 11, 12, 13, 14]
+    docs = [_bar("tushare", d, 10.0 + d) for d in days] + [_bar("tushare", 7, 1.0, period="weekly")]
+    db = _FakeDb(stock_daily_quotes=docs)
+    adapter = _adapter(monkeypatch, db)
+
+    monkeypatch.delenv("MULTI_PERIOD_SYNC_RESAMPLE_DERIVED", raising=False)
+    df = adapter.get_historical_data("000001", "2024-06-03", "2024-06-14", period="weekly")
+    assert list(df["trade_date"]) == ["2024-06-07", "2024-06-14"]
+
+    # 仍同步周线/月线时，读取存储的周线
+    monkeypatch.setenv("MULTI_PERIOD_SYNC_RESAMPLE_DERIVED", "false")
+    df = adapter.get_historical_data("000001", "2024-06-03", "2024-06-14", period="weekly")
+    assert list(df["close"]) == [1.0]
@@ -0,0 +1,143 @@
+"""
+测试区间感知的K线缓存
+"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from tradingagents.dataflows.cache.range_cache import OHLCVRangeCache
+
+
+class _FakeProvider:
+    """按日历日生成K线，记录每次请求的区间"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        dates = pd.date_range(start_date, end_date, freq="D")
+        return pd.DataFrame({"date": dates, "close": [float(d.day) for d in dates]})
+
+
+def test_sub_range_is_served_from_cache(tmp_path):
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+
+    full = cache.get_range("000001", "2023-01-01", "2023-12-31", provider)
+    sub = cache.get_range("000001", "2023-03-01", "2023-03-31", provider)
+
+    assert len(full) == 365
+    assert len(sub) == 31
+    assert sub["date"].min() == pd.Timestamp("2023-03-01")
+    assert provider.calls == [("2023-01-01", "2023-12-31")]
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_only_missing_edges_are_fetched(tmp_path):
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+
+    cache.get_range("000001", "2023-02-01", "2023-02-28", provider)
+    df = cache.get_range("000001", "2023-01-15", "2023-03-10", provider)
+
+    assert provider.calls[1:] == [("2023-01-15", "2023-01-31"), ("2023-03-01", "2023-03-10")]
+    assert len(df) == (pd.Timestamp("2023-03-10") - pd.Timestamp("2023-01-15")).days + 1
+    assert df["date"].is_monotonic_increasing
+
+
+def test_today_is_never_marked_as_covered(tmp_path):
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+    today = datetime.now().strftime("%Y-%m-%d")
+    start = (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d")
+
+    cache.get_range("000001", start, today, provider)
+    cache.get_range("000001", start, today, provider)
+
+    assert provider.calls[1] == (today, today)
+
+
+def test_failed_gap_fetch_does_not_extend_coverage(tmp_path):
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+    cache.get_range("000001", "2023-02-01", "2023-02-28", provider)
+
+    empty = lambda symbol, start_date, end_date: pd.DataFrame()
+    df = cache.get_range("000001", "2023-02-01", "2023-03-31", empty)
+    assert len(df) == 28
+
+    cache.get_range("000001", "2023-02-01", "2023-03-31", provider)
+    assert provider.calls[-1] == ("2023-03-01", "2023-03-31")
+
+
+def test_disjoint_request_fetches_only_requested_range(tmp_path):
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+
+    cache.get_range("000001", "2023-01-01", "2023-01-31", provider)
+    df = cache.get_range("000001", "2023-06-01", "2023-06-30", provider)
+    assert provider.calls[1] == ("2023-06-01", "2023-06-30")
+    assert len(df) == 30
+
+    # 两段都已覆盖；跨越两段的请求只补中间缺口
+    cache.get_range("000001", "2023-06-10", "2023-06-20", provider)
+    assert len(provider.calls) == 2
+    cache.get_range("000001", "2023-01-20", "2023-06-05", provider)
+    assert provider.calls[2:] == [("2023-02-01", "2023-05-31")]
+
+
+def test_provider_and_adjust_are_part_of_the_key(tmp_path):
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+
+    cache.get_range("000001", "2023-01-01", "2023-01-31", provider, provider="tushare", adjust="qfq")
+    cache.get_range("000001", "2023-01-01", "2023-01-31", provider, provider="akshare", adjust="qfq")
+    cache.get_range("000001", "2023-01-01", "2023-01-31", provider, provider="tushare", adjust="hfq")
+    cache.get_range("000001", "2023-01-01", "2023-01-31", provider, provider="tushare", adjust="qfq")
+
+    assert len(provider.calls) == 3
+    assert cache.get_stats() == {"hits": 1, "partial_hits": 0, "misses": 3, "fetches": 3}
+
+
+def test_stats_are_consistent_across_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = OHLCVRangeCache(cache_dir=str(tmp_path))
+    provider = _FakeProvider()
+    symbols = [f"{i:06d}" for i in range(8)]
+    for symbol in symbols:
+        cache.get_range(symbol, "2023-01-01", "2023-01-10", provider)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: cache.get_range(symbols[i % 8], "2023-01-01", "2023-01-10", provider), range(400)))
+
+    assert cache.get_stats()["hits"] == 400
+
+
+def test_failed_current_source_is_not_requested_again(tmp_path, monkeypatch):
+    from tradingagents.dataflows.cache import range_cache
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource, DataSourceManager
+
+    monkeypatch.setenv("TA_OHLCV_RANGE_CACHE", "true")
+    monkeypatch.setattr(range_cache, "_range_cache_instance", OHLCVRangeCache(cache_dir=str(tmp_path)))
+
+    manager = DataSourceManager.__new__(DataSourceManager)
+    manager.current_source = ChinaDataSource.TUSHARE
+    manager.available_sources = [ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE]
+    requested = []
+
+    def fetch(source, symbol, start_date, end_date, period="daily"):
+        requested.append(source)
+        if source == ChinaDataSource.TUSHARE:
+            return None
+        return _FakeProvider()(symbol, start_date, end_date)
+
+    monkeypatch.setattr(manager, "_fetch_dataframe_from_source", fetch)
+    monkeypatch.setattr(manager, "_standardize_dataframe", lambda df: df)
+
+    df = manager.get_stock_dataframe("000001", "2024-01-01", "2024-01-10")
+
+    # 区间缓存已请求过当前数据源（tushare）且失败：直接降级，不再重复请求
+    assert len(df) == 10
+    assert requested == [ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE]
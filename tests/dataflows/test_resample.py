@@ -0,0 +1,85 @@
+import pandas as pd
+
+from tradingagents.dataflows.resample import BarResampler, resample_bars
+
+
+def _daily(dates):
+    n = len(dates)
+    return pd.DataFrame({
+        "symbol": "000001",
+        "trade_date": dates,
+        "open": [float(i) for i in range(1, n + 1)],
+        "high": [i + 1.0 for i in range(1, n + 1)],
+        "low": [i - 1.0 for i in range(1, n + 1)],
+        "close": [i + 0.5 for i in range(1, n + 1)],
+        "volume": 10.0,
+        "amount": 100.0,
+        "pre_close": 0.5,
+        "pct_chg": 1.0,
+        "period": "daily",
+    })
+
+
+def _trading_days(start, end, holidays=()):
+    return [d.strftime("%Y-%m-%d") for d in pd.bdate_range(start, end) if d.strftime("%Y-%m-%d") not in holidays]
+
+
+def test_weekly_bars_follow_trading_days():
+    # 2024-06-10 端午休市，那一周只有 4 个交易日
+    dates = _trading_days("2024-06-03", "2024-06-14", holidays={"2024-06-10"})
+    df = _daily(dates)
+
+    weekly = resample_bars(df.sample(frac=1, random_state=1), "weekly")
+
+    assert weekly["trade_date"].tolist() == ["2024-06-07", "2024-06-14"]
+    first, second = weekly.iloc[0], weekly.iloc[1]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (1.0, 6.0, 0.0, 5.5)
+    assert (second["open"], second["close"], second["volume"]) == (6.0, 9.5, 40.0)
+    # 前收盘取上一周收盘，首周沿用日线的前收盘
+    assert second["pre_close"] == 5.5 and first["pre_close"] == 0.5
+    assert round(second["pct_chg"], 4) == round((9.5 - 5.5) / 5.5 * 100, 4)
+    assert set(weekly["period"]) == {"weekly"} and set(weekly["symbol"]) == {"000001"}
+
+
+def test_monthly_bars_label_last_trading_day():
+    dates = _trading_days("2024-05-27", "2024-06-05")
+    monthly = resample_bars(_daily(dates), "monthly")
+
+    assert monthly["trade_date"].tolist() == ["2024-05-31", "2024-06-05"]
+    assert monthly["amount"].tolist() == [500.0, 300.0]
+
+
+def test_minute_bars_align_to_a_share_sessions():
+    times = pd.date_range("2024-06-03 09:30", "2024-06-03 11:30", freq="min").append(
+        pd.date_range("2024-06-03 13:01", "2024-06-03 15:00", freq="min"))
+    minutes = pd.DataFrame({
+        "trade_time": times.strftime("%Y-%m-%d %H:%M:%S"),
+        "open": range(len(times)), "high": 100.0, "low": 0.0, "close": range(len(times)), "volume": 1.0,
+    })
+
+    hourly = resample_bars(minutes, "60min")
+    assert hourly["trade_time"].tolist() == [
+        "2024-06-03 10:30:00", "2024-06-03 11:30:00", "2024-06-03 14:00:00", "2024-06-03 15:00:00",
+    ]
+    # 09:30 集合竞价并入第一根
+    assert hourly["volume"].tolist() == [61.0, 60.0, 60.0, 60.0]
+    assert hourly["open"].iloc[0] == 0 and hourly["close"].iloc[1] == 120
+
+    assert len(resample_bars(minutes, "5min")) == 48
+    assert resample_bars(minutes, "30min")["trade_time"].iloc[4] == "2024-06-03 13:30:00"
+
+
+def test_resampler_caches_until_input_changes():
+    resampler = BarResampler(max_entries=2)
+    df = _daily(_trading_days("2024-06-03", "2024-06-14"))
+
+    first = resampler.resample(df, "weekly", cache_key=("000001", "tushare"))
+    first["close"] = 0.0
+    second = resampler.resample(df, "weekly", cache_key=("000001", "tushare"))
+    assert resampler.get_stats()["hits"] == 1
+    assert second["close"].tolist() == [5.5, 10.5]
+
+    # 新增一根日线后指纹变化，重新计算
+    longer = _daily(_trading_days("2024-06-03", "2024-06-17"))
+    assert resampler.resample(longer, "weekly", cache_key=("000001", "tushare"))["trade_date"].iloc[-1] == "2024-06-17"
+    assert resampler.get_stats()["misses"] == 2
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI, Request
+from pymongo.errors import BulkWriteError
+
+import app.services.operation_log_service as oplog_service
+import app.services.operation_log_writer as oplog_writer
+from app.middleware.operation_log_middleware import OperationLogMiddleware
+from app.services.operation_log_writer import OperationLogWriter
+
+
+class _FakeCollection:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.single = []
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("mongo down")
+        self.batches.append(list(docs))
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(self.delay)
+        self.single.append(doc)
+        return type("Result", (), {"inserted_id": "x"})()
+
+
+def _patch_db(monkeypatch, collection):
+    db = {"operation_logs": collection}
+    monkeypatch.setattr(oplog_writer, "get_mongo_db", lambda: db)
+    monkeypatch.setattr(oplog_service, "get_mongo_db", lambda: db)
+
+
+def test_writer_batches_by_size_and_flushes_on_stop(monkeypatch, tmp_path):
+    coll = _FakeCollection()
+    _patch_db(monkeypatch, coll)
+    writer = OperationLogWriter(batch_size=100, flush_interval=60, spill_path=str(tmp_path / "spill.jsonl"))
+
+    async def run():
+        await writer.start()
+        for i in range(250):
+            writer.enqueue({"i": i})
+        await asyncio.sleep(0.05)
+        sizes_before_stop = [len(b) for b in coll.batches]
+        await writer.stop()
+        return sizes_before_stop
+
+    assert asyncio.run(run()) == [100, 100]
+    assert [len(b) for b in coll.batches] == [100, 100, 50]
+    assert [d["i"] for b in coll.batches for d in b] == list(range(250))
+
+
+def test_overflow_spill_is_replayed_on_next_start(monkeypatch, tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    failing = _FakeCollection(fail=True)
+    _patch_db(monkeypatch, failing)
+    writer = OperationLogWriter(max_size=3, batch_size=10, flush_interval=60,
+                                overflow_policy="spill", spill_path=str(spill))
+
+    async def first_run():
+        await writer.start()
+        for i in range(5):
+            writer.enqueue({"i": i, "timestamp": datetime(2024, 1, 1, 9, 30)})
+        await writer.stop()  # 写库失败，缓冲中的日志也落盘
+
+    asyncio.run(first_run())
+    assert writer.spilled == 5
+    assert len(spill.read_text(encoding="utf-8").splitlines()) == 5
+
+    ok = _FakeCollection()
+    _patch_db(monkeypatch, ok)
+    asyncio.run(OperationLogWriter(spill_path=str(spill)).start())
+
+    replayed = [d for b in ok.batches for d in b]
+    assert sorted(d["i"] for d in replayed) == list(range(5))
+    assert replayed[0]["timestamp"] == datetime(2024, 1, 1, 9, 30)
+    assert not spill.exists()
+
+
+class _PartialFailCollection:
+    """按 _id 去重的集合：fail_ids 中的日志写入失败，已存在的 _id 报重复键错误"""
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.docs = {}
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["i"] in self.fail_ids:
+                errors.append({"index": index, "code": 2, "errmsg": "failed"})
+            elif doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+def test_partial_bulk_failure_rebuffers_only_failed_docs(monkeypatch, tmp_path):
+    coll = _PartialFailCollection(fail_ids={1})
+    _patch_db(monkeypatch, coll)
+    writer = OperationLogWriter(batch_size=10, flush_interval=60, spill_path=str(tmp_path / "spill.jsonl"))
+    for i in range(3):
+        writer.enqueue({"i": i})
+
+    assert asyncio.run(writer.flush()) is False
+    assert [d["i"] for d in writer._buffer] == [1]
+    assert writer.written == 2
+
+    coll.fail_ids.clear()
+    assert asyncio.run(writer.flush()) is True
+    assert sorted(d["i"] for d in coll.docs.values()) == [0, 1, 2]
+
+
+def test_replay_keeps_earlier_failed_replay_and_skips_written_docs(monkeypatch, tmp_path):
+    spill = tmp_path / "spill.jsonl"
+    writer = OperationLogWriter(max_size=0, overflow_policy="spill", spill_path=str(spill))
+    for i in range(3):
+        writer.enqueue({"i": i})
+
+    # 第一次回放部分失败：只保留未写入的日志
+    coll = _PartialFailCollection(fail_ids={2})
+    _patch_db(monkeypatch, coll)
+    asyncio.run(OperationLogWriter(spill_path=str(spill)).start())
+    kept = list(tmp_path.glob("spill.jsonl.replay*"))
+    assert len(kept) == 1 and len(kept[0].read_text(encoding="utf-8").splitlines()) == 1
+
+    # 新的落盘日志不会覆盖保留的回放文件
+    writer.enqueue({"i": 3})
+    coll.fail_ids.clear()
+    asyncio.run(OperationLogWriter(spill_path=str(spill)).start())
+
+    assert sorted(d["i"] for d in coll.docs.values()) == [0, 1, 2, 3]
+    assert not list(tmp_path.glob("spill.jsonl*"))
+
+
+def test_overflow_drop_counts_dropped(monkeypatch, tmp_path):
+    writer = OperationLogWriter(max_size=2, spill_path=str(tmp_path / "spill.jsonl"))
+    assert [writer.enqueue({"i": i}) for i in range(4)] == [True, True, False, False]
+    assert writer.dropped == 2
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(OperationLogMiddleware)
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user = {"id": "admin", "username": "admin"}
+        return await call_next(request)
+
+    @app.post("/api/screening/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def test_middleware_response_does_not_wait_for_insert(monkeypatch, tmp_path):
+    coll = _FakeCollection(delay=0.3)
+    _patch_db(monkeypatch, coll)
+    writer = OperationLogWriter(batch_size=10, flush_interval=0.05, spill_path=str(tmp_path / "spill.jsonl"))
+    monkeypatch.setattr("app.middleware.operation_log_middleware.get_operation_log_writer", lambda: writer)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_app()), base_url="http://t") as client:
+            # 写入器未启动：同步写库
+            started = time.perf_counter()
+            await client.post("/api/screening/ping")
+            inline = time.perf_counter() - started
+
+            await writer.start()
+            started = time.perf_counter()
+            await client.post("/api/screening/ping")
+            behind = time.perf_counter() - started
+            await writer.stop()
+        return inline, behind
+
+    inline, behind = asyncio.run(run())
+
+    assert inline >= 0.3
+    assert behind < 0.2
+    assert len(coll.single) == 1
+    assert coll.batches[0][0]["action"] == "创建股票筛选"
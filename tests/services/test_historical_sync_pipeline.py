@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pandas as pd
+
+from app.services.historical_sync_pipeline import HistoricalSyncPipeline
+
+
+class _FakeHistoricalService:
+    def __init__(self):
+        self.writes = []
+
+    def build_documents(self, symbol, data, data_source, market, period):
+        return [
+            {"symbol": symbol, "trade_date": d, "data_source": data_source, "period": period}
+            for d in data["date"]
+        ]
+
+    async def upsert_documents(self, label, docs, batch_size=200):
+        self.writes.append(len(docs))
+        return len(docs)
+
+
+def _frame(days=3):
+    return pd.DataFrame({"date": [f"2024-06-0{i + 1}" for i in range(days)], "close": 1.0})
+
+
+def test_fetches_concurrently_and_coalesces_writes():
+    service = _FakeHistoricalService()
+    progress = []
+
+    async def fetch(symbol):
+        await asyncio.sleep(0.05)
+        if symbol == "empty":
+            return None
+        if symbol == "bad":
+            raise ValueError("boom")
+        return _frame()
+
+    async def on_progress(result):
+        progress.append(result.completed)
+
+    symbols = [f"{i:06d}" for i in range(40)] + ["empty", "bad"]
+    pipeline = HistoricalSyncPipeline(
+        fetch=fetch,
+        data_source="akshare",
+        fetch_concurrency=10,
+        write_batch_size=60,
+        progress_interval=0,
+        on_progress=on_progress,
+        historical_service=service,
+    )
+
+    started = time.monotonic()
+    result = asyncio.run(pipeline.run(symbols))
+    elapsed = time.monotonic() - started
+
+    # 42 次 50ms 的获取串行需要 2 秒以上
+    assert elapsed < 1.0
+    assert result.success_count == 40
+    assert result.empty_count == 1
+    assert result.error_count == 1
+    assert result.errors[0]["code"] == "bad"
+    assert result.total_records == 120
+    # 多只股票合并写入，而不是每只股票一次
+    assert len(service.writes) < 40
+    assert result.latest_dates["000000"] == "2024-06-03"
+    assert progress[-1] == 42
+
+
+def test_should_stop_halts_fetching_but_flushes_fetched_data():
+    service = _FakeHistoricalService()
+    fetched = []
+
+    async def fetch(symbol):
+        fetched.append(symbol)
+        return _frame(1)
+
+    async def should_stop():
+        return len(fetched) >= 3
+
+    pipeline = HistoricalSyncPipeline(
+        fetch=fetch,
+        data_source="baostock",
+        fetch_concurrency=1,
+        stop_check_interval=0,
+        should_stop=should_stop,
+        historical_service=service,
+    )
+    result = asyncio.run(pipeline.run([f"{i:06d}" for i in range(10)]))
+
+    assert result.stopped
+    assert len(fetched) == 3
+    assert result.success_count == 3
+    assert sum(service.writes) == 3
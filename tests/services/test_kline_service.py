@@ -0,0 +1,207 @@
+import asyncio
+
+from app.services import kline_service as kline_module
+from app.services.kline_service import KlineService, compute_etag, etag_matches, to_columns
+
+
+class _FakeCursor:
+    def __init__(self, docs, collection):
+        self.docs = docs
+        self.collection = collection
+
+    def sort(self, keys):
+        self.collection.sorts.append(list(keys))
+        for key, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d.get(key, ""), reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            self.collection.read += 1
+            yield doc
+
+    async def close(self):
+        self.collection.closed += 1
+
+
+class _FakeCollection:
+    """按测试用到的条件（等值/$in）执行 find，记录每次查询、排序和读取的文档数"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+        self.projections = []
+        self.sorts = []
+        self.read = 0
+        self.closed = 0
+
+    @staticmethod
+    def _matches(doc, match):
+        for key, cond in match.items():
+            value = doc.get(key)
+            if isinstance(cond, dict):
+                if value not in cond["$in"]:
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    def find(self, match, projection):
+        self.queries.append(match)
+        self.projections.append(projection)
+        docs = [
+            {k: v for k, v in d.items() if projection.get(k)}
+            for d in self.docs
+            if self._matches(d, match)
+        ]
+        return _FakeCursor(docs, self)
+
+
+class _FakeDb:
+    def __init__(self, docs):
+        self.stock_daily_quotes = _FakeCollection(docs)
+
+
+def _doc(source, day, close, period="daily"):
+    return {
+        "symbol": "000001", "period": period, "data_source": source,
+        "trade_date": f"2024-06-{day:02d}", "open": close, "high": close, "low": close,
+        "close": close, "vol": 100, "pct_chg": 1.0, "name": "平安银行",
+    }
+
+
+def test_single_query_picks_priority_source_and_keeps_last_bars(monkeypatch):
+    docs = [_doc("akshare", d, 10.0 + d) for d in range(1, 11)] + [_doc("tushare", d, 20.0 + d) for d in range(1, 6)]
+    db = _FakeDb(docs)
+    service = KlineService(db=db)
+
+    async def priority(market_category="a_shares"):
+        return ["tushare", "akshare", "baostock"]
+    monkeypatch.setattr(service, "get_source_priority", priority)
+
+    result = asyncio.run(service.get_cached_bars("000001", "daily", limit=3))
+
+    assert result["source"] == "tushare"
+    assert [bar["time"] for bar in result["items"]] == ["2024-06-03", "2024-06-04", "2024-06-05"]
+    assert result["items"][0] == {
+        "time": "2024-06-03", "open": 23.0, "high": 23.0, "low": 23.0,
+        "close": 23.0, "volume": 100.0, "amount": None,
+    }
+    # 一次 $in 查询，只投影 K 线字段，按索引字段排序
+    collection = db.stock_daily_quotes
+    assert collection.queries == [
+        {"symbol": "000001", "period": "daily", "data_source": {"$in": ["tushare", "akshare", "baostock"]}}
+    ]
+    assert collection.sorts == [[("data_source", 1), ("trade_date", -1)]]
+    projection = collection.projections[0]
+    assert "pct_chg" not in projection and "name" not in projection
+    # akshare 排在 tushare 前面（按名称升序）：读到 tushare 时还不能确定，tushare 读完后关闭游标
+    assert collection.read == 15 and collection.closed == 1
+
+    # 优先数据源不足 limit 条时只返回它自己的数据，不混入其他数据源
+    result = asyncio.run(service.get_cached_bars("000001", "daily", limit=8))
+    assert result["source"] == "tushare"
+    assert len(result["items"]) == 5
+
+
+def test_cursor_closes_once_priority_source_is_settled(monkeypatch):
+    docs = [_doc("akshare", d, 10.0 + d) for d in range(1, 11)] + [_doc("tushare", d, 20.0 + d) for d in range(1, 6)]
+    db = _FakeDb(docs)
+    service = KlineService(db=db)
+
+    async def priority(market_category="a_shares"):
+        return ["akshare", "tushare"]
+    monkeypatch.setattr(service, "get_source_priority", priority)
+
+    result = asyncio.run(service.get_cached_bars("000001", "daily", limit=3))
+
+    assert result["source"] == "akshare"
+    assert [bar["time"] for bar in result["items"]] == ["2024-06-08", "2024-06-09", "2024-06-10"]
+    # akshare 读完、读到 tushare 的第一条时即可确定，不再读取 tushare 的其余数据
+    assert db.stock_daily_quotes.read == 11
+
+
+def test_pick_priority_source_waits_for_higher_priority_sources():
+    groups = {"akshare": [{}], "baostock": []}
+    assert kline_module.pick_priority_source(groups, ["tushare", "akshare"], current="baostock") is None
+    assert kline_module.pick_priority_source(groups, ["tushare", "akshare"]) == "akshare"
+    assert kline_module.pick_priority_source(groups, ["baostock", "akshare"], current="tushare") == "akshare"
+
+
+def test_weekly_bars_are_resampled_from_daily_when_not_stored(monkeypatch):
+    # 2024-06-03 ~ 2024-06-14 两周日线，没有存储周线
+    days = [3, 4, 5, 6, 7, 11, 12, 13, 14]
+    db = _FakeDb([_doc("akshare", d, 10.0 + d) for d in days] + [_doc("tushare", 5, 1.0, period="monthly")])
+    service = KlineService(db=db)
+
+    async def priority(market_category="a_shares"):
+        return ["tushare", "akshare"]
+    monkeypatch.setattr(service, "get_source_priority", priority)
+
+    result = asyncio.run(service.get_cached_bars("000001", "weekly", limit=5))
+
+    assert result["source"] == "akshare"
+    assert [bar["time"] for bar in result["items"]] == ["2024-06-07", "2024-06-14"]
+    assert result["items"][1]["open"] == 21.0 and result["items"][1]["close"] == 24.0
+    assert result["items"][1]["volume"] == 400.0
+    # 周线不再同步（默认）：直接按日线重采样，一次查询所有数据源
+    assert [q["period"] for q in db.stock_daily_quotes.queries] == ["daily"]
+
+
+def test_stale_stored_weekly_bars_are_ignored_unless_derived_periods_are_synced(monkeypatch):
+    days = [3, 4, 5, 6, 7, 11, 12, 13, 14]
+    docs = [_doc("tushare", d, 10.0 + d) for d in days] + [_doc("tushare", 7, 1.0, period="weekly")]
+    db = _FakeDb(docs)
+    service = KlineService(db=db)
+
+    async def priority(market_category="a_shares"):
+        return ["tushare"]
+    monkeypatch.setattr(service, "get_source_priority", priority)
+
+    # 存储的周线停在 06-07，日线已到 06-14
+    result = asyncio.run(service.get_cached_bars("000001", "weekly", limit=5))
+    assert [bar["time"] for bar in result["items"]] == ["2024-06-07", "2024-06-14"]
+
+    # 仍同步周线/月线时，存储的周线优先
+    monkeypatch.setattr(kline_module.settings, "MULTI_PERIOD_SYNC_RESAMPLE_DERIVED", False, raising=False)
+    result = asyncio.run(service.get_cached_bars("000001", "weekly", limit=5))
+    assert [bar["time"] for bar in result["items"]] == ["2024-06-07"]
+    assert result["items"][0]["close"] == 1.0
+
+
+def test_source_priority_comes_from_config_snapshot(monkeypatch):
+    from tradingagents.config.datasource_snapshot import DataSourceConfigSnapshot
+
+    snapshot = DataSourceConfigSnapshot(data_source_configs=[
+        {"type": "AKShare", "priority": 3, "market_categories": ["a_shares"]},
+        {"type": "tushare", "priority": 1},
+        {"type": "baostock", "priority": 5, "enabled": False},
+        {"type": "yfinance", "priority": 9, "market_categories": ["us_stocks"]},
+    ])
+    monkeypatch.setattr(
+        "tradingagents.config.datasource_snapshot.get_datasource_config_snapshot", lambda: snapshot
+    )
+
+    assert asyncio.run(KlineService(db=_FakeDb([])).get_source_priority()) == ["akshare", "tushare"]
+
+
+def test_columns_and_etag():
+    items = [
+        {"time": "2024-06-03", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10.0, "amount": None},
+        {"time": "2024-06-04", "open": 1.5, "high": 2.5, "low": 1.0, "close": 2.0, "volume": 12.0, "amount": 30.0},
+    ]
+    columns = to_columns(items)
+    assert columns["time"] == ["2024-06-03", "2024-06-04"]
+    assert columns["close"] == [1.5, 2.0]
+    assert columns["amount"] == [None, 30.0]
+
+    etag = compute_etag({"columns": columns})
+    assert etag == compute_etag({"columns": to_columns(list(items))})
+    assert etag != compute_etag({"columns": to_columns(items[:1])})
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag[2:]}', etag)
+    assert not etag_matches(None, etag)
+    assert kline_module.KLINE_COLUMNS == tuple(columns)
@@ -0,0 +1,130 @@
+import json
+
+from app.services.progress.stream import (
+    ProgressStreamWriter,
+    compute_delta,
+    read_progress_snapshot,
+)
+from app.services.progress.tracker import RedisProgressTracker, get_progress_by_id
+
+
+def _document(pct, current=0, message="", steps=20):
+    return {
+        "task_id": "t1",
+        "status": "completed" if pct >= 100 else "running",
+        "progress_percentage": pct,
+        "last_message": message,
+        "steps": [
+            {"name": f"step{i}", "status": "completed" if i < current else ("current" if i == current else "pending")}
+            for i in range(steps)
+        ],
+    }
+
+
+class _FakeRedis:
+    """只实现事件流需要的命令"""
+
+    def __init__(self):
+        self.streams = {}
+        self.values = {}
+        self.xrange_calls = []
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def xadd(self, key, fields):
+        entries = self.streams.setdefault(key, [])
+        event_id = f"{len(entries) + 1}-0"
+        entries.append((event_id, dict(fields)))
+        return event_id
+
+    def expire(self, key, ttl):
+        return True
+
+    def xrange(self, key, min="-", max="+"):
+        self.xrange_calls.append(min)
+        entries = self.streams.get(key, [])
+        if min == "-":
+            return list(entries)
+        start = int(min.split("-")[0])
+        return [e for e in entries if int(e[0].split("-")[0]) >= start]
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def xadd(self, *args):
+        self.ops.append(("xadd", args))
+
+    def expire(self, *args):
+        self.ops.append(("expire", args))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.ops]
+
+
+def test_delta_only_carries_changed_steps():
+    delta = compute_delta(_document(10, current=2), _document(15, current=3, message="next"))
+
+    assert set(delta) == {"progress_percentage", "last_message", "steps"}
+    assert set(delta["steps"]) == {"2", "3"}
+
+
+def test_file_stream_coalesces_updates_and_folds_on_read(tmp_path):
+    writer = ProgressStreamWriter("t1", file_dir=str(tmp_path), min_interval=60)
+    for pct in range(0, 100, 2):
+        writer.publish(_document(pct, current=pct // 5, message=f"m{pct}"))
+    final = _document(100, current=20, message="done")
+    writer.publish(final, final=True)
+
+    lines = (tmp_path / "t1.events.jsonl").read_text(encoding="utf-8").splitlines()
+    # 首个快照 + 终态增量；间隔内的 49 次更新被合并
+    assert [json.loads(line)["type"] for line in lines] == ["snapshot", "final"]
+    assert read_progress_snapshot("t1", file_dir=str(tmp_path)) == final
+
+
+def test_redis_stream_caches_compacted_snapshot(tmp_path):
+    redis = _FakeRedis()
+    writer = ProgressStreamWriter("t1", redis_client=redis, min_interval=0)
+    writer.publish(_document(0))
+    writer.publish(_document(10, current=2))
+
+    assert read_progress_snapshot("t1", redis_client=redis)["progress_percentage"] == 10
+
+    writer.publish(_document(20, current=4))
+    snapshot = read_progress_snapshot("t1", redis_client=redis)
+
+    assert snapshot == _document(20, current=4)
+    # 第二次读取从缓存快照的事件ID开始，只折叠新增事件
+    assert redis.xrange_calls == ["-", "2-0"]
+    assert "_stream_id" not in snapshot
+
+
+def test_tracker_writes_deltas_and_get_progress_by_id_materializes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("REDIS_ENABLED", "false")
+    monkeypatch.setenv("PROGRESS_STREAM_MIN_INTERVAL", "0")
+
+    tracker = RedisProgressTracker("task-1", ["market", "news"], "标准", "dashscope")
+    tracker.update_progress({"progress_percentage": 30, "last_message": "市场分析完成"})
+    tracker.update_progress({"progress_percentage": 30, "last_message": "市场分析完成"})
+    tracker.mark_completed()
+
+    events = (tmp_path / "data" / "progress" / "task-1.events.jsonl").read_text(encoding="utf-8").splitlines()
+    # 重复的更新没有产生事件
+    assert len(events) == 3
+    assert len(events[1]) < len(events[0])
+
+    progress = get_progress_by_id("task-1")
+    assert progress["status"] == "completed"
+    assert progress["progress_percentage"] == 100
+    assert progress["last_message"] == "市场分析完成"
+    assert all(step["status"] == "completed" for step in progress["steps"])
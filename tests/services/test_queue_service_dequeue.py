@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.queue import (
+    INFLIGHT_PREFIX,
+    READY_LIST,
+    SET_PROCESSING,
+    USER_PROCESSING_PREFIX,
+    VISIBILITY_TIMEOUT_PREFIX,
+    WORKER_HEARTBEAT_KEY,
+)
+from app.services.queue_service import QueueService
+
+
+def _service():
+    return QueueService(fakeredis.aioredis.FakeRedis(decode_responses=True))
+
+
+def test_blocking_dequeue_claims_task_atomically():
+    async def run():
+        svc = _service()
+        task_id = await svc.enqueue_task("u1", "000001", {"research_depth": "标准"})
+
+        task = await svc.dequeue_task("w1", block_timeout=1)
+
+        assert task["id"] == task_id
+        assert task["status"] == "processing"
+        assert task["worker_id"] == "w1"
+        assert task["parameters"] == {"research_depth": "标准"}
+        assert await svc.r.sismember(SET_PROCESSING, task_id)
+        assert await svc.r.sismember(USER_PROCESSING_PREFIX + "u1", task_id)
+        assert await svc.r.hget(VISIBILITY_TIMEOUT_PREFIX + task_id, "worker_id") == "w1"
+        assert await svc.r.llen(INFLIGHT_PREFIX + "w1") == 0
+
+    asyncio.run(run())
+
+
+def test_user_limit_requeues_without_marking():
+    async def run():
+        svc = _service()
+        svc.user_concurrent_limit = 1
+        await svc.enqueue_task("u1", "000001", {})
+        first = await svc.dequeue_task("w1")
+        # 入队时的限制检查基于处理中集合，这里直接写入第二个任务模拟竞态
+        await svc.r.hset("qa:task:t2", mapping={"id": "t2", "user": "u1", "status": "queued"})
+        await svc.r.lpush(READY_LIST, "t2")
+
+        second = await svc.dequeue_task("w1")
+
+        assert first is not None
+        assert second is None
+        assert await svc.r.lrange(READY_LIST, 0, -1) == ["t2"]
+        assert not await svc.r.sismember(SET_PROCESSING, "t2")
+        assert await svc.r.hget("qa:task:t2", "status") == "queued"
+
+    asyncio.run(run())
+
+
+def test_cancelled_and_missing_tasks_are_dropped():
+    async def run():
+        svc = _service()
+        task_id = await svc.enqueue_task("u1", "000001", {})
+        await svc.r.hset("qa:task:" + task_id, "status", "cancelled")
+        await svc.r.lpush(READY_LIST, "ghost")
+
+        assert await svc.dequeue_task("w1") is None  # ghost
+        assert await svc.dequeue_task("w1") is None  # cancelled
+        assert await svc.r.llen(READY_LIST) == 0
+        assert await svc.r.llen(INFLIGHT_PREFIX + "w1") == 0
+
+    asyncio.run(run())
+
+
+def test_recover_inflight_tasks():
+    async def run():
+        svc = _service()
+        await svc.r.lpush(INFLIGHT_PREFIX + "w1", "t1", "t2")
+        recovered = await svc.recover_inflight_tasks("w1")
+        return recovered, await svc.r.lrange(READY_LIST, 0, -1)
+
+    recovered, ready = asyncio.run(run())
+    assert recovered == 2
+    assert sorted(ready) == ["t1", "t2"]
+
+
+def test_recover_orphaned_inflight_tasks_skips_live_workers():
+    async def run():
+        svc = _service()
+        await svc.r.lpush(INFLIGHT_PREFIX + "dead", "t1")
+        await svc.r.lpush(INFLIGHT_PREFIX + "alive", "t2")
+        await svc.r.set(WORKER_HEARTBEAT_KEY.format(worker_id="alive"), "{}", ex=60)
+        recovered = await svc.recover_orphaned_inflight_tasks()
+        return recovered, await svc.r.lrange(READY_LIST, 0, -1), await svc.r.lrange(INFLIGHT_PREFIX + "alive", 0, -1)
+
+    recovered, ready, alive = asyncio.run(run())
+    assert recovered == 1
+    assert ready == ["t1"]
+    assert alive == ["t2"]
+
+
+def _sejf_service():
+    return QueueService(fakeredis.aioredis.FakeRedis(decode_responses=True), scheduling="sejf", aging_rate=1.0)
+
+
+def test_sejf_dequeues_shortest_expected_first_with_aging(monkeypatch):
+    async def run():
+        svc = _sejf_service()
+        clock = [1_000_000]
+        monkeypatch.setattr("app.services.queue_service.time.time", lambda: clock[0])
+
+        deep = await svc.enqueue_task("u1", "000001", {}, expected_duration=1200)
+        quick = await svc.enqueue_task("u2", "000002", {}, expected_duration=300)
+        # 深度分析已等待 1000 秒，比新入队的快速分析(300)更优先：1200 - 1000 < 300
+        clock[0] += 1000
+        late_quick = await svc.enqueue_task("u3", "000003", {}, expected_duration=300)
+
+        order = []
+        for _ in range(3):
+            task = await svc.dequeue_task("w1")
+            order.append(task["id"])
+            await svc.ack_task(task["id"])
+        return order, (deep, quick, late_quick)
+
+    order, (deep, quick, late_quick) = asyncio.run(run())
+    assert order == [quick, deep, late_quick]
+
+
+def test_sejf_prefers_recovered_tasks_and_estimates_batches(monkeypatch):
+    async def run():
+        svc = _sejf_service()
+        estimates = []
+
+        async def fake_estimate(params):
+            estimates.append(params)
+            return 60.0
+
+        monkeypatch.setattr(svc, "estimate_duration", fake_estimate)
+        batch_id, submitted = await svc.create_batch("u1", ["000001", "000002"], {"research_depth": "快速"})
+        await svc.r.lpush(INFLIGHT_PREFIX + "w0", "ghost")
+        await svc.recover_inflight_tasks("w0")
+
+        stats = await svc.stats()
+        first = await svc.dequeue_task("w1")  # 回收的任务先出队（数据不存在，被丢弃）
+        second = await svc.dequeue_task("w1")
+        return estimates, stats, first, second
+
+    estimates, stats, first, second = asyncio.run(run())
+    assert len(estimates) == 1
+    assert stats["queued"] == 3
+    assert first is None
+    assert second["expected_duration"] == "60.0"
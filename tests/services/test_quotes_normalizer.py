@@ -0,0 +1,109 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+
+def _em_snapshot():
+    return pd.DataFrame({
+        "代码": ["000001", "sh600000", "1", "abc"],
+        "名称": ["平安银行", "浦发银行", "平安银行(重复)", "无效"],
+        "最新价": ["10.50", "-", "10.60", "1"],
+        "涨跌幅": ["1.2%", "", "1.3", "0"],
+        "成交额": ["1,000", 2000, None, "0"],
+        "成交量": [100, 200, 300, 0],
+    })
+
+
+def test_normalize_quotes_frame_is_columnwise():
+    from app.services.quotes_normalizer import frame_to_quotes_map, normalize_quotes_frame
+
+    frame = normalize_quotes_frame(_em_snapshot())
+
+    # 无效代码被丢弃，重复代码保留最后一条
+    assert list(frame["code"]) == ["600000", "000001"]
+    quotes = frame_to_quotes_map(frame)
+    assert quotes["000001"]["close"] == 10.6
+    assert quotes["000001"]["amount"] is None
+    assert quotes["600000"]["close"] is None
+    assert quotes["600000"]["amount"] == 2000.0
+    assert quotes["600000"]["open"] is None
+
+
+def test_tushare_scale_and_pct_fill():
+    from app.services.data_sources.tushare_adapter import _RT_K_COLUMNS
+    from app.services.quotes_normalizer import fill_pct_chg, normalize_quotes_frame
+
+    raw = pd.DataFrame({
+        "ts_code": ["000001.SZ", "600000.SH"],
+        "close": [11.0, 9.0],
+        "pre_close": [10.0, 0.0],
+        "vol": [5.0, 6.0],
+    })
+    frame = fill_pct_chg(normalize_quotes_frame(raw, aliases=_RT_K_COLUMNS, scale={"volume": 100}))
+
+    assert list(frame["volume"]) == [500.0, 600.0]
+    assert np.isclose(frame.loc[0, "pct_chg"], 10.0)
+    assert np.isnan(frame.loc[1, "pct_chg"])
+
+
+def test_bulk_upsert_compares_with_stored_documents(monkeypatch):
+    import app.services.quotes_ingestion_service as qis_mod
+    from app.services.quotes_ingestion_service import QuotesIngestionService
+    from app.services.quotes_normalizer import normalize_quotes_frame
+
+    class _FakeResult:
+        matched_count = 0
+        modified_count = 0
+        upserted_ids = {}
+
+    class _FakeCursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        async def to_list(self, length=None):
+            return self.docs
+
+    class _FakeColl:
+        def __init__(self):
+            self.batches = []
+            self.docs = {}
+
+        def find(self, query, projection=None):
+            codes = set(query["code"]["$in"])
+            return _FakeCursor([
+                dict(doc) for code, doc in self.docs.items()
+                if code in codes and doc["trade_date"] == query["trade_date"]
+            ])
+
+        async def bulk_write(self, ops, ordered=False):
+            self.batches.append(ops)
+            for op in ops:
+                if "code" in op._filter and isinstance(op._filter["code"], str):
+                    self.docs.setdefault(op._filter["code"], {}).update(op._doc["$set"])
+            return _FakeResult()
+
+    coll = _FakeColl()
+    monkeypatch.setattr(qis_mod, "get_mongo_db", lambda: {"market_quotes": coll}, raising=True)
+
+    async def _run():
+        snapshot = _em_snapshot()
+        await QuotesIngestionService()._bulk_upsert(normalize_quotes_frame(snapshot), "20240102", "akshare_eastmoney")
+        # 新的服务实例（相当于另一个进程）同样能识别未变化的行
+        await QuotesIngestionService()._bulk_upsert(normalize_quotes_frame(snapshot), "20240102", "akshare_eastmoney")
+        # 其他写入方修改了库中的值：本次快照与库中不一致，需要重新写入
+        coll.docs["000001"]["close"] = 1.0
+        await QuotesIngestionService()._bulk_upsert(normalize_quotes_frame(snapshot), "20240102", "akshare_eastmoney")
+        await QuotesIngestionService()._bulk_upsert(normalize_quotes_frame(snapshot), "20240103", "akshare_eastmoney")
+
+    asyncio.run(_run())
+
+    first, unchanged, rewritten, new_day = coll.batches
+    assert len(first) == 2 and len(new_day) == 2
+    # 未变化的行只用一条 UpdateMany 刷新 updated_at
+    assert len(unchanged) == 1
+    assert unchanged[0]._filter == {"code": {"$in": ["600000", "000001"]}}
+    assert list(unchanged[0]._doc["$set"]) == ["updated_at"]
+    assert rewritten[0]._doc["$set"]["code"] == "000001"
+    assert rewritten[0]._doc["$set"]["close"] == 10.6
+    assert rewritten[1]._filter == {"code": {"$in": ["600000"]}}
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from app.core.rate_limiter import RateLimiter
+
+
+def _local(max_calls, time_window, **kwargs):
+    return RateLimiter(max_calls, time_window, name="test", distributed=False, **kwargs)
+
+
+def test_concurrent_waiters_sleep_in_parallel():
+    # 10次/秒，突发容量 1：第 k 个调用预约到 k*0.1 秒之后
+    limiter = _local(10, 1, burst=1)
+
+    async def _run():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(_run())
+
+    # 等待者各自 sleep：总耗时约为最后一个预约（0.5秒），而不是各等待时间之和（1.5秒）
+    assert 0.4 <= elapsed < 0.9
+    stats = limiter.get_stats()
+    assert stats["total_calls"] == 6
+    assert stats["burst_calls"] == 1
+    assert stats["total_waits"] == 5
+    assert abs(stats["max_wait_time"] - 0.5) < 0.05
+    assert abs(stats["total_wait_time"] - 1.5) < 0.1
+
+
+def test_weighted_api_costs():
+    limiter = _local(100, 1, burst=5, api_costs={"stk_mins": 5})
+
+    async def _run():
+        await limiter.acquire("stk_mins")
+        started = time.monotonic()
+        await limiter.acquire("daily")
+        return time.monotonic() - started
+
+    # 重接口消耗了全部 5 个令牌，下一次调用需要等待约 1 个令牌（0.01秒）
+    waited = asyncio.run(_run())
+    assert waited >= 0.005
+    stats = limiter.get_stats()
+    assert stats["total_cost"] == 6
+    assert stats["backend"] == "local"
+
+
+def test_redis_script_backend_and_fallback():
+    class _FakeScript:
+        def __init__(self, fail):
+            self.fail = fail
+            self.calls = []
+
+        async def __call__(self, keys, args):
+            if self.fail:
+                raise ConnectionError("redis down")
+            self.calls.append((keys, args))
+            return "0.0"
+
+    class _FakeRedis:
+        def __init__(self, fail=False):
+            self.script = _FakeScript(fail)
+
+        def register_script(self, source):
+            assert "HMGET" in source
+            return self.script
+
+    redis = _FakeRedis()
+    limiter = RateLimiter(60, 60, name="shared", burst=3, redis=redis)
+    asyncio.run(limiter.acquire(cost=2))
+    assert redis.script.calls == [(["rate_limit:bucket:shared"], [1.0, 3.0, 2])]
+    assert limiter.get_stats()["backend"] == "redis"
+
+    broken = RateLimiter(60, 60, name="broken", burst=3, redis=_FakeRedis(fail=True))
+    asyncio.run(broken.acquire())
+    stats = broken.get_stats()
+    assert stats["backend"] == "local"
+    assert stats["total_calls"] == 1
+
+
+def test_burst_capacity_is_at_least_one():
+    # max_calls // 10 == 0 或显式 burst=0 时容量仍为 1，调用不会无限等待
+    assert _local(5, 60).capacity == 1
+    limiter = _local(10, 1, burst=0)
+    assert limiter.capacity == 1
+
+    async def _run():
+        started = time.monotonic()
+        await limiter.acquire()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(_run()) < 0.3
@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.screening import panel_engine
+from app.services.screening.eval_utils import evaluate_conditions, evaluate_conditions_frame
+from app.services.screening_service import (
+    ALLOWED_FIELDS,
+    ALLOWED_OPS,
+    TECH_FIELDS,
+    ScreeningParams,
+    ScreeningService,
+)
+from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many
+
+SPECS = [
+    IndicatorSpec("ma", {"n": 5}),
+    IndicatorSpec("ma", {"n": 10}),
+    IndicatorSpec("ma", {"n": 20}),
+    IndicatorSpec("ma", {"n": 60}),
+    IndicatorSpec("ema", {"n": 12}),
+    IndicatorSpec("ema", {"n": 26}),
+    IndicatorSpec("macd"),
+    IndicatorSpec("rsi", {"n": 14}),
+    IndicatorSpec("boll", {"n": 20, "k": 2}),
+    IndicatorSpec("atr", {"n": 14}),
+    IndicatorSpec("kdj", {"n": 9, "m1": 3, "m2": 3}),
+]
+
+CONDITIONS = [
+    {"field": "close", "op": ">", "right_field": "ma20"},
+    {"field": "rsi14", "op": "between", "value": [40, 70]},
+    {"field": "dif", "op": "cross_up", "right_field": "dea"},
+    {"field": "kdj_k", "op": "cross_down", "right_field": "kdj_d"},
+    {"field": "atr14", "op": "<=", "value": 2},
+    {"op": "group", "logic": "OR", "children": [
+        {"field": "pct_chg", "op": ">", "value": 1},
+        {"op": "group", "logic": "AND", "children": [
+            {"field": "ma5", "op": ">", "right_field": "ma60"},
+            {"field": "boll_upper", "op": ">=", "right_field": "close"},
+        ]},
+    ]},
+    {"field": "pe", "op": "<", "value": 30},
+    {"field": "close", "op": "between", "right_field": "ma5"},
+]
+
+
+def _synthetic_docs(n_symbols=12, days=160, seed=7):
+    rng = np.random.default_rng(seed)
+    end = datetime(2024, 6, 28)
+    dates = [(end - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d") for i in range(days)]
+    docs = []
+    for s in range(n_symbols):
+        symbol = f"{s:06d}"
+        # 部分股票上市较晚，K线更短
+        length = days if s % 3 else max(3, days // (s + 2))
+        close = 10 + np.cumsum(rng.normal(0, 0.3, length))
+        for i, date in enumerate(dates[-length:]):
+            c = float(close[i])
+            docs.append({
+                "symbol": symbol, "code": symbol, "trade_date": date, "period": "daily",
+                "data_source": "tushare", "open": c - 0.1, "high": c + abs(rng.normal(0, 0.5)),
+                "low": c - abs(rng.normal(0, 0.5)), "close": c, "volume": 1000 + i, "amount": c * 1000,
+            })
+    # 同日多数据源：低优先级数据应被丢弃
+    docs.append(dict(docs[-1], data_source="akshare", close=999.0))
+    return docs
+
+
+class _FakeCursor(list):
+    def batch_size(self, _n):
+        return self
+
+
+class _FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def _match(self, query):
+        lo, hi = query["trade_date"]["$gte"], query["trade_date"]["$lte"]
+        symbols = query.get("symbol", {}).get("$in")
+        return [
+            d for d in self.docs
+            if d["period"] == query["period"] and lo <= d["trade_date"] <= hi
+            and (symbols is None or d["symbol"] in symbols)
+        ]
+
+    def find_one(self, query, projection=None, sort=None):
+        docs = self._match(query)
+        return max(docs, key=lambda d: d["trade_date"]) if docs else None
+
+    def distinct(self, field, query):
+        return list({d[field] for d in self._match(query)})
+
+    def find(self, query, projection):
+        self.queries.append(query)
+        return _FakeCursor(
+            {k: d[k] for k in projection if projection[k] and k in d} for d in self._match(query)
+        )
+
+
+class _FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, _FakeCollection([]))
+
+
+def _per_symbol_frames(bars):
+    frames = {}
+    for symbol, group in bars.groupby("symbol"):
+        df = group.reset_index(drop=True)
+        df["pct_chg"] = df["close"].pct_change() * 100.0
+        frames[symbol] = compute_many(df, SPECS)
+    return frames
+
+
+@pytest.fixture
+def bars():
+    db = _FakeDB()
+    db["stock_daily_quotes"].docs = _synthetic_docs()
+    return panel_engine.load_daily_bars(db, "CN", "2023-01-01", "2024-06-28")
+
+
+def test_load_daily_bars_dedupes_by_source_priority(bars):
+    assert not bars.duplicated(["symbol", "trade_date"]).any()
+    assert (bars["close"] != 999.0).all()
+    assert "vol" in bars.columns
+
+
+def test_load_daily_bars_in_symbol_chunks_and_drops_suspended():
+    db = _FakeDB()
+    docs = _synthetic_docs()
+    # 000001 停牌：最新K线早于面板结束日
+    docs = [d for d in docs if not (d["symbol"] == "000001" and d["trade_date"] > "2024-06-20")]
+    db["stock_daily_quotes"].docs = docs
+
+    bars = panel_engine.load_daily_bars(db, "CN", "2023-01-01", "2024-06-28", chunk_size=5)
+
+    assert len(db["stock_daily_quotes"].queries) == 3
+    assert all(len(q["symbol"]["$in"]) <= 5 for q in db["stock_daily_quotes"].queries)
+    assert "000001" not in set(bars["symbol"])
+    assert bars["symbol"].nunique() == 11
+    assert bars.groupby("symbol")["trade_date"].max().eq("2024-06-28").all()
+
+    kept = panel_engine.load_daily_bars(db, "CN", "2023-01-01", "2024-06-28", drop_suspended=False)
+    assert kept["symbol"].nunique() == 12
+
+
+def test_panel_indicators_match_per_symbol_path(bars):
+    fields = panel_engine.screening_fields(TECH_FIELDS, ())
+    panel = panel_engine.compute_panel_indicators(panel_engine.build_panel(bars), fields)
+    expected = _per_symbol_frames(bars)
+
+    for offset in (1, 2):
+        snap = panel_engine.snapshot(panel, fields, offset=offset)
+        for symbol, frame in expected.items():
+            if len(frame) < offset:
+                assert snap.loc[symbol].isna().all()
+                continue
+            row = frame.iloc[-offset]
+            for field in fields:
+                np.testing.assert_allclose(
+                    snap.loc[symbol, field], row[field], rtol=1e-9, equal_nan=True,
+                    err_msg=f"{symbol} {field} offset={offset}",
+                )
+
+
+@pytest.mark.parametrize("node", CONDITIONS)
+def test_condition_masks_match_per_symbol_evaluation(bars, node):
+    fields = panel_engine.screening_fields(TECH_FIELDS, ())
+    panel = panel_engine.compute_panel_indicators(panel_engine.build_panel(bars), fields)
+    last = panel_engine.snapshot(panel, fields, offset=1)
+    prev = panel_engine.snapshot(panel, fields, offset=2)
+
+    mask = evaluate_conditions_frame(last, prev, node, ALLOWED_FIELDS, ALLOWED_OPS)
+
+    for symbol, frame in _per_symbol_frames(bars).items():
+        assert bool(mask[symbol]) == evaluate_conditions(frame, node, ALLOWED_FIELDS, ALLOWED_OPS), symbol
+
+
+def test_run_uses_bulk_panel(monkeypatch):
+    import app.core.database as database
+
+    db = _FakeDB()
+    docs = _synthetic_docs()
+    # 使日期落在 run() 的 220 天窗口内
+    shift = (datetime.now() - datetime(2024, 6, 28)).days
+    for d in docs:
+        d["trade_date"] = (datetime.strptime(d["trade_date"], "%Y-%m-%d") + timedelta(days=shift)).strftime("%Y-%m-%d")
+    db["stock_daily_quotes"].docs = docs
+    monkeypatch.setattr(database, "get_mongo_db_sync", lambda: db)
+
+    svc = ScreeningService()
+    monkeypatch.setattr(svc, "_get_universe", lambda market: pytest.fail("should not fall back"))
+
+    out = svc.run(
+        {"field": "close", "op": ">", "value": 0},
+        ScreeningParams(limit=5, order_by=[{"field": "rsi14", "direction": "desc"}]),
+    )
+
+    assert out["total"] == 12
+    assert len(db["stock_daily_quotes"].queries) == 1
+    assert len(out["items"]) == 5
+    rsi = [item["rsi14"] for item in out["items"]]
+    assert all(v is not None for v in rsi[:3])
+    assert rsi[:3] == sorted(rsi[:3], reverse=True)
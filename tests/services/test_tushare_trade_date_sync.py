@@ -0,0 +1,172 @@
+import asyncio
+
+import pandas as pd
+
+from app.core.rate_limiter import RateLimiter
+from app.worker.tushare_sync_service import (
+    TushareSyncService,
+    apply_qfq,
+    find_adjusted_symbols,
+)
+
+
+def _market_daily(trade_date, closes, factors):
+    codes = list(closes)
+    return pd.DataFrame({
+        "code": codes,
+        "trade_date": trade_date.replace("-", ""),
+        "open": [closes[c] for c in codes],
+        "high": [closes[c] for c in codes],
+        "low": [closes[c] for c in codes],
+        "close": [closes[c] for c in codes],
+        "pre_close": [closes[c] for c in codes],
+        "volume": 10.0,
+        "amount": 20.0,
+        "adj_factor": [factors[c] for c in codes],
+    })
+
+
+def test_apply_qfq_matches_pro_bar_formula():
+    df = _market_daily("2024-06-03", {"000001": 10.0, "600000": 8.0}, {"000001": 1.0, "600000": 2.0})
+    latest = pd.Series({"000001": 1.1, "600000": 2.0})
+
+    adjusted = apply_qfq(df, latest)
+
+    assert list(adjusted["close"]) == [9.09, 8.0]
+    assert list(df["close"]) == [10.0, 8.0]
+    assert find_adjusted_symbols(pd.Series({"000001": 1.0, "600000": 2.0}), latest) == ["000001"]
+    assert find_adjusted_symbols(None, latest) == []
+
+
+class _FakeAggregate:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _FakeQuotes:
+    async def find_one(self, *args, **kwargs):
+        return {"trade_date": "2024-06-03"}
+
+    def aggregate(self, pipeline):
+        # 06-03 已完整入库，06-04 只同步了少数股票
+        return _FakeAggregate([
+            {"_id": "2024-06-03", "count": 5000},
+            {"_id": "2024-06-04", "count": 3},
+        ])
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.market_daily_calls = []
+
+    async def get_trade_dates(self, start_date, end_date):
+        return ["2024-05-31", "2024-06-03", "2024-06-04", "2024-06-05"]
+
+    async def get_market_daily(self, trade_date):
+        self.market_daily_calls.append(trade_date)
+        return _market_daily(trade_date, {"000001": 10.0}, {"000001": 1.0})
+
+    async def get_adj_factor(self, trade_date):
+        return pd.Series({"000001": 1.0})
+
+
+class _FakeHistoricalService:
+    def __init__(self):
+        self.saved = []
+
+    async def save_historical_data(self, symbol, data, data_source, market, period, symbol_column=None):
+        self.saved.append((symbol, symbol_column, len(data)))
+        return len(data)
+
+
+def test_sync_by_trade_date_fetches_only_missing_dates():
+    service = TushareSyncService.__new__(TushareSyncService)
+    service.db = type("DB", (), {"stock_daily_quotes": _FakeQuotes()})()
+    service.provider = _FakeProvider()
+    service.historical_service = _FakeHistoricalService()
+    service.rate_limiter = RateLimiter(1000, 1, name="test", distributed=False)
+
+    stats = asyncio.run(service.sync_historical_data_by_trade_date(
+        start_date="2024-06-03", end_date="2024-06-05"
+    ))
+
+    assert service.provider.market_daily_calls == ["2024-06-04", "2024-06-05"]
+    assert stats["trade_dates"] == ["2024-06-04", "2024-06-05"]
+    assert stats["total_records"] == 2
+    assert stats["adjusted_symbols"] == []
+    # 交易日历 1 次 + 每个交易日 3 次 + 除权检查 1 次
+    assert stats["api_calls"] == 8
+    assert service.historical_service.saved[0] == ("全市场 2024-06-04", "code", 1)
+
+
+class _FakeBulkResult:
+    modified_count = 250
+
+
+class _RebasedQuotes(_FakeQuotes):
+    def __init__(self):
+        self.bulk_writes = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes.append(requests)
+        return _FakeBulkResult()
+
+
+class _ExDividendProvider(_FakeProvider):
+    async def get_market_daily(self, trade_date):
+        self.market_daily_calls.append(trade_date)
+        return _market_daily(trade_date, {"000001": 10.0, "600000": 8.0}, {"000001": 1.1, "600000": 2.0})
+
+    async def get_adj_factor(self, trade_date):
+        return pd.Series({"000001": 1.0, "600000": 2.0})
+
+
+def test_ex_dividend_symbols_are_rebased_in_one_bulk_write():
+    service = TushareSyncService.__new__(TushareSyncService)
+    quotes = _RebasedQuotes()
+    service.db = type("DB", (), {"stock_daily_quotes": quotes})()
+    service.provider = _ExDividendProvider()
+    service.historical_service = _FakeHistoricalService()
+    service.rate_limiter = RateLimiter(1000, 1, name="test", distributed=False)
+
+    stats = asyncio.run(service.sync_historical_data_by_trade_date(
+        start_date="2024-06-03", end_date="2024-06-05"
+    ))
+
+    # 不再逐只股票重新拉取全部历史，只做一次库内重算
+    assert stats["adjusted_symbols"] == ["000001"]
+    assert stats["api_calls"] == 8
+    assert stats["rebased_records"] == 250
+    assert len(quotes.bulk_writes) == 1 and len(quotes.bulk_writes[0]) == 1
+
+
+class _PermissionDeniedProvider(_FakeProvider):
+    async def get_trade_dates(self, start_date, end_date):
+        raise PermissionError("抱歉，您没有访问该接口的权限")
+
+
+class _FailingBasicInfo:
+    def __init__(self):
+        self.find_calls = 0
+
+    def find(self, *args, **kwargs):
+        self.find_calls += 1
+        raise RuntimeError("stock_basic_info unavailable")
+
+
+def test_trade_date_sync_failure_falls_back_to_per_symbol_sync():
+    service = TushareSyncService.__new__(TushareSyncService)
+    service.db = type("DB", (), {"stock_daily_quotes": _FakeQuotes()})()
+    service.provider = _PermissionDeniedProvider()
+    service.historical_service = _FakeHistoricalService()
+    service.rate_limiter = RateLimiter(1000, 1, name="test", distributed=False)
+    service.db.stock_basic_info = _FailingBasicInfo()
+
+    stats = asyncio.run(service.sync_historical_data())
+
+    # 按交易日同步抛出异常后，改走逐只股票模式（查询股票列表）
+    assert service.db.stock_basic_info.find_calls == 1
+    assert "failed" not in stats
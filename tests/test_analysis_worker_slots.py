@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+AnalysisWorker 多槽位并发测试
+
+使用假的队列服务和分析服务，不依赖真实 DB/Redis：
+1) 槽位数限制同时执行的任务数，所有任务都被确认
+2) 停止后等待进行中的任务完成（优雅退出）
+3) 心跳中包含槽位指标
+"""
+
+import asyncio
+import time
+
+import app.worker.analysis_worker as analysis_worker
+
+
+class _FakeQueueService:
+    visibility_timeout = 300
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.acked = []
+        self.extended = []
+
+    async def dequeue_task(self, worker_id, block_timeout=0):
+        if self.tasks:
+            return self.tasks.pop(0)
+        await asyncio.sleep(0.01)
+        return None
+
+    async def ack_task(self, task_id, success=True):
+        self.acked.append((task_id, success))
+        return True
+
+    async def extend_visibility_timeout(self, task_id, worker_id):
+        self.extended.append(task_id)
+
+
+class _FakeAnalysisService:
+    def __init__(self, duration=0.2):
+        self.duration = duration
+        self.active = 0
+        self.peak = 0
+
+    async def execute_analysis_task(self, task, progress_callback=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self.active -= 1
+        progress_callback(100, "done")
+        return type("Result", (), {"execution_time": self.duration})()
+
+
+def _tasks(n):
+    now = str(int(time.time()))
+    return [
+        {"id": f"t{i}", "symbol": f"{i:06d}", "user": "507f1f77bcf86cd799439011", "parameters": {}, "enqueued_at": now}
+        for i in range(n)
+    ]
+
+
+def _make_worker(monkeypatch, tasks, concurrency, duration=0.2):
+    service = _FakeAnalysisService(duration)
+    monkeypatch.setattr(analysis_worker, "get_analysis_service", lambda: service)
+    worker = analysis_worker.AnalysisWorker(worker_id="wtest")
+    worker.concurrency = concurrency
+    worker.queue_service = _FakeQueueService(tasks)
+    worker.poll_interval = 0.01
+    worker.block_timeout = 0
+    worker.running = True
+    return worker, service
+
+
+def test_slots_bound_concurrency_and_ack_all(monkeypatch):
+    worker, service = _make_worker(monkeypatch, _tasks(6), concurrency=3)
+
+    async def run():
+        loop = asyncio.create_task(worker._work_loop())
+        while len(worker.queue_service.acked) < 6:
+            await asyncio.sleep(0.02)
+        worker.running = False
+        await loop
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    assert service.peak == 3
+    assert sorted(t for t, ok in worker.queue_service.acked if ok) == [f"t{i}" for i in range(6)]
+    # 6 个 0.2s 的任务在 3 个槽位上约需 0.4s
+    assert elapsed < 1.0
+    assert sum(slot["tasks_completed"] for slot in worker._slot_metrics()) == 6
+
+
+def test_stop_drains_inflight_slots(monkeypatch):
+    worker, service = _make_worker(monkeypatch, _tasks(2), concurrency=2, duration=0.3)
+
+    async def run():
+        loop = asyncio.create_task(worker._work_loop())
+        while service.active < 2:
+            await asyncio.sleep(0.01)
+        worker.running = False
+        await loop
+
+    asyncio.run(run())
+
+    assert len(worker.queue_service.acked) == 2
+    assert worker.current_task is None
+    assert all(slot["task_id"] is None for slot in worker._slot_metrics())
+
+
+def test_heartbeat_reports_slot_metrics(monkeypatch):
+    worker, service = _make_worker(monkeypatch, _tasks(1), concurrency=2, duration=0.3)
+    sent = {}
+
+    class _FakeRedisService:
+        async def set_json(self, key, value, ttl=None):
+            sent.update(value)
+
+    import app.core.redis_client as redis_client
+    monkeypatch.setattr(redis_client, "get_redis_service", lambda: _FakeRedisService())
+
+    async def run():
+        loop = asyncio.create_task(worker._work_loop())
+        while service.active < 1:
+            await asyncio.sleep(0.01)
+        await worker._send_heartbeat()
+        worker.running = False
+        await loop
+
+    asyncio.run(run())
+
+    assert sent["concurrency"] == 2
+    assert sent["busy_slots"] == 1
+    assert sent["current_tasks"] == ["t0"]
+    busy = [slot for slot in sent["slots"] if slot["task_id"]]
+    assert busy[0]["symbol"] == "000000"
+    assert busy[0]["last_queue_wait_seconds"] is not None
+
+
+def test_default_worker_id_is_unique_per_process_unless_pinned(monkeypatch):
+    import os
+
+    monkeypatch.delenv("WORKER_ID", raising=False)
+    monkeypatch.delenv("WORKER_SLOT", raising=False)
+    assert analysis_worker.default_worker_id().endswith(f"-{os.getpid()}")
+    monkeypatch.setenv("WORKER_SLOT", "2")
+    assert analysis_worker.default_worker_id() == analysis_worker.default_worker_id()
+    assert analysis_worker.default_worker_id().endswith("-2")
+    monkeypatch.setenv("WORKER_ID", "worker-a")
+    assert analysis_worker.default_worker_id() == "worker-a"
+
+
+def test_refuses_worker_id_held_by_live_heartbeat(monkeypatch):
+    worker, _ = _make_worker(monkeypatch, [], concurrency=1)
+    worker.heartbeat_interval = 0
+    heartbeats = {"worker:wtest:heartbeat"}
+    deleted = []
+
+    class _FakeRedis:
+        async def exists(self, key):
+            return key in heartbeats
+
+        async def delete(self, key):
+            deleted.append(key)
+
+    class _FakeRedisService:
+        redis = _FakeRedis()
+
+    import app.core.redis_client as redis_client
+    monkeypatch.setattr(redis_client, "get_redis_service", lambda: _FakeRedisService())
+    monkeypatch.setattr(analysis_worker, "close_database", _noop)
+    monkeypatch.setattr(analysis_worker, "close_redis", _noop)
+
+    async def run():
+        try:
+            await worker._ensure_worker_id_free()
+        except RuntimeError:
+            await worker._cleanup()
+            return False
+        return True
+
+    # 心跳一直存在：拒绝启动，也不删除另一个 Worker 的心跳
+    assert asyncio.run(run()) is False
+    assert deleted == []
+
+    heartbeats.clear()
+    assert asyncio.run(run()) is True
+    assert worker._owns_heartbeat
+
+
+async def _noop():
+    return None
@@ -219,10 +219,14 @@ class TestTushareSyncService:
             'volume': [1000000]
         })
         sync_service.provider.get_historical_data = AsyncMock(return_value=mock_df)
-        sync_service._save_historical_data = AsyncMock(return_value=1)
+        sync_service.historical_service = Mock()
+        sync_service.historical_service.build_documents = Mock(return_value=[{"trade_date": "2024-12-01"}])
+        sync_service.historical_service.upsert_documents = AsyncMock(
+            side_effect=lambda label, docs, batch_size: len(docs)
+        )
         sync_service._get_last_sync_date = AsyncMock(return_value='2024-11-01')
-        
-        result = await sync_service.sync_historical_data(incremental=True)
+
+        result = await sync_service.sync_historical_data(incremental=True, by_trade_date=False)
         
         assert result["total_processed"] == 2
         assert result["success_count"] == 2
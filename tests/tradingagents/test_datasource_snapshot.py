@@ -0,0 +1,84 @@
+from tradingagents.config.datasource_snapshot import VERSION_KEY, DataSourceConfigStore
+
+
+class _Loader:
+    def __init__(self, configs):
+        self.configs = configs
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("mongo down")
+        return {"data_source_configs": list(self.configs), "version": self.calls, "us_groupings": []}
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+def _store(loader, redis=None, **kwargs):
+    kwargs.setdefault("check_interval", 0)
+    return DataSourceConfigStore(loader=loader, redis_client=redis, use_redis=redis is not None, **kwargs)
+
+
+def test_snapshot_reloads_only_when_version_changes():
+    loader = _Loader([{"name": "Tushare", "type": "tushare", "api_key": "k1"}])
+    redis = _FakeRedis()
+    redis.values[VERSION_KEY] = b"1"
+    store = _store(loader, redis)
+
+    for _ in range(10):
+        assert store.get().credentials()["tushare"]["api_key"] == "k1"
+    assert loader.calls == 1
+
+    loader.configs = [{"name": "Tushare", "type": "tushare", "api_key": "k2"}]
+    redis.values[VERSION_KEY] = b"2"
+
+    assert store.get().credentials()["tushare"]["api_key"] == "k2"
+    assert loader.calls == 2
+
+
+def test_memoized_results_are_per_snapshot():
+    loader = _Loader([])
+    store = _store(loader, ttl=3600)
+    builds = []
+
+    def build(category):
+        builds.append(category)
+        return [category]
+
+    for _ in range(3):
+        snapshot = store.get()
+        snapshot.memoize(("cn_priority", "a_shares"), lambda: build("a_shares"))
+        snapshot.memoize(("cn_priority", "hk_stocks"), lambda: build("hk_stocks"))
+    assert builds == ["a_shares", "hk_stocks"]
+
+    store.invalidate()
+    store.get().memoize(("cn_priority", "a_shares"), lambda: build("a_shares"))
+    assert builds == ["a_shares", "hk_stocks", "a_shares"]
+    assert loader.calls == 2
+
+
+def test_load_failure_keeps_previous_snapshot_and_retries():
+    loader = _Loader([{"name": "AKShare", "type": "akshare"}])
+    store = _store(loader, ttl=0)
+    first = store.get()
+
+    loader.fail = True
+    assert store.get() is first
+    assert store.get_stats()["load_errors"] == 1
+
+    # 首次加载就失败时返回空快照，下次访问重试
+    empty_loader = _Loader([])
+    empty_loader.fail = True
+    empty_store = _store(empty_loader, ttl=3600)
+    assert empty_store.get().data_source_configs is None
+    empty_loader.fail = False
+    assert empty_store.get().data_source_configs == []
+    assert empty_loader.calls == 2
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache, embedding_key
+
+
+class CountingEmbedder:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return [float(len(text)), 0.5, -1.25]
+
+
+def test_key_normalizes_whitespace_and_includes_model():
+    assert embedding_key("m", "市场报告\n\n  内容 ") == embedding_key("m", "市场报告 内容")
+    assert embedding_key("m", "报告") != embedding_key("other", "报告")
+
+
+def test_concurrent_identical_lookups_compute_once():
+    cache = EmbeddingCache(max_entries=8)
+    embedder = CountingEmbedder(delay=0.1)
+    results = []
+
+    def lookup():
+        results.append(cache.get_or_compute("m", "同一份分析师报告", embedder))
+
+    threads = [threading.Thread(target=lookup) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert embedder.calls == 1
+    assert len({tuple(r) for r in results}) == 1
+    stats = cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 4
+
+
+def test_persistent_tier_survives_new_instance(tmp_path):
+    db_path = tmp_path / "embeddings.sqlite3"
+    first = EmbeddingCache(max_entries=8, db_path=db_path)
+    first.get_or_compute("m", "report", CountingEmbedder())
+
+    second = EmbeddingCache(max_entries=8, db_path=db_path)
+    embedder = CountingEmbedder()
+    assert second.get_or_compute("m", "report", embedder) == [6.0, 0.5, -1.25]
+    assert embedder.calls == 0
+    assert second.get_stats()["disk_hits"] == 1
+
+
+def test_lru_eviction_and_zero_vectors_not_cached():
+    cache = EmbeddingCache(max_entries=2)
+    for text in ("a", "b", "c"):
+        cache.put("m", text, [1.0])
+    assert cache.get("m", "a") is None
+    assert cache.get("m", "c") == [1.0]
+
+    cache.get_or_compute("m", "disabled", lambda text: [0.0] * 4)
+    assert cache.get("m", "disabled") is None
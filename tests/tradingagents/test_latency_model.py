@@ -0,0 +1,75 @@
+from tradingagents.graph.latency_model import AnalysisLatencyModel, latency_profile_key
+
+
+def _perf(total, market=None):
+    return {"total_time": total, "node_timings": {"Market Analyst": market if market is not None else total / 4}}
+
+
+def _model(**kwargs):
+    return AnalysisLatencyModel(backend="memory", min_samples=3, **kwargs)
+
+
+def test_estimate_uses_rolling_quantiles_per_profile():
+    model = _model(window=5)
+    for total in (900, 100, 200, 300, 400, 500):
+        model.record(["news", "market"], "标准", "dashscope", "qwen-turbo/qwen-plus", _perf(total))
+
+    estimate = model.estimate(["market", "news"], "标准", "dashscope", "qwen-turbo/qwen-plus")
+
+    # 窗口为 5，最早的 900 已被淘汰；分析师顺序不影响画像
+    assert estimate.samples == 5
+    assert estimate.total_p50 == 300
+    assert estimate.total_p90 == 460
+    assert estimate.node_p50["Market Analyst"] == 75
+    assert estimate.profile == latency_profile_key(["market", "news"], "标准", "dashscope", "qwen-turbo/qwen-plus")
+
+
+def test_estimate_falls_back_to_coarse_profile_and_needs_min_samples():
+    model = _model()
+    model.record(["market"], 1, "deepseek", "deepseek-chat/deepseek-chat", _perf(120))
+    model.record(["market"], "快速", "dashscope", "qwen-turbo/qwen-plus", _perf(150))
+    assert model.estimate(["market"], "快速") is None
+
+    model.record(["market"], "快速", "dashscope", "qwen-turbo/qwen-plus", _perf(180))
+
+    # 精确画像只有 2 个样本，回退到 (分析师, 深度) 画像；数字等级与中文等级等价
+    estimate = model.estimate(["market"], "1", "dashscope", "qwen-turbo/qwen-plus")
+    assert estimate.profile == latency_profile_key(["market"], "快速")
+    assert estimate.total_p50 == 150
+    assert model.estimate(["market"], "深度") is None
+
+
+def test_remaining_is_conditioned_on_elapsed_time():
+    model = _model()
+    for total in (100, 200, 300, 400, 1000):
+        model.record(["market"], "标准", None, None, _perf(total))
+    estimate = model.estimate(["market"], "标准")
+
+    assert estimate.remaining(0) == 300
+    # 已经运行了 350 秒：只参考更慢的 400 和 1000，中位数 700
+    assert estimate.remaining(350) == 350
+    assert estimate.remaining(2000) == 0
+
+
+def test_tracker_uses_history_for_eta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("REDIS_ENABLED", "false")
+    from app.services.progress import tracker as tracker_module
+
+    model = _model()
+    monkeypatch.setattr(tracker_module, "get_latency_model", lambda: model)
+
+    heuristic = tracker_module.RedisProgressTracker("t0", ["market"], "标准", "dashscope")
+    assert heuristic.progress_data["estimated_total_time"] == heuristic._get_heuristic_total_time()
+
+    for total in (80, 100, 120):
+        model.record(["market"], "标准", "deepseek", "deepseek-chat/deepseek-chat", _perf(total))
+    tracker = tracker_module.RedisProgressTracker("t1", ["market"], "标准", "dashscope")
+    assert tracker.progress_data["estimated_total_time"] == 100
+
+    tracker.apply_llm_config({
+        "llm_provider": "deepseek",
+        "quick_think_llm": "deepseek-chat",
+        "deep_think_llm": "deepseek-chat",
+    })
+    assert tracker._latency_estimate.profile.endswith("|deepseek|deepseek-chat/deepseek-chat")
@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_lazy_exports_resolve_on_first_access(tmp_path, monkeypatch):
+    package = tmp_path / "lazy_pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text(
+        "from tradingagents.utils.lazy_imports import lazy_exports\n"
+        "__getattr__, __dir__ = lazy_exports(\n"
+        "    globals(),\n"
+        "    {'Provider': ('.impl', 'Provider'), 'Missing': ('.not_installed', 'Missing')},\n"
+        "    {'PROVIDER_AVAILABLE': 'Provider', 'MISSING_AVAILABLE': 'Missing'},\n"
+        "    required={'Strict': ('.impl', 'Provider')},\n"
+        ")\n"
+    )
+    (package / "impl.py").write_text("Provider = 'provider'\n")
+    (package / "helpers.py").write_text("VALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    import lazy_pkg
+
+    assert "lazy_pkg.impl" not in sys.modules
+    assert lazy_pkg.Provider == "provider" and "lazy_pkg.impl" in sys.modules
+    # 与 try/except ImportError 的旧写法一致：依赖缺失时为 None / False
+    assert lazy_pkg.Missing is None
+    assert lazy_pkg.PROVIDER_AVAILABLE is True and lazy_pkg.MISSING_AVAILABLE is False
+    assert lazy_pkg.Strict == "provider"
+    # 未列出的子模块按需导入
+    assert lazy_pkg.helpers.VALUE == 42
+    assert "Provider" in dir(lazy_pkg)
+
+    try:
+        lazy_pkg.nothing
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("unknown attribute should raise AttributeError")
+
+
+def test_importing_dataflows_does_not_load_providers():
+    code = (
+        "import json, sys\n"
+        "import tradingagents.dataflows\n"
+        "import tradingagents.dataflows.providers\n"
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith('tradingagents.dataflows.'))))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    for module in ("interface", "providers.china", "providers.us", "providers.hk", "technical", "news"):
+        assert f"tradingagents.dataflows.{module}" not in loaded
+
+
+def test_yfinance_flag_is_an_eager_bool():
+    code = (
+        "import json, sys\n"
+        "import tradingagents.dataflows as dataflows\n"
+        "import tradingagents.dataflows.providers as providers\n"
+        "flags = [dataflows.__dict__['YFINANCE_AVAILABLE'], providers.__dict__['YFINANCE_AVAILABLE']]\n"
+        "print(json.dumps({'flags': flags, 'yfinance': 'yfinance' in sys.modules}))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # 导入包时就已确定且为 bool，不会导入 yfinance
+    assert all(isinstance(flag, bool) for flag in result["flags"])
+    assert result["flags"][0] == result["flags"][1]
+    assert result["yfinance"] is False
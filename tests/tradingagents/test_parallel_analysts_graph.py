@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import tradingagents.graph.setup as setup_mod
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.setup import GraphSetup
+
+
+REPORT_KEYS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
+
+class ShortCircuitLogic(ConditionalLogic):
+    """研究/风险辩论直接进入裁决节点，只验证分析师阶段的拓扑"""
+
+    def should_continue_debate(self, state):
+        return "Research Manager"
+
+    def should_continue_risk_analysis(self, state):
+        return "Risk Judge"
+
+
+def _fake_analyst(analyst_type, active, peak, lock):
+    report_key = REPORT_KEYS[analyst_type]
+
+    def node(state):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+        # 并行分支之间不应看到彼此的报告
+        others = [k for k in REPORT_KEYS.values() if k != report_key and state.get(k)]
+        return {
+            "messages": [AIMessage(content=f"{analyst_type} done")],
+            report_key: f"{analyst_type} report (saw {len(others)} peers)",
+        }
+
+    return node
+
+
+@pytest.fixture
+def patched_setup(monkeypatch):
+    active, peak, lock = [0], [0], threading.Lock()
+    seen = {}
+
+    for analyst_type in REPORT_KEYS:
+        factory_name = {
+            "market": "create_market_analyst",
+            "social": "create_social_media_analyst",
+            "news": "create_news_analyst",
+            "fundamentals": "create_fundamentals_analyst",
+        }[analyst_type]
+        node = _fake_analyst(analyst_type, active, peak, lock)
+        monkeypatch.setattr(setup_mod, factory_name, lambda *a, _node=node, **k: _node)
+
+    def bull(state):
+        seen.update({k: state.get(k) for k in REPORT_KEYS.values()})
+        return {}
+
+    monkeypatch.setattr(setup_mod, "create_bull_researcher", lambda *a, **k: bull)
+    for name in ("create_bear_researcher", "create_research_manager", "create_trader",
+                 "create_risky_debator", "create_neutral_debator", "create_safe_debator",
+                 "create_risk_manager"):
+        monkeypatch.setattr(setup_mod, name, lambda *a, **k: (lambda state: {}))
+
+    def make(parallel):
+        return GraphSetup(
+            quick_thinking_llm=None,
+            deep_thinking_llm=None,
+            toolkit=None,
+            tool_nodes={k: (lambda state: {}) for k in REPORT_KEYS},
+            bull_memory=None,
+            bear_memory=None,
+            trader_memory=None,
+            invest_judge_memory=None,
+            risk_manager_memory=None,
+            conditional_logic=ShortCircuitLogic(),
+            config={"parallel_analysts": parallel},
+        )
+
+    return make, peak, seen
+
+
+def _initial_state():
+    return {
+        "messages": [HumanMessage(content="000001")],
+        "company_of_interest": "000001",
+        "trade_date": "2024-06-28",
+    }
+
+
+def test_parallel_analysts_run_concurrently_and_join(patched_setup):
+    make, peak, seen = patched_setup
+    graph = make(parallel=True).setup_graph(list(REPORT_KEYS))
+
+    updates = list(graph.stream(_initial_state(), stream_mode="updates"))
+    node_names = {name for chunk in updates for name in chunk}
+
+    assert peak[0] == len(REPORT_KEYS)
+    # 主图节点名保持不变，进度回调仍可按 "<Type> Analyst" 识别
+    assert {"Market Analyst", "Social Analyst", "News Analyst", "Fundamentals Analyst"} <= node_names
+    for analyst_type, key in REPORT_KEYS.items():
+        assert seen[key] == f"{analyst_type} report (saw 0 peers)"
+
+    final = graph.invoke(_initial_state())
+    assert set(final["analyst_timings"]) == {
+        "Market Analyst", "Social Analyst", "News Analyst", "Fundamentals Analyst"
+    }
+    # 分支的消息在子图内清理，不会写回主图
+    assert [m.content for m in final["messages"]] == ["000001"]
+
+
+def test_sequential_topology_is_default(patched_setup):
+    make, peak, seen = patched_setup
+    graph = make(parallel=False).setup_graph(list(REPORT_KEYS))
+    graph.invoke(_initial_state())
+
+    assert peak[0] == 1
+    # 顺序执行时后面的分析师能看到前面的报告
+    assert seen["fundamentals_report"] == "fundamentals report (saw 3 peers)"
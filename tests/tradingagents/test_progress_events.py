@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from tradingagents.graph.progress_events import NODE_END, NODE_ERROR, NODE_START, NodeEvent, NodeEventBus
+from tradingagents.graph.setup import GraphSetup
+
+
+def test_observed_node_publishes_only_for_its_task(monkeypatch):
+    bus = NodeEventBus()
+    monkeypatch.setattr("tradingagents.graph.setup.get_node_event_bus", lambda: bus)
+    events = {"t1": [], "t2": []}
+    for task_id, received in events.items():
+        bus.subscribe(task_id, received.append)
+
+    node = GraphSetup._observe_node("Trader", lambda state: {"seen": state["x"]})
+
+    def run(task_id):
+        assert node({"x": task_id}, {"configurable": {"task_id": task_id}}) == {"seen": task_id}
+
+    threads = [threading.Thread(target=run, args=(task_id,)) for task_id in ("t1", "t2", "t3")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for task_id, received in events.items():
+        assert [(e.task_id, e.node, e.phase) for e in received] == [
+            (task_id, "Trader", NODE_START), (task_id, "Trader", NODE_END),
+        ]
+        assert received[1].elapsed >= 0
+    # 没有 task_id 的运行不发布事件
+    assert node({"x": 1}, {}) == {"seen": 1}
+
+
+def test_observed_node_reports_errors_and_passes_config(monkeypatch):
+    bus = NodeEventBus()
+    monkeypatch.setattr("tradingagents.graph.setup.get_node_event_bus", lambda: bus)
+    received = []
+    unsubscribe = bus.subscribe("t1", received.append)
+
+    def branch(state, config):
+        raise RuntimeError(config["configurable"]["task_id"])
+
+    with pytest.raises(RuntimeError):
+        GraphSetup._observe_node("Market Analyst", branch)({}, {"configurable": {"task_id": "t1"}})
+    assert [e.phase for e in received] == [NODE_START, NODE_ERROR]
+    assert received[1].error == "t1"
+
+    unsubscribe()
+    assert not bus.has_subscribers("t1")
+
+
+def test_handler_routes_node_starts_to_task_tracker():
+    from app.services.progress.log_handler import ProgressLogHandler
+
+    class _Tracker:
+        def __init__(self):
+            self.progress_data = {"status": "running"}
+            self.messages = []
+
+        def update_progress(self, message):
+            self.messages.append(message)
+
+    bus = NodeEventBus()
+    handler = ProgressLogHandler(event_bus=bus)
+    first, second = _Tracker(), _Tracker()
+    handler.register_tracker("t1", first)
+    handler.register_tracker("t2", second)
+
+    for node in ("Market Analyst", "Market Analyst", "tools_market", "Bull Researcher"):
+        bus.publish(NodeEvent("t2", node, NODE_START))
+    bus.publish(NodeEvent("t2", "Bull Researcher", NODE_END))
+
+    assert first.messages == []
+    assert second.messages == ["📊 市场分析师正在分析", "🐂 看涨研究员构建论据"]
+
+    handler.unregister_tracker("t2")
+    bus.publish(NodeEvent("t2", "Trader", NODE_START))
+    assert len(second.messages) == 2 and not bus.has_subscribers("t2")
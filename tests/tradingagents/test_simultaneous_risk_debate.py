@@ -0,0 +1,121 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import tradingagents.graph.setup as setup_mod
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.setup import GraphSetup
+
+
+class SlowLLM:
+    """记录并发度的假 LLM，按提示词中的角色返回固定论点"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.1)
+        with self.lock:
+            self.active -= 1
+        return SimpleNamespace(content=f"argument #{self.calls}")
+
+
+class SkipResearchLogic(ConditionalLogic):
+    def should_continue_debate(self, state):
+        return "Research Manager"
+
+
+@pytest.fixture
+def build_graph(monkeypatch):
+    def analyst(state):
+        return {"messages": [AIMessage(content="done")], "market_report": "market"}
+
+    monkeypatch.setattr(setup_mod, "create_market_analyst", lambda *a, **k: analyst)
+    for name in ("create_bull_researcher", "create_bear_researcher",
+                 "create_research_manager", "create_trader"):
+        monkeypatch.setattr(setup_mod, name, lambda *a, **k: (lambda state: {}))
+
+    judged = {}
+
+    def judge(state):
+        judged.update(state["risk_debate_state"])
+        return {"final_trade_decision": "hold"}
+
+    monkeypatch.setattr(setup_mod, "create_risk_manager", lambda *a, **k: judge)
+
+    def make(mode, rounds):
+        llm = SlowLLM()
+        graph = GraphSetup(
+            quick_thinking_llm=llm,
+            deep_thinking_llm=llm,
+            toolkit=None,
+            tool_nodes={"market": lambda state: {}},
+            bull_memory=None,
+            bear_memory=None,
+            trader_memory=None,
+            invest_judge_memory=None,
+            risk_manager_memory=None,
+            conditional_logic=SkipResearchLogic(max_risk_discuss_rounds=rounds),
+            config={"risk_debate_mode": mode},
+        ).setup_graph(["market"])
+        return graph, llm
+
+    return make, judged
+
+
+def _initial_state():
+    return {
+        "messages": [HumanMessage(content="000001")],
+        "company_of_interest": "000001",
+        "trade_date": "2024-06-28",
+        "market_report": "",
+        "sentiment_report": "",
+        "news_report": "",
+        "fundamentals_report": "",
+        "trader_investment_plan": "buy",
+        "risk_debate_state": {
+            "history": "",
+            "current_risky_response": "",
+            "current_safe_response": "",
+            "current_neutral_response": "",
+            "count": 0,
+        },
+    }
+
+
+def test_simultaneous_rounds_run_debaters_concurrently(build_graph):
+    make, judged = build_graph
+    graph, llm = make("simultaneous", rounds=2)
+
+    final = graph.invoke(_initial_state())
+
+    assert llm.calls == 6
+    assert llm.peak == 3
+    assert judged["count"] == 6
+    assert judged["latest_speaker"] == "Neutral"
+    # 合并顺序固定为 激进 → 保守 → 中性，每轮三条论点
+    speakers = [line.split(":")[0] for line in judged["history"].split("\n") if line]
+    assert speakers == ["Risky Analyst", "Safe Analyst", "Neutral Analyst"] * 2
+    assert judged["risky_history"].count("Risky Analyst:") == 2
+    assert final["final_trade_decision"] == "hold"
+
+
+def test_sequential_mode_is_default(build_graph):
+    make, judged = build_graph
+    graph, llm = make("sequential", rounds=1)
+
+    graph.invoke(_initial_state())
+
+    assert llm.calls == 3
+    assert llm.peak == 1
+    assert judged["count"] == 3
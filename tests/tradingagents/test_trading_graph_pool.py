@@ -0,0 +1,136 @@
+import threading
+import time
+
+from tradingagents.graph.graph_pool import TradingGraphPool, graph_pool_key
+from tradingagents.graph.propagation import Propagator
+from tradingagents.graph.trading_graph import TradingAgentsGraph
+
+
+def _config(**overrides):
+    config = {
+        "llm_provider": "dashscope",
+        "quick_think_llm": "qwen-turbo",
+        "deep_think_llm": "qwen-plus",
+        "research_depth": "标准",
+        "selected_analysts": ["market", "fundamentals"],
+    }
+    config.update(overrides)
+    return config
+
+
+class _FakeGraph:
+    builds = 0
+
+    def __init__(self, selected_analysts, debug, config):
+        type(self).builds += 1
+        self.selected_analysts = selected_analysts
+        self.config = config
+        self.activations = 0
+
+    def activate(self):
+        self.activations += 1
+
+
+def test_pool_reuses_instances_per_config_and_evicts_lru():
+    _FakeGraph.builds = 0
+    pool = TradingGraphPool(max_size=2, factory=_FakeGraph)
+
+    first = pool.get(_config())
+    assert pool.get(_config()) is first
+    assert first.activations == 1
+
+    other_depth = pool.get(_config(research_depth="深度"))
+    assert other_depth is not first
+    # 模型相同但 API Key 不同也不能复用
+    other_key = pool.get(_config(quick_api_key="sk-other"))
+    assert other_key is not first
+
+    assert _FakeGraph.builds == 3
+    assert pool.stats()["size"] == 2
+    assert pool.stats()["evictions"] == 1
+    # first 是最久未使用的，已被淘汰
+    assert pool.get(_config()) is not first
+
+
+def test_pool_builds_each_config_once_under_concurrency():
+    built = []
+
+    def slow_factory(selected_analysts, debug, config):
+        time.sleep(0.1)
+        graph = _FakeGraph(selected_analysts, debug, config)
+        built.append(graph)
+        return graph
+
+    pool = TradingGraphPool(max_size=4, factory=slow_factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get(_config()))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(built) == 1
+    assert all(graph is built[0] for graph in results)
+
+
+def test_pool_key_includes_analysts():
+    config = _config()
+    assert graph_pool_key(config, ["market"]) != graph_pool_key(config, ["market", "news"])
+
+
+class _FakeCompiledGraph:
+    def stream(self, state, **kwargs):
+        time.sleep(0.05)
+        company = state["company_of_interest"]
+        yield {"Risk Judge": {
+            "investment_debate_state": {
+                "bull_history": "", "bear_history": "", "history": "",
+                "current_response": "", "judge_decision": "",
+            },
+            "risk_debate_state": {
+                "risky_history": "", "safe_history": "", "neutral_history": "",
+                "history": "", "judge_decision": "",
+            },
+            "trader_investment_plan": "",
+            "investment_plan": "",
+            "final_trade_decision": f"买入 {company}",
+        }}
+
+
+class _FakeSignalProcessor:
+    def process_signal(self, signal, symbol):
+        return {"action": "买入", "symbol": symbol}
+
+
+def _shared_graph():
+    graph = TradingAgentsGraph.__new__(TradingAgentsGraph)
+    graph.debug = False
+    graph.config = _config()
+    graph.propagator = Propagator()
+    graph.graph = _FakeCompiledGraph()
+    graph.signal_processor = _FakeSignalProcessor()
+    graph.deep_thinking_llm = object()
+    graph._run_local = threading.local()
+    graph._log_states_lock = threading.Lock()
+    graph._log_states = {}
+    return graph
+
+
+def test_shared_graph_keeps_run_state_per_thread(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    graph = _shared_graph()
+    seen = {}
+
+    def run(symbol):
+        final_state, decision = graph.propagate(symbol, "2024-06-03", progress_callback=lambda *_: None)
+        seen[symbol] = (graph.ticker, graph.curr_state["final_trade_decision"], decision["symbol"])
+
+    threads = [threading.Thread(target=run, args=(s,)) for s in ("000001", "600519", "AAPL")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for symbol in ("000001", "600519", "AAPL"):
+        assert seen[symbol] == (symbol, f"买入 {symbol}", symbol)
+        assert (tmp_path / "eval_results" / symbol / "TradingAgentsStrategy_logs" / "full_states_log.json").exists()
@@ -1,23 +1,27 @@
-from .utils.agent_utils import Toolkit, create_msg_delete
-from .utils.agent_states import AgentState, InvestDebateState, RiskDebateState
-from .utils.memory import FinancialSituationMemory
+# 各智能体在第一次访问时才导入（``from tradingagents.agents import *`` 会全部加载），
+# 导入 tradingagents.agents.utils.* 等子模块时不再连带加载 LangChain、数据接口和 LLM SDK
+from tradingagents.utils.lazy_imports import lazy_exports
 
-from .analysts.fundamentals_analyst import create_fundamentals_analyst
-from .analysts.market_analyst import create_market_analyst
-from .analysts.news_analyst import create_news_analyst
-from .analysts.social_media_analyst import create_social_media_analyst
-
-from .researchers.bear_researcher import create_bear_researcher
-from .researchers.bull_researcher import create_bull_researcher
-
-from .risk_mgmt.aggresive_debator import create_risky_debator
-from .risk_mgmt.conservative_debator import create_safe_debator
-from .risk_mgmt.neutral_debator import create_neutral_debator
-
-from .managers.research_manager import create_research_manager
-from .managers.risk_manager import create_risk_manager
-
-from .trader.trader import create_trader
+__getattr__, __dir__ = lazy_exports(globals(), {}, required={
+    "Toolkit": (".utils.agent_utils", "Toolkit"),
+    "create_msg_delete": (".utils.agent_utils", "create_msg_delete"),
+    "AgentState": (".utils.agent_states", "AgentState"),
+    "InvestDebateState": (".utils.agent_states", "InvestDebateState"),
+    "RiskDebateState": (".utils.agent_states", "RiskDebateState"),
+    "FinancialSituationMemory": (".utils.memory", "FinancialSituationMemory"),
+    "create_fundamentals_analyst": (".analysts.fundamentals_analyst", "create_fundamentals_analyst"),
+    "create_market_analyst": (".analysts.market_analyst", "create_market_analyst"),
+    "create_news_analyst": (".analysts.news_analyst", "create_news_analyst"),
+    "create_social_media_analyst": (".analysts.social_media_analyst", "create_social_media_analyst"),
+    "create_bear_researcher": (".researchers.bear_researcher", "create_bear_researcher"),
+    "create_bull_researcher": (".researchers.bull_researcher", "create_bull_researcher"),
+    "create_risky_debator": (".risk_mgmt.aggresive_debator", "create_risky_debator"),
+    "create_safe_debator": (".risk_mgmt.conservative_debator", "create_safe_debator"),
+    "create_neutral_debator": (".risk_mgmt.neutral_debator", "create_neutral_debator"),
+    "create_research_manager": (".managers.research_manager", "create_research_manager"),
+    "create_risk_manager": (".managers.risk_manager", "create_risk_manager"),
+    "create_trader": (".trader.trader", "create_trader"),
+})
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
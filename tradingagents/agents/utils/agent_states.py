@@ -1,8 +1,6 @@
-from typing import Annotated, Sequence
+from typing import Annotated, Any, Dict, Sequence
 from datetime import date, timedelta, datetime
 from typing_extensions import TypedDict, Optional
-from langchain_openai import ChatOpenAI
-from tradingagents.agents import *
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import END, StateGraph, START, MessagesState
 
@@ -11,6 +9,33 @@ from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
+def __getattr__(name: str):
+    """
+    兼容旧的 ``from tradingagents.agents.utils.agent_states import ChatOpenAI`` 等写法
+
+    本模块以前在顶部 ``from langchain_openai import ChatOpenAI`` 和
+    ``from tradingagents.agents import *``，导入状态定义时会连带加载 LLM SDK 和全部智能体；
+    现在改为第一次访问时才导入。
+    """
+    if name == "ChatOpenAI":
+        from langchain_openai import ChatOpenAI
+        value = ChatOpenAI
+    else:
+        import tradingagents.agents as agents
+        if name not in agents.__all__:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        value = getattr(agents, name)
+    globals()[name] = value
+    return value
+
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """按键合并并行节点各自写入的字典（并行分支写入同一字段时使用）"""
+    merged = dict(left or {})
+    merged.update(right or {})
+    return merged
+
+
 # Researcher team state
 class InvestDebateState(TypedDict):
     bull_history: Annotated[
@@ -71,6 +96,9 @@ class AgentState(MessagesState):
     sentiment_tool_call_count: Annotated[int, "Social media analyst tool call counter"]
     fundamentals_tool_call_count: Annotated[int, "Fundamentals analyst tool call counter"]
 
+    # 并行分析师模式下各分支的实际耗时（节点名 -> 秒）
+    analyst_timings: Annotated[Dict[str, float], merge_dicts]
+
     # researcher team discussion step
     investment_debate_state: Annotated[
         InvestDebateState, "Current state of the debate on if to invest or not"
@@ -83,4 +111,6 @@ class AgentState(MessagesState):
     risk_debate_state: Annotated[
         RiskDebateState, "Current state of the debate on evaluating risk"
     ]
+    # 同步轮次风险辩论中各辩手本轮的发言（发言者 -> 论点），由 Risk Round Merge 合并
+    risk_round_responses: Annotated[Dict[str, str], merge_dicts]
     final_trade_decision: Annotated[str, "Final decision made by the Risk Analysts"]
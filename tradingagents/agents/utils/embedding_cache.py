@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Embedding 内容寻址缓存
+
+看涨/看跌研究员、研究经理、交易员和风险经理在同一次分析中会对几乎相同的
+current_situation（拼接的分析师报告）调用 get_embedding，每次都是一次远程请求。
+这里按 (模型, 规范化文本) 的哈希缓存 embedding：
+- 第一层：进程内 LRU，所有 FinancialSituationMemory 实例共享
+- 第二层：本地 SQLite 持久化，进程重启和多个进程之间共享
+- 同一个键同时未命中时只计算一次（per-key 锁），其他线程等待结果
+
+使用方法：
+    from tradingagents.agents.utils.embedding_cache import get_embedding_cache
+    cache = get_embedding_cache()
+    vector = cache.get_or_compute(model, text, compute_func)
+
+配置（环境变量）：
+    TA_EMBEDDING_CACHE=false                 # 关闭缓存
+    TA_EMBEDDING_CACHE_SIZE=512              # 内存 LRU 条数
+    TA_EMBEDDING_CACHE_PERSIST=false         # 关闭 SQLite 持久层
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.embedding_cache")
+
+
+DB_FILENAME = "embedding_cache.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：Unicode NFC、首尾空白去除、连续空白合并为一个空格"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(model: str, text: str) -> str:
+    """内容寻址键：sha256(模型 + 规范化文本)"""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_empty_vector(vector: Optional[List[float]]) -> bool:
+    """零向量表示记忆功能禁用或调用失败，不写入缓存"""
+    return not vector or not any(vector)
+
+
+class EmbeddingCache:
+    """内存 LRU + SQLite 持久层的 embedding 缓存"""
+
+    def __init__(self, max_entries: int = 512, db_path: Union[str, Path, None] = None):
+        """
+        初始化 embedding 缓存
+
+        Args:
+            max_entries: 内存 LRU 最大条数
+            db_path: SQLite 文件路径，为 None 时只使用内存层
+        """
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+        self.db_path = Path(db_path) if db_path else None
+        self._conn = None
+        if self.db_path is not None:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ embedding 持久缓存不可用，仅使用内存缓存: {e}")
+                self._conn = None
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """查询缓存，未命中返回 None（计入 misses）"""
+        key = embedding_key(model, text)
+        vector = self._lookup(key)
+        if vector is None:
+            with self._lock:
+                self._stats["misses"] += 1
+        return vector
+
+    def put(self, model: str, text: str, vector: List[float]):
+        """写入缓存（零向量不写入）"""
+        if is_empty_vector(vector):
+            return
+        self._store(embedding_key(model, text), model, vector)
+
+    def get_or_compute(self, model: str, text: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """查询缓存，未命中时调用 compute(text) 并写入；同一键并发未命中只计算一次"""
+        key = embedding_key(model, text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector
+
+        with self._key_lock(key):
+            vector = self._lookup(key)
+            if vector is not None:
+                return vector
+            with self._lock:
+                self._stats["misses"] += 1
+            vector = compute(text)
+            if not is_empty_vector(vector):
+                self._store(key, model, vector)
+            return vector
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """批量查询，返回与 texts 对齐的列表，未命中的位置为 None"""
+        return [self.get(model, text) for text in texts]
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                return vector
+
+        vector = self._read_disk(key)
+        if vector is not None:
+            with self._lock:
+                self._stats["disk_hits"] += 1
+                self._remember(key, vector)
+        return vector
+
+    def _store(self, key: str, model: str, vector: List[float]):
+        vector = list(vector)
+        with self._lock:
+            self._remember(key, vector)
+            self._stats["stores"] += 1
+        self._write_disk(key, model, vector)
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                if len(self._key_locks) > self.max_entries * 4:
+                    # 只保留未被持有的锁
+                    self._key_locks = {k: v for k, v in self._key_locks.items() if v.locked()}
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    # ------------------------------------------------------------------
+    # 持久层
+    # ------------------------------------------------------------------
+
+    def _read_disk(self, key: str) -> Optional[List[float]]:
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"读取 embedding 持久缓存失败: {e}")
+            return None
+        if row is None:
+            return None
+        return array("d", row[0]).tolist()
+
+    def _write_disk(self, key: str, model: str, vector: List[float]):
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, len(vector), array("d", vector).tobytes(), time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"写入 embedding 持久缓存失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["persistent"] = self._conn is not None
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_cache_guard = threading.Lock()
+
+
+def is_embedding_cache_enabled() -> bool:
+    return os.getenv("TA_EMBEDDING_CACHE", "true").lower() in ("true", "1", "yes", "on")
+
+
+def get_embedding_cache(cache_dir: Union[str, Path, None] = None) -> EmbeddingCache:
+    """
+    获取全局 embedding 缓存（所有 FinancialSituationMemory 实例共享）
+
+    Args:
+        cache_dir: 持久层目录，仅在首次创建时生效，默认为 config 中的 data_cache_dir/embeddings
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _cache_guard:
+            if _embedding_cache is None:
+                db_path = None
+                if os.getenv("TA_EMBEDDING_CACHE_PERSIST", "true").lower() in ("true", "1", "yes", "on"):
+                    if cache_dir is None:
+                        from tradingagents.default_config import DEFAULT_CONFIG
+                        cache_dir = os.path.join(DEFAULT_CONFIG["data_cache_dir"], "embeddings")
+                    db_path = Path(cache_dir) / DB_FILENAME
+                _embedding_cache = EmbeddingCache(
+                    max_entries=int(os.getenv("TA_EMBEDDING_CACHE_SIZE", "512")),
+                    db_path=db_path,
+                )
+    return _embedding_cache
@@ -1,8 +1,4 @@
-import chromadb
-from chromadb.config import Settings
-from openai import OpenAI
-import dashscope
-from dashscope import TextEmbedding
+# chromadb / openai / dashscope 在首次使用时才导入，导入本模块（以及 tradingagents.agents）不加载这些 SDK
 import os
 import threading
 import hashlib
@@ -12,6 +8,12 @@ from typing import Dict, Optional
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("agents.utils.memory")
 
+from tradingagents.agents.utils.embedding_cache import get_embedding_cache, is_embedding_cache_enabled
+
+# 批量 embedding 每次请求的条数上限（DashScope text-embedding-v3 单次最多10条）
+DASHSCOPE_EMBEDDING_BATCH_SIZE = 10
+OPENAI_EMBEDDING_BATCH_SIZE = 256
+
 
 class ChromaDBManager:
     """单例ChromaDB管理器，避免并发创建集合的冲突"""
@@ -52,6 +54,9 @@ class ChromaDBManager:
             except Exception as e:
                 logger.error(f"❌ [ChromaDB] 初始化失败: {e}")
                 # 使用最简单的配置作为备用
+                import chromadb
+                from chromadb.config import Settings
+
                 try:
                     settings = Settings(
                         allow_reset=True,
@@ -98,6 +103,8 @@ class ChromaDBManager:
 
 class FinancialSituationMemory:
     def __init__(self, name, config):
+        from openai import OpenAI
+
         self.config = config
         self.llm_provider = config.get("llm_provider", "openai").lower()
 
@@ -310,6 +317,12 @@ class FinancialSituationMemory:
         self.chroma_manager = ChromaDBManager()
         self.situation_collection = self.chroma_manager.get_or_create_collection(name)
 
+        # 进程内共享的 embedding 缓存（内存 LRU + 本地持久层）
+        self.embedding_cache = None
+        if is_embedding_cache_enabled():
+            cache_dir = os.path.join(config["data_cache_dir"], "embeddings") if config.get("data_cache_dir") else None
+            self.embedding_cache = get_embedding_cache(cache_dir)
+
     def _smart_text_truncation(self, text, max_length=8192):
         """智能文本截断，保持语义完整性和缓存兼容性"""
         if len(text) <= max_length:
@@ -348,7 +361,93 @@ class FinancialSituationMemory:
         logger.warning(f"⚠️ 强制截断：保留首尾关键信息，{len(text)}字符截断为{len(truncated)}字符")
         return truncated, True
 
+    def _uses_dashscope_embedding(self):
+        """是否使用阿里百炼的嵌入模型"""
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
+    def _is_cacheable(self, text):
+        return (self.embedding_cache is not None and self.client != "DISABLED"
+                and isinstance(text, str) and bool(text))
+
     def get_embedding(self, text):
+        """Get embedding for a text, served from the shared embedding cache when possible"""
+        if not self._is_cacheable(text):
+            return self._compute_embedding(text)
+        return self.embedding_cache.get_or_compute(self.embedding, text, self._compute_embedding)
+
+    def get_embeddings(self, texts):
+        """批量获取 embedding：先查缓存，未命中的文本通过批量接口一次请求"""
+        results = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if self._is_cacheable(text):
+                results[i] = self.embedding_cache.get(self.embedding, text)
+            if results[i] is None:
+                pending.append(i)
+
+        # 同一批内的重复文本只请求一次
+        unique_texts = list(dict.fromkeys(texts[i] for i in pending))
+        if unique_texts:
+            computed = dict(zip(unique_texts, self._compute_embeddings_batch(unique_texts)))
+            for i in pending:
+                results[i] = computed[texts[i]]
+            if self.embedding_cache is not None and self.client != "DISABLED":
+                for text, vector in computed.items():
+                    if isinstance(text, str) and text:
+                        self.embedding_cache.put(self.embedding, text, vector)
+        return results
+
+    def _compute_embeddings_batch(self, texts):
+        """通过批量接口计算 embedding；不适合批量的文本或批量失败时逐条计算（保留原有降级逻辑）"""
+        results = [None] * len(texts)
+        if self.client == "DISABLED" or (self.client is None and not self._uses_dashscope_embedding()):
+            batchable = []
+        else:
+            batchable = [
+                i for i, text in enumerate(texts)
+                if isinstance(text, str) and text
+                and not (self.enable_embedding_length_check and len(text) > self.max_embedding_length)
+            ]
+
+        batch_size = DASHSCOPE_EMBEDDING_BATCH_SIZE if self._uses_dashscope_embedding() else OPENAI_EMBEDDING_BATCH_SIZE
+        for start in range(0, len(batchable), batch_size):
+            chunk = batchable[start:start + batch_size]
+            try:
+                vectors = self._request_embeddings([texts[i] for i in chunk])
+                for i, vector in zip(chunk, vectors):
+                    results[i] = vector
+                logger.debug(f"✅ 批量embedding成功: {len(chunk)} 条")
+            except Exception as e:
+                logger.warning(f"⚠️ 批量embedding失败，改为逐条请求: {e}")
+
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                results[i] = self._compute_embedding(text)
+        return results
+
+    def _request_embeddings(self, texts):
+        """调用提供商的批量 embedding 接口，返回与 texts 对齐的向量列表"""
+        if self._uses_dashscope_embedding():
+            import dashscope
+            from dashscope import TextEmbedding
+
+            if not hasattr(dashscope, 'api_key') or not dashscope.api_key:
+                raise RuntimeError("DashScope API密钥未设置")
+            response = TextEmbedding.call(model=self.embedding, input=texts)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.code} - {response.message}")
+            items = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+            return [item['embedding'] for item in items]
+
+        response = self.client.embeddings.create(model=self.embedding, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _compute_embedding(self, text):
         """Get embedding for a text using the configured provider"""
 
         # 检查记忆功能是否被禁用
@@ -396,12 +495,7 @@ class FinancialSituationMemory:
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        if self._uses_dashscope_embedding():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -562,7 +656,6 @@ class FinancialSituationMemory:
         situations = []
         advice = []
         ids = []
-        embeddings = []
 
         offset = self.situation_collection.count()
 
@@ -570,7 +663,9 @@ class FinancialSituationMemory:
             situations.append(situation)
             advice.append(recommendation)
             ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+
+        # 缓存未命中的情况通过批量接口一次请求
+        embeddings = self.get_embeddings(situations)
 
         self.situation_collection.add(
             documents=situations,
@@ -648,6 +743,10 @@ class FinancialSituationMemory:
             'provider': self.llm_provider
         }
         
+        # embedding 缓存命中统计（所有实例共享）
+        if self.embedding_cache is not None:
+            info['embedding_cache'] = self.embedding_cache.get_stats()
+
         # 添加最后一次文本处理信息
         if hasattr(self, '_last_text_info'):
             info['last_text_processing'] = self._last_text_info
@@ -40,6 +40,7 @@ logger = get_logger('agents')
 
 # 导入数据模型（避免循环导入）
 from .usage_models import UsageRecord, ModelConfig, PricingConfig
+from .usage_ledger import UsageLedger
 
 try:
     from .mongodb_storage import MongoDBStorage
@@ -67,9 +68,13 @@ class ConfigManager:
 
         self.models_file = self.config_dir / "models.json"
         self.pricing_file = self.config_dir / "pricing.json"
-        self.usage_file = self.config_dir / "usage.json"
+        self.usage_file = self.config_dir / "usage.json"  # 旧版格式，首次启动时迁移到 usage.jsonl
+        self.usage_ledger_file = self.config_dir / "usage.jsonl"
         self.settings_file = self.config_dir / "settings.json"
 
+        # JSON 配置文件缓存：{path: ((mtime_ns, size), data)}，文件未变化时不重复解析
+        self._json_cache: Dict[Path, Any] = {}
+
         # 加载.env文件（保持向后兼容）
         self._load_env_file()
 
@@ -79,6 +84,14 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # Token 使用记录账本（内存缓冲 + 批量追加写入）
+        self.usage_ledger = UsageLedger(
+            self.usage_ledger_file,
+            legacy_path=self.usage_file,
+            max_records=self.load_settings().get("max_usage_records", 10000),
+            mongodb_storage=self.mongodb_storage,
+        )
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -344,11 +357,22 @@ class ConfigManager:
         except Exception as e:
             logger.error(f"保存模型配置失败: {e}")
     
+    def _read_json_cached(self, path: Path) -> Any:
+        """读取 JSON 文件，文件修改时间和大小未变时直接返回缓存的解析结果（调用方不得修改返回值）"""
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._json_cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._json_cache[path] = (key, data)
+        return data
+
     def load_pricing(self) -> List[PricingConfig]:
         """加载定价配置"""
         try:
-            with open(self.pricing_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self._read_json_cached(self.pricing_file)
             return [PricingConfig(**item) for item in data]
         except Exception as e:
             logger.error(f"加载定价配置失败: {e}")
@@ -358,6 +382,7 @@ class ConfigManager:
         """保存定价配置"""
         try:
             data = [asdict(price) for price in pricing]
+            self._json_cache.pop(self.pricing_file, None)
             with open(self.pricing_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
         except Exception as e:
@@ -365,28 +390,15 @@ class ConfigManager:
     
     def load_usage_records(self) -> List[UsageRecord]:
         """加载使用记录"""
-        try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
-        except Exception as e:
-            logger.error(f"加载使用记录失败: {e}")
-            return []
+        return self.usage_ledger.load_records()
     
     def save_usage_records(self, records: List[UsageRecord]):
-        """保存使用记录"""
-        try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存使用记录失败: {e}")
+        """保存使用记录（整体替换，仅用于清空等管理操作）"""
+        self.usage_ledger.replace(records)
     
     def add_usage_record(self, provider: str, model_name: str, input_tokens: int,
                         output_tokens: int, session_id: str, analysis_type: str = "stock_analysis"):
-        """添加使用记录"""
+        """添加使用记录（写入内存缓冲，由账本批量落盘到 MongoDB 或 JSONL 文件）"""
         # 计算成本和货币单位
         cost, currency = self.calculate_cost(provider, model_name, input_tokens, output_tokens)
 
@@ -402,40 +414,8 @@ class ConfigManager:
             analysis_type=analysis_type
         )
 
-        # 🔍 详细日志：记录保存位置
-        logger.info(f"💾 [Token记录] 准备保存: {provider}/{model_name}, 输入={input_tokens}, 输出={output_tokens}, 成本=¥{cost:.4f}, session={session_id}")
-
-        # 优先使用MongoDB存储
-        if self.mongodb_storage and self.mongodb_storage.is_connected():
-            logger.info(f"📊 [Token记录] 使用 MongoDB 存储 (数据库: {self.mongodb_storage.database_name}, 集合: {self.mongodb_storage.collection_name})")
-            success = self.mongodb_storage.save_usage_record(record)
-            if success:
-                logger.info(f"✅ [Token记录] MongoDB 保存成功: {provider}/{model_name}")
-                return record
-            else:
-                logger.error(f"⚠️ [Token记录] MongoDB保存失败，回退到JSON文件存储")
-        else:
-            # 🔍 详细日志：为什么没有使用MongoDB
-            if self.mongodb_storage is None:
-                logger.warning(f"⚠️ [Token记录] MongoDB存储未初始化 (mongodb_storage=None)")
-                logger.warning(f"   💡 请检查环境变量: USE_MONGODB_STORAGE={os.getenv('USE_MONGODB_STORAGE', '未设置')}")
-            elif not self.mongodb_storage.is_connected():
-                logger.warning(f"⚠️ [Token记录] MongoDB未连接 (is_connected=False)")
-
-            logger.info(f"📄 [Token记录] 使用 JSON 文件存储: {self.usage_file}")
-
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
-
-        # 限制记录数量
-        settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
-
-        self.save_usage_records(records)
-        logger.info(f"✅ [Token记录] JSON 文件保存成功: {self.usage_file}")
+        logger.info(f"💾 [Token记录] {provider}/{model_name}, 输入={input_tokens}, 输出={output_tokens}, 成本=¥{cost:.4f}, session={session_id}")
+        self.usage_ledger.append(record)
         return record
     
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> tuple[float, str]:
@@ -466,8 +446,7 @@ class ConfigManager:
         """加载设置，合并.env中的配置"""
         try:
             if self.settings_file.exists():
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                settings = dict(self._read_json_cached(self.settings_file))
             else:
                 # 如果设置文件不存在，创建默认设置
                 settings = {
@@ -538,6 +517,7 @@ class ConfigManager:
     def save_settings(self, settings: Dict[str, Any]):
         """保存设置"""
         try:
+            self._json_cache.pop(self.settings_file, None)
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
         except Exception as e:
@@ -557,68 +537,8 @@ class ConfigManager:
         return None
     
     def get_usage_statistics(self, days: int = 30) -> Dict[str, Any]:
-        """获取使用统计"""
-        # 优先使用MongoDB获取统计
-        if self.mongodb_storage and self.mongodb_storage.is_connected():
-            try:
-                # 从MongoDB获取基础统计
-                stats = self.mongodb_storage.get_usage_statistics(days)
-                # 获取供应商统计
-                provider_stats = self.mongodb_storage.get_provider_statistics(days)
-                
-                if stats:
-                    stats["provider_stats"] = provider_stats
-                    stats["records_count"] = stats.get("total_requests", 0)
-                    return stats
-            except Exception as e:
-                logger.error(f"⚠️ MongoDB统计获取失败，回退到JSON文件: {e}")
-        
-        # 回退到JSON文件统计
-        records = self.load_usage_records()
-        
-        # 过滤最近N天的记录
-        from datetime import datetime, timedelta
-
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_records = []
-        for record in records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    recent_records.append(record)
-            except:
-                continue
-        
-        # 统计数据
-        total_cost = sum(record.cost for record in recent_records)
-        total_input_tokens = sum(record.input_tokens for record in recent_records)
-        total_output_tokens = sum(record.output_tokens for record in recent_records)
-        
-        # 按供应商统计
-        provider_stats = {}
-        for record in recent_records:
-            if record.provider not in provider_stats:
-                provider_stats[record.provider] = {
-                    "cost": 0,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "requests": 0
-                }
-            provider_stats[record.provider]["cost"] += record.cost
-            provider_stats[record.provider]["input_tokens"] += record.input_tokens
-            provider_stats[record.provider]["output_tokens"] += record.output_tokens
-            provider_stats[record.provider]["requests"] += 1
-        
-        return {
-            "period_days": days,
-            "total_cost": round(total_cost, 4),
-            "total_input_tokens": total_input_tokens,
-            "total_output_tokens": total_output_tokens,
-            "total_requests": len(recent_records),
-            "provider_stats": provider_stats,
-            "records_count": len(recent_records)
-        }
+        """获取使用统计（由账本增量维护的小时桶汇总，不扫描历史记录）"""
+        return self.usage_ledger.statistics(days)
     
     def get_data_dir(self) -> str:
         """获取数据目录路径"""
@@ -739,9 +659,7 @@ class TokenTracker:
 
     def get_session_cost(self, session_id: str) -> float:
         """获取会话成本"""
-        records = self.config_manager.load_usage_records()
-        session_cost = sum(record.cost for record in records if record.session_id == session_id)
-        return session_cost
+        return self.config_manager.usage_ledger.session_cost(session_id)
 
     def estimate_cost(self, provider: str, model_name: str, estimated_input_tokens: int,
                      estimated_output_tokens: int) -> tuple[float, str]:
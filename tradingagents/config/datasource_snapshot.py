@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+数据源配置快照（进程内缓存）
+
+DataSourceManager / USDataSourceManager 的降级顺序、启用状态和 API Key 以前每次调用都
+同步查询 MongoDB（system_configs.find_one + sort version，美股还要查 datasource_groupings），
+而 _try_fallback_sources、股票信息和基本面的降级都在热路径上调用它们。
+
+现在进程内只保留一份配置快照：
+- 快照包含激活的 system_configs（data_source_configs、version）与美股的 datasource_groupings
+- 由配置快照解析出的结果（如各市场分类的降级顺序）按快照记忆化，快照更换后自动失效
+- 失效检测：配置保存时（app/services/config_service.py）INCR Redis 版本号
+  ``config:datasource:version``；读取方最多每 check_interval 秒 GET 一次版本号，
+  版本变化才重新加载。同一进程内保存时直接调用 invalidate()
+- Redis 不可用时按 ttl 定期重新加载
+- 加载失败时继续使用上一份快照，没有快照时返回空快照（调用方使用默认顺序）
+
+热路径上只有内存读取，以及每 check_interval 秒一次的 Redis GET，不再访问 MongoDB。
+
+配置（环境变量）：
+    TA_DATASOURCE_CONFIG_CHECK_INTERVAL=5   # 版本号检查间隔（秒）
+    TA_DATASOURCE_CONFIG_TTL=60             # 无 Redis 时快照的有效期（秒）
+
+使用方法：
+    from tradingagents.config.datasource_snapshot import get_datasource_config_snapshot
+
+    snapshot = get_datasource_config_snapshot()
+    order = snapshot.memoize(("cn_priority", "a_shares"), lambda: resolve(snapshot))
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+VERSION_KEY = "config:datasource:version"
+
+# loader() -> {"data_source_configs": [...] | None, "version": int, "us_groupings": [...] | None}
+SnapshotLoader = Callable[[], Dict[str, Any]]
+
+
+@dataclass
+class DataSourceConfigSnapshot:
+    """某一时刻的数据源配置
+
+    data_source_configs / us_groupings 为 None 表示读取失败（区别于数据库中没有配置的空列表）
+    """
+    data_source_configs: Optional[List[Dict[str, Any]]] = None
+    us_groupings: Optional[List[Dict[str, Any]]] = None
+    version: int = 0
+    stamp: Optional[str] = None
+    loaded_at: float = 0.0
+    # 加载失败时的占位快照，下次检查时重试
+    failed: bool = False
+    _memo: Dict[Hashable, Any] = field(default_factory=dict, repr=False)
+
+    def memoize(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """返回按本快照解析的结果，首次访问时调用 builder 计算"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = builder()
+            return value
+
+    def credentials(self) -> Dict[str, Dict[str, Any]]:
+        """数据源凭证 {名称(小写): {api_key, api_secret, config_params}}"""
+        def build():
+            result = {}
+            for ds_config in self.data_source_configs or []:
+                name = ds_config.get('name', '').lower()
+                result[name] = {
+                    'api_key': ds_config.get('api_key', ''),
+                    'api_secret': ds_config.get('api_secret', ''),
+                    'config_params': ds_config.get('config_params', {})
+                }
+            return result
+        return self.memoize("credentials", build)
+
+
+def load_from_mongodb() -> Dict[str, Any]:
+    """从 MongoDB 读取激活的系统配置和美股数据源分组"""
+    from app.core.database import get_mongo_db_sync
+    db = get_mongo_db_sync()
+
+    config_data = db.system_configs.find_one(
+        {"is_active": True},
+        {"data_source_configs": 1, "version": 1},
+        sort=[("version", -1)]
+    )
+    us_groupings = list(db.datasource_groupings.find({
+        "market_category_id": "us_stocks",
+        "enabled": True
+    }).sort("priority", -1))
+
+    return {
+        "data_source_configs": (config_data or {}).get("data_source_configs") or [],
+        "version": (config_data or {}).get("version", 0),
+        "us_groupings": us_groupings,
+    }
+
+
+class DataSourceConfigStore:
+    """带版本检测的数据源配置快照（线程安全）"""
+
+    def __init__(
+        self,
+        loader: SnapshotLoader = None,
+        redis_client=None,
+        check_interval: float = None,
+        ttl: float = None,
+        use_redis: bool = True,
+    ):
+        """
+        Args:
+            loader: 加载配置的函数，默认从 MongoDB 读取
+            redis_client: 同步 Redis 客户端；为 None 且 use_redis 时自动获取
+            check_interval: 版本号检查间隔（秒）
+            ttl: 无法获取版本号时快照的有效期（秒）
+            use_redis: 是否通过 Redis 版本号检测配置变更
+        """
+        self.loader = loader or load_from_mongodb
+        if check_interval is None:
+            check_interval = float(os.getenv("TA_DATASOURCE_CONFIG_CHECK_INTERVAL", "5"))
+        if ttl is None:
+            ttl = float(os.getenv("TA_DATASOURCE_CONFIG_TTL", "60"))
+        self.check_interval = check_interval
+        self.ttl = ttl
+
+        if redis_client is None and use_redis:
+            redis_client = self._get_default_redis()
+        self._redis = redis_client if use_redis else None
+
+        self._snapshot: Optional[DataSourceConfigSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'version_checks': 0, 'loads': 0, 'load_errors': 0}
+
+    @staticmethod
+    def _get_default_redis():
+        try:
+            from tradingagents.config.database_manager import get_redis_client
+            return get_redis_client()
+        except Exception as e:
+            logger.debug(f"获取 Redis 客户端失败，数据源配置快照按 TTL 刷新: {e}")
+            return None
+
+    def get(self) -> DataSourceConfigSnapshot:
+        """获取当前快照"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            self._stats['hits'] += 1
+            return snapshot
+
+        with self._lock:
+            now = time.monotonic()
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._checked_at < self.check_interval:
+                self._stats['hits'] += 1
+                return snapshot
+
+            stamp = self._read_stamp()
+            if (
+                snapshot is None
+                or snapshot.failed
+                or (stamp is not None and stamp != snapshot.stamp)
+                or (stamp is None and now - snapshot.loaded_at >= self.ttl)
+            ):
+                snapshot = (
+                    self._load(stamp, now)
+                    or snapshot
+                    or DataSourceConfigSnapshot(stamp=stamp, loaded_at=now, failed=True)
+                )
+                self._snapshot = snapshot
+            self._checked_at = now
+            return snapshot
+
+    def invalidate(self) -> None:
+        """丢弃当前快照，下次访问时重新加载"""
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def _read_stamp(self) -> Optional[str]:
+        if self._redis is None:
+            return None
+        self._stats['version_checks'] += 1
+        try:
+            value = self._redis.get(VERSION_KEY)
+        except Exception as e:
+            logger.debug(f"读取数据源配置版本号失败: {e}")
+            return None
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    def _load(self, stamp: Optional[str], now: float) -> Optional[DataSourceConfigSnapshot]:
+        """调用方需持有 self._lock；失败时返回 None"""
+        self._stats['loads'] += 1
+        try:
+            data = self.loader()
+        except Exception as e:
+            self._stats['load_errors'] += 1
+            logger.warning(f"⚠️ [数据源配置] 从数据库读取失败: {e}，继续使用{'上一份快照' if self._snapshot else '默认配置'}")
+            return None
+        snapshot = DataSourceConfigSnapshot(
+            data_source_configs=data.get("data_source_configs"),
+            us_groupings=data.get("us_groupings"),
+            version=data.get("version", 0),
+            stamp=stamp,
+            loaded_at=now,
+        )
+        logger.info(f"🔄 [数据源配置] 已加载配置快照: version={snapshot.version}, 数据源={len(snapshot.data_source_configs or [])}")
+        return snapshot
+
+
+_store: Optional[DataSourceConfigStore] = None
+_store_lock = threading.Lock()
+
+
+def get_datasource_config_store() -> DataSourceConfigStore:
+    """获取全局数据源配置快照存储"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DataSourceConfigStore()
+    return _store
+
+
+def get_datasource_config_snapshot() -> DataSourceConfigSnapshot:
+    return get_datasource_config_store().get()
+
+
+def invalidate_datasource_config() -> None:
+    """本进程内立即失效（保存配置的进程调用，其他进程通过版本号感知）"""
+    if _store is not None:
+        _store.invalidate()
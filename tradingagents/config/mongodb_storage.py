@@ -144,6 +144,30 @@ class MongoDBStorage:
             logger.error(f"   堆栈: {traceback.format_exc()}")
             return False
     
+    def save_usage_records(self, records: List[UsageRecord]) -> bool:
+        """批量保存使用记录到MongoDB（insert_many）"""
+        if not self._connected:
+            logger.warning(f"⚠️ [MongoDB存储] 未连接，无法保存记录")
+            return False
+        if not records:
+            return True
+
+        try:
+            created_at = datetime.now(ZoneInfo(get_timezone_name()))
+            docs = []
+            for record in records:
+                record_dict = asdict(record)
+                record_dict['_created_at'] = created_at
+                docs.append(record_dict)
+
+            result = self.collection.insert_many(docs, ordered=False)
+            logger.debug(f"✅ [MongoDB存储] 批量保存 {len(result.inserted_ids)} 条记录")
+            return len(result.inserted_ids) == len(docs)
+
+        except Exception as e:
+            logger.error(f"❌ [MongoDB存储] 批量保存记录失败: {e}")
+            return False
+
     def load_usage_records(self, limit: int = 10000, days: int = None) -> List[UsageRecord]:
         """从MongoDB加载使用记录"""
         if not self._connected:
@@ -276,6 +300,48 @@ class MongoDBStorage:
             logger.error(f"获取供应商统计失败: {e}")
             return {}
     
+    def get_hourly_provider_statistics(self, since_hour: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按小时和供应商聚合记录（用于增量统计）
+
+        Args:
+            since_hour: 只聚合该小时（YYYY-MM-DDTHH）及之后的记录，None 时聚合全部记录
+        """
+        if not self._connected:
+            return []
+
+        try:
+            pipeline = [{'$match': {'timestamp': {'$gte': since_hour}}}] if since_hour else []
+            pipeline += [
+                {
+                    '$group': {
+                        '_id': {
+                            'hour': {'$substrBytes': ['$timestamp', 0, 13]},
+                            'provider': '$provider'
+                        },
+                        'cost': {'$sum': '$cost'},
+                        'input_tokens': {'$sum': '$input_tokens'},
+                        'output_tokens': {'$sum': '$output_tokens'},
+                        'requests': {'$sum': 1}
+                    }
+                }
+            ]
+            return [
+                {
+                    'hour': result['_id']['hour'],
+                    'provider': result['_id']['provider'],
+                    'cost': result.get('cost', 0),
+                    'input_tokens': result.get('input_tokens', 0),
+                    'output_tokens': result.get('output_tokens', 0),
+                    'requests': result.get('requests', 0)
+                }
+                for result in self.collection.aggregate(pipeline)
+            ]
+
+        except Exception as e:
+            logger.error(f"获取按小时统计失败: {e}")
+            return []
+
     def cleanup_old_records(self, days: int = 90) -> int:
         """清理旧记录"""
         if not self._connected:
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Token 使用记录账本
+内存缓冲 + 批量追加写入 JSONL（或批量 insert_many 到 MongoDB），
+统计数据按小时桶增量维护，单次记录的开销与历史记录数量无关
+
+API、worker 等多个进程共用同一个账本：统计时按文件偏移量增量读取其他进程追加的记录，
+MongoDB 模式下按时间增量重新聚合最近的小时桶，因此其他进程写入的记录也会计入统计。
+"""
+
+import atexit
+import json
+from collections import OrderedDict
+import os
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from .usage_models import UsageRecord
+from tradingagents.config.runtime_settings import get_timezone_name
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+
+def _hour_key(timestamp: str) -> str:
+    """ISO 时间戳 -> 小时桶键 YYYY-MM-DDTHH（时间戳统一使用系统时区生成）"""
+    return timestamp[:13]
+
+
+class UsageAggregates:
+    """按小时桶增量维护的使用统计"""
+
+    def __init__(self):
+        self.hours: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, record: UsageRecord):
+        self.add_bucket(_hour_key(record.timestamp), record.provider, record.cost,
+                        record.input_tokens, record.output_tokens, 1)
+
+    def add_bucket(self, hour: str, provider: str, cost: float, input_tokens: int, output_tokens: int, requests: int):
+        """累加到小时桶（也用于合并 MongoDB 预聚合结果）"""
+        bucket = self.hours.setdefault(hour, {"providers": {}})
+        stats = bucket["providers"].setdefault(provider, {
+            "cost": 0.0, "input_tokens": 0, "output_tokens": 0, "requests": 0
+        })
+        stats["cost"] += cost
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        stats["requests"] += requests
+
+    def drop_since(self, hour: str):
+        """删除 hour 及之后的小时桶（重新聚合这些小时之前调用）"""
+        for key in [key for key in self.hours if key >= hour]:
+            del self.hours[key]
+
+    def statistics(self, days: int) -> Dict[str, Any]:
+        return combined_statistics([self], days)
+
+
+def combined_statistics(parts: List[UsageAggregates], days: int) -> Dict[str, Any]:
+    """合并多份小时桶统计（文件、MongoDB、未落盘缓冲），返回最近 days 天的统计"""
+    cutoff = (datetime.now(ZoneInfo(get_timezone_name())) - timedelta(days=days)).strftime("%Y-%m-%dT%H")
+    provider_stats: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        for hour, bucket in part.hours.items():
+            if hour < cutoff:
+                continue
+            for provider, stats in bucket["providers"].items():
+                total = provider_stats.setdefault(provider, {
+                    "cost": 0, "input_tokens": 0, "output_tokens": 0, "requests": 0
+                })
+                for key, value in stats.items():
+                    total[key] += value
+
+    total_requests = sum(p["requests"] for p in provider_stats.values())
+    return {
+        "period_days": days,
+        "total_cost": round(sum(p["cost"] for p in provider_stats.values()), 4),
+        "total_input_tokens": sum(p["input_tokens"] for p in provider_stats.values()),
+        "total_output_tokens": sum(p["output_tokens"] for p in provider_stats.values()),
+        "total_requests": total_requests,
+        "provider_stats": provider_stats,
+        "records_count": total_requests,
+    }
+
+
+class SessionCosts:
+    """会话成本（LRU，最多保留 max_sessions 个会话）"""
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._costs: "OrderedDict[str, float]" = OrderedDict()
+
+    def add(self, record: UsageRecord):
+        if not record.session_id:
+            return
+        self._costs[record.session_id] = self._costs.pop(record.session_id, 0.0) + record.cost
+        while len(self._costs) > self.max_sessions:
+            self._costs.popitem(last=False)
+
+    def get(self, session_id: str) -> float:
+        return self._costs.get(session_id, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._costs)
+
+
+class UsageLedger:
+    """
+    Token 使用记录账本
+
+    - append() 只写入内存缓冲，缓冲达到 batch_size 时批量落盘；后台线程每 flush_interval 秒
+      落盘一次未满的缓冲，进程被强制结束时最多丢失 flush_interval 秒内的记录
+    - 有 MongoDB 存储时批量 insert_many，失败的批次回退到 JSONL 文件
+    - JSONL 文件超过 max_records 的 1.5 倍时整体压缩一次，保留最近 max_records 条（摊销 O(1)）
+    - 统计 = 文件记录（按偏移量增量读取，含其他进程追加的记录）+ MongoDB 聚合（每次统计重新聚合
+      最近的小时桶）+ 本进程未落盘的缓冲
+    - 会话成本按本进程写入的记录（以及启动时文件中的历史记录）统计，LRU 最多保留 max_sessions 个会话
+    """
+
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None, max_records: int = 10000,
+                 batch_size: int = 50, flush_interval: float = 5.0, mongodb_storage=None,
+                 max_sessions: int = 1000):
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.max_records = max_records
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.mongodb_storage = mongodb_storage
+
+        self._lock = threading.RLock()
+        self._buffer: List[UsageRecord] = []
+        self._last_flush = time.monotonic()
+        self._session_costs = SessionCosts(max_sessions)
+
+        # 文件记录的统计：(设备, inode) 与已读取的字节偏移量，文件被替换（压缩）时整体重读
+        self._file_records = 0
+        self._file_aggregates = UsageAggregates()
+        self._file_id = None
+        self._file_offset = 0
+
+        # MongoDB 记录的统计：已聚合到的最新小时
+        self._mongo_aggregates = UsageAggregates()
+        self._mongo_watermark: Optional[str] = None
+
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+        self._migrate_legacy_file()
+        self._sync_file(count_sessions=True)
+
+        atexit.register(self.close)
+
+    # --- 写入 ---
+    def append(self, record: UsageRecord):
+        with self._lock:
+            self._buffer.append(record)
+            self._session_costs.add(record)
+            self._ensure_flusher()
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """将缓冲区批量写入存储"""
+        with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+
+            if self._mongo_connected():
+                if self.mongodb_storage.save_usage_records(batch):
+                    logger.debug(f"✅ [Token记录] MongoDB 批量写入 {len(batch)} 条")
+                    return
+                logger.error(f"⚠️ [Token记录] MongoDB 批量写入失败，回退到 JSONL 文件: {self.path}")
+
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(asdict(r), ensure_ascii=False) + "\n" for r in batch))
+                logger.debug(f"✅ [Token记录] JSONL 追加 {len(batch)} 条: {self.path}")
+            except Exception as e:
+                logger.error(f"保存使用记录失败: {e}")
+                return
+
+            # 读入刚追加的记录（以及其他进程追加的记录），更新文件统计与记录数
+            self._sync_file()
+            if self._file_records > self.max_records * 1.5:
+                self._compact()
+
+    def replace(self, records: List[UsageRecord]):
+        """用给定记录整体替换文件内容（用于清空等管理操作），统计随之重建"""
+        with self._lock:
+            self._buffer = []
+            records = records[-self.max_records:]
+            self._write_file(records)
+            self._session_costs = SessionCosts(self._session_costs.max_sessions)
+            self._mongo_aggregates = UsageAggregates()
+            self._mongo_watermark = None
+            self._sync_file(count_sessions=True)
+
+    def close(self):
+        """停止后台落盘线程并落盘剩余缓冲"""
+        self._stop.set()
+        self.flush()
+
+    # --- 读取 ---
+    def load_records(self) -> List[UsageRecord]:
+        """读取文件中的全部记录（含未落盘的缓冲）"""
+        with self._lock:
+            self.flush()
+            return self._read_file()[-self.max_records:]
+
+    def statistics(self, days: int = 30) -> Dict[str, Any]:
+        with self._lock:
+            self._sync_file()
+            self._refresh_from_mongodb()
+            pending = UsageAggregates()
+            for record in self._buffer:
+                pending.add(record)
+            return combined_statistics([self._file_aggregates, self._mongo_aggregates, pending], days)
+
+    def session_cost(self, session_id: str) -> float:
+        with self._lock:
+            return self._session_costs.get(session_id)
+
+    # --- 内部 ---
+    def _mongo_connected(self) -> bool:
+        return self.mongodb_storage is not None and self.mongodb_storage.is_connected()
+
+    def _ensure_flusher(self):
+        """首次写入时启动后台落盘线程"""
+        if self._flusher is None and not self._stop.is_set():
+            self._flusher = threading.Thread(target=self._flush_loop, name="usage-ledger-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"定时落盘使用记录失败: {e}")
+
+    def _refresh_from_mongodb(self):
+        """
+        增量聚合 MongoDB 中的记录
+
+        首次统计时按小时/供应商聚合全部历史记录，之后只重新聚合已聚合到的最新小时及其前一小时
+        （其他进程的缓冲最多延迟 flush_interval 秒落盘，记录可能晚于所在小时写入）。
+        """
+        if not self._mongo_connected():
+            return
+        since = None
+        if self._mongo_watermark is not None:
+            watermark = datetime.strptime(self._mongo_watermark, "%Y-%m-%dT%H")
+            since = (watermark - timedelta(hours=1)).strftime("%Y-%m-%dT%H")
+
+        rows = self.mongodb_storage.get_hourly_provider_statistics(since_hour=since)
+        if since is None:
+            self._mongo_aggregates = UsageAggregates()
+        else:
+            self._mongo_aggregates.drop_since(since)
+        for row in rows:
+            self._mongo_aggregates.add_bucket(
+                row["hour"], row["provider"], row.get("cost", 0.0),
+                row.get("input_tokens", 0), row.get("output_tokens", 0), row.get("requests", 0)
+            )
+
+        latest = max(self._mongo_aggregates.hours, default=None)
+        if latest is not None:
+            self._mongo_watermark = latest
+
+    def _sync_file(self, count_sessions: bool = False):
+        """
+        从上次读取的偏移量起增量读取文件中新追加的记录（文件被替换或截断时整体重读）
+
+        Args:
+            count_sessions: 是否计入会话成本（仅启动时加载历史记录；之后本进程的记录在 append 时已计入）
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            if self._file_id is not None:
+                self._reset_file_state()
+            return
+        except Exception as e:
+            logger.error(f"加载使用记录失败: {e}")
+            return
+
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._file_id or stat.st_size < self._file_offset:
+            self._reset_file_state()
+            self._file_id = file_id
+        if stat.st_size == self._file_offset:
+            return
+
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._file_offset)
+                data = f.read()
+        except Exception as e:
+            logger.error(f"加载使用记录失败: {e}")
+            return
+
+        # 只消费完整的行，其他进程正在写入的半行留到下次读取
+        end = data.rfind(b"\n") + 1
+        for record in self._parse_lines(data[:end].decode('utf-8', errors='ignore').splitlines()):
+            self._file_aggregates.add(record)
+            if count_sessions:
+                self._session_costs.add(record)
+            self._file_records += 1
+        self._file_offset += end
+
+    def _reset_file_state(self):
+        self._file_records = 0
+        self._file_aggregates = UsageAggregates()
+        self._file_id = None
+        self._file_offset = 0
+
+    def _migrate_legacy_file(self):
+        """将旧版 usage.json（整体重写的 JSON 数组）转换为 JSONL，只执行一次"""
+        if not self.legacy_path or not self.legacy_path.exists() or self.path.exists():
+            return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                records = [UsageRecord(**item) for item in json.load(f)]
+            self._write_file(records[-self.max_records:])
+            self.legacy_path.rename(self.legacy_path.with_suffix(".json.migrated"))
+            logger.info(f"📦 [Token记录] 已将 {len(records)} 条旧记录迁移到 {self.path}")
+        except Exception as e:
+            logger.error(f"迁移旧版使用记录失败: {e}")
+
+    def _read_file(self) -> List[UsageRecord]:
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return self._parse_lines(f)
+        except Exception as e:
+            logger.error(f"加载使用记录失败: {e}")
+            return []
+
+    @staticmethod
+    def _parse_lines(lines) -> List[UsageRecord]:
+        records = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(UsageRecord(**json.loads(line)))
+            except Exception:
+                # 进程异常退出可能留下半行，跳过
+                continue
+        return records
+
+    def _write_file(self, records: List[UsageRecord]):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".jsonl.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("".join(json.dumps(asdict(r), ensure_ascii=False) + "\n" for r in records))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"保存使用记录失败: {e}")
+
+    def _compact(self):
+        records = self._read_file()
+        self._write_file(records[-self.max_records:])
+        # 文件已被替换，统计按新文件重建
+        self._sync_file()
+        logger.info(f"🧹 [Token记录] 压缩使用记录文件: {len(records)} -> {self._file_records} 条")
@@ -1,88 +1,64 @@
-# 导入基础模块
-# Finnhub 工具（支持新旧路径）
-try:
-    from .providers.us import get_data_in_range
-except ImportError:
-    try:
-        from .finnhub_utils import get_data_in_range
-    except ImportError:
-        get_data_in_range = None
+"""
+数据流包
 
-# 导入新闻模块（新路径）
-try:
-    from .news import getNewsData, fetch_top_from_category
-except ImportError:
-    # 向后兼容：尝试从旧路径导入
-    try:
-        from .news.google_news import getNewsData
-    except ImportError:
-        getNewsData = None
-    try:
-        from .news.reddit import fetch_top_from_category
-    except ImportError:
-        fetch_top_from_category = None
+数据源、技术指标、新闻模块和 interface.py 都在第一次访问时才导入
+（见 tradingagents/utils/lazy_imports.py）。``from tradingagents.dataflows.cache import ...``、
+``from tradingagents.dataflows.providers.china.tushare import ...`` 等导入不再连带加载
+yfinance、stockstats、akshare 等全部依赖。
+"""
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
+from tradingagents.utils.lazy_imports import lazy_exports, module_available
+
 logger = get_logger('agents')
 
-# 尝试导入yfinance相关模块（支持新旧路径）
-try:
-    from .providers.us import YFinanceUtils, YFINANCE_AVAILABLE
-except ImportError:
-    try:
-        from .yfin_utils import YFinanceUtils
-        YFINANCE_AVAILABLE = True
-    except ImportError as e:
-        logger.warning(f"⚠️ yfinance模块不可用: {e}")
-        YFinanceUtils = None
-        YFINANCE_AVAILABLE = False
+# 在导入时确定（只检查是否安装，不导入 yfinance），始终为 bool
+YFINANCE_AVAILABLE = module_available("yfinance")
 
-# 导入技术指标模块（新路径）
-try:
-    from .technical import StockstatsUtils, STOCKSTATS_AVAILABLE
-except ImportError as e:
-    # 向后兼容：尝试从旧路径导入
-    try:
-        from .technical.stockstats import StockstatsUtils
-        STOCKSTATS_AVAILABLE = True
-    except ImportError as e:
-        logger.warning(f"⚠️ stockstats模块不可用: {e}")
-        StockstatsUtils = None
-        STOCKSTATS_AVAILABLE = False
+_EXPORTS = {
+    # Finnhub 工具
+    "get_data_in_range": (".providers.us", "get_data_in_range"),
+    # 新闻模块
+    "getNewsData": (".news", "getNewsData"),
+    "fetch_top_from_category": (".news", "fetch_top_from_category"),
+    # yfinance
+    "YFinanceUtils": (".providers.us", "YFinanceUtils"),
+    # 技术指标
+    "StockstatsUtils": (".technical", "StockstatsUtils"),
+}
 
-from .interface import (
+_FLAGS = {
+    "STOCKSTATS_AVAILABLE": "StockstatsUtils",
+}
 
-    # News and sentiment functions
-    get_finnhub_news,
-    get_finnhub_company_insider_sentiment,
-    get_finnhub_company_insider_transactions,
-    get_google_news,
-    get_reddit_global_news,
-    get_reddit_company_news,
-    # Financial statements functions
-    get_simfin_balance_sheet,
-    get_simfin_cashflow,
-    get_simfin_income_statements,
-    # Technical analysis functions
-    get_stock_stats_indicators_window,
-    get_stockstats_indicator,
-    # Market data functions
-    get_YFin_data_window,
-    get_YFin_data,
-    # Tushare data functions
-    get_china_stock_data_tushare,
-    get_china_stock_fundamentals_tushare,
-    # Unified China data functions (recommended)
-    get_china_stock_data_unified,
-    get_china_stock_info_unified,
-    switch_china_data_source,
-    get_current_china_data_source,
-    # Hong Kong stock functions
-    get_hk_stock_data_unified,
-    get_hk_stock_info_unified,
-    get_stock_data_by_market,
-)
+# interface.py 中的数据获取函数（导入失败时直接报错）
+_INTERFACE_EXPORTS = {
+    "get_finnhub_news": (".interface", "get_finnhub_news"),
+    "get_finnhub_company_insider_sentiment": (".interface", "get_finnhub_company_insider_sentiment"),
+    "get_finnhub_company_insider_transactions": (".interface", "get_finnhub_company_insider_transactions"),
+    "get_google_news": (".interface", "get_google_news"),
+    "get_reddit_global_news": (".interface", "get_reddit_global_news"),
+    "get_reddit_company_news": (".interface", "get_reddit_company_news"),
+    "get_simfin_balance_sheet": (".interface", "get_simfin_balance_sheet"),
+    "get_simfin_cashflow": (".interface", "get_simfin_cashflow"),
+    "get_simfin_income_statements": (".interface", "get_simfin_income_statements"),
+    "get_stock_stats_indicators_window": (".interface", "get_stock_stats_indicators_window"),
+    "get_stockstats_indicator": (".interface", "get_stockstats_indicator"),
+    "get_YFin_data_window": (".interface", "get_YFin_data_window"),
+    "get_YFin_data": (".interface", "get_YFin_data"),
+    "get_china_stock_data_tushare": (".interface", "get_china_stock_data_tushare"),
+    "get_china_stock_fundamentals_tushare": (".interface", "get_china_stock_fundamentals_tushare"),
+    "get_china_stock_data_unified": (".interface", "get_china_stock_data_unified"),
+    "get_china_stock_info_unified": (".interface", "get_china_stock_info_unified"),
+    "switch_china_data_source": (".interface", "switch_china_data_source"),
+    "get_current_china_data_source": (".interface", "get_current_china_data_source"),
+    "get_hk_stock_data_unified": (".interface", "get_hk_stock_data_unified"),
+    "get_hk_stock_info_unified": (".interface", "get_hk_stock_info_unified"),
+    "get_stock_data_by_market": (".interface", "get_stock_data_by_market"),
+}
+
+__getattr__, __dir__ = lazy_exports(globals(), _EXPORTS, _FLAGS, required=_INTERFACE_EXPORTS)
 
 __all__ = [
     # News and sentiment functions
@@ -15,6 +15,7 @@ from typing import Any, Dict, Optional, Union
 import pandas as pd
 
 from tradingagents.config.database_manager import get_database_manager
+from .serializers import dump_frame, load_frame, dumps_frame, loads_frame
 
 class AdaptiveCacheSystem:
     """自适应缓存系统"""
@@ -31,6 +32,8 @@ class AdaptiveCacheSystem:
             cache_dir = "data/cache"
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.frame_dir = self.cache_dir / "frames"
+        self.frame_dir.mkdir(exist_ok=True)
         
         # 获取配置
         self.config = self.db_manager.get_config()
@@ -79,7 +82,14 @@ class AdaptiveCacheSystem:
                 'timestamp': datetime.now(),
                 'backend': 'file'
             }
-            
+
+            # DataFrame 单独写为列式文件，pkl 中只保留元数据和文件引用
+            if isinstance(data, pd.DataFrame):
+                frame_path, frame_format = dump_frame(data, self.frame_dir / cache_key)
+                cache_data['data'] = None
+                cache_data['frame_file'] = frame_path.name
+                cache_data['frame_format'] = frame_format
+
             with open(cache_file, 'wb') as f:
                 pickle.dump(cache_data, f)
             
@@ -99,7 +109,11 @@ class AdaptiveCacheSystem:
             
             with open(cache_file, 'rb') as f:
                 cache_data = pickle.load(f)
-            
+
+            if cache_data.get('frame_file'):
+                cache_data['data'] = load_frame(self.frame_dir / cache_data['frame_file'],
+                                                cache_data['frame_format'])
+
             self.logger.debug(f"文件缓存加载成功: {cache_key}")
             return cache_data
             
@@ -167,8 +181,8 @@ class AdaptiveCacheSystem:
             
             # 序列化数据
             if isinstance(data, pd.DataFrame):
-                serialized_data = data.to_json()
-                data_type = 'dataframe'
+                serialized_data, frame_format = dumps_frame(data)
+                data_type = f"frame:{frame_format}"
             else:
                 serialized_data = pickle.dumps(data).hex()
                 data_type = 'pickle'
@@ -212,7 +226,10 @@ class AdaptiveCacheSystem:
                 return None
             
             # 反序列化数据
-            if doc['data_type'] == 'dataframe':
+            if doc['data_type'].startswith('frame:'):
+                data = loads_frame(bytes(doc['data']), doc['data_type'].split(':', 1)[1])
+            elif doc['data_type'] == 'dataframe':
+                # 旧版本写入的 JSON 格式
                 data = pd.read_json(doc['data'])
             else:
                 data = pickle.loads(bytes.fromhex(doc['data']))
@@ -391,6 +408,11 @@ class AdaptiveCacheSystem:
                     total_size_bytes += pkl_file.stat().st_size
                 except:
                     pass
+            for frame_file in self.frame_dir.glob("*"):
+                try:
+                    total_size_bytes += frame_file.stat().st_size
+                except:
+                    pass
 
         # 设置总大小
         stats['total_size'] = total_size_bytes
@@ -417,6 +439,10 @@ class AdaptiveCacheSystem:
                 ttl_seconds = self._get_ttl_seconds(symbol, data_type)
                 
                 if not self._is_cache_valid(cache_data['timestamp'], ttl_seconds):
+                    if cache_data.get('frame_file'):
+                        frame_file = self.frame_dir / cache_data['frame_file']
+                        if frame_file.exists():
+                            frame_file.unlink()
                     cache_file.unlink()
                     cleared_files += 1
                     
@@ -6,6 +6,7 @@ MongoDB + Redis 数据库缓存管理器
 
 import os
 import json
+import base64
 import pickle
 import hashlib
 from datetime import datetime, timedelta
@@ -19,6 +20,8 @@ import pandas as pd
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from .serializers import dumps_frame, loads_frame
+
 # MongoDB
 try:
     from pymongo import MongoClient
@@ -172,6 +175,23 @@ class DatabaseCacheManager:
         except Exception as e:
             logger.error(f"⚠️ MongoDB索引创建失败: {e}")
 
+    @staticmethod
+    def _to_redis_payload(data: Any, data_format: str) -> Any:
+        """Redis 客户端以文本模式连接，二进制数据需要 base64 编码"""
+        if data_format.startswith("frame:"):
+            return base64.b64encode(bytes(data)).decode('ascii')
+        return data
+
+    @staticmethod
+    def _decode_stock_data(data: Any, data_format: str) -> Union[pd.DataFrame, str]:
+        """按 data_format 还原股票数据，兼容旧的 dataframe_json 格式"""
+        if data_format.startswith("frame:"):
+            raw = base64.b64decode(data) if isinstance(data, str) else bytes(data)
+            return loads_frame(raw, data_format.split(":", 1)[1])
+        if data_format == "dataframe_json":
+            return pd.read_json(data, orient='records')
+        return data
+
     def _generate_cache_key(self, data_type: str, symbol: str, **kwargs) -> str:
         """生成缓存键"""
         params_str = f"{data_type}_{symbol}"
@@ -228,8 +248,9 @@ class DatabaseCacheManager:
 
         # 处理数据格式
         if isinstance(data, pd.DataFrame):
-            doc["data"] = data.to_json(orient='records', date_format='iso')
-            doc["data_format"] = "dataframe_json"
+            payload, frame_format = dumps_frame(data)
+            doc["data"] = payload
+            doc["data_format"] = f"frame:{frame_format}"
         else:
             doc["data"] = str(data)
             doc["data_format"] = "text"
@@ -247,7 +268,7 @@ class DatabaseCacheManager:
         if self.redis_client:
             try:
                 redis_data = {
-                    "data": doc["data"],
+                    "data": self._to_redis_payload(doc["data"], doc["data_format"]),
                     "data_format": doc["data_format"],
                     "symbol": symbol,
                     "data_source": data_source,
@@ -275,10 +296,7 @@ class DatabaseCacheManager:
                     data_dict = json.loads(redis_data)
                     logger.info(f"⚡ 从Redis加载数据: {cache_key}")
 
-                    if data_dict["data_format"] == "dataframe_json":
-                        return pd.read_json(data_dict["data"], orient='records')
-                    else:
-                        return data_dict["data"]
+                    return self._decode_stock_data(data_dict["data"], data_dict["data_format"])
             except Exception as e:
                 logger.error(f"⚠️ Redis加载失败: {e}")
 
@@ -295,7 +313,7 @@ class DatabaseCacheManager:
                     if self.redis_client:
                         try:
                             redis_data = {
-                                "data": doc["data"],
+                                "data": self._to_redis_payload(doc["data"], doc["data_format"]),
                                 "data_format": doc["data_format"],
                                 "symbol": doc["symbol"],
                                 "data_source": doc["data_source"],
@@ -310,10 +328,7 @@ class DatabaseCacheManager:
                         except Exception as e:
                             logger.error(f"⚠️ Redis同步失败: {e}")
 
-                    if doc["data_format"] == "dataframe_json":
-                        return pd.read_json(doc["data"], orient='records')
-                    else:
-                        return doc["data"]
+                    return self._decode_stock_data(doc["data"], doc["data_format"])
 
             except Exception as e:
                 logger.error(f"⚠️ MongoDB加载失败: {e}")
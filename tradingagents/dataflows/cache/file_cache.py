@@ -13,6 +13,9 @@ from pathlib import Path
 from typing import Optional, Dict, Any, Union, List
 import hashlib
 
+from .metadata_index import CacheMetadataIndex, INDEX_FILENAME, default_index_path
+from .serializers import dump_frame, load_frame
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -28,10 +31,13 @@ class StockDataCache:
         Args:
             cache_dir: 缓存目录路径，默认为 tradingagents/dataflows/data_cache
         """
+        # 默认缓存目录在源码树中，元数据索引放到源码树之外的数据目录
+        index_path = None
         if cache_dir is None:
             # 获取当前文件所在目录
             current_dir = Path(__file__).parent
             cache_dir = current_dir / "data_cache"
+            index_path = default_index_path(cache_dir)
 
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
@@ -51,6 +57,10 @@ class StockDataCache:
                         self.china_fundamentals_dir, self.metadata_dir]:
             dir_path.mkdir(exist_ok=True)
 
+        # 元数据索引（SQLite），find_* 通过索引查询，不再遍历 metadata 目录
+        self.metadata_index = CacheMetadataIndex(index_path or self.metadata_dir / INDEX_FILENAME)
+        self.metadata_index.migrate_from_directory(self.metadata_dir)
+
         # 缓存配置 - 针对不同市场设置不同的TTL
         self.cache_config = {
             'us_stock_data': {
@@ -216,6 +226,11 @@ class StockDataCache:
         
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+        try:
+            self.metadata_index.upsert(cache_key, metadata)
+        except Exception as e:
+            logger.warning(f"⚠️ 更新缓存元数据索引失败: {e}")
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """加载元数据"""
@@ -230,6 +245,28 @@ class StockDataCache:
             logger.error(f"⚠️ 加载元数据失败: {e}")
             return None
     
+    def _find_in_index(self, symbol: str, data_type: str, market_type: str,
+                       data_source: Optional[str], max_age_hours: float) -> Optional[str]:
+        """通过元数据索引查找未过期的缓存键（按缓存时间从新到旧）"""
+        cached_after = datetime.now() - timedelta(hours=max_age_hours)
+        try:
+            candidates = self.metadata_index.find(symbol, data_type,
+                                                  market_type=market_type,
+                                                  data_source=data_source,
+                                                  cached_after=cached_after)
+        except Exception as e:
+            logger.warning(f"⚠️ 查询缓存元数据索引失败: {e}")
+            return None
+
+        for row in candidates:
+            cache_key = row['cache_key']
+            if self.is_cache_valid(cache_key, max_age_hours, symbol, data_type):
+                return cache_key
+            # 元数据文件已被外部删除或过期，同步清理索引
+            if not self._get_metadata_path(cache_key).exists():
+                self.metadata_index.remove(cache_key)
+        return None
+
     def is_cache_valid(self, cache_key: str, max_age_hours: int = None, symbol: str = None, data_type: str = None) -> bool:
         """检查缓存是否有效 - 支持智能TTL配置"""
         metadata = self._load_metadata(cache_key)
@@ -300,12 +337,13 @@ class StockDataCache:
                                            source=data_source,
                                            market=market_type)
 
-        # 保存数据
+        # 保存数据（DataFrame 使用列式二进制格式，保留 dtype）
         if isinstance(data, pd.DataFrame):
-            cache_path = self._get_cache_path("stock_data", cache_key, "csv", symbol)
-            cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-            data.to_csv(cache_path, index=True)
+            base_dir = self._get_cache_path("stock_data", cache_key, "csv", symbol).parent
+            base_dir.mkdir(parents=True, exist_ok=True)  # 确保目录存在
+            cache_path, file_format = dump_frame(data, base_dir / cache_key)
         else:
+            file_format = 'txt'
             cache_path = self._get_cache_path("stock_data", cache_key, "txt", symbol)
             cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
             with open(cache_path, 'w', encoding='utf-8') as f:
@@ -320,7 +358,7 @@ class StockDataCache:
             'end_date': end_date,
             'data_source': data_source,
             'file_path': str(cache_path),
-            'file_format': 'csv' if isinstance(data, pd.DataFrame) else 'txt',
+            'file_format': file_format,
             'content_length': len(content_to_check)
         }
         self._save_metadata(cache_key, metadata)
@@ -342,11 +380,11 @@ class StockDataCache:
             return None
         
         try:
-            if metadata['file_format'] == 'csv':
-                return pd.read_csv(cache_path, index_col=0)
-            else:
+            if metadata['file_format'] == 'txt':
                 with open(cache_path, 'r', encoding='utf-8') as f:
                     return f.read()
+            # feather/parquet/pickle，以及旧版本写入的 csv
+            return load_frame(cache_path, metadata['file_format'])
         except Exception as e:
             logger.error(f"⚠️ 加载缓存数据失败: {e}")
             return None
@@ -387,24 +425,12 @@ class StockDataCache:
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 如果没有精确匹配，通过索引查找部分匹配（相同股票代码的其他缓存）
+        cache_key = self._find_in_index(symbol, 'stock_data', market_type, data_source, max_age_hours)
+        if cache_key:
+            desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+            logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+            return cache_key
 
         desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol}")
@@ -528,25 +554,13 @@ class StockDataCache:
             cache_type = f"{market_type}_fundamentals"
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
         
-        # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
-        
+        # 通过索引查找匹配的缓存
+        cache_key = self._find_in_index(symbol, 'fundamentals', market_type, data_source, max_age_hours)
+        if cache_key:
+            desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+            logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+            return cache_key
+
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol} ({data_source})")
         return None
@@ -570,6 +584,7 @@ class StockDataCache:
                     
                     # 删除元数据文件
                     metadata_file.unlink()
+                    self.metadata_index.remove(metadata_file.name[:-len("_meta.json")])
                     cleared_count += 1
                     
             except Exception as e:
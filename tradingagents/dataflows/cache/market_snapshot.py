@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+跨进程共享的A股全市场实时快照
+
+AKShare 的 spot 接口每次都返回全市场 5000+ 行，单股查询、批量行情和筛选富集
+以前各自下载一份。这里维护唯一的一份快照：
+- 快照按标准化的6位代码建索引，列式存储（数值列统一转为数值类型）
+- 存放在 Redis（可用时）或本地共享文件（Feather，读取时内存映射），API 进程和 Worker 进程共用
+- 刷新为 single-flight：进程内用线程锁，跨进程用 Redis SET NX / 独占锁文件，
+  每个 TTL 内只有一个进程请求上游，其余进程等待并读取其结果
+- 上游失败时返回上一份快照（可能已过期），而不是空结果
+
+使用方法：
+    from tradingagents.dataflows.cache.market_snapshot import get_market_snapshot_store
+    snapshot = get_market_snapshot_store().get_snapshot()
+    row = snapshot.get_row("000001") if snapshot else None
+
+配置（环境变量）：
+    TA_MARKET_SNAPSHOT_TTL_SECONDS=30        # 快照有效期
+    TA_MARKET_SNAPSHOT_BACKEND=auto|redis|file
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+from .serializers import dumps_frame, loads_frame, dump_frame, load_frame
+
+
+# 不做数值转换的文本列
+TEXT_COLUMNS = ("代码", "名称")
+
+REDIS_KEY_PREFIX = "market_snapshot:cn"
+
+# fetcher() -> 全市场快照 DataFrame（含“代码”列）
+SnapshotFetcher = Callable[[], Optional[pd.DataFrame]]
+
+
+def normalize_spot_code(code) -> str:
+    """标准化快照中的股票代码：去掉 sh/sz/bj 前缀，纯数字补齐到6位"""
+    code_str = str(code).strip().lower()
+    for prefix in ("sh", "sz", "bj"):
+        if code_str.startswith(prefix):
+            code_str = code_str[len(prefix):]
+            break
+    return code_str.zfill(6) if code_str.isdigit() else code_str
+
+
+def normalize_spot_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    将上游快照转换为按代码索引的列式 DataFrame
+
+    - 索引为标准化后的6位代码（去重，保留第一条）
+    - object 列尽量转为数值（'-'、空串等变为 NaN），无法转换的列保留为字符串
+    """
+    code_col = next((c for c in ["代码", "代码code", "symbol", "股票代码"] if c in df.columns), None)
+    if code_col is None:
+        raise ValueError(f"快照缺少代码列: {list(df.columns)}")
+
+    df = df.copy()
+    if code_col != "代码":
+        df = df.rename(columns={code_col: "代码"})
+    df["代码"] = df["代码"].astype(str)
+
+    for col in df.columns:
+        if col in TEXT_COLUMNS or df[col].dtype != object:
+            continue
+        cleaned = df[col].astype(str).str.strip().str.replace(",", "", regex=False).str.rstrip("%")
+        numeric = pd.to_numeric(cleaned, errors="coerce")
+        df[col] = numeric if numeric.notna().any() else df[col].astype(str)
+    if "名称" in df.columns:
+        df["名称"] = df["名称"].astype(str)
+
+    df.index = pd.Index(df["代码"].map(normalize_spot_code), name="code")
+    return df[~df.index.duplicated(keep="first")]
+
+
+def fetch_spot_akshare() -> Optional[pd.DataFrame]:
+    """默认上游：东方财富全市场快照（字段最全），失败时回退到新浪财经"""
+    import akshare as ak
+
+    try:
+        df = ak.stock_zh_a_spot_em()
+        if df is not None and not df.empty:
+            return df
+        logger.warning("⚠️ 东方财富快照为空，尝试新浪财经接口")
+    except Exception as e:
+        logger.warning(f"⚠️ 东方财富快照失败: {e}，尝试新浪财经接口")
+    return ak.stock_zh_a_spot()
+
+
+class MarketSnapshot:
+    """一份按代码索引的全市场快照"""
+
+    def __init__(self, frame: pd.DataFrame, fetched_at: float):
+        self.frame = frame
+        self.fetched_at = fetched_at
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def get_row(self, code: str) -> Optional[pd.Series]:
+        """按代码取一行（O(1) 索引查找），不存在时返回 None"""
+        key = normalize_spot_code(code)
+        if key not in self.frame.index:
+            return None
+        return self.frame.loc[key]
+
+    def select(self, codes: Iterable[str]) -> pd.DataFrame:
+        """按代码批量取行，忽略不存在的代码"""
+        keys = [normalize_spot_code(c) for c in codes if c]
+        return self.frame.loc[self.frame.index.intersection(pd.Index(keys))]
+
+
+class MarketSnapshotStore:
+    """共享快照存储，负责读取、single-flight 刷新和发布"""
+
+    def __init__(
+        self,
+        fetcher: SnapshotFetcher = None,
+        ttl_seconds: float = None,
+        cache_dir: str = None,
+        redis_client=None,
+        backend: str = None,
+        lock_timeout: float = 60.0,
+        wait_timeout: float = 30.0,
+    ):
+        """
+        初始化快照存储
+
+        Args:
+            fetcher: 上游拉取函数，默认为 AKShare（东方财富，回退新浪）
+            ttl_seconds: 快照有效期（秒）
+            cache_dir: 文件后端的目录，默认为 tradingagents/dataflows/cache/data_cache/market_snapshot
+            redis_client: 同步 Redis 客户端；为 None 且 backend 允许时自动获取
+            backend: auto | redis | file
+            lock_timeout: 刷新锁的最长持有时间（秒），超时视为持有者已崩溃
+            wait_timeout: 未抢到刷新锁时等待其他进程发布结果的最长时间（秒）
+        """
+        self.fetcher = fetcher or fetch_spot_akshare
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("TA_MARKET_SNAPSHOT_TTL_SECONDS", "30"))
+        self.ttl = ttl_seconds
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+
+        if cache_dir is None:
+            cache_dir = Path(__file__).parent / "data_cache" / "market_snapshot"
+        self.cache_dir = Path(cache_dir)
+
+        backend = (backend or os.getenv("TA_MARKET_SNAPSHOT_BACKEND", "auto")).lower()
+        if redis_client is None and backend in ("auto", "redis"):
+            redis_client = self._get_default_redis()
+        self._redis = redis_client if backend != "file" else None
+        if self._redis is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._local: Optional[MarketSnapshot] = None
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'refreshes': 0, 'waits': 0, 'stale': 0}
+
+    @staticmethod
+    def _get_default_redis():
+        try:
+            from tradingagents.config.database_manager import get_redis_client
+            return get_redis_client()
+        except Exception as e:
+            logger.debug(f"获取 Redis 客户端失败，快照使用文件后端: {e}")
+            return None
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "file"
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def _is_fresh(self, snapshot: Optional[MarketSnapshot]) -> bool:
+        return snapshot is not None and snapshot.age() < self.ttl
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def get_snapshot(self, force_refresh: bool = False) -> Optional[MarketSnapshot]:
+        """
+        获取全市场快照（阻塞调用，异步代码请放到线程中执行）
+
+        依次尝试：进程内副本 → 共享存储 → 抢锁刷新 / 等待其他进程刷新。
+        上游失败时返回最近一份快照（可能已过期），都没有时返回 None。
+        """
+        if not force_refresh and self._is_fresh(self._local):
+            self._stats['local_hits'] += 1
+            return self._local
+
+        with self._lock:
+            if not force_refresh and self._is_fresh(self._local):
+                self._stats['local_hits'] += 1
+                return self._local
+
+            if not force_refresh:
+                shared = self._read_shared()
+                if self._is_fresh(shared):
+                    self._stats['shared_hits'] += 1
+                    self._local = shared
+                    return shared
+
+            snapshot = self._refresh_single_flight()
+            if snapshot is not None:
+                self._local = snapshot
+                return snapshot
+
+            stale = self._local or self._read_shared()
+            if stale is not None:
+                self._stats['stale'] += 1
+                logger.warning(f"⚠️ 全市场快照刷新失败，使用 {stale.age():.0f}s 前的快照")
+                self._local = stale
+            return stale
+
+    def _refresh_single_flight(self) -> Optional[MarketSnapshot]:
+        token = self._acquire_refresh_lock()
+        if token is None:
+            # 其他进程正在刷新，等待其发布结果
+            self._stats['waits'] += 1
+            deadline = time.time() + self.wait_timeout
+            while time.time() < deadline:
+                time.sleep(0.2)
+                shared = self._read_shared()
+                if self._is_fresh(shared):
+                    return shared
+                if not self._refresh_lock_held():
+                    # 持有者失败退出，自己来刷新
+                    token = self._acquire_refresh_lock()
+                    if token is not None:
+                        break
+            else:
+                logger.warning(f"⚠️ 等待其他进程刷新全市场快照超时({self.wait_timeout}s)")
+                return None
+        try:
+            return self._fetch_and_publish()
+        finally:
+            self._release_refresh_lock(token)
+
+    def _fetch_and_publish(self) -> Optional[MarketSnapshot]:
+        started = time.time()
+        try:
+            raw = self.fetcher()
+            if raw is None or raw.empty:
+                logger.warning("⚠️ 全市场快照上游返回空数据")
+                return None
+            snapshot = MarketSnapshot(normalize_spot_frame(raw), time.time())
+        except Exception as e:
+            logger.error(f"❌ 拉取全市场快照失败: {e}")
+            return None
+
+        self._stats['refreshes'] += 1
+        try:
+            self._write_shared(snapshot)
+        except Exception as e:
+            logger.warning(f"⚠️ 发布全市场快照到{self.backend}失败（仅本进程可用）: {e}")
+        logger.info(f"📊 全市场快照已刷新: {len(snapshot)} 只股票, 耗时 {time.time() - started:.2f}s, 后端 {self.backend}")
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # 共享存储
+    # ------------------------------------------------------------------
+
+    def _read_shared(self) -> Optional[MarketSnapshot]:
+        try:
+            if self._redis is not None:
+                return self._read_redis()
+            return self._read_file()
+        except Exception as e:
+            logger.debug(f"读取共享全市场快照失败: {e}")
+            return None
+
+    def _write_shared(self, snapshot: MarketSnapshot):
+        if self._redis is not None:
+            self._write_redis(snapshot)
+        else:
+            self._write_file(snapshot)
+
+    def _read_redis(self) -> Optional[MarketSnapshot]:
+        ts, fmt = self._redis.hmget(f"{REDIS_KEY_PREFIX}:meta", "fetched_at", "format")
+        if ts is None or fmt is None:
+            return None
+        fetched_at = float(ts)
+        if self._local is not None and self._local.fetched_at == fetched_at:
+            return self._local
+        data = self._redis.get(f"{REDIS_KEY_PREFIX}:data")
+        if data is None:
+            return None
+        return MarketSnapshot(loads_frame(data, fmt.decode() if isinstance(fmt, bytes) else fmt), fetched_at)
+
+    def _write_redis(self, snapshot: MarketSnapshot):
+        data, fmt = dumps_frame(snapshot.frame)
+        # 保留多个 TTL，刷新失败时其他进程仍可读到旧快照
+        expire = int(max(self.ttl * 20, 600))
+        pipe = self._redis.pipeline()
+        pipe.set(f"{REDIS_KEY_PREFIX}:data", data, ex=expire)
+        pipe.hset(f"{REDIS_KEY_PREFIX}:meta", mapping={"fetched_at": repr(snapshot.fetched_at), "format": fmt})
+        pipe.expire(f"{REDIS_KEY_PREFIX}:meta", expire)
+        pipe.execute()
+
+    def _pointer_path(self) -> Path:
+        return self.cache_dir / "snapshot.current"
+
+    def _read_file(self) -> Optional[MarketSnapshot]:
+        pointer = self._pointer_path()
+        if not pointer.exists():
+            return None
+        name, fmt, ts = pointer.read_text(encoding="utf-8").strip().split("\t")
+        fetched_at = float(ts)
+        if self._local is not None and self._local.fetched_at == fetched_at:
+            return self._local
+        return MarketSnapshot(load_frame(self.cache_dir / name, fmt, shared=True), fetched_at)
+
+    def _write_file(self, snapshot: MarketSnapshot):
+        # 每个版本写独立文件，再原子替换指针，读者不会读到写了一半的文件，
+        # 也不会影响其他进程正在内存映射的旧版本
+        stamp = f"{int(snapshot.fetched_at * 1000)}_{os.getpid()}"
+        path, fmt = dump_frame(snapshot.frame, self.cache_dir / f"snapshot_{stamp}", shared=True)
+        tmp_pointer = self.cache_dir / f"snapshot.current.{stamp}"
+        tmp_pointer.write_text(f"{path.name}\t{fmt}\t{snapshot.fetched_at!r}", encoding="utf-8")
+        os.replace(tmp_pointer, self._pointer_path())
+        self._cleanup_files(keep=path.name)
+
+    def _cleanup_files(self, keep: str):
+        cutoff = time.time() - max(self.ttl * 4, 120)
+        for old in self.cache_dir.glob("snapshot_*"):
+            if old.name == keep:
+                continue
+            try:
+                if old.stat().st_mtime < cutoff:
+                    old.unlink()
+            except OSError:
+                # Windows 下正在被映射的文件无法删除，下次再清理
+                pass
+
+    # ------------------------------------------------------------------
+    # 刷新锁
+    # ------------------------------------------------------------------
+
+    def _lock_path(self) -> Path:
+        return self.cache_dir / "refresh.lock"
+
+    def _acquire_refresh_lock(self) -> Optional[str]:
+        token = f"{os.getpid()}:{threading.get_ident()}:{time.time()!r}"
+        if self._redis is not None:
+            try:
+                ok = self._redis.set(f"{REDIS_KEY_PREFIX}:lock", token, nx=True, px=int(self.lock_timeout * 1000))
+                return token if ok else None
+            except Exception as e:
+                logger.debug(f"获取 Redis 刷新锁失败，按单进程刷新: {e}")
+                return token
+
+        lock_path = self._lock_path()
+        try:
+            if time.time() - lock_path.stat().st_mtime > self.lock_timeout:
+                lock_path.unlink()
+        except OSError:
+            pass
+        try:
+            fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(token)
+        return token
+
+    def _refresh_lock_held(self) -> bool:
+        try:
+            if self._redis is not None:
+                return bool(self._redis.exists(f"{REDIS_KEY_PREFIX}:lock"))
+            return self._lock_path().exists()
+        except Exception:
+            return False
+
+    def _release_refresh_lock(self, token: str):
+        try:
+            if self._redis is not None:
+                key = f"{REDIS_KEY_PREFIX}:lock"
+                current = self._redis.get(key)
+                if current is not None and (current.decode() if isinstance(current, bytes) else current) == token:
+                    self._redis.delete(key)
+                return
+            lock_path = self._lock_path()
+            if lock_path.read_text(encoding="utf-8") == token:
+                lock_path.unlink()
+        except Exception as e:
+            logger.debug(f"释放快照刷新锁失败: {e}")
+
+
+_market_snapshot_store: Optional[MarketSnapshotStore] = None
+_store_guard = threading.Lock()
+
+
+def get_market_snapshot_store() -> MarketSnapshotStore:
+    """获取全局全市场快照存储"""
+    global _market_snapshot_store
+    if _market_snapshot_store is None:
+        with _store_guard:
+            if _market_snapshot_store is None:
+                _market_snapshot_store = MarketSnapshotStore()
+    return _market_snapshot_store
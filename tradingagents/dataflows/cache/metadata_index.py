@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+文件缓存元数据索引
+
+为 StockDataCache 提供持久化的元数据索引（SQLite），避免在精确键未命中时
+遍历 metadata 目录下的所有 *_meta.json 文件。
+
+- 每条缓存的元数据按 (symbol, data_type, market_type, data_source, cached_at) 建立复合索引
+- save_* 写入时在单个事务中 upsert，find_* 通过索引查询（O(log n)）
+- 首次打开时一次性从既有 metadata 目录迁移
+- *_meta.json 文件仍然保留，兼容依赖它们的旧代码和清理脚本
+- 使用默认缓存目录（源码树中的 dataflows/data_cache）时，索引文件放在源码树之外的数据目录
+  （见 default_index_path），SQLite 的 -wal/-shm 文件不会出现在源码树中
+
+环境变量：
+- TRADINGAGENTS_CACHE_INDEX_DIR: 索引文件目录，默认为 <TRADINGAGENTS_DATA_DIR>/cache
+- TRADINGAGENTS_DATA_DIR: 数据目录，默认为 ~/Documents/TradingAgents/data
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+INDEX_FILENAME = "metadata_index.sqlite3"
+
+
+def default_index_path(cache_dir: Union[str, Path]) -> Path:
+    """
+    缓存目录对应的索引文件路径（源码树之外）
+
+    文件名带缓存目录路径的哈希：多个代码副本共用同一数据目录时各自使用独立的索引。
+    """
+    index_dir = os.getenv("TRADINGAGENTS_CACHE_INDEX_DIR", "").strip()
+    if not index_dir:
+        data_dir = os.getenv("TRADINGAGENTS_DATA_DIR", "").strip() or os.path.join(
+            os.path.expanduser("~"), "Documents", "TradingAgents", "data"
+        )
+        index_dir = os.path.join(data_dir, "cache")
+    digest = hashlib.sha1(str(Path(cache_dir).resolve()).encode("utf-8")).hexdigest()[:12]
+    return Path(index_dir) / f"metadata_index_{digest}.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_metadata (
+    cache_key TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    market_type TEXT,
+    data_source TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    cached_at TEXT NOT NULL,
+    file_path TEXT,
+    file_format TEXT,
+    content_length INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_cache_metadata_lookup
+    ON cache_metadata (symbol, data_type, market_type, data_source, cached_at);
+CREATE INDEX IF NOT EXISTS idx_cache_metadata_cached_at
+    ON cache_metadata (cached_at);
+CREATE TABLE IF NOT EXISTS index_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = (
+    'cache_key', 'symbol', 'data_type', 'market_type', 'data_source',
+    'start_date', 'end_date', 'cached_at', 'file_path', 'file_format', 'content_length'
+)
+
+
+class CacheMetadataIndex:
+    """基于 SQLite 的缓存元数据索引"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        初始化元数据索引
+
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 同一实例可能被多个线程共享，由 _lock 保证串行访问
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            try:
+                # WAL 模式允许多个进程并发读，写入不阻塞读
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.DatabaseError as e:
+                logger.debug(f"设置 SQLite PRAGMA 失败（忽略）: {e}")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    @staticmethod
+    def _to_row(cache_key: str, metadata: Dict[str, Any]) -> tuple:
+        return (
+            cache_key,
+            str(metadata.get('symbol', '')),
+            metadata.get('data_type', 'unknown'),
+            metadata.get('market_type'),
+            metadata.get('data_source'),
+            metadata.get('start_date'),
+            metadata.get('end_date'),
+            metadata.get('cached_at') or datetime.now().isoformat(),
+            metadata.get('file_path'),
+            metadata.get('file_format'),
+            metadata.get('content_length'),
+        )
+
+    def upsert(self, cache_key: str, metadata: Dict[str, Any]):
+        """写入或更新一条元数据（单事务）"""
+        self.upsert_many([(cache_key, metadata)])
+
+    def upsert_many(self, items: Iterable[tuple]):
+        """批量写入元数据，items 为 (cache_key, metadata) 序列"""
+        rows = [self._to_row(key, meta) for key, meta in items]
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        sql = f"INSERT OR REPLACE INTO cache_metadata ({', '.join(_COLUMNS)}) VALUES ({placeholders})"
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    def remove(self, cache_key: str):
+        """删除一条元数据"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_metadata WHERE cache_key = ?", (cache_key,))
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """按缓存键获取元数据"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM cache_metadata WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find(self, symbol: str, data_type: str, market_type: str = None,
+             data_source: str = None, cached_after: datetime = None,
+             limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        查找匹配的缓存元数据，按缓存时间从新到旧排序
+
+        Args:
+            symbol: 股票代码
+            data_type: 数据类型（stock_data / news / fundamentals）
+            market_type: 市场类型，None 表示不限
+            data_source: 数据源，None 表示不限
+            cached_after: 只返回该时间之后缓存的记录
+            limit: 最多返回条数
+
+        Returns:
+            元数据字典列表
+        """
+        sql = "SELECT * FROM cache_metadata WHERE symbol = ? AND data_type = ?"
+        params: List[Any] = [str(symbol), data_type]
+        if market_type is not None:
+            sql += " AND market_type = ?"
+            params.append(market_type)
+        if data_source is not None:
+            sql += " AND data_source = ?"
+            params.append(data_source)
+        if cached_after is not None:
+            sql += " AND cached_at >= ?"
+            params.append(cached_after.isoformat())
+        sql += " ORDER BY cached_at DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """索引中的记录数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_metadata").fetchone()[0]
+
+    def _get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO index_state (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def migrate_from_directory(self, metadata_dir: Union[str, Path], force: bool = False) -> int:
+        """
+        从旧的 metadata 目录一次性迁移 *_meta.json 到索引
+
+        Args:
+            metadata_dir: 元数据目录
+            force: 已迁移过时是否强制重新导入
+
+        Returns:
+            导入的记录数
+        """
+        if not force and self._get_state('migrated_at'):
+            return 0
+
+        metadata_dir = Path(metadata_dir)
+        batch: List[tuple] = []
+        imported = 0
+        for metadata_file in metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except Exception as e:
+                logger.debug(f"跳过无法解析的元数据文件 {metadata_file.name}: {e}")
+                continue
+            if not metadata.get('symbol') or not metadata.get('cached_at'):
+                continue
+            cache_key = metadata_file.name[:-len("_meta.json")]
+            batch.append((cache_key, metadata))
+            if len(batch) >= 1000:
+                self.upsert_many(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            self.upsert_many(batch)
+            imported += len(batch)
+
+        self._set_state('migrated_at', datetime.now().isoformat())
+        if imported:
+            logger.info(f"🗂️ 已将 {imported} 条缓存元数据迁移到索引: {self.db_path}")
+        return imported
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -2,8 +2,21 @@
 """
 MongoDB 缓存适配器
 根据 TA_USE_APP_CACHE 配置，优先使用 MongoDB 中的同步数据
+
+多数据源查询：同一只股票的数据可能由多个数据源同步。以前按优先级对每个数据源依次
+find，主数据源缺数据时要 3 次往返。现在一次 ``data_source: {$in: 优先级列表}`` 查询读取所有
+数据源的文档，在内存中选出优先级最高且有数据的数据源。排序只用索引字段
+（数据源, 日期）：stock_daily_quotes 上的 (symbol, period, data_source, trade_date) 复合索引
+（symbol_period_source_date_idx）同时覆盖过滤和排序，不需要内存排序。只取每个数据源最新一条时
+（财务数据、基础信息）用 $sort + $group/$first，每个数据源只返回一条文档。
+数据源优先级按进程内的数据源配置快照解析（不再每次查询 system_configs）。
+历史数据按列解码：数值列直接写入 float64 数组（np.fromiter），不经过逐行字典对齐。
+
+周线/月线不再同步时（MULTI_PERIOD_SYNC_RESAMPLE_DERIVED，默认开启），get_historical_data
+优先由日线重采样周线/月线，不读取存储中已停止更新的周线/月线。
 """
 
+import numpy as np
 import pandas as pd
 from typing import Optional, Dict, Any, List, Union
 from datetime import datetime, timedelta, timezone
@@ -15,6 +28,55 @@ logger = get_logger('agents')
 # 导入配置
 from tradingagents.config.runtime_settings import use_app_cache_enabled
 
+# 按列解码时直接写入 float64 数组的数值字段
+NUMERIC_COLUMNS = frozenset({
+    'open', 'high', 'low', 'close', 'pre_close', 'volume', 'vol', 'amount',
+    'change', 'pct_chg', 'turnover_rate', 'volume_ratio',
+})
+
+# 数据库中没有可用配置时的数据源优先级
+DEFAULT_SOURCE_PRIORITY = ('tushare', 'akshare', 'baostock')
+
+# 重采样只需要的K线字段（其他数值字段不参与重采样）
+BAR_COLUMNS = (
+    'symbol', 'code', 'full_symbol', 'market', 'data_source', 'period', 'trade_date', 'trade_time',
+    'open', 'high', 'low', 'close', 'pre_close', 'volume', 'vol', 'amount',
+)
+
+
+def resolve_source_priority(data_source_configs: Optional[List[Dict[str, Any]]],
+                            market_category: Optional[str]) -> List[str]:
+    """
+    按系统配置中的数据源配置解析缓存数据的数据源优先级
+
+    Args:
+        data_source_configs: system_configs.data_source_configs
+        market_category: 市场分类（a_shares/us_stocks/hk_stocks）
+
+    Returns:
+        按优先级排序的数据源类型列表（小写）；没有可用配置时返回空列表
+    """
+    enabled = []
+    for ds in data_source_configs or []:
+        ds_type = ds.get('type', '')
+        ds_categories = ds.get('market_categories', [])
+
+        if not ds.get('enabled', True):
+            logger.debug(f"⚠️ [数据源优先级] {ds_type} 未启用，跳过")
+            continue
+
+        # 检查市场分类
+        if ds_categories and market_category and market_category not in ds_categories:
+            logger.debug(f"⚠️ [数据源优先级] {ds_type} 不支持市场 {market_category}，跳过")
+            continue
+
+        enabled.append(ds)
+
+    # 按优先级排序（数字越大优先级越高）
+    enabled.sort(key=lambda x: x.get('priority', 0), reverse=True)
+    return [ds.get('type', '').lower() for ds in enabled if ds.get('type')]
+
+
 class MongoDBCacheAdapter:
     """MongoDB 缓存适配器（从 app 的 MongoDB 读取同步数据）"""
     
@@ -56,23 +118,17 @@ class MongoDBCacheAdapter:
             # 🔥 获取数据源优先级
             source_priority = self._get_data_source_priority(symbol)
 
-            # 🔥 按优先级查询
-            doc = None
-            for src in source_priority:
-                doc = collection.find_one({"code": code6, "source": src}, {"_id": 0})
-                if doc:
-                    logger.debug(f"✅ 从MongoDB获取基础信息: {symbol}, 数据源: {src}")
-                    return doc
-
-            # 如果所有数据源都没有，尝试不带 source 条件查询（兼容旧数据）
-            if not doc:
-                doc = collection.find_one({"code": code6}, {"_id": 0})
-                if doc:
-                    logger.debug(f"✅ 从MongoDB获取基础信息（旧数据）: {symbol}")
-                    return doc
-                else:
-                    logger.debug(f"📊 MongoDB中未找到基础信息: {symbol}")
-                    return None
+            # 🔥 一次查询：按优先级取数据源，不在优先级列表中或没有 source 的旧数据最后选用
+            source, docs = self._find_by_priority(
+                collection, {"code": code6}, source_priority, {}, source_field="source",
+                include_unranked=True, limit=1,
+            )
+            if docs:
+                logger.debug(f"✅ 从MongoDB获取基础信息: {symbol}, 数据源: {source}")
+                return docs[0]
+
+            logger.debug(f"📊 MongoDB中未找到基础信息: {symbol}")
+            return None
 
         except Exception as e:
             logger.warning(f"⚠️ 获取基础信息失败: {e}")
@@ -99,66 +155,104 @@ class MongoDBCacheAdapter:
                 StockMarket.HONG_KONG: 'hk_stocks',
             }
             market_category = market_mapping.get(market)
-            logger.info(f"📊 [数据源优先级] 股票代码: {symbol}, 市场分类: {market_category}")
-
-            # 2. 从数据库读取配置
-            if self.db is not None:
-                config_collection = self.db.system_configs
-                config_data = config_collection.find_one(
-                    {"is_active": True},
-                    sort=[("version", -1)]
-                )
-
-                if config_data and config_data.get('data_source_configs'):
-                    configs = config_data['data_source_configs']
-                    logger.info(f"📊 [数据源优先级] 从数据库读取到 {len(configs)} 个数据源配置")
-
-                    # 3. 过滤启用的数据源
-                    enabled = []
-                    for ds in configs:
-                        ds_type = ds.get('type', '')
-                        ds_enabled = ds.get('enabled', True)
-                        ds_priority = ds.get('priority', 0)
-                        ds_categories = ds.get('market_categories', [])
-
-                        logger.info(f"📊 [数据源配置] 类型: {ds_type}, 启用: {ds_enabled}, 优先级: {ds_priority}, 市场: {ds_categories}")
-
-                        if not ds_enabled:
-                            logger.info(f"⚠️ [数据源优先级] {ds_type} 未启用，跳过")
-                            continue
-
-                        # 检查市场分类
-                        if ds_categories and market_category:
-                            if market_category not in ds_categories:
-                                logger.info(f"⚠️ [数据源优先级] {ds_type} 不支持市场 {market_category}，跳过")
-                                continue
-
-                        enabled.append(ds)
-
-                    logger.info(f"📊 [数据源优先级] 过滤后启用的数据源: {len(enabled)} 个")
-
-                    # 4. 按优先级排序（数字越大优先级越高）
-                    enabled.sort(key=lambda x: x.get('priority', 0), reverse=True)
-
-                    # 5. 返回数据源类型列表
-                    result = [ds.get('type', '').lower() for ds in enabled if ds.get('type')]
-                    if result:
-                        logger.info(f"✅ [数据源优先级] {symbol} ({market_category}): {result}")
-                        return result
-                    else:
-                        logger.warning(f"⚠️ [数据源优先级] 没有可用的数据源配置，使用默认顺序")
-                else:
-                    logger.warning(f"⚠️ [数据源优先级] 数据库中没有找到数据源配置")
+
+            # 2. 从数据源配置快照解析（配置版本不变时直接复用）
+            from tradingagents.config.datasource_snapshot import get_datasource_config_snapshot
+
+            snapshot = get_datasource_config_snapshot()
+            result = snapshot.memoize(
+                ("cache_priority", market_category),
+                lambda: resolve_source_priority(snapshot.data_source_configs, market_category),
+            )
+            if result:
+                logger.debug(f"📊 [数据源优先级] {symbol} ({market_category}): {result}")
+                return list(result)
+            logger.debug(f"⚠️ [数据源优先级] 没有可用的数据源配置，使用默认顺序")
 
         except Exception as e:
             logger.error(f"❌ 获取数据源优先级失败: {e}", exc_info=True)
 
         # 默认顺序：Tushare > AKShare > BaoStock
-        logger.info(f"📊 [数据源优先级] 使用默认顺序: ['tushare', 'akshare', 'baostock']")
-        return ['tushare', 'akshare', 'baostock']
+        logger.debug(f"📊 [数据源优先级] 使用默认顺序: {DEFAULT_SOURCE_PRIORITY}")
+        return list(DEFAULT_SOURCE_PRIORITY)
+
+    @staticmethod
+    def _find_by_priority(collection, query: Dict[str, Any], priority: List[str], sort: Dict[str, int],
+                          projection: Optional[Dict[str, Any]] = None, source_field: str = "data_source",
+                          include_unranked: bool = False, limit: Optional[int] = None):
+        """
+        一次查询所有数据源，返回 (优先级最高且有数据的数据源, 该数据源的文档)
+
+        按 (数据源, sort) 排序：复合索引 (代码, 数据源, 日期 -1) 可以直接按这个顺序扫描，
+        数据源的排序方向取与日期相反的方向（正向或反向遍历索引）。数据源的优先级在内存中比较。
+        limit=1 时用 $sort + $group/$first，每个数据源只返回排在最前的一条。
+
+        Args:
+            include_unranked: 是否包含不在 priority 中（或没有数据源字段）的文档，最后选用（兼容旧数据）
+        """
+        match = dict(query)
+        if not include_unranked:
+            match[source_field] = {"$in": list(priority)}
+        sort_spec = [(source_field, -next(iter(sort.values()), -1)), *sort.items()]
+
+        by_source: Dict[Any, List[Dict[str, Any]]] = {}
+        if limit == 1:
+            pipeline = [
+                {"$match": match},
+                {"$sort": dict(sort_spec)},
+                {"$group": {"_id": f"${source_field}", "doc": {"$first": "$$ROOT"}}},
+                {"$replaceRoot": {"newRoot": "$doc"}},
+                {"$project": projection or {"_id": 0}},
+            ]
+            for doc in collection.aggregate(pipeline):
+                by_source[doc.get(source_field)] = [doc]
+        else:
+            if projection and any(v == 1 for v in projection.values()):
+                projection = {**projection, source_field: 1}
+            for doc in collection.find(match, projection or {"_id": 0}).sort(sort_spec):
+                group = by_source.setdefault(doc.get(source_field), [])
+                if not limit or len(group) < limit:
+                    group.append(doc)
+
+        for source in priority:
+            if by_source.get(source):
+                return source, by_source[source]
+        if include_unranked:
+            for source, docs in by_source.items():
+                if source not in priority:
+                    return source, docs
+        return None, []
+
+    @staticmethod
+    def _docs_to_frame(docs: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        按列组装 DataFrame（指定 columns 时）
+
+        数值列用 np.fromiter 直接写入 float64 数组（缺失值为 NaN），其他列为对象数组；
+        数值列中出现非数值时按对象列处理。
+        """
+        if not columns:
+            return pd.DataFrame(docs)
+        n = len(docs)
+        data = {}
+        for column in columns:
+            if not any(column in doc for doc in docs):
+                continue
+            values = None
+            if column in NUMERIC_COLUMNS:
+                try:
+                    raw = (doc.get(column) for doc in docs)
+                    values = np.fromiter((np.nan if v is None else v for v in raw), dtype=np.float64, count=n)
+                except (TypeError, ValueError):
+                    values = None
+            if values is None:
+                values = np.empty(n, dtype=object)
+                values[:] = [doc.get(column) for doc in docs]
+            data[column] = values
+        return pd.DataFrame(data)
 
     def get_historical_data(self, symbol: str, start_date: str = None, end_date: str = None,
-                          period: str = "daily") -> Optional[pd.DataFrame]:
+                          period: str = "daily", columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """
         获取历史数据，支持多周期，按数据源优先级查询
 
@@ -167,6 +261,7 @@ class MongoDBCacheAdapter:
             start_date: 开始日期
             end_date: 结束日期
             period: 数据周期（daily/weekly/monthly），默认为daily
+            columns: 只读取这些字段（默认读取全部字段）
 
         Returns:
             DataFrame: 历史数据
@@ -175,40 +270,53 @@ class MongoDBCacheAdapter:
             return None
 
         try:
+            from tradingagents.dataflows.resample import prefer_resampled
+
+            # 周线/月线不再同步时，存储中的周线/月线可能已过期，先由日线重采样
+            resample_first = prefer_resampled(period)
+            if resample_first:
+                df = self._get_resampled_historical_data(symbol, start_date, end_date, period)
+                if df is not None:
+                    return df
+
             code6 = str(symbol).zfill(6)
             collection = self.db.stock_daily_quotes
 
             # 获取数据源优先级
             priority_order = self._get_data_source_priority(symbol)
 
-            # 按优先级查询
-            for data_source in priority_order:
-                # 构建查询条件
-                query = {
-                    "symbol": code6,
-                    "period": period,
-                    "data_source": data_source  # 指定数据源
-                }
-
+            query = {
+                "symbol": code6,
+                "period": period,
+            }
+            if start_date or end_date:
+                date_filter = {}
                 if start_date:
-                    query["trade_date"] = {"$gte": start_date}
+                    date_filter["$gte"] = start_date
                 if end_date:
-                    if "trade_date" in query:
-                        query["trade_date"]["$lte"] = end_date
-                    else:
-                        query["trade_date"] = {"$lte": end_date}
-
-                # 查询数据
-                logger.debug(f"🔍 [MongoDB查询] 尝试数据源: {data_source}, symbol={code6}, period={period}")
-                cursor = collection.find(query, {"_id": 0}).sort("trade_date", 1)
-                data = list(cursor)
-
-                if data:
-                    df = pd.DataFrame(data)
-                    logger.info(f"✅ [数据来源: MongoDB-{data_source}] {symbol}, {len(df)}条记录 (period={period})")
+                    date_filter["$lte"] = end_date
+                query["trade_date"] = date_filter
+
+            projection = None
+            if columns:
+                projection = {"_id": 0, "data_source": 1, **{c: 1 for c in columns}}
+
+            # 一次查询所有数据源，取优先级最高且有数据的数据源
+            logger.debug(f"🔍 [MongoDB查询] 数据源: {priority_order}, symbol={code6}, period={period}")
+            data_source, data = self._find_by_priority(
+                collection, query, priority_order, {"trade_date": 1}, projection
+            )
+
+            if data:
+                df = self._docs_to_frame(data, ["data_source", *columns] if columns else None)
+                logger.info(f"✅ [数据来源: MongoDB-{data_source}] {symbol}, {len(df)}条记录 (period={period})")
+                return df
+
+            # 没有存储该周期时，由基础周期（日线/1分钟线）重采样
+            if not resample_first:
+                df = self._get_resampled_historical_data(symbol, start_date, end_date, period)
+                if df is not None:
                     return df
-                else:
-                    logger.debug(f"⚠️ [MongoDB-{data_source}] 未找到{period}数据: {symbol}")
 
             # 所有数据源都没有数据
             logger.warning(f"⚠️ [数据来源: MongoDB] 所有数据源({', '.join(priority_order)})都没有{period}数据: {symbol}，降级到其他数据源")
@@ -217,6 +325,36 @@ class MongoDBCacheAdapter:
         except Exception as e:
             logger.warning(f"⚠️ 获取历史数据失败: {e}")
             return None
+
+    def _get_resampled_historical_data(self, symbol: str, start_date: str = None, end_date: str = None,
+                                       period: str = "weekly") -> Optional[pd.DataFrame]:
+        """由基础周期数据重采样出周线/月线/分钟线，不可推导或没有基础数据时返回 None"""
+        from tradingagents.dataflows.resample import base_period_for, get_bar_resampler, resample_enabled
+
+        base_period = base_period_for(period)
+        if base_period is None or not resample_enabled():
+            return None
+
+        # 起始日期对齐到所在周/月的第一天，保证第一根重采样K线完整
+        base_start = start_date
+        if start_date and period in ("weekly", "monthly"):
+            start = pd.Timestamp(start_date)
+            start = start - pd.Timedelta(days=start.weekday()) if period == "weekly" else start.replace(day=1)
+            base_start = start.strftime("%Y-%m-%d")
+
+        base_df = self.get_historical_data(symbol, base_start, end_date, period=base_period, columns=list(BAR_COLUMNS))
+        if base_df is None or base_df.empty:
+            return None
+
+        source = base_df["data_source"].iloc[0] if "data_source" in base_df.columns else None
+        df = get_bar_resampler().resample(base_df, period, cache_key=(str(symbol).zfill(6), source, base_period))
+        if start_date and "trade_date" in df.columns and period in ("weekly", "monthly"):
+            df = df[df["trade_date"] >= start_date].reset_index(drop=True)
+        if df.empty:
+            return None
+
+        logger.info(f"✅ [数据来源: MongoDB-{source}] {symbol}, 由{base_period}重采样得到 {len(df)} 条{period}数据")
+        return df
     
     def get_financial_data(self, symbol: str, report_period: str = None) -> Optional[Dict[str, Any]]:
         """获取财务数据，按数据源优先级查询"""
@@ -230,23 +368,19 @@ class MongoDBCacheAdapter:
             # 获取数据源优先级
             priority_order = self._get_data_source_priority(symbol)
 
-            # 按优先级查询
-            for data_source in priority_order:
-                # 构建查询条件
-                query = {
-                    "code": code6,
-                    "data_source": data_source  # 指定数据源
-                }
-                if report_period:
-                    query["report_period"] = report_period
-
-                # 获取最新的财务数据
-                doc = collection.find_one(query, {"_id": 0}, sort=[("report_period", -1)])
-
-                if doc:
-                    logger.info(f"✅ [数据来源: MongoDB-{data_source}] {symbol}财务数据")
-                    logger.debug(f"📊 [财务数据] 成功提取{symbol}的财务数据，包含字段: {list(doc.keys())}")
-                    return doc
+            query = {"code": code6}
+            if report_period:
+                query["report_period"] = report_period
+
+            # 一次查询：优先级最高且有数据的数据源的最新一期财务数据
+            data_source, docs = self._find_by_priority(
+                collection, query, priority_order, {"report_period": -1}, limit=1
+            )
+            if docs:
+                doc = docs[0]
+                logger.info(f"✅ [数据来源: MongoDB-{data_source}] {symbol}财务数据")
+                logger.debug(f"📊 [财务数据] 成功提取{symbol}的财务数据，包含字段: {list(doc.keys())}")
+                return doc
 
             # 所有数据源都没有数据
             logger.debug(f"📊 [数据来源: MongoDB] 所有数据源都没有财务数据: {symbol}")
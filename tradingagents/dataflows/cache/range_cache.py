@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+区间感知的K线（OHLCV）缓存
+
+按 (provider, symbol, period, adjust) 为每只股票维护一份时间序列及其已覆盖的日期段，
+而不是把 start_date/end_date 哈希进缓存键：
+- 请求的区间被已覆盖日期段完全覆盖时，直接切片返回
+- 否则只向数据源请求请求区间内未覆盖的日期段（与已缓存区间不相交时只请求该区间本身），再合并落盘
+- 最近一个交易日（今天）不计入已覆盖区间，保证盘中数据会被刷新
+- 数据源和复权方式是缓存键的一部分，不同数据源/复权口径的价格不会混在一起
+
+使用方法：
+    from tradingagents.dataflows.cache.range_cache import get_ohlcv_range_cache
+    cache = get_ohlcv_range_cache()
+    df = cache.get_range("000001", "2024-01-01", "2024-06-30", fetcher=fetch_func,
+                         provider="tushare", adjust="qfq")
+
+配置（环境变量）：
+    TA_OHLCV_RANGE_CACHE=false               # 关闭区间缓存
+    TA_OHLCV_RANGE_CACHE_TTL_DAYS=7          # 整体刷新周期（复权价格可能被修订）
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+from .serializers import dump_frame, load_frame, remove_stale_frames
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# fetcher(symbol, start_date, end_date) -> 标准化后的 DataFrame（含 date 列）
+Fetcher = Callable[[str, str, str], Optional[pd.DataFrame]]
+
+
+def is_range_cache_enabled() -> bool:
+    """是否启用区间缓存"""
+    return os.getenv("TA_OHLCV_RANGE_CACHE", "true").lower() in ("true", "1", "yes", "on")
+
+
+class OHLCVRangeCache:
+    """按股票维护连续K线序列的区间缓存"""
+
+    def __init__(self, cache_dir: str = None, ttl_days: int = None):
+        """
+        初始化区间缓存
+
+        Args:
+            cache_dir: 缓存目录，默认为 tradingagents/dataflows/cache/data_cache/ohlcv
+            ttl_days: 整体刷新周期（天），超过后丢弃整段序列重新获取
+        """
+        if cache_dir is None:
+            cache_dir = Path(__file__).parent / "data_cache" / "ohlcv"
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        if ttl_days is None:
+            ttl_days = int(os.getenv("TA_OHLCV_RANGE_CACHE_TTL_DAYS", "7"))
+        self.ttl_days = ttl_days
+
+        self._locks: Dict[str, threading.Lock] = {}
+        # 同时保护 _locks 和跨股票共享的 _stats
+        self._locks_guard = threading.Lock()
+        self._stats = {'hits': 0, 'partial_hits': 0, 'misses': 0, 'fetches': 0}
+
+    # ------------------------------------------------------------------
+    # 存储
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _entry_name(symbol: str, period: str, adjust: str, provider: str = "") -> str:
+        safe_symbol = str(symbol).replace('/', '_').replace('\\', '_')
+        return f"{provider or 'default'}_{safe_symbol}_{period}_{adjust or 'none'}"
+
+    def _count(self, key: str):
+        with self._locks_guard:
+            self._stats[key] += 1
+
+    def _meta_path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}_meta.json"
+
+    def _get_lock(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[name] = lock
+            return lock
+
+    def _load_entry(self, name: str) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        meta_path = self._meta_path(name)
+        if not meta_path.exists():
+            return None, None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            created_at = datetime.fromisoformat(meta['created_at'])
+            if datetime.now() - created_at > timedelta(days=self.ttl_days):
+                logger.debug(f"🕒 区间缓存已超过刷新周期，丢弃: {name}")
+                return None, None
+            data_path = self.cache_dir / meta['file']
+            if not data_path.exists():
+                return None, None
+            return load_frame(data_path, meta['format']), meta
+        except Exception as e:
+            logger.warning(f"⚠️ 读取区间缓存失败 {name}: {e}")
+            return None, None
+
+    def _save_entry(self, name: str, df: pd.DataFrame, meta: Dict):
+        meta_path = self._meta_path(name)
+        tmp_meta = meta_path.with_suffix('.json.tmp')
+        try:
+            tmp_data, fmt = dump_frame(df, self.cache_dir / f"{name}.tmp")
+            data_path = self.cache_dir / f"{name}.{tmp_data.name.rsplit('.', 1)[1]}"
+            meta = dict(meta, file=data_path.name, format=fmt)
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            # 先替换数据再替换元数据，元数据描述的区间始终不超过已落盘的数据
+            os.replace(tmp_data, data_path)
+            os.replace(tmp_meta, meta_path)
+            # 格式变化（如安装/卸载 pyarrow）后删除旧格式的数据文件
+            remove_stale_frames(self.cache_dir / name, data_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存区间缓存失败 {name}: {e}")
+
+    # ------------------------------------------------------------------
+    # 区间计算
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_date(value) -> datetime:
+        return pd.Timestamp(value).to_pydatetime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _last_settled_day() -> datetime:
+        """已收盘、数据不会再变化的最后一天（保守取昨天）"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=1)
+
+    @staticmethod
+    def _segments(meta: Dict) -> List[Tuple[datetime, datetime]]:
+        """元数据中的已覆盖日期段"""
+        parse = OHLCVRangeCache._parse_date
+        return [(parse(s), parse(e)) for s, e in meta.get('segments', [])]
+
+    @staticmethod
+    def _missing_ranges(start: datetime, end: datetime,
+                        segments: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+        """计算请求区间 [start, end] 内未被已覆盖日期段覆盖的部分"""
+        gaps = []
+        cursor = start
+        for seg_start, seg_end in sorted(segments):
+            if seg_end < cursor:
+                continue
+            if seg_start > end:
+                break
+            if seg_start > cursor:
+                gaps.append((cursor, seg_start - timedelta(days=1)))
+            cursor = max(cursor, seg_end + timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    @staticmethod
+    def _add_segment(segments: List[Tuple[datetime, datetime]],
+                     start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """加入新的已覆盖日期段，合并重叠或相邻的日期段"""
+        merged: List[Tuple[datetime, datetime]] = []
+        for seg_start, seg_end in sorted([*segments, (start, end)]):
+            if merged and seg_start <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], seg_end))
+            else:
+                merged.append((seg_start, seg_end))
+        return merged
+
+    @staticmethod
+    def _merge(base: Optional[pd.DataFrame], new: Optional[pd.DataFrame]) -> pd.DataFrame:
+        frames = [f for f in (base, new) if f is not None and not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        merged = pd.concat(frames, ignore_index=True)
+        merged['date'] = pd.to_datetime(merged['date'])
+        merged = merged.drop_duplicates(subset='date', keep='last').sort_values('date')
+        return merged.reset_index(drop=True)
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, start: datetime, end: datetime) -> pd.DataFrame:
+        if df is None or df.empty:
+            return pd.DataFrame()
+        end_exclusive = end + timedelta(days=1)
+        mask = (df['date'] >= start) & (df['date'] < end_exclusive)
+        return df.loc[mask].reset_index(drop=True)
+
+    def _fetch(self, fetcher: Fetcher, symbol: str,
+               start: datetime, end: datetime) -> Optional[pd.DataFrame]:
+        self._count('fetches')
+        df = fetcher(symbol, start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT))
+        if df is None or df.empty:
+            return None
+        return df
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def get_range(self, symbol: str, start_date: str, end_date: str, fetcher: Fetcher,
+                  period: str = "daily", adjust: str = "", provider: str = "") -> pd.DataFrame:
+        """
+        获取 [start_date, end_date] 区间的K线，必要时只补齐缺失的日期段
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            fetcher: 数据获取函数 fetcher(symbol, start_date, end_date)，返回含 date 列的 DataFrame
+            period: 数据周期
+            adjust: 复权方式（缓存键的一部分）
+            provider: 数据源名称（缓存键的一部分）
+
+        Returns:
+            pd.DataFrame: 区间内的K线数据（可能为空）
+        """
+        start = self._parse_date(start_date)
+        end = self._parse_date(end_date)
+        if start > end:
+            return pd.DataFrame()
+
+        name = self._entry_name(symbol, period, adjust, provider)
+        settled = self._last_settled_day()
+        with self._get_lock(name):
+            df, meta = self._load_entry(name)
+
+            if df is None or meta is None:
+                self._count('misses')
+                fetched = self._fetch(fetcher, symbol, start, end)
+                if fetched is None:
+                    return pd.DataFrame()
+                if 'date' not in fetched.columns:
+                    # 无法按日期切片的数据不进入区间缓存
+                    return fetched
+                merged = self._merge(None, fetched)
+                segments = [(start, min(end, settled))] if start <= min(end, settled) else []
+                created_at = datetime.now().isoformat()
+            else:
+                segments = self._segments(meta)
+                created_at = meta['created_at']
+                gaps = self._missing_ranges(start, end, segments)
+                if not gaps:
+                    self._count('hits')
+                    logger.debug(f"📦 区间缓存命中: {symbol} {start_date}~{end_date}")
+                    return self._slice(df, start, end)
+
+                self._count('partial_hits')
+                merged = df
+                for gap_start, gap_end in gaps:
+                    logger.debug(f"🧩 区间缓存补齐: {symbol} {gap_start:%Y-%m-%d}~{gap_end:%Y-%m-%d}")
+                    fetched = self._fetch(fetcher, symbol, gap_start, gap_end)
+                    if fetched is None or 'date' not in fetched.columns:
+                        # 获取失败（或该段无交易日）时不扩展覆盖区间，下次重试
+                        continue
+                    merged = self._merge(merged, fetched)
+                    if gap_start <= min(gap_end, settled):
+                        segments = self._add_segment(segments, gap_start, min(gap_end, settled))
+
+            if segments:
+                self._save_entry(name, merged, {
+                    'symbol': symbol,
+                    'provider': provider,
+                    'period': period,
+                    'adjust': adjust,
+                    'segments': [[s.strftime(DATE_FORMAT), e.strftime(DATE_FORMAT)] for s, e in segments],
+                    'rows': len(merged),
+                    'created_at': created_at,
+                    'updated_at': datetime.now().isoformat(),
+                })
+            return self._slice(merged, start, end)
+
+    def invalidate(self, symbol: str, period: str = "daily", adjust: str = "", provider: str = ""):
+        """删除某只股票的区间缓存"""
+        name = self._entry_name(symbol, period, adjust, provider)
+        with self._get_lock(name):
+            meta_path = self._meta_path(name)
+            if not meta_path.exists():
+                return
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    data_path = self.cache_dir / json.load(f)['file']
+                if data_path.exists():
+                    data_path.unlink()
+            except Exception as e:
+                logger.debug(f"删除区间缓存数据文件失败 {name}: {e}")
+            meta_path.unlink()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        with self._locks_guard:
+            return dict(self._stats)
+
+
+# 全局区间缓存实例
+_range_cache_instance: Optional[OHLCVRangeCache] = None
+
+
+def get_ohlcv_range_cache() -> OHLCVRangeCache:
+    """获取全局区间缓存实例"""
+    global _range_cache_instance
+    if _range_cache_instance is None:
+        _range_cache_instance = OHLCVRangeCache()
+    return _range_cache_instance
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+缓存 DataFrame 序列化层
+
+为文件缓存、自适应缓存、数据库缓存和区间缓存提供统一的 DataFrame 序列化：
+- feather（默认，需要 pyarrow）: Arrow IPC 文件，读取时内存映射，保留 dtype 和日期索引
+- parquet（需要 pyarrow）: 列式压缩，磁盘占用最小
+- json: 无 pyarrow 或列式格式无法表示时的降级格式（pandas table schema + dtype 列表）
+- pickle: 仅限显式配置的本地缓存；共享存储（Redis/MongoDB/跨进程共享文件）拒绝读写，
+  反序列化不可信数据可执行任意代码
+- csv: 旧缓存格式，仅为兼容读取保留
+
+同一缓存键改用其他格式写入时，旧格式的数据文件会被删除。
+
+使用方法：
+    from tradingagents.dataflows.cache.serializers import dump_frame, load_frame
+    path, fmt = dump_frame(df, cache_dir / cache_key)
+    df = load_frame(path, fmt)
+
+配置（环境变量）：
+    TA_CACHE_FRAME_FORMAT=feather|parquet|json|pickle   # 默认 feather（无 pyarrow 时为 json）
+    TA_CACHE_FLOAT32=true                          # float64 列降为 float32 以减少体积
+"""
+
+import io
+import json
+import os
+import pickle
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+
+class FrameSerializer(ABC):
+    """DataFrame 序列化器基类"""
+
+    name = "base"
+    extension = "bin"
+
+    def dump(self, df: pd.DataFrame, path: Union[str, Path]):
+        with open(path, 'wb') as f:
+            f.write(self.dumps(df))
+
+    def load(self, path: Union[str, Path]) -> pd.DataFrame:
+        with open(path, 'rb') as f:
+            return self.loads(f.read())
+
+    @abstractmethod
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        """序列化为字节"""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> pd.DataFrame:
+        """从字节反序列化"""
+
+
+class FeatherSerializer(FrameSerializer):
+    """Arrow IPC（Feather v2）序列化，读取文件时使用内存映射"""
+
+    name = "feather"
+    extension = "feather"
+
+    def dump(self, df: pd.DataFrame, path: Union[str, Path]):
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        # 不压缩，读取时可以直接内存映射
+        with pa.OSFile(str(path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def load(self, path: Union[str, Path]) -> pd.DataFrame:
+        with pa.memory_map(str(path), 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def loads(self, data: bytes) -> pd.DataFrame:
+        return pa.ipc.open_file(pa.py_buffer(data)).read_all().to_pandas()
+
+
+class ParquetSerializer(FrameSerializer):
+    """Parquet 序列化（zstd 压缩）"""
+
+    name = "parquet"
+    extension = "parquet"
+
+    def dump(self, df: pd.DataFrame, path: Union[str, Path]):
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=True), str(path), compression='zstd')
+
+    def load(self, path: Union[str, Path]) -> pd.DataFrame:
+        return pq.read_table(str(path), memory_map=True).to_pandas()
+
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        sink = pa.BufferOutputStream()
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=True), sink, compression='zstd')
+        return sink.getvalue().to_pybytes()
+
+    def loads(self, data: bytes) -> pd.DataFrame:
+        return pq.read_table(pa.BufferReader(data)).to_pandas()
+
+
+class JSONSerializer(FrameSerializer):
+    """JSON 序列化（pandas table schema，附带各列 dtype 以还原 float32 等类型）"""
+
+    name = "json"
+    extension = "json"
+
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        payload = {
+            "dtypes": [str(dtype) for dtype in df.dtypes],
+            "frame": df.to_json(orient='table', date_unit='ns', double_precision=15),
+        }
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data: bytes) -> pd.DataFrame:
+        payload = json.loads(data)
+        df = pd.read_json(io.StringIO(payload["frame"]), orient='table')
+        for i, dtype in enumerate(payload.get("dtypes", [])):
+            if str(df.dtypes.iloc[i]) != dtype:
+                try:
+                    df.isetitem(i, df.iloc[:, i].astype(dtype))
+                except (TypeError, ValueError):
+                    pass
+        return df
+
+
+class PickleSerializer(FrameSerializer):
+    """pickle 序列化（仅限显式配置的本地缓存，共享存储拒绝使用）"""
+
+    name = "pickle"
+    extension = "pkl"
+
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        return pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> pd.DataFrame:
+        return pickle.loads(data)
+
+
+class CSVSerializer(FrameSerializer):
+    """CSV 序列化（旧缓存格式，读取时按第一列作为索引）"""
+
+    name = "csv"
+    extension = "csv"
+
+    def dump(self, df: pd.DataFrame, path: Union[str, Path]):
+        df.to_csv(path, index=True)
+
+    def load(self, path: Union[str, Path]) -> pd.DataFrame:
+        return pd.read_csv(path, index_col=0)
+
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        return df.to_csv(index=True).encode('utf-8')
+
+    def loads(self, data: bytes) -> pd.DataFrame:
+        return pd.read_csv(io.BytesIO(data), index_col=0)
+
+
+_SERIALIZERS: Dict[str, FrameSerializer] = {
+    JSONSerializer.name: JSONSerializer(),
+    PickleSerializer.name: PickleSerializer(),
+    CSVSerializer.name: CSVSerializer(),
+}
+if PYARROW_AVAILABLE:
+    _SERIALIZERS[FeatherSerializer.name] = FeatherSerializer()
+    _SERIALIZERS[ParquetSerializer.name] = ParquetSerializer()
+
+
+# 所有格式的数据文件扩展名（用于格式变化时删除旧文件）
+FRAME_EXTENSIONS = ("feather", "parquet", "json", "pkl", "csv")
+
+# 列式格式失败或共享存储不能使用 pickle 时的安全降级格式
+FALLBACK_FORMAT = JSONSerializer.name
+
+
+def get_serializer(fmt: str) -> Optional[FrameSerializer]:
+    """按格式名获取序列化器，不可用时返回 None"""
+    return _SERIALIZERS.get(fmt)
+
+
+def get_default_serializer(shared: bool = False) -> FrameSerializer:
+    """
+    获取配置的默认序列化器
+
+    Args:
+        shared: 是否写入共享存储；共享存储配置为 pickle 时改用 json
+    """
+    default = "feather" if PYARROW_AVAILABLE else FALLBACK_FORMAT
+    fmt = os.getenv("TA_CACHE_FRAME_FORMAT", default).lower()
+    serializer = _SERIALIZERS.get(fmt)
+    if serializer is None:
+        logger.warning(f"⚠️ 缓存格式 {fmt} 不可用（可能未安装 pyarrow），使用 {default}")
+        serializer = _SERIALIZERS[default]
+    if shared and serializer.name == PickleSerializer.name:
+        logger.debug(f"共享缓存不使用 pickle，改用 {FALLBACK_FORMAT}")
+        serializer = _SERIALIZERS[FALLBACK_FORMAT]
+    return serializer
+
+
+def _check_shared(fmt: str, shared: bool):
+    if shared and fmt == PickleSerializer.name:
+        raise ValueError("共享缓存拒绝使用 pickle 格式（反序列化不可信数据可执行任意代码）")
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """写入前的 dtype 处理"""
+    if os.getenv("TA_CACHE_FLOAT32", "false").lower() == "true":
+        float_cols = df.select_dtypes(include=['float64']).columns
+        if len(float_cols) > 0:
+            df = df.astype({col: 'float32' for col in float_cols})
+    return df
+
+
+def remove_stale_frames(base_path: Union[str, Path], keep: Union[str, Path],
+                        extensions: Iterable[str] = FRAME_EXTENSIONS):
+    """删除 base_path 其他格式的旧数据文件（同一缓存键改用新格式写入后调用）"""
+    base_path, keep = Path(base_path), Path(keep)
+    for ext in extensions:
+        path = base_path.with_name(f"{base_path.name}.{ext}")
+        if path != keep and path.exists():
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.debug(f"删除旧格式缓存文件失败 {path}: {e}")
+
+
+def dump_frame(df: pd.DataFrame, base_path: Union[str, Path],
+               serializer: FrameSerializer = None, shared: bool = False) -> Tuple[Path, str]:
+    """
+    将 DataFrame 写入 base_path + 格式扩展名，并删除同名的其他格式旧文件
+
+    列式格式无法表示的数据（如混合类型的 object 列）自动降级为 json。
+
+    Args:
+        df: 要保存的 DataFrame
+        base_path: 不含扩展名的文件路径
+        serializer: 指定序列化器，默认使用配置的格式
+        shared: 文件是否被多个进程共享读取（共享时拒绝 pickle）
+
+    Returns:
+        (实际文件路径, 格式名)
+    """
+    serializer = serializer or get_default_serializer(shared)
+    _check_shared(serializer.name, shared)
+    base_path = Path(base_path)
+    df = _prepare(df)
+    path = base_path.with_name(f"{base_path.name}.{serializer.extension}")
+    try:
+        serializer.dump(df, path)
+    except Exception as e:
+        if serializer.name in (FALLBACK_FORMAT, PickleSerializer.name):
+            raise
+        logger.debug(f"{serializer.name} 序列化失败，降级为 {FALLBACK_FORMAT}: {e}")
+        if path.exists():
+            path.unlink()
+        serializer = _SERIALIZERS[FALLBACK_FORMAT]
+        path = base_path.with_name(f"{base_path.name}.{serializer.extension}")
+        serializer.dump(df, path)
+    remove_stale_frames(base_path, path)
+    return path, serializer.name
+
+
+def load_frame(path: Union[str, Path], fmt: str, shared: bool = False) -> pd.DataFrame:
+    """按格式名读取 DataFrame（shared=True 时拒绝 pickle）"""
+    _check_shared(fmt, shared)
+    serializer = _SERIALIZERS.get(fmt)
+    if serializer is None:
+        raise ValueError(f"不支持的缓存格式: {fmt}")
+    return serializer.load(path)
+
+
+def dumps_frame(df: pd.DataFrame, serializer: FrameSerializer = None) -> Tuple[bytes, str]:
+    """
+    将 DataFrame 序列化为字节，返回 (bytes, 格式名)
+
+    字节写入 Redis/MongoDB 等共享存储，从不使用 pickle；列式格式失败时降级为 json。
+    """
+    serializer = serializer or get_default_serializer(shared=True)
+    _check_shared(serializer.name, True)
+    df = _prepare(df)
+    try:
+        return serializer.dumps(df), serializer.name
+    except Exception as e:
+        if serializer.name == FALLBACK_FORMAT:
+            raise
+        logger.debug(f"{serializer.name} 序列化失败，降级为 {FALLBACK_FORMAT}: {e}")
+        return _SERIALIZERS[FALLBACK_FORMAT].dumps(df), FALLBACK_FORMAT
+
+
+def loads_frame(data: bytes, fmt: str) -> pd.DataFrame:
+    """按格式名从共享存储的字节反序列化 DataFrame（拒绝 pickle）"""
+    _check_shared(fmt, True)
+    serializer = _SERIALIZERS.get(fmt)
+    if serializer is None:
+        raise ValueError(f"不支持的缓存格式: {fmt}")
+    return serializer.loads(data)
@@ -23,6 +23,7 @@ logger = setup_dataflow_logging()
 
 # 导入统一数据源编码
 from tradingagents.constants import DataSourceCode
+from tradingagents.config.datasource_snapshot import get_datasource_config_snapshot
 
 
 class ChinaDataSource(Enum):
@@ -38,6 +39,15 @@ class ChinaDataSource(Enum):
     BAOSTOCK = DataSourceCode.BAOSTOCK
 
 
+# DataFrame 接口各数据源返回的价格复权方式（区间缓存键的一部分，不同口径的价格不混存）
+DATAFRAME_PRICE_ADJUST = {
+    ChinaDataSource.MONGODB: "qfq",   # 同步入库的日线为前复权
+    ChinaDataSource.TUSHARE: "qfq",
+    ChinaDataSource.AKSHARE: "qfq",
+    ChinaDataSource.BAOSTOCK: "qfq",
+}
+
+
 class USDataSource(Enum):
     """
     美股数据源枚举
@@ -90,7 +100,10 @@ class DataSourceManager:
 
     def _get_data_source_priority_order(self, symbol: Optional[str] = None) -> List[ChinaDataSource]:
         """
-        从数据库获取数据源优先级顺序（用于降级）
+        获取数据源优先级顺序（用于降级）
+
+        顺序由数据库中的数据源配置决定，配置读取自进程内快照，
+        每个市场分类的解析结果按快照缓存，热路径不访问数据库。
 
         Args:
             symbol: 股票代码，用于识别市场类型（A股/美股/港股）
@@ -101,64 +114,59 @@ class DataSourceManager:
         # 🔥 识别市场类型
         market_category = self._identify_market_category(symbol)
 
-        try:
-            # 🔥 从数据库读取数据源配置（使用同步客户端）
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
-            config_collection = db.system_configs
-
-            # 获取最新的激活配置
-            config_data = config_collection.find_one(
-                {"is_active": True},
-                sort=[("version", -1)]
-            )
-
-            if config_data and config_data.get('data_source_configs'):
-                data_source_configs = config_data.get('data_source_configs', [])
+        snapshot = get_datasource_config_snapshot()
+        order = snapshot.memoize(
+            ("cn_priority", market_category, tuple(self.available_sources)),
+            lambda: self._resolve_data_source_priority_order(snapshot.data_source_configs, market_category),
+        )
+        return list(order)
+
+    def _resolve_data_source_priority_order(
+        self, data_source_configs: Optional[List[Dict[str, Any]]], market_category: Optional[str]
+    ) -> List[ChinaDataSource]:
+        """按数据源配置解析某个市场分类的降级顺序"""
+        if data_source_configs:
+            # 🔥 过滤出启用的数据源，并按市场分类过滤
+            enabled_sources = []
+            for ds in data_source_configs:
+                if not ds.get('enabled', True):
+                    continue
 
-                # 🔥 过滤出启用的数据源，并按市场分类过滤
-                enabled_sources = []
-                for ds in data_source_configs:
-                    if not ds.get('enabled', True):
+                # 检查数据源是否属于当前市场分类
+                market_categories = ds.get('market_categories', [])
+                if market_categories and market_category:
+                    # 如果数据源配置了市场分类，只选择匹配的数据源
+                    if market_category not in market_categories:
                         continue
 
-                    # 检查数据源是否属于当前市场分类
-                    market_categories = ds.get('market_categories', [])
-                    if market_categories and market_category:
-                        # 如果数据源配置了市场分类，只选择匹配的数据源
-                        if market_category not in market_categories:
-                            continue
+                enabled_sources.append(ds)
 
-                    enabled_sources.append(ds)
+            # 按优先级排序（数字越大优先级越高）
+            enabled_sources.sort(key=lambda x: x.get('priority', 0), reverse=True)
 
-                # 按优先级排序（数字越大优先级越高）
-                enabled_sources.sort(key=lambda x: x.get('priority', 0), reverse=True)
+            # 转换为 ChinaDataSource 枚举（使用统一编码）
+            source_mapping = {
+                DataSourceCode.TUSHARE: ChinaDataSource.TUSHARE,
+                DataSourceCode.AKSHARE: ChinaDataSource.AKSHARE,
+                DataSourceCode.BAOSTOCK: ChinaDataSource.BAOSTOCK,
+            }
 
-                # 转换为 ChinaDataSource 枚举（使用统一编码）
-                source_mapping = {
-                    DataSourceCode.TUSHARE: ChinaDataSource.TUSHARE,
-                    DataSourceCode.AKSHARE: ChinaDataSource.AKSHARE,
-                    DataSourceCode.BAOSTOCK: ChinaDataSource.BAOSTOCK,
-                }
+            result = []
+            for ds in enabled_sources:
+                ds_type = ds.get('type', '').lower()
+                if ds_type in source_mapping:
+                    source = source_mapping[ds_type]
+                    # 排除 MongoDB（MongoDB 是最高优先级，不参与降级）
+                    if source != ChinaDataSource.MONGODB and source in self.available_sources:
+                        result.append(source)
 
-                result = []
-                for ds in enabled_sources:
-                    ds_type = ds.get('type', '').lower()
-                    if ds_type in source_mapping:
-                        source = source_mapping[ds_type]
-                        # 排除 MongoDB（MongoDB 是最高优先级，不参与降级）
-                        if source != ChinaDataSource.MONGODB and source in self.available_sources:
-                            result.append(source)
-
-                if result:
-                    logger.info(f"✅ [数据源优先级] 市场={market_category or '全部'}, 从数据库读取: {[s.value for s in result]}")
-                    return result
-                else:
-                    logger.warning(f"⚠️ [数据源优先级] 市场={market_category or '全部'}, 数据库配置中没有可用的数据源，使用默认顺序")
+            if result:
+                logger.info(f"✅ [数据源优先级] 市场={market_category or '全部'}, 从数据库配置读取: {[s.value for s in result]}")
+                return result
             else:
-                logger.warning("⚠️ [数据源优先级] 数据库中没有数据源配置，使用默认顺序")
-        except Exception as e:
-            logger.warning(f"⚠️ [数据源优先级] 从数据库读取失败: {e}，使用默认顺序")
+                logger.warning(f"⚠️ [数据源优先级] 市场={market_category or '全部'}, 数据库配置中没有可用的数据源，使用默认顺序")
+        else:
+            logger.warning("⚠️ [数据源优先级] 数据库中没有数据源配置，使用默认顺序")
 
         # 🔥 回退到默认顺序（兼容性）
         # 默认顺序：AKShare > Tushare > BaoStock
@@ -412,36 +420,20 @@ class DataSourceManager:
         """
         available = []
 
-        # 🔥 从数据库读取数据源配置，获取启用状态
+        # 🔥 从数据库配置（进程内快照）获取启用状态
         enabled_sources_in_db = set()
-        try:
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
-            config_collection = db.system_configs
-
-            # 获取最新的激活配置
-            config_data = config_collection.find_one(
-                {"is_active": True},
-                sort=[("version", -1)]
-            )
-
-            if config_data and config_data.get('data_source_configs'):
-                data_source_configs = config_data.get('data_source_configs', [])
-
-                # 提取已启用的数据源类型
-                for ds in data_source_configs:
-                    if ds.get('enabled', True):
-                        ds_type = ds.get('type', '').lower()
-                        enabled_sources_in_db.add(ds_type)
+        data_source_configs = get_datasource_config_snapshot().data_source_configs
+        if data_source_configs:
+            # 提取已启用的数据源类型
+            for ds in data_source_configs:
+                if ds.get('enabled', True):
+                    ds_type = ds.get('type', '').lower()
+                    enabled_sources_in_db.add(ds_type)
 
-                logger.info(f"✅ [数据源配置] 从数据库读取到已启用的数据源: {enabled_sources_in_db}")
-            else:
-                logger.warning("⚠️ [数据源配置] 数据库中没有数据源配置，将检查所有已安装的数据源")
-                # 如果数据库中没有配置，默认所有数据源都启用
-                enabled_sources_in_db = {'mongodb', 'tushare', 'akshare', 'baostock'}
-        except Exception as e:
-            logger.warning(f"⚠️ [数据源配置] 从数据库读取失败: {e}，将检查所有已安装的数据源")
-            # 如果读取失败，默认所有数据源都启用
+            logger.info(f"✅ [数据源配置] 从数据库读取到已启用的数据源: {enabled_sources_in_db}")
+        else:
+            logger.warning("⚠️ [数据源配置] 数据库中没有数据源配置或读取失败，将检查所有已安装的数据源")
+            # 如果数据库中没有配置，默认所有数据源都启用
             enabled_sources_in_db = {'mongodb', 'tushare', 'akshare', 'baostock'}
 
         # 检查MongoDB（最高优先级）
@@ -507,33 +499,8 @@ class DataSourceManager:
         return available
 
     def _get_datasource_configs_from_db(self) -> dict:
-        """从数据库读取数据源配置（包括 API Key）"""
-        try:
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
-
-            # 从 system_configs 集合读取激活的配置
-            config = db.system_configs.find_one({"is_active": True})
-            if not config:
-                return {}
-
-            # 提取数据源配置
-            datasource_configs = config.get('data_source_configs', [])
-
-            # 构建配置字典 {数据源名称: {api_key, api_secret, ...}}
-            result = {}
-            for ds_config in datasource_configs:
-                name = ds_config.get('name', '').lower()
-                result[name] = {
-                    'api_key': ds_config.get('api_key', ''),
-                    'api_secret': ds_config.get('api_secret', ''),
-                    'config_params': ds_config.get('config_params', {})
-                }
-
-            return result
-        except Exception as e:
-            logger.warning(f"⚠️ 从数据库读取数据源配置失败: {e}")
-            return {}
+        """读取数据源配置（包括 API Key），来自进程内配置快照"""
+        return get_datasource_config_snapshot().credentials()
 
     def get_current_source(self) -> ChinaDataSource:
         """获取当前数据源"""
@@ -923,29 +890,60 @@ class DataSourceManager:
         """
         logger.info(f"📊 [DataFrame接口] 获取股票数据: {symbol} ({start_date} 到 {end_date})")
 
+        # 区间缓存：命中已缓存区间时直接切片，否则只获取缺失的前端/尾端日期段
+        current_tried = []
+        if start_date and end_date:
+            from .cache.range_cache import get_ohlcv_range_cache, is_range_cache_enabled
+            if is_range_cache_enabled():
+                try:
+                    # 缓存只保存当前数据源的数据，键包含数据源和复权方式；当前数据源失败时不缓存，走下面的降级
+                    source = self.current_source
+
+                    def fetch_current(s, sd, ed):
+                        current_tried.append(True)
+                        return self._fetch_stock_dataframe(s, sd, ed, period, fallback=False)
+
+                    df = get_ohlcv_range_cache().get_range(
+                        symbol, start_date, end_date,
+                        fetcher=fetch_current,
+                        period=period,
+                        adjust=DATAFRAME_PRICE_ADJUST.get(source, ""),
+                        provider=source.name.lower(),
+                    )
+                    if df is not None and not df.empty:
+                        return df
+                except Exception as e:
+                    logger.warning(f"⚠️ [DataFrame接口] 区间缓存不可用，直接获取: {e}")
+
+        # 区间缓存已经请求过当前数据源时直接降级，不再重复请求
+        return self._fetch_stock_dataframe(symbol, start_date, end_date, period, skip_current=bool(current_tried))
+
+    def _fetch_stock_dataframe(self, symbol: str, start_date: str = None, end_date: str = None, period: str = "daily",
+                               fallback: bool = True, skip_current: bool = False) -> pd.DataFrame:
+        """
+        从数据源获取股票数据 DataFrame（不经过区间缓存），支持自动降级
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            period: 数据周期（daily/weekly/monthly）
+            fallback: 当前数据源失败时是否降级到其他数据源
+            skip_current: 跳过当前数据源，直接降级（调用方已经请求过当前数据源）
+
+        Returns:
+            pd.DataFrame: 标准化后的 DataFrame，失败时返回空 DataFrame
+        """
         try:
             # 尝试当前数据源
-            df = None
-            if self.current_source == ChinaDataSource.MONGODB:
-                from tradingagents.dataflows.cache.mongodb_cache_adapter import get_mongodb_cache_adapter
-                adapter = get_mongodb_cache_adapter()
-                df = adapter.get_historical_data(symbol, start_date, end_date, period=period)
-            elif self.current_source == ChinaDataSource.TUSHARE:
-                from .providers.china.tushare import get_tushare_provider
-                provider = get_tushare_provider()
-                df = provider.get_daily_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.AKSHARE:
-                from .providers.china.akshare import get_akshare_provider
-                provider = get_akshare_provider()
-                df = provider.get_stock_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.BAOSTOCK:
-                from .providers.china.baostock import get_baostock_provider
-                provider = get_baostock_provider()
-                df = provider.get_stock_data(symbol, start_date, end_date)
+            if not skip_current:
+                df = self._fetch_dataframe_from_source(self.current_source, symbol, start_date, end_date, period)
+                if df is not None and not df.empty:
+                    logger.info(f"✅ [DataFrame接口] 从 {self.current_source.value} 获取成功: {len(df)}条")
+                    return self._standardize_dataframe(df)
 
-            if df is not None and not df.empty:
-                logger.info(f"✅ [DataFrame接口] 从 {self.current_source.value} 获取成功: {len(df)}条")
-                return self._standardize_dataframe(df)
+            if not fallback:
+                return pd.DataFrame()
 
             # 降级到其他数据源
             logger.warning(f"⚠️ [DataFrame接口] {self.current_source.value} 失败，尝试降级")
@@ -953,23 +951,7 @@ class DataSourceManager:
                 if source == self.current_source:
                     continue
                 try:
-                    if source == ChinaDataSource.MONGODB:
-                        from tradingagents.dataflows.cache.mongodb_cache_adapter import get_mongodb_cache_adapter
-                        adapter = get_mongodb_cache_adapter()
-                        df = adapter.get_historical_data(symbol, start_date, end_date, period=period)
-                    elif source == ChinaDataSource.TUSHARE:
-                        from .providers.china.tushare import get_tushare_provider
-                        provider = get_tushare_provider()
-                        df = provider.get_daily_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.AKSHARE:
-                        from .providers.china.akshare import get_akshare_provider
-                        provider = get_akshare_provider()
-                        df = provider.get_stock_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.BAOSTOCK:
-                        from .providers.china.baostock import get_baostock_provider
-                        provider = get_baostock_provider()
-                        df = provider.get_stock_data(symbol, start_date, end_date)
-
+                    df = self._fetch_dataframe_from_source(source, symbol, start_date, end_date, period)
                     if df is not None and not df.empty:
                         logger.info(f"✅ [DataFrame接口] 降级到 {source.value} 成功: {len(df)}条")
                         return self._standardize_dataframe(df)
@@ -984,6 +966,27 @@ class DataSourceManager:
             logger.error(f"❌ [DataFrame接口] 获取失败: {e}", exc_info=True)
             return pd.DataFrame()
 
+    def _fetch_dataframe_from_source(self, source: ChinaDataSource, symbol: str, start_date: str = None,
+                                     end_date: str = None, period: str = "daily") -> Optional[pd.DataFrame]:
+        """从指定数据源获取原始 DataFrame（未标准化）"""
+        if source == ChinaDataSource.MONGODB:
+            from tradingagents.dataflows.cache.mongodb_cache_adapter import get_mongodb_cache_adapter
+            adapter = get_mongodb_cache_adapter()
+            return adapter.get_historical_data(symbol, start_date, end_date, period=period)
+        if source == ChinaDataSource.TUSHARE:
+            from .providers.china.tushare import get_tushare_provider
+            provider = get_tushare_provider()
+            return provider.get_daily_data(symbol, start_date, end_date)
+        if source == ChinaDataSource.AKSHARE:
+            from .providers.china.akshare import get_akshare_provider
+            provider = get_akshare_provider()
+            return provider.get_stock_data(symbol, start_date, end_date)
+        if source == ChinaDataSource.BAOSTOCK:
+            from .providers.china.baostock import get_baostock_provider
+            provider = get_baostock_provider()
+            return provider.get_stock_data(symbol, start_date, end_date)
+        return None
+
     def _standardize_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         标准化 DataFrame 列名和格式
@@ -2249,7 +2252,7 @@ class USDataSourceManager:
 
     def _get_data_source_priority_order(self, symbol: Optional[str] = None) -> List[USDataSource]:
         """
-        从数据库获取美股数据源优先级顺序（用于降级）
+        获取美股数据源优先级顺序（用于降级），来自进程内配置快照，结果按快照缓存
 
         Args:
             symbol: 股票代码
@@ -2257,44 +2260,39 @@ class USDataSourceManager:
         Returns:
             按优先级排序的数据源列表（不包含MongoDB）
         """
-        try:
-            # 从数据库读取数据源配置
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
-
-            # 方法1: 从 datasource_groupings 集合读取（推荐）
-            groupings_collection = db.datasource_groupings
-            groupings = list(groupings_collection.find({
-                "market_category_id": "us_stocks",
-                "enabled": True
-            }).sort("priority", -1))  # 降序排序，优先级高的在前
-
-            if groupings:
-                # 转换为 USDataSource 枚举
-                # 🔥 数据源名称映射（数据库名称 → USDataSource 枚举）
-                source_mapping = {
-                    'yfinance': USDataSource.YFINANCE,
-                    'yahoo_finance': USDataSource.YFINANCE,  # 别名
-                    'alpha_vantage': USDataSource.ALPHA_VANTAGE,
-                    'finnhub': USDataSource.FINNHUB,
-                }
+        snapshot = get_datasource_config_snapshot()
+        order = snapshot.memoize(
+            ("us_priority", tuple(self.available_sources)),
+            lambda: self._resolve_data_source_priority_order(snapshot.us_groupings),
+        )
+        return list(order)
+
+    def _resolve_data_source_priority_order(self, groupings: Optional[List[Dict[str, Any]]]) -> List[USDataSource]:
+        """按美股数据源分组（已按优先级降序）解析降级顺序"""
+        if groupings:
+            # 转换为 USDataSource 枚举
+            # 🔥 数据源名称映射（数据库名称 → USDataSource 枚举）
+            source_mapping = {
+                'yfinance': USDataSource.YFINANCE,
+                'yahoo_finance': USDataSource.YFINANCE,  # 别名
+                'alpha_vantage': USDataSource.ALPHA_VANTAGE,
+                'finnhub': USDataSource.FINNHUB,
+            }
 
-                result = []
-                for grouping in groupings:
-                    ds_name = grouping.get('data_source_name', '').lower()
-                    if ds_name in source_mapping:
-                        source = source_mapping[ds_name]
-                        # 排除 MongoDB（MongoDB 是最高优先级，不参与降级）
-                        if source != USDataSource.MONGODB and source in self.available_sources:
-                            result.append(source)
-
-                if result:
-                    logger.info(f"✅ [美股数据源优先级] 从数据库读取: {[s.value for s in result]}")
-                    return result
+            result = []
+            for grouping in groupings:
+                ds_name = grouping.get('data_source_name', '').lower()
+                if ds_name in source_mapping:
+                    source = source_mapping[ds_name]
+                    # 排除 MongoDB（MongoDB 是最高优先级，不参与降级）
+                    if source != USDataSource.MONGODB and source in self.available_sources:
+                        result.append(source)
 
-            logger.warning("⚠️ [美股数据源优先级] 数据库中没有配置，使用默认顺序")
-        except Exception as e:
-            logger.warning(f"⚠️ [美股数据源优先级] 从数据库读取失败: {e}，使用默认顺序")
+            if result:
+                logger.info(f"✅ [美股数据源优先级] 从数据库配置读取: {[s.value for s in result]}")
+                return result
+
+        logger.warning("⚠️ [美股数据源优先级] 数据库中没有配置，使用默认顺序")
 
         # 回退到默认顺序
         # 默认顺序：yfinance > Alpha Vantage > Finnhub
@@ -2387,66 +2385,32 @@ class USDataSourceManager:
         return available
 
     def _get_enabled_sources_from_db(self) -> List[str]:
-        """从数据库读取启用的数据源列表"""
-        try:
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
-
-            # 从 datasource_groupings 集合读取
-            groupings = list(db.datasource_groupings.find({
-                "market_category_id": "us_stocks",
-                "enabled": True
-            }))
-
-            # 🔥 数据源名称映射（数据库名称 → 代码中使用的名称）
-            name_mapping = {
-                'alpha vantage': 'alpha_vantage',
-                'yahoo finance': 'yfinance',
-                'finnhub': 'finnhub',
-            }
-
-            result = []
-            for g in groupings:
-                db_name = g.get('data_source_name', '').lower()
-                # 使用映射表转换名称
-                code_name = name_mapping.get(db_name, db_name)
-                result.append(code_name)
-                logger.debug(f"🔄 数据源名称映射: '{db_name}' → '{code_name}'")
-
-            return result
-        except Exception as e:
-            logger.warning(f"⚠️ 从数据库读取启用的数据源失败: {e}")
-            # 默认全部启用
+        """读取启用的数据源列表（来自进程内配置快照）"""
+        groupings = get_datasource_config_snapshot().us_groupings
+        if groupings is None:
+            logger.warning("⚠️ 从数据库读取启用的数据源失败，默认全部启用")
             return ['yfinance', 'alpha_vantage', 'finnhub']
 
-    def _get_datasource_configs_from_db(self) -> dict:
-        """从数据库读取数据源配置（包括 API Key）"""
-        try:
-            from app.core.database import get_mongo_db_sync
-            db = get_mongo_db_sync()
+        # 🔥 数据源名称映射（数据库名称 → 代码中使用的名称）
+        name_mapping = {
+            'alpha vantage': 'alpha_vantage',
+            'yahoo finance': 'yfinance',
+            'finnhub': 'finnhub',
+        }
 
-            # 从 system_configs 集合读取激活的配置
-            config = db.system_configs.find_one({"is_active": True})
-            if not config:
-                return {}
+        result = []
+        for g in groupings:
+            db_name = g.get('data_source_name', '').lower()
+            # 使用映射表转换名称
+            code_name = name_mapping.get(db_name, db_name)
+            result.append(code_name)
+            logger.debug(f"🔄 数据源名称映射: '{db_name}' → '{code_name}'")
 
-            # 提取数据源配置
-            datasource_configs = config.get('data_source_configs', [])
-
-            # 构建配置字典 {数据源名称: {api_key, api_secret, ...}}
-            result = {}
-            for ds_config in datasource_configs:
-                name = ds_config.get('name', '').lower()
-                result[name] = {
-                    'api_key': ds_config.get('api_key', ''),
-                    'api_secret': ds_config.get('api_secret', ''),
-                    'config_params': ds_config.get('config_params', {})
-                }
+        return result
 
-            return result
-        except Exception as e:
-            logger.warning(f"⚠️ 从数据库读取数据源配置失败: {e}")
-            return {}
+    def _get_datasource_configs_from_db(self) -> dict:
+        """读取数据源配置（包括 API Key），来自进程内配置快照"""
+        return get_datasource_config_snapshot().credentials()
 
     def get_current_source(self) -> USDataSource:
         """获取当前数据源"""
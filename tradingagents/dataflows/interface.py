@@ -52,61 +52,73 @@ except (ImportError, AttributeError) as e:
 
 # ==================== 数据源配置读取 ====================
 
+def _resolve_enabled_data_sources(data_source_configs, market_labels: tuple, supported_types: tuple,
+                                  market_name: str, default: list) -> list:
+    """
+    从系统配置中筛选某个市场启用的数据源
+
+    Args:
+        data_source_configs: 配置快照中的 data_source_configs（None 表示读取失败）
+        market_labels: 市场标识（中英文），如 ('港股', 'hk_stocks')
+        supported_types: 该市场支持的数据源类型
+        market_name: 日志中显示的市场名称
+        default: 没有可用配置时的默认顺序
+
+    Returns:
+        list: 按优先级排序的数据源列表
+    """
+    if data_source_configs is None:
+        logger.warning(f"⚠️ [{market_name}数据源] 从数据库读取失败，使用默认顺序")
+        return list(default)
+    if not data_source_configs:
+        logger.warning(f"⚠️ [{market_name}数据源] 数据库中没有配置，使用默认顺序")
+        return list(default)
+
+    enabled_sources = []
+    for ds in data_source_configs:
+        if not ds.get('enabled', True):
+            continue
+
+        # 检查是否支持该市场（支持中英文标识）
+        market_categories = ds.get('market_categories', [])
+        if market_categories and not any(label in market_categories for label in market_labels):
+            continue
+
+        # 映射数据源类型
+        ds_type = ds.get('type', '').lower()
+        if ds_type in supported_types:
+            enabled_sources.append({
+                'type': ds_type,
+                'priority': ds.get('priority', 0)
+            })
+
+    # 按优先级排序（数字越大优先级越高）
+    enabled_sources.sort(key=lambda x: x['priority'], reverse=True)
+
+    result = [s['type'] for s in enabled_sources]
+    if result:
+        logger.info(f"✅ [{market_name}数据源] 从数据库读取: {result}")
+        return result
+
+    logger.warning(f"⚠️ [{market_name}数据源] 数据库中没有启用的{market_name}数据源，使用默认顺序")
+    return list(default)
+
+
 def _get_enabled_hk_data_sources() -> list:
     """
-    从数据库读取用户启用的港股数据源配置
+    读取用户启用的港股数据源配置（来自进程内配置快照，配置变更后自动刷新）
 
     Returns:
         list: 按优先级排序的数据源列表，如 ['akshare', 'yfinance']
     """
     try:
-        # 尝试从数据库读取配置
-        from app.core.database import get_mongo_db_sync
-        db = get_mongo_db_sync()
-
-        # 获取最新的激活配置
-        config_data = db.system_configs.find_one(
-            {"is_active": True},
-            sort=[("version", -1)]
-        )
-
-        if config_data and config_data.get('data_source_configs'):
-            data_source_configs = config_data.get('data_source_configs', [])
-
-            # 过滤出启用的港股数据源
-            enabled_sources = []
-            for ds in data_source_configs:
-                if not ds.get('enabled', True):
-                    continue
-
-                # 检查是否支持港股市场（支持中英文标识）
-                market_categories = ds.get('market_categories', [])
-                if market_categories:
-                    # 支持 '港股' 或 'hk_stocks'
-                    if '港股' not in market_categories and 'hk_stocks' not in market_categories:
-                        continue
-
-                # 映射数据源类型
-                ds_type = ds.get('type', '').lower()
-                if ds_type in ['akshare', 'yfinance', 'finnhub']:
-                    enabled_sources.append({
-                        'type': ds_type,
-                        'priority': ds.get('priority', 0)
-                    })
-
-            # 按优先级排序（数字越大优先级越高）
-            enabled_sources.sort(key=lambda x: x['priority'], reverse=True)
-
-            result = [s['type'] for s in enabled_sources]
-            if result:
-                logger.info(f"✅ [港股数据源] 从数据库读取: {result}")
-                return result
-            else:
-                logger.warning(f"⚠️ [港股数据源] 数据库中没有启用的港股数据源，使用默认顺序")
-        else:
-            logger.warning("⚠️ [港股数据源] 数据库中没有配置，使用默认顺序")
+        from tradingagents.config.datasource_snapshot import get_datasource_config_snapshot
+        snapshot = get_datasource_config_snapshot()
+        return list(snapshot.memoize("hk_enabled_sources", lambda: _resolve_enabled_data_sources(
+            snapshot.data_source_configs, ('港股', 'hk_stocks'), ('akshare', 'yfinance', 'finnhub'),
+            "港股", ['akshare', 'yfinance'])))
     except Exception as e:
-        logger.warning(f"⚠️ [港股数据源] 从数据库读取失败: {e}，使用默认顺序")
+        logger.warning(f"⚠️ [港股数据源] 读取配置失败: {e}，使用默认顺序")
 
     # 回退到默认顺序
     return ['akshare', 'yfinance']
@@ -114,59 +126,19 @@ def _get_enabled_hk_data_sources() -> list:
 
 def _get_enabled_us_data_sources() -> list:
     """
-    从数据库读取用户启用的美股数据源配置
+    读取用户启用的美股数据源配置（来自进程内配置快照，配置变更后自动刷新）
 
     Returns:
         list: 按优先级排序的数据源列表，如 ['yfinance', 'finnhub']
     """
     try:
-        # 尝试从数据库读取配置
-        from app.core.database import get_mongo_db_sync
-        db = get_mongo_db_sync()
-
-        # 获取最新的激活配置
-        config_data = db.system_configs.find_one(
-            {"is_active": True},
-            sort=[("version", -1)]
-        )
-
-        if config_data and config_data.get('data_source_configs'):
-            data_source_configs = config_data.get('data_source_configs', [])
-
-            # 过滤出启用的美股数据源
-            enabled_sources = []
-            for ds in data_source_configs:
-                if not ds.get('enabled', True):
-                    continue
-
-                # 检查是否支持美股市场（支持中英文标识）
-                market_categories = ds.get('market_categories', [])
-                if market_categories:
-                    # 支持 '美股' 或 'us_stocks'
-                    if '美股' not in market_categories and 'us_stocks' not in market_categories:
-                        continue
-
-                # 映射数据源类型
-                ds_type = ds.get('type', '').lower()
-                if ds_type in ['yfinance', 'finnhub']:
-                    enabled_sources.append({
-                        'type': ds_type,
-                        'priority': ds.get('priority', 0)
-                    })
-
-            # 按优先级排序（数字越大优先级越高）
-            enabled_sources.sort(key=lambda x: x['priority'], reverse=True)
-
-            result = [s['type'] for s in enabled_sources]
-            if result:
-                logger.info(f"✅ [美股数据源] 从数据库读取: {result}")
-                return result
-            else:
-                logger.warning(f"⚠️ [美股数据源] 数据库中没有启用的美股数据源，使用默认顺序")
-        else:
-            logger.warning("⚠️ [美股数据源] 数据库中没有配置，使用默认顺序")
+        from tradingagents.config.datasource_snapshot import get_datasource_config_snapshot
+        snapshot = get_datasource_config_snapshot()
+        return list(snapshot.memoize("us_enabled_sources", lambda: _resolve_enabled_data_sources(
+            snapshot.data_source_configs, ('美股', 'us_stocks'), ('yfinance', 'finnhub'),
+            "美股", ['yfinance', 'finnhub'])))
     except Exception as e:
-        logger.warning(f"⚠️ [美股数据源] 从数据库读取失败: {e}，使用默认顺序")
+        logger.warning(f"⚠️ [美股数据源] 读取配置失败: {e}，使用默认顺序")
 
     # 回退到默认顺序
     return ['yfinance', 'finnhub']
@@ -1,45 +1,33 @@
 """
 新闻数据获取模块
 统一管理各种新闻数据源
+
+各新闻源在第一次访问时才导入（见 tradingagents/utils/lazy_imports.py）。
 """
 
-# 导入 Google News
-try:
-    from .google_news import getNewsData
-    GOOGLE_NEWS_AVAILABLE = True
-except ImportError:
-    getNewsData = None
-    GOOGLE_NEWS_AVAILABLE = False
+from tradingagents.utils.lazy_imports import lazy_exports
 
-# 导入 Reddit
-try:
-    from .reddit import fetch_top_from_category
-    REDDIT_AVAILABLE = True
-except ImportError:
-    fetch_top_from_category = None
-    REDDIT_AVAILABLE = False
+_EXPORTS = {
+    # Google News
+    'getNewsData': ('.google_news', 'getNewsData'),
+    # Reddit
+    'fetch_top_from_category': ('.reddit', 'fetch_top_from_category'),
+    # Realtime News
+    'get_realtime_news': ('.realtime_news', 'get_realtime_news'),
+    'get_news_with_sentiment': ('.realtime_news', 'get_news_with_sentiment'),
+    'search_news_by_keyword': ('.realtime_news', 'search_news_by_keyword'),
+    # Chinese Finance
+    'ChineseFinanceDataAggregator': ('.chinese_finance', 'ChineseFinanceDataAggregator'),
+}
 
-# 导入实时新闻
-try:
-    from .realtime_news import (
-        get_realtime_news,
-        get_news_with_sentiment,
-        search_news_by_keyword
-    )
-    REALTIME_NEWS_AVAILABLE = True
-except ImportError:
-    get_realtime_news = None
-    get_news_with_sentiment = None
-    search_news_by_keyword = None
-    REALTIME_NEWS_AVAILABLE = False
+_FLAGS = {
+    'GOOGLE_NEWS_AVAILABLE': 'getNewsData',
+    'REDDIT_AVAILABLE': 'fetch_top_from_category',
+    'REALTIME_NEWS_AVAILABLE': 'get_realtime_news',
+    'CHINESE_FINANCE_AVAILABLE': 'ChineseFinanceDataAggregator',
+}
 
-# 导入中国财经数据聚合器
-try:
-    from .chinese_finance import ChineseFinanceDataAggregator
-    CHINESE_FINANCE_AVAILABLE = True
-except ImportError:
-    ChineseFinanceDataAggregator = None
-    CHINESE_FINANCE_AVAILABLE = False
+__getattr__, __dir__ = lazy_exports(globals(), _EXPORTS, _FLAGS)
 
 __all__ = [
     # Google News
@@ -60,4 +48,3 @@ __all__ = [
     'ChineseFinanceDataAggregator',
     'CHINESE_FINANCE_AVAILABLE',
 ]
-
@@ -1,99 +1,49 @@
 """
 统一数据源提供器包
 按市场分类组织数据提供器
+
+各市场的提供器在第一次访问时才导入（见 tradingagents/utils/lazy_imports.py），
+``from tradingagents.dataflows.providers.china.tushare import ...`` 只加载 Tushare。
 """
 from .base_provider import BaseStockDataProvider
+from tradingagents.utils.lazy_imports import lazy_exports, module_available
 
-# 导入中国市场提供器（新路径）
-try:
-    from .china import (
-        AKShareProvider,
-        TushareProvider,
-        BaostockProvider as BaoStockProvider,
-        AKSHARE_AVAILABLE,
-        TUSHARE_AVAILABLE,
-        BAOSTOCK_AVAILABLE
-    )
-except ImportError:
-    # 向后兼容：尝试从旧路径导入
-    try:
-        from .tushare_provider import TushareProvider
-    except ImportError:
-        TushareProvider = None
-
-    try:
-        from .akshare_provider import AKShareProvider
-    except ImportError:
-        AKShareProvider = None
-
-    try:
-        from .baostock_provider import BaoStockProvider
-    except ImportError:
-        BaoStockProvider = None
-
-    AKSHARE_AVAILABLE = AKShareProvider is not None
-    TUSHARE_AVAILABLE = TushareProvider is not None
-    BAOSTOCK_AVAILABLE = BaoStockProvider is not None
-
-# 导入港股提供器
-try:
-    from .hk import (
-        ImprovedHKStockProvider,
-        get_improved_hk_provider,
-        HK_PROVIDER_AVAILABLE
-    )
-except ImportError:
-    ImprovedHKStockProvider = None
-    get_improved_hk_provider = None
-    HK_PROVIDER_AVAILABLE = False
-
-# 导入美股提供器
-try:
-    from .us import (
-        YFinanceUtils,
-        OptimizedUSDataProvider,
-        get_data_in_range,
-        YFINANCE_AVAILABLE,
-        OPTIMIZED_US_AVAILABLE,
-        FINNHUB_AVAILABLE
-    )
-except ImportError:
-    # 向后兼容：尝试从旧路径导入
-    try:
-        from ..yfin_utils import YFinanceUtils
-    except ImportError:
-        YFinanceUtils = None
-
-    try:
-        from ..optimized_us_data import OptimizedUSDataProvider
-    except ImportError:
-        OptimizedUSDataProvider = None
-
-    try:
-        from ..finnhub_utils import get_data_in_range
-    except ImportError:
-        get_data_in_range = None
-
-    YFINANCE_AVAILABLE = YFinanceUtils is not None
-    OPTIMIZED_US_AVAILABLE = OptimizedUSDataProvider is not None
-    FINNHUB_AVAILABLE = get_data_in_range is not None
+_EXPORTS = {
+    # 中国市场
+    'TushareProvider': ('.china', 'TushareProvider'),
+    'AKShareProvider': ('.china', 'AKShareProvider'),
+    'BaoStockProvider': ('.china', 'BaostockProvider'),
 
-# 其他提供器（预留）
-try:
-    from .yahoo_provider import YahooProvider
-except ImportError:
-    YahooProvider = None
+    # 港股
+    'ImprovedHKStockProvider': ('.hk', 'ImprovedHKStockProvider'),
+    'get_improved_hk_provider': ('.hk', 'get_improved_hk_provider'),
 
-try:
-    from .finnhub_provider import FinnhubProvider
-except ImportError:
-    FinnhubProvider = None
+    # 美股
+    'YFinanceUtils': ('.us', 'YFinanceUtils'),
+    'OptimizedUSDataProvider': ('.us', 'OptimizedUSDataProvider'),
+    'get_data_in_range': ('.us', 'get_data_in_range'),
+
+    # 其他提供器（预留）
+    'YahooProvider': ('.yahoo_provider', 'YahooProvider'),
+    'FinnhubProvider': ('.finnhub_provider', 'FinnhubProvider'),
+}
+
+# 可用性标志：子包导入失败时同样为 False（而不是 None）
+_FLAGS = {
+    'AKSHARE_AVAILABLE': 'AKShareProvider',
+    'TUSHARE_AVAILABLE': 'TushareProvider',
+    'BAOSTOCK_AVAILABLE': 'BaoStockProvider',
+    'HK_PROVIDER_AVAILABLE': 'ImprovedHKStockProvider',
+    'OPTIMIZED_US_AVAILABLE': 'OptimizedUSDataProvider',
+    'FINNHUB_AVAILABLE': 'get_data_in_range',
+}
+
+# 在导入时确定（只检查是否安装，不导入 yfinance），始终为 bool
+YFINANCE_AVAILABLE = module_available('yfinance')
 
 # TDXProvider 已移除
-# try:
-#     from .tdx_provider import TDXProvider
-# except ImportError:
-#     TDXProvider = None
+
+__getattr__, __dir__ = lazy_exports(globals(), _EXPORTS, _FLAGS)
 
 __all__ = [
     # 基类
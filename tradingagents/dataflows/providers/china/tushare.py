@@ -617,6 +617,89 @@ class TushareProvider(BaseStockDataProvider):
             self.logger.error(f"❌ 获取每日基础数据失败 trade_date={trade_date}: {e}")
             return None
     
+    async def get_trade_dates(self, start_date: Union[str, date], end_date: Union[str, date]) -> Optional[List[str]]:
+        """获取交易日历中的开市日期（YYYY-MM-DD，升序）"""
+        if not self.is_available():
+            return None
+
+        try:
+            df = await asyncio.to_thread(
+                self.api.trade_cal,
+                exchange='SSE',
+                start_date=self._format_date(start_date),
+                end_date=self._format_date(end_date),
+                is_open='1',
+                fields='cal_date'
+            )
+            if df is None or df.empty:
+                return []
+
+            return sorted(f"{d[:4]}-{d[4:6]}-{d[6:8]}" for d in df['cal_date'].astype(str))
+
+        except Exception as e:
+            self.logger.error(f"❌ 获取交易日历失败 {start_date}~{end_date}: {e}")
+            return None
+
+    async def get_adj_factor(self, trade_date: Union[str, date]) -> Optional[pd.Series]:
+        """获取某个交易日全市场的复权因子（索引为6位代码）"""
+        if not self.is_available():
+            return None
+
+        try:
+            df = await asyncio.to_thread(
+                self.api.adj_factor,
+                trade_date=self._format_date(trade_date)
+            )
+            if df is None or df.empty:
+                return None
+
+            factors = df.set_index(df['ts_code'].str.split('.').str[0])['adj_factor']
+            return factors[~factors.index.duplicated(keep='last')].astype(float)
+
+        except Exception as e:
+            self.logger.error(f"❌ 获取复权因子失败 trade_date={trade_date}: {e}")
+            return None
+
+    async def get_market_daily(self, trade_date: Union[str, date]) -> Optional[pd.DataFrame]:
+        """
+        获取某个交易日全市场的日线数据（不复权）
+
+        每个接口只调用一次：daily（行情）+ adj_factor（复权因子）+ daily_basic（换手率、估值）。
+        返回列：code, trade_date, open, high, low, close, pre_close, change, pct_chg,
+        volume, amount, adj_factor, turnover_rate, volume_ratio, pe, pb
+        单位与 pro_bar 一致（成交量：手，成交额：千元）。
+
+        Returns:
+            DataFrame，该日无数据（非交易日或尚未收盘入库）时返回 None
+        """
+        if not self.is_available():
+            return None
+
+        date_str = self._format_date(trade_date)
+        try:
+            df = await asyncio.to_thread(self.api.daily, trade_date=date_str)
+            if df is None or df.empty:
+                self.logger.info(f"ℹ️ Tushare daily 无数据: trade_date={date_str}")
+                return None
+
+            df = df.rename(columns={'vol': 'volume'})
+            df['code'] = df['ts_code'].str.split('.').str[0]
+
+            factors = await self.get_adj_factor(date_str)
+            df['adj_factor'] = df['code'].map(factors) if factors is not None else float('nan')
+
+            basic_df = await self.get_daily_basic(date_str)
+            if basic_df is not None:
+                basic_cols = [c for c in ('turnover_rate', 'volume_ratio', 'pe', 'pb') if c in basic_df.columns]
+                df = df.merge(basic_df[['ts_code'] + basic_cols], on='ts_code', how='left')
+
+            self.logger.info(f"✅ 获取全市场日线: {date_str} {len(df)}条记录")
+            return df.drop(columns=['ts_code']).reset_index(drop=True)
+
+        except Exception as e:
+            self.logger.error(f"❌ 获取全市场日线失败 trade_date={date_str}: {e}")
+            return None
+
     async def find_latest_trade_date(self) -> Optional[str]:
         """查找最新交易日期"""
         if not self.is_available():
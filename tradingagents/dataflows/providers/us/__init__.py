@@ -1,34 +1,31 @@
 """
 美股数据提供器
 包含 Finnhub, Yahoo Finance 等美股数据源
+
+各提供器在第一次访问时才导入（见 tradingagents/utils/lazy_imports.py）。
 """
 
-# 导入 Finnhub 工具
-try:
-    from .finnhub import get_data_in_range
-    FINNHUB_AVAILABLE = True
-except ImportError:
-    get_data_in_range = None
-    FINNHUB_AVAILABLE = False
-
-# 导入 Yahoo Finance 工具
-try:
-    from .yfinance import YFinanceUtils
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFinanceUtils = None
-    YFINANCE_AVAILABLE = False
-
-# 导入优化的美股数据提供器
-try:
-    from .optimized import OptimizedUSDataProvider
-    OPTIMIZED_US_AVAILABLE = True
-except ImportError:
-    OptimizedUSDataProvider = None
-    OPTIMIZED_US_AVAILABLE = False
-
-# 默认使用优化的提供器
-DefaultUSProvider = OptimizedUSDataProvider
+from tradingagents.utils.lazy_imports import lazy_exports, module_available
+
+_EXPORTS = {
+    # Finnhub
+    'get_data_in_range': ('.finnhub', 'get_data_in_range'),
+    # Yahoo Finance
+    'YFinanceUtils': ('.yfinance', 'YFinanceUtils'),
+    # 优化的提供器（默认使用）
+    'OptimizedUSDataProvider': ('.optimized', 'OptimizedUSDataProvider'),
+    'DefaultUSProvider': ('.optimized', 'OptimizedUSDataProvider'),
+}
+
+_FLAGS = {
+    'FINNHUB_AVAILABLE': 'get_data_in_range',
+    'OPTIMIZED_US_AVAILABLE': 'OptimizedUSDataProvider',
+}
+
+# 在导入时确定（只检查是否安装，不导入 yfinance），始终为 bool
+YFINANCE_AVAILABLE = module_available('yfinance')
+
+__getattr__, __dir__ = lazy_exports(globals(), _EXPORTS, _FLAGS)
 
 __all__ = [
     # Finnhub
@@ -44,4 +41,3 @@ __all__ = [
     'OPTIMIZED_US_AVAILABLE',
     'DefaultUSProvider',
 ]
-
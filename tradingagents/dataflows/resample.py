@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+K线周期重采样
+
+stock_daily_quotes 以前按 period=daily/weekly/monthly 分别存储三套序列，每个同步服务都要
+为每只股票分别拉取并写入三次。周线/月线完全可以由日线推导，分钟级的 5/15/30/60 分钟线
+也可以由 1 分钟线推导，这里提供按需重采样：
+
+- 日线 → 周线/月线：按自然周（周一~周日）/自然月分组。分组只包含实际存在的交易日，
+  所以节假日、停牌自动按 A 股交易日历处理；周期标签取组内最后一个交易日
+  （与 Tushare/AKShare 的周线、月线 trade_date 一致）
+- 1 分钟线 → N 分钟线：按 A 股交易时段（09:30-11:30、13:00-15:00）对齐分桶，
+  标签为区间结束时刻（60 分钟线为 10:30/11:30/14:00/15:00），集合竞价的 09:30 并入第一根
+- OHLCV 聚合全部向量化：open 取首、high 取最大、low 取最小、close 取末、volume/amount 求和；
+  pre_close/change/pct_chg 按上一根重采样K线重新计算
+- 结果按 (cache_key, 周期, 输入指纹) 做进程内 LRU 缓存，输入数据变化（新增K线）后自动失效
+
+配置（环境变量）：
+    TA_RESAMPLE_ENABLED=true     # 存储中没有目标周期时，是否由基础周期重采样
+    TA_RESAMPLE_CACHE_SIZE=256   # 重采样结果缓存条数
+    MULTI_PERIOD_SYNC_RESAMPLE_DERIVED=true
+                                 # 周线/月线不再同步（app 配置项），读路径忽略存储中已停止更新的周线/月线，
+                                 # 优先由日线重采样（见 prefer_resampled）
+
+使用方法：
+    from tradingagents.dataflows.resample import base_period_for, get_bar_resampler
+
+    base = base_period_for("weekly")          # "daily"
+    weekly = get_bar_resampler().resample(daily_df, "weekly", cache_key=("000001", "tushare"))
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+# 可推导的周期 -> 基础周期
+DERIVED_PERIODS = {
+    "weekly": "daily",
+    "monthly": "daily",
+    "5min": "1min",
+    "15min": "1min",
+    "30min": "1min",
+    "60min": "1min",
+}
+
+# 每根目标K线大约对应的基础K线数（用于按 limit 估算需要读取的基础数据量）
+BASE_BARS_PER_BAR = {
+    "weekly": 5,
+    "monthly": 23,
+    "5min": 5,
+    "15min": 15,
+    "30min": 30,
+    "60min": 60,
+}
+
+# A 股交易时段（分钟数，自 00:00 起）
+_SESSIONS = ((9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60))
+
+_DATE_COLUMNS = ("trade_date", "date")
+_TIME_COLUMNS = ("trade_time", "datetime", "time", "trade_date", "date")
+_SUM_COLUMNS = ("volume", "vol", "amount")
+_DERIVED_COLUMNS = ("pre_close", "change", "pct_chg")
+
+
+def resample_enabled() -> bool:
+    return os.getenv("TA_RESAMPLE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+
+
+def prefer_resampled(period: str, resample_derived: Optional[bool] = None) -> bool:
+    """
+    是否应直接由日线重采样周线/月线，而不是读取存储中的周线/月线
+
+    MULTI_PERIOD_SYNC_RESAMPLE_DERIVED 开启（默认）时周线/月线不再同步，已有部署中存储的
+    周线/月线会停止更新、越来越旧，因此读路径先重采样日线，没有日线时才回退到存储的数据。
+
+    Args:
+        resample_derived: MULTI_PERIOD_SYNC_RESAMPLE_DERIVED 的值，None 时读取环境变量
+    """
+    if DERIVED_PERIODS.get(period) != "daily" or not resample_enabled():
+        return False
+    if resample_derived is None:
+        resample_derived = os.getenv("MULTI_PERIOD_SYNC_RESAMPLE_DERIVED", "true").lower() in ("true", "1", "yes", "on")
+    return resample_derived
+
+
+def base_period_for(period: str) -> Optional[str]:
+    """目标周期对应的基础周期；不可推导时返回 None"""
+    return DERIVED_PERIODS.get(period)
+
+
+def _find_column(df: pd.DataFrame, candidates) -> Optional[str]:
+    for column in candidates:
+        if column in df.columns:
+            return column
+    return None
+
+
+def _aggregate(df: pd.DataFrame, keys: np.ndarray, label_column: str) -> pd.DataFrame:
+    """按分组键聚合 OHLCV（df 已按时间升序）"""
+    named = {}
+    for column in df.columns:
+        if column in _DERIVED_COLUMNS:
+            continue
+        if column == "open":
+            named[column] = (column, "first")
+        elif column == "high":
+            named[column] = (column, "max")
+        elif column == "low":
+            named[column] = (column, "min")
+        elif column == "close" or column == label_column or column in _TIME_COLUMNS:
+            named[column] = (column, "last")
+        elif column in _SUM_COLUMNS:
+            named[column] = (column, "sum")
+        elif not pd.api.types.is_numeric_dtype(df[column]):
+            # 代码、名称、数据源等元数据
+            named[column] = (column, "first")
+
+    result = df.groupby(keys, sort=True).agg(**named).reset_index(drop=True)
+
+    if "close" in result.columns:
+        pre_close = result["close"].shift(1)
+        if "pre_close" in df.columns and len(result):
+            pre_close.iloc[0] = df["pre_close"].iloc[0]
+        result["pre_close"] = pre_close
+        result["change"] = result["close"] - pre_close
+        result["pct_chg"] = (result["change"] / pre_close * 100).round(4)
+    return result
+
+
+def resample_daily_bars(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """日线 → 周线/月线"""
+    date_column = _find_column(df, _DATE_COLUMNS)
+    if date_column is None:
+        raise ValueError("日线数据缺少 trade_date/date 列")
+
+    dates = pd.to_datetime(df[date_column])
+    order = np.argsort(dates.values, kind="stable")
+    df = df.iloc[order].reset_index(drop=True)
+    dates = dates.iloc[order].reset_index(drop=True)
+
+    if period == "weekly":
+        keys = dates.dt.to_period("W-SUN").values
+    elif period == "monthly":
+        keys = dates.dt.to_period("M").values
+    else:
+        raise ValueError(f"不支持由日线生成的周期: {period}")
+
+    result = _aggregate(df, keys, date_column)
+    if "period" in result.columns:
+        result["period"] = period
+    return result
+
+
+def resample_minute_bars(df: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    """1 分钟线 → N 分钟线（按 A 股交易时段对齐）"""
+    time_column = _find_column(df, _TIME_COLUMNS)
+    if time_column is None:
+        raise ValueError("分钟数据缺少时间列")
+
+    raw = df[time_column]
+    times = pd.to_datetime(raw)
+    order = np.argsort(times.values, kind="stable")
+    df = df.iloc[order].reset_index(drop=True)
+    times = times.iloc[order].reset_index(drop=True)
+
+    minute_of_day = (times.dt.hour * 60 + times.dt.minute).to_numpy()
+    (am_open, am_close), (pm_open, pm_close) = _SESSIONS
+    afternoon = minute_of_day >= pm_open
+    session_open = np.where(afternoon, pm_open, am_open)
+    session_close = np.where(afternoon, pm_close, am_close)
+    offset = np.clip(minute_of_day, session_open, session_close) - session_open
+    # K线时间为该分钟结束时刻（09:31 表示 09:30-09:31），09:30 的集合竞价并入第一根
+    bucket = np.maximum(np.ceil(offset / minutes), 1)
+    label_minute = np.minimum(session_open + bucket * minutes, session_close).astype("int64")
+
+    labels = times.dt.normalize() + pd.to_timedelta(label_minute, unit="m")
+    keys = labels.values
+
+    result = _aggregate(df, keys, time_column)
+    label_values = pd.Series(np.unique(keys))
+    if pd.api.types.is_string_dtype(raw) or raw.dtype == object:
+        result[time_column] = label_values.dt.strftime("%Y-%m-%d %H:%M:%S").values
+    else:
+        result[time_column] = label_values.values
+    if "period" in result.columns:
+        result["period"] = f"{minutes}min"
+    return result
+
+
+def resample_bars(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """按目标周期重采样（基础周期见 DERIVED_PERIODS）"""
+    if df is None or df.empty:
+        return df
+    base = base_period_for(period)
+    if base == "daily":
+        return resample_daily_bars(df, period)
+    if base == "1min":
+        return resample_minute_bars(df, int(period[:-3]))
+    raise ValueError(f"不支持重采样的周期: {period}")
+
+
+def _fingerprint(df: pd.DataFrame) -> tuple:
+    """输入数据的轻量指纹：行数 + 首末行的时间和收盘价/成交量"""
+    first, last = df.iloc[0], df.iloc[-1]
+    time_column = _find_column(df, _TIME_COLUMNS)
+
+    def value(row, column):
+        return row.get(column) if column else None
+
+    return (
+        len(df),
+        str(value(first, time_column)),
+        str(value(last, time_column)),
+        value(last, "close"),
+        value(last, "volume") if "volume" in df.columns else value(last, "vol"),
+    )
+
+
+class BarResampler:
+    """带 LRU 缓存的K线重采样"""
+
+    def __init__(self, max_entries: int = None):
+        if max_entries is None:
+            max_entries = int(os.getenv("TA_RESAMPLE_CACHE_SIZE", "256"))
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def resample(self, df: pd.DataFrame, period: str, cache_key: Hashable = None) -> pd.DataFrame:
+        """
+        重采样（cache_key 为 None 时不缓存）
+
+        Args:
+            df: 基础周期数据
+            period: 目标周期
+            cache_key: 标识数据序列的键，如 (股票代码, 数据源)
+
+        Returns:
+            重采样后的 DataFrame（调用方可以修改，不影响缓存）
+        """
+        if df is None or df.empty:
+            return df
+        if cache_key is None or self.max_entries <= 0:
+            return resample_bars(df, period)
+
+        key = (cache_key, period, _fingerprint(df))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats['hits'] += 1
+                return cached.copy()
+
+        result = resample_bars(df, period)
+        with self._lock:
+            self._stats['misses'] += 1
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        logger.debug(f"📊 [重采样] {cache_key} {period}: {len(df)} → {len(result)} 条")
+        return result.copy()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'size': len(self._cache)}
+
+
+_resampler: Optional[BarResampler] = None
+_resampler_lock = threading.Lock()
+
+
+def get_bar_resampler() -> BarResampler:
+    """获取全局重采样器"""
+    global _resampler
+    if _resampler is None:
+        with _resampler_lock:
+            if _resampler is None:
+                _resampler = BarResampler()
+    return _resampler
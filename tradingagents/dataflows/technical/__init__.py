@@ -1,18 +1,19 @@
 """
 技术指标计算模块
 提供各种技术分析指标的计算功能
+
+stockstats 在第一次访问时才导入（见 tradingagents/utils/lazy_imports.py）。
 """
 
-# 导入 stockstats
-try:
-    from .stockstats import StockstatsUtils
-    STOCKSTATS_AVAILABLE = True
-except ImportError:
-    StockstatsUtils = None
-    STOCKSTATS_AVAILABLE = False
+from tradingagents.utils.lazy_imports import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(
+    globals(),
+    {'StockstatsUtils': ('.stockstats', 'StockstatsUtils')},
+    {'STOCKSTATS_AVAILABLE': 'StockstatsUtils'},
+)
 
 __all__ = [
     'StockstatsUtils',
     'STOCKSTATS_AVAILABLE',
 ]
-
@@ -17,6 +17,10 @@ DEFAULT_CONFIG = {
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
+    # 并行执行所选分析师（各自独立的消息通道，在看涨研究员之前汇合）
+    "parallel_analysts": os.getenv("PARALLEL_ANALYSTS_ENABLED", "false").lower() == "true",
+    # 风险辩论模式: sequential（激进→保守→中性轮流发言）/ simultaneous（每轮三方基于上一轮快照同时发言）
+    "risk_debate_mode": os.getenv("RISK_DEBATE_MODE", "sequential").lower(),
     # Tool settings - 从环境变量读取，提供默认值
     "online_tools": os.getenv("ONLINE_TOOLS_ENABLED", "false").lower() == "true",
     "online_news": os.getenv("ONLINE_NEWS_ENABLED", "true").lower() == "true", 
@@ -1,11 +1,25 @@
 # TradingAgents/graph/__init__.py
 
-from .trading_graph import TradingAgentsGraph
-from .conditional_logic import ConditionalLogic
-from .setup import GraphSetup
-from .propagation import Propagator
-from .reflection import Reflector
-from .signal_processing import SignalProcessor
+from tradingagents.utils.lazy_imports import lazy_exports
+
+# TradingAgentsGraph 会加载全部智能体、LLM SDK 和数据源；进度事件、耗时模型等轻量模块
+# 不应为此付出启动时间，所以各导出在第一次访问时才导入（见 tradingagents/utils/lazy_imports.py）
+__getattr__, __dir__ = lazy_exports(globals(), {}, required={
+    "TradingAgentsGraph": (".trading_graph", "TradingAgentsGraph"),
+    "ConditionalLogic": (".conditional_logic", "ConditionalLogic"),
+    "GraphSetup": (".setup", "GraphSetup"),
+    "Propagator": (".propagation", "Propagator"),
+    "Reflector": (".reflection", "Reflector"),
+    "SignalProcessor": (".signal_processing", "SignalProcessor"),
+    "TradingGraphPool": (".graph_pool", "TradingGraphPool"),
+    "get_trading_graph_pool": (".graph_pool", "get_trading_graph_pool"),
+    "AnalysisLatencyModel": (".latency_model", "AnalysisLatencyModel"),
+    "LatencyEstimate": (".latency_model", "LatencyEstimate"),
+    "get_latency_model": (".latency_model", "get_latency_model"),
+    "NodeEvent": (".progress_events", "NodeEvent"),
+    "NodeEventBus": (".progress_events", "NodeEventBus"),
+    "get_node_event_bus": (".progress_events", "get_node_event_bus"),
+})
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -18,4 +32,12 @@ __all__ = [
     "Propagator",
     "Reflector",
     "SignalProcessor",
+    "TradingGraphPool",
+    "get_trading_graph_pool",
+    "AnalysisLatencyModel",
+    "LatencyEstimate",
+    "get_latency_model",
+    "NodeEvent",
+    "NodeEventBus",
+    "get_node_event_bus",
 ]
@@ -240,3 +240,17 @@ class ConditionalLogic:
 
         logger.info(f"🔄 [风险讨论控制] 继续讨论 -> {next_speaker}")
         return next_speaker
+
+    def should_continue_risk_round(self, state: AgentState):
+        """Determine if another simultaneous risk debate round should start."""
+        current_count = state["risk_debate_state"]["count"]
+        max_count = 3 * self.max_risk_discuss_rounds
+
+        logger.info(f"🔍 [风险讨论控制-同步轮次] 当前发言次数: {current_count}, 最大次数: {max_count} (配置轮次: {self.max_risk_discuss_rounds})")
+
+        if current_count >= max_count:
+            logger.info(f"✅ [风险讨论控制-同步轮次] 达到最大次数，结束讨论 -> Risk Judge")
+            return "Risk Judge"
+
+        logger.info(f"🔄 [风险讨论控制-同步轮次] 开始下一轮 -> 三位风险分析师同时发言")
+        return ["Risky Analyst", "Safe Analyst", "Neutral Analyst"]
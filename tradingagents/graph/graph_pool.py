@@ -0,0 +1,155 @@
+# TradingAgents/graph/graph_pool.py
+"""
+TradingAgentsGraph 实例池
+
+构造 TradingAgentsGraph 需要创建 LLM 客户端（各自持有 HTTP 连接池）、记忆集合、
+工具节点并编译 LangGraph，每个分析任务都重新构造会带来数百毫秒到数秒的启动开销。
+每次运行的状态已经移到线程本地的 RunContext 中，编译好的图可以安全地被并发任务共享，
+因此按 (分析师, 供应商, 模型, 研究深度, 配置摘要) 缓存实例，复用时 LLM 的 HTTP 连接也一并复用。
+
+池是有界的 LRU：超过容量时淘汰最久未使用的实例（正在运行的任务仍持有引用，不受影响）。
+
+环境变量：
+- TRADING_GRAPH_POOL_SIZE: 最多缓存的图实例数（默认 8，设为 0 关闭池化，每次都新建）
+
+使用方法：
+    from tradingagents.graph.graph_pool import get_trading_graph_pool
+
+    graph = get_trading_graph_pool().get(config)
+    final_state, decision = graph.propagate(symbol, trade_date)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_ANALYSTS = ["market", "fundamentals"]
+
+
+def graph_pool_key(config: Dict[str, Any], selected_analysts: List[str], debug: bool = False) -> Tuple:
+    """计算图实例的池键
+
+    前几项是便于日志排查的主要维度；最后一项是完整配置的摘要，
+    保证 API Key、backend_url、模型参数等任何差异都不会复用到错误的实例。
+    """
+    digest = hashlib.sha1(
+        json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+    llm_provider = config.get("llm_provider")
+    return (
+        tuple(selected_analysts),
+        config.get("quick_provider") or llm_provider,
+        config.get("deep_provider") or llm_provider,
+        config.get("quick_think_llm"),
+        config.get("deep_think_llm"),
+        config.get("research_depth"),
+        bool(debug),
+        digest,
+    )
+
+
+class TradingGraphPool:
+    """按配置复用 TradingAgentsGraph 的有界 LRU 池（线程安全）"""
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE, factory: Optional[Callable[..., Any]] = None):
+        """
+        Args:
+            max_size: 最多缓存的实例数，<= 0 时不缓存
+            factory: 构造图实例的函数，签名同 TradingAgentsGraph(selected_analysts, debug, config)
+        """
+        self.max_size = max_size
+        self._factory = factory
+        self._graphs: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._building: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, config: Dict[str, Any], selected_analysts: Optional[List[str]] = None, debug: Optional[bool] = None):
+        """获取与配置匹配的图实例，不存在时构造并放入池中"""
+        analysts = list(selected_analysts or config.get("selected_analysts", DEFAULT_ANALYSTS))
+        debug = config.get("debug", False) if debug is None else debug
+
+        if self.max_size <= 0:
+            return self._build(analysts, debug, config)
+
+        key = graph_pool_key(config, analysts, debug)
+        with self._lock:
+            graph = self._lookup(key)
+            build_lock = None if graph is not None else self._building.setdefault(key, threading.Lock())
+
+        if graph is None:
+            # 同一配置只构造一次，并发的同配置请求等待构造完成后直接复用
+            with build_lock:
+                with self._lock:
+                    graph = self._lookup(key)
+                if graph is None:
+                    graph = self._build(analysts, debug, config)
+                    with self._lock:
+                        self.misses += 1
+                        self._graphs[key] = graph
+                        self._building.pop(key, None)
+                        while len(self._graphs) > self.max_size:
+                            evicted_key, _ = self._graphs.popitem(last=False)
+                            self.evictions += 1
+                            logger.info(f"♻️ [图实例池] 淘汰最久未使用的实例: {evicted_key[:6]}")
+                    return graph
+
+        graph.activate()
+        logger.info(f"♻️ [图实例池] 复用TradingAgents实例（实例ID: {id(graph)}）")
+        return graph
+
+    def _lookup(self, key: Tuple):
+        """调用方需持有 self._lock"""
+        graph = self._graphs.get(key)
+        if graph is not None:
+            self._graphs.move_to_end(key)
+            self.hits += 1
+        return graph
+
+    def _build(self, analysts: List[str], debug: bool, config: Dict[str, Any]):
+        factory = self._factory
+        if factory is None:
+            from tradingagents.graph.trading_graph import TradingAgentsGraph
+            factory = TradingAgentsGraph
+        logger.info(f"🔧 [图实例池] 创建新的TradingAgents实例: analysts={analysts}, provider={config.get('llm_provider')}")
+        return factory(selected_analysts=analysts, debug=debug, config=config)
+
+    def clear(self):
+        """清空池（配置变更后调用，例如更新了 API Key）"""
+        with self._lock:
+            self._graphs.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._graphs),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_trading_graph_pool: Optional[TradingGraphPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_trading_graph_pool() -> TradingGraphPool:
+    """获取全局图实例池"""
+    global _trading_graph_pool
+    if _trading_graph_pool is None:
+        with _pool_lock:
+            if _trading_graph_pool is None:
+                size = int(os.getenv("TRADING_GRAPH_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+                _trading_graph_pool = TradingGraphPool(max_size=size)
+    return _trading_graph_pool
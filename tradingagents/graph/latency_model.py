@@ -0,0 +1,328 @@
+# TradingAgents/graph/latency_model.py
+"""
+分析耗时模型
+
+进度跟踪器、任务状态管理器的预估时长以前是按研究深度/分析师数量/供应商写死的系数，
+与实际耗时经常相差数倍。TradingAgentsGraph.propagate 每次运行都会记录真实的节点耗时
+（_build_performance_data），这里把这些记录按画像聚合为滚动窗口，用分位数给出预估：
+
+- 画像 (profile)：分析师集合 + 研究深度 + 供应商 + 模型（快速/深度）
+- 粗粒度画像：只有分析师集合 + 研究深度，调用方不知道模型时（如入队时）使用，
+  精确画像样本不足时也回退到它
+- 每个画像保留最近 window 次运行的总耗时和各节点耗时
+- 预估：总耗时 P50/P90、各节点 P50；剩余时间按"已运行 elapsed 秒"条件化：
+  取总耗时大于 elapsed 的样本的中位数减去 elapsed，运行越久预估越保守
+
+样本存放在 Redis 列表（可用时，RPUSH + LTRIM，API 进程与 Worker 进程共享），
+否则只保存在进程内存中。读取有本地缓存，refresh_interval 内不重复访问 Redis。
+样本不足 min_samples 时返回 None，调用方继续使用原有的经验公式。
+
+环境变量：
+- TA_LATENCY_MODEL_WINDOW: 每个画像保留的样本数（默认 50）
+- TA_LATENCY_MODEL_MIN_SAMPLES: 给出预估所需的最少样本数（默认 3）
+- TA_LATENCY_MODEL_BACKEND: auto | redis | memory（默认 auto）
+
+使用方法：
+    from tradingagents.graph.latency_model import get_latency_model
+
+    estimate = get_latency_model().estimate(["market", "news"], "标准", "dashscope", "qwen-turbo/qwen-plus")
+    if estimate:
+        total = estimate.total_p50
+        remaining = estimate.remaining(elapsed)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+REDIS_KEY_PREFIX = "latency:analysis:"
+DEFAULT_WINDOW = 50
+DEFAULT_MIN_SAMPLES = 3
+DEFAULT_REFRESH_INTERVAL = 60.0
+DEFAULT_ANALYSTS = ["market", "fundamentals"]
+# 与 create_analysis_config 的数字等级映射一致
+RESEARCH_DEPTH_NAMES = {1: "快速", 2: "基础", 3: "标准", 4: "深度", 5: "全面"}
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    """线性插值分位数，sorted_values 需已升序排列且非空"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def latency_profile_key(
+    selected_analysts: Iterable[str],
+    research_depth: Any,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+) -> str:
+    """画像键；provider 和 model 都为空时即粗粒度画像"""
+    analysts = ",".join(sorted(str(a) for a in (selected_analysts or [])))
+    key = f"{analysts}|{research_depth}"
+    if provider or model:
+        key += f"|{provider or ''}|{model or ''}"
+    return key
+
+
+def normalize_research_depth(research_depth: Any) -> Any:
+    """数字等级（1-5 或 "3"）转换为中文等级，与记录时配置中的写法一致"""
+    if isinstance(research_depth, (int, float)) or (isinstance(research_depth, str) and research_depth.isdigit()):
+        return RESEARCH_DEPTH_NAMES.get(int(research_depth), "标准")
+    return research_depth or "标准"
+
+
+def profile_from_config(config: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """从分析配置中取出 (供应商, 模型)，模型为 "快速模型/深度模型" """
+    quick = config.get("quick_think_llm")
+    deep = config.get("deep_think_llm")
+    model = f"{quick}/{deep}" if quick or deep else None
+    return config.get("llm_provider"), model
+
+
+@dataclass
+class LatencyEstimate:
+    """某个画像的耗时预估（秒）"""
+    profile: str
+    samples: int
+    total_p50: float
+    total_p90: float
+    node_p50: Dict[str, float] = field(default_factory=dict)
+    totals: List[float] = field(default_factory=list, repr=False)
+
+    def remaining(self, elapsed: float) -> float:
+        """已运行 elapsed 秒时的剩余时间：超过 elapsed 的历史样本的中位数减去 elapsed"""
+        longer = [t for t in self.totals if t > elapsed]
+        if not longer:
+            # 已经比所有历史样本都慢，无法再给出有意义的预估
+            return 0.0
+        return quantile(longer, 0.5) - elapsed
+
+
+class AnalysisLatencyModel:
+    """按画像聚合历史运行耗时的滚动窗口模型（线程安全）"""
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        min_samples: Optional[int] = None,
+        redis_client=None,
+        backend: Optional[str] = None,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+    ):
+        """
+        Args:
+            window: 每个画像保留的样本数，默认读取 TA_LATENCY_MODEL_WINDOW
+            min_samples: 给出预估所需的最少样本数，默认读取 TA_LATENCY_MODEL_MIN_SAMPLES
+            redis_client: 同步 Redis 客户端；为 None 且 backend 允许时自动获取
+            backend: auto | redis | memory
+            refresh_interval: 本地缓存的有效期（秒），过期后重新从 Redis 读取
+        """
+        self.window = window or int(os.getenv("TA_LATENCY_MODEL_WINDOW", str(DEFAULT_WINDOW)))
+        if min_samples is None:
+            min_samples = int(os.getenv("TA_LATENCY_MODEL_MIN_SAMPLES", str(DEFAULT_MIN_SAMPLES)))
+        self.min_samples = max(1, min_samples)
+        self.refresh_interval = refresh_interval
+
+        backend = (backend or os.getenv("TA_LATENCY_MODEL_BACKEND", "auto")).lower()
+        if redis_client is None and backend in ("auto", "redis"):
+            redis_client = self._get_default_redis()
+        self._redis = redis_client if backend != "memory" else None
+
+        self._samples: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._estimates: Dict[str, Optional[LatencyEstimate]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_default_redis():
+        try:
+            from tradingagents.config.database_manager import get_redis_client
+            return get_redis_client()
+        except Exception as e:
+            logger.debug(f"获取 Redis 客户端失败，耗时模型仅保存在内存中: {e}")
+            return None
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "memory"
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+
+    def record(
+        self,
+        selected_analysts: Iterable[str],
+        research_depth: Any,
+        provider: Optional[str],
+        model: Optional[str],
+        performance_data: Dict[str, Any],
+    ) -> None:
+        """记录一次运行的性能数据（_build_performance_data 的返回值）"""
+        total = performance_data.get("total_time")
+        if not total or total <= 0:
+            return
+        sample = {
+            "total": round(float(total), 2),
+            "nodes": {k: round(float(v), 2) for k, v in (performance_data.get("node_timings") or {}).items()},
+            "ts": int(time.time()),
+        }
+        analysts = list(selected_analysts or [])
+        research_depth = normalize_research_depth(research_depth)
+        keys = [latency_profile_key(analysts, research_depth)]
+        if provider or model:
+            keys.append(latency_profile_key(analysts, research_depth, provider, model))
+
+        with self._lock:
+            for key in keys:
+                self._local_samples(key).append(sample)
+                self._estimates.pop(key, None)
+
+        if self._redis is not None:
+            try:
+                payload = json.dumps(sample, ensure_ascii=False)
+                pipe = self._redis.pipeline()
+                for key in keys:
+                    pipe.rpush(REDIS_KEY_PREFIX + key, payload)
+                    pipe.ltrim(REDIS_KEY_PREFIX + key, -self.window, -1)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"⚠️ [耗时模型] 写入 Redis 失败: {e}")
+
+        logger.info(f"⏱️ [耗时模型] 记录运行耗时 {sample['total']}秒: {keys[-1]}")
+
+    def record_run(self, config: Dict[str, Any], selected_analysts: Iterable[str], performance_data: Dict[str, Any]) -> None:
+        """按分析配置记录一次运行"""
+        provider, model = profile_from_config(config)
+        self.record(selected_analysts, config.get("research_depth"), provider, model, performance_data)
+
+    # ------------------------------------------------------------------
+    # 预估
+    # ------------------------------------------------------------------
+
+    def estimate(
+        self,
+        selected_analysts: Iterable[str],
+        research_depth: Any,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Optional[LatencyEstimate]:
+        """返回画像的耗时预估；精确画像样本不足时回退到粗粒度画像，仍不足时返回 None"""
+        analysts = list(selected_analysts or [])
+        research_depth = normalize_research_depth(research_depth)
+        keys = []
+        if provider or model:
+            keys.append(latency_profile_key(analysts, research_depth, provider, model))
+        keys.append(latency_profile_key(analysts, research_depth))
+
+        for key in keys:
+            estimate = self._estimate_key(key)
+            if estimate is not None:
+                return estimate
+        return None
+
+    def estimate_for_config(self, config: Dict[str, Any], selected_analysts: Optional[Iterable[str]] = None) -> Optional[LatencyEstimate]:
+        provider, model = profile_from_config(config)
+        analysts = selected_analysts if selected_analysts is not None else config.get("selected_analysts", [])
+        return self.estimate(analysts, config.get("research_depth"), provider, model)
+
+    def estimate_for_parameters(self, parameters: Dict[str, Any]) -> Optional[LatencyEstimate]:
+        """按分析请求参数预估（selected_analysts / research_depth / 可选的 llm_provider 与模型）"""
+        quick = parameters.get("quick_analysis_model")
+        deep = parameters.get("deep_analysis_model")
+        return self.estimate(
+            parameters.get("selected_analysts") or DEFAULT_ANALYSTS,
+            parameters.get("research_depth"),
+            parameters.get("llm_provider"),
+            f"{quick}/{deep}" if quick and deep else None,
+        )
+
+    def _estimate_key(self, key: str) -> Optional[LatencyEstimate]:
+        self._refresh(key)
+        with self._lock:
+            if key in self._estimates:
+                return self._estimates[key]
+            samples = list(self._samples.get(key, ()))
+            estimate = self._build_estimate(key, samples) if len(samples) >= self.min_samples else None
+            self._estimates[key] = estimate
+            return estimate
+
+    @staticmethod
+    def _build_estimate(key: str, samples: List[Dict[str, Any]]) -> LatencyEstimate:
+        totals = sorted(s["total"] for s in samples)
+        node_values: Dict[str, List[float]] = {}
+        for s in samples:
+            for node, elapsed in (s.get("nodes") or {}).items():
+                node_values.setdefault(node, []).append(elapsed)
+        return LatencyEstimate(
+            profile=key,
+            samples=len(totals),
+            total_p50=round(quantile(totals, 0.5), 2),
+            total_p90=round(quantile(totals, 0.9), 2),
+            node_p50={node: round(quantile(sorted(values), 0.5), 2) for node, values in node_values.items()},
+            totals=totals,
+        )
+
+    def _local_samples(self, key: str) -> Deque[Dict[str, Any]]:
+        """调用方需持有 self._lock"""
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        return samples
+
+    def _refresh(self, key: str) -> None:
+        """从 Redis 重新加载画像样本（本地缓存过期时）"""
+        if self._redis is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            loaded_at = self._loaded_at.get(key)
+            if loaded_at is not None and now - loaded_at < self.refresh_interval:
+                return
+            self._loaded_at[key] = now
+        try:
+            raw = self._redis.lrange(REDIS_KEY_PREFIX + key, -self.window, -1)
+        except Exception as e:
+            logger.warning(f"⚠️ [耗时模型] 读取 Redis 失败: {e}")
+            return
+        samples = []
+        for item in raw or []:
+            try:
+                samples.append(json.loads(item))
+            except (TypeError, ValueError):
+                continue
+        with self._lock:
+            self._samples[key] = deque(samples, maxlen=self.window)
+            self._estimates.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._loaded_at.clear()
+            self._estimates.clear()
+
+
+_latency_model: Optional[AnalysisLatencyModel] = None
+_model_lock = threading.Lock()
+
+
+def get_latency_model() -> AnalysisLatencyModel:
+    """获取全局耗时模型"""
+    global _latency_model
+    if _latency_model is None:
+        with _model_lock:
+            if _latency_model is None:
+                _latency_model = AnalysisLatencyModel()
+    return _latency_model
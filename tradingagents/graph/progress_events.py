@@ -0,0 +1,104 @@
+# TradingAgents/graph/progress_events.py
+"""
+图节点进度事件
+
+以前的分析进度来自 app 侧的 ProgressLogHandler：它挂在 agents/tradingagents 日志记录器上，
+对每条日志做关键词扫描和 ~20 个正则匹配，再更新"第一个正在运行的跟踪器"——
+日志热路径有额外开销，并发分析时进度还会写到别的任务上。
+
+这里改为由图本身发布结构化事件：
+- GraphSetup 给主图中的业务节点（分析师、研究员、交易员、风险辩手、风险经理）包一层，
+  节点开始/结束时发布 NodeEvent(task_id, node, phase)
+- task_id 通过 RunnableConfig 的 configurable.task_id 传入（TradingAgentsGraph.propagate 设置），
+  图实例在任务之间共享也能区分事件归属
+- 订阅按 task_id 分组，没有订阅者时节点包装只做一次字典查询
+
+使用方法：
+    from tradingagents.graph.progress_events import get_node_event_bus
+
+    unsubscribe = get_node_event_bus().subscribe(task_id, lambda event: print(event.node, event.phase))
+    ...
+    unsubscribe()
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from tradingagents.utils.logging_init import get_logger
+
+logger = get_logger("default")
+
+NODE_START = "start"
+NODE_END = "end"
+NODE_ERROR = "error"
+
+
+@dataclass(frozen=True)
+class NodeEvent:
+    """单个图节点的开始/结束事件"""
+    task_id: str
+    node: str
+    phase: str  # start / end / error
+    timestamp: float = field(default_factory=time.time)
+    elapsed: Optional[float] = None  # end/error 事件：节点耗时（秒）
+    error: Optional[str] = None
+
+
+NodeEventCallback = Callable[[NodeEvent], None]
+
+
+class NodeEventBus:
+    """进程内节点事件总线（按 task_id 订阅）"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[NodeEventCallback]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, task_id: str, callback: NodeEventCallback) -> Callable[[], None]:
+        """订阅某个任务的节点事件，返回取消订阅函数"""
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append(callback)
+
+        def unsubscribe():
+            self.unsubscribe(task_id, callback)
+
+        return unsubscribe
+
+    def unsubscribe(self, task_id: str, callback: NodeEventCallback) -> None:
+        with self._lock:
+            callbacks = self._subscribers.get(task_id)
+            if not callbacks:
+                return
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                del self._subscribers[task_id]
+
+    def has_subscribers(self, task_id: Optional[str]) -> bool:
+        return task_id is not None and task_id in self._subscribers
+
+    def publish(self, event: NodeEvent) -> None:
+        """把事件分发给该任务的订阅者（订阅者的异常不影响图执行）"""
+        with self._lock:
+            callbacks = list(self._subscribers.get(event.task_id, ()))
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.warning(f"⚠️ [节点事件] 订阅者处理失败: {event.task_id} {event.node} - {e}")
+
+
+_node_event_bus: Optional[NodeEventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_node_event_bus() -> NodeEventBus:
+    """获取全局节点事件总线"""
+    global _node_event_bus
+    if _node_event_bus is None:
+        with _bus_lock:
+            if _node_event_bus is None:
+                _node_event_bus = NodeEventBus()
+    return _node_event_bus
@@ -1,6 +1,9 @@
 # TradingAgents/graph/setup.py
 
-from typing import Dict, Any
+import inspect
+import time
+from typing import Dict, Any, List
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
@@ -10,12 +13,22 @@ from tradingagents.agents.utils.agent_states import AgentState
 from tradingagents.agents.utils.agent_utils import Toolkit
 
 from .conditional_logic import ConditionalLogic
+from .progress_events import NODE_END, NODE_ERROR, NODE_START, NodeEvent, get_node_event_bus
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
+# 并行模式下每个分析师分支写回主图的字段（互不重叠，合并结果与执行顺序无关）
+ANALYST_OUTPUT_KEYS = {
+    "market": ("market_report", "market_tool_call_count"),
+    "social": ("sentiment_report", "sentiment_tool_call_count"),
+    "news": ("news_report", "news_tool_call_count"),
+    "fundamentals": ("fundamentals_report", "fundamentals_tool_call_count"),
+}
+
+
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
 
@@ -159,49 +172,30 @@ class GraphSetup:
         # Create workflow
         workflow = StateGraph(AgentState)
 
-        # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
-
         # Add other nodes
-        workflow.add_node("Bull Researcher", bull_researcher_node)
-        workflow.add_node("Bear Researcher", bear_researcher_node)
-        workflow.add_node("Research Manager", research_manager_node)
-        workflow.add_node("Trader", trader_node)
-        workflow.add_node("Risky Analyst", risky_analyst)
-        workflow.add_node("Neutral Analyst", neutral_analyst)
-        workflow.add_node("Safe Analyst", safe_analyst)
-        workflow.add_node("Risk Judge", risk_manager_node)
+        workflow.add_node("Bull Researcher", self._observe_node("Bull Researcher", bull_researcher_node))
+        workflow.add_node("Bear Researcher", self._observe_node("Bear Researcher", bear_researcher_node))
+        workflow.add_node("Research Manager", self._observe_node("Research Manager", research_manager_node))
+        workflow.add_node("Trader", self._observe_node("Trader", trader_node))
+        if self.config.get("risk_debate_mode", "sequential") == "simultaneous":
+            # 同步轮次：辩手只上报本轮论点，由 Risk Round Merge 统一写入 risk_debate_state
+            risky_analyst = self._create_risk_round_node(risky_analyst, "Risky")
+            neutral_analyst = self._create_risk_round_node(neutral_analyst, "Neutral")
+            safe_analyst = self._create_risk_round_node(safe_analyst, "Safe")
+        workflow.add_node("Risky Analyst", self._observe_node("Risky Analyst", risky_analyst))
+        workflow.add_node("Neutral Analyst", self._observe_node("Neutral Analyst", neutral_analyst))
+        workflow.add_node("Safe Analyst", self._observe_node("Safe Analyst", safe_analyst))
+        workflow.add_node("Risk Judge", self._observe_node("Risk Judge", risk_manager_node))
 
         # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
+        if self.config.get("parallel_analysts", False) and len(selected_analysts) > 1:
+            self._add_parallel_analysts(
+                workflow, selected_analysts, analyst_nodes, delete_nodes, tool_nodes
+            )
+        else:
+            self._add_sequential_analysts(
+                workflow, selected_analysts, analyst_nodes, delete_nodes, tool_nodes
             )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -221,33 +215,228 @@ class GraphSetup:
             },
         )
         workflow.add_edge("Research Manager", "Trader")
-        workflow.add_edge("Trader", "Risky Analyst")
-        workflow.add_conditional_edges(
-            "Risky Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Safe Analyst": "Safe Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Safe Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Neutral Analyst": "Neutral Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Neutral Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Risky Analyst": "Risky Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
+        if self.config.get("risk_debate_mode", "sequential") == "simultaneous":
+            self._add_simultaneous_risk_debate(workflow)
+        else:
+            workflow.add_edge("Trader", "Risky Analyst")
+            workflow.add_conditional_edges(
+                "Risky Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Safe Analyst": "Safe Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Safe Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Neutral Analyst": "Neutral Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Neutral Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Risky Analyst": "Risky Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
 
         workflow.add_edge("Risk Judge", END)
 
         # Compile and return
         return workflow.compile()
+
+    def _add_analyst_chain(
+        self,
+        graph: StateGraph,
+        analyst_type: str,
+        analyst_node,
+        delete_node,
+        tool_node,
+        observe: bool = False,
+    ):
+        """Add one analyst with its tool loop and Msg Clear node to a graph.
+
+        With ``observe`` the analyst node publishes node start/end events.
+        """
+        current_analyst = f"{analyst_type.capitalize()} Analyst"
+        current_tools = f"tools_{analyst_type}"
+        current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+        if observe:
+            analyst_node = self._observe_node(current_analyst, analyst_node)
+        graph.add_node(current_analyst, analyst_node)
+        graph.add_node(current_clear, delete_node)
+        graph.add_node(current_tools, tool_node)
+
+        graph.add_conditional_edges(
+            current_analyst,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            [current_tools, current_clear],
+        )
+        graph.add_edge(current_tools, current_analyst)
+
+    def _add_sequential_analysts(
+        self,
+        workflow: StateGraph,
+        selected_analysts: List[str],
+        analyst_nodes: Dict[str, Any],
+        delete_nodes: Dict[str, Any],
+        tool_nodes: Dict[str, Any],
+    ):
+        """Chain the analysts one after another (default topology)."""
+        for analyst_type in selected_analysts:
+            self._add_analyst_chain(
+                workflow,
+                analyst_type,
+                analyst_nodes[analyst_type],
+                delete_nodes[analyst_type],
+                tool_nodes[analyst_type],
+                observe=True,
+            )
+
+        # Start with the first analyst
+        workflow.add_edge(START, f"{selected_analysts[0].capitalize()} Analyst")
+
+        # Connect to next analyst or to Bull Researcher if this is the last analyst
+        for i, analyst_type in enumerate(selected_analysts):
+            current_clear = f"Msg Clear {analyst_type.capitalize()}"
+            if i < len(selected_analysts) - 1:
+                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                workflow.add_edge(current_clear, next_analyst)
+            else:
+                workflow.add_edge(current_clear, "Bull Researcher")
+
+    def _add_parallel_analysts(
+        self,
+        workflow: StateGraph,
+        selected_analysts: List[str],
+        analyst_nodes: Dict[str, Any],
+        delete_nodes: Dict[str, Any],
+        tool_nodes: Dict[str, Any],
+    ):
+        """Fan the analysts out from START and join them before Bull Researcher.
+
+        Each analyst runs its tool loop inside its own compiled subgraph, so the
+        message channels stay isolated. Only the analyst's report and tool call
+        counter are written back, which keeps the merge deterministic.
+        """
+        branch_names = []
+        for analyst_type in selected_analysts:
+            branch = StateGraph(AgentState)
+            self._add_analyst_chain(
+                branch,
+                analyst_type,
+                analyst_nodes[analyst_type],
+                delete_nodes[analyst_type],
+                tool_nodes[analyst_type],
+            )
+            node_name = f"{analyst_type.capitalize()} Analyst"
+            branch.add_edge(START, node_name)
+            branch.add_edge(f"Msg Clear {analyst_type.capitalize()}", END)
+
+            # 主图中沿用 "<Type> Analyst" 节点名，进度回调和计时无需区分模式
+            workflow.add_node(
+                node_name,
+                self._observe_node(
+                    node_name,
+                    self._create_analyst_branch_node(
+                        node_name, branch.compile(), ANALYST_OUTPUT_KEYS[analyst_type]
+                    ),
+                ),
+            )
+            workflow.add_edge(START, node_name)
+            branch_names.append(node_name)
+
+        workflow.add_edge(branch_names, "Bull Researcher")
+        logger.info(f"🔀 [并行分析师] 已启用并行拓扑: {branch_names}")
+
+    @staticmethod
+    def _observe_node(node_name: str, node):
+        """Wrap a node so it publishes NodeEvents for the task in ``configurable.task_id``."""
+        passes_config = "config" in inspect.signature(node).parameters
+
+        def observed_node(state: AgentState, config: RunnableConfig):
+            task_id = ((config or {}).get("configurable") or {}).get("task_id")
+            bus = get_node_event_bus()
+            if not bus.has_subscribers(task_id):
+                return node(state, config) if passes_config else node(state)
+
+            bus.publish(NodeEvent(task_id, node_name, NODE_START))
+            start_time = time.time()
+            try:
+                result = node(state, config) if passes_config else node(state)
+            except Exception as e:
+                bus.publish(NodeEvent(task_id, node_name, NODE_ERROR,
+                                      elapsed=time.time() - start_time, error=str(e)))
+                raise
+            bus.publish(NodeEvent(task_id, node_name, NODE_END, elapsed=time.time() - start_time))
+            return result
+
+        return observed_node
+
+    @staticmethod
+    def _create_analyst_branch_node(node_name: str, branch_graph, output_keys):
+        def analyst_branch(state: AgentState, config: RunnableConfig):
+            start_time = time.time()
+            result = branch_graph.invoke(dict(state), config=config)
+            update = {key: result[key] for key in output_keys if key in result}
+            update["analyst_timings"] = {node_name: time.time() - start_time}
+            logger.info(f"⏱️ [并行分析师] {node_name} 完成，耗时 {time.time() - start_time:.2f}秒")
+            return update
+
+        return analyst_branch
+
+    def _add_simultaneous_risk_debate(self, workflow: StateGraph):
+        """Run the three risk debaters concurrently each round.
+
+        Every debater sees the previous round's snapshot of risk_debate_state;
+        Risk Round Merge folds the three arguments back in (Risky, Safe,
+        Neutral order) before the next round or the Risk Judge.
+        """
+        debaters = ["Risky Analyst", "Safe Analyst", "Neutral Analyst"]
+        workflow.add_node("Risk Round Merge", self._merge_risk_round)
+        for debater in debaters:
+            workflow.add_edge("Trader", debater)
+        workflow.add_edge(debaters, "Risk Round Merge")
+        workflow.add_conditional_edges(
+            "Risk Round Merge",
+            self.conditional_logic.should_continue_risk_round,
+            debaters + ["Risk Judge"],
+        )
+        logger.info(f"🔀 [风险辩论] 已启用同步轮次模式")
+
+    @staticmethod
+    def _create_risk_round_node(debater_node, speaker: str):
+        response_key = f"current_{speaker.lower()}_response"
+
+        def risk_round_debater(state: AgentState):
+            result = debater_node(state)
+            return {
+                "risk_round_responses": {speaker: result["risk_debate_state"][response_key]}
+            }
+
+        return risk_round_debater
+
+    @staticmethod
+    def _merge_risk_round(state: AgentState):
+        risk_debate_state = state["risk_debate_state"]
+        responses = state.get("risk_round_responses") or {}
+
+        new_state = dict(risk_debate_state)
+        history = risk_debate_state.get("history", "")
+        for speaker in ("Risky", "Safe", "Neutral"):
+            argument = responses.get(speaker, "")
+            history_key = f"{speaker.lower()}_history"
+            history = history + "\n" + argument
+            new_state[history_key] = risk_debate_state.get(history_key, "") + "\n" + argument
+            new_state[f"current_{speaker.lower()}_response"] = argument
+
+        new_state["history"] = history
+        new_state["latest_speaker"] = "Neutral"
+        new_state["count"] = risk_debate_state["count"] + 3
+        logger.info(f"🔀 [风险辩论-同步轮次] 本轮发言已合并，计数: {risk_debate_state['count']} -> {new_state['count']}")
+        return {"risk_debate_state": new_state}
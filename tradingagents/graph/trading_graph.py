@@ -3,14 +3,13 @@
 import os
 from pathlib import Path
 import json
+import threading
+from dataclasses import dataclass
 from datetime import date
 from typing import Dict, Any, Tuple, List, Optional
 import time
 
 from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-from tradingagents.llm_adapters import ChatDashScopeOpenAI, ChatGoogleOpenAI
 
 from langgraph.prebuilt import ToolNode
 
@@ -36,6 +35,7 @@ from .setup import GraphSetup
 from .propagation import Propagator
 from .reflection import Reflector
 from .signal_processing import SignalProcessor
+from .latency_model import get_latency_model
 
 
 def create_llm_by_provider(provider: str, model: str, backend_url: str, temperature: float, max_tokens: int, timeout: int, api_key: str = None):
@@ -67,6 +67,7 @@ def create_llm_by_provider(provider: str, model: str, backend_url: str, temperat
             raise ValueError("使用Google需要设置GOOGLE_API_KEY环境变量或在数据库中配置API Key")
 
         # 传递 base_url 参数，使厂家配置的 default_base_url 生效
+        from tradingagents.llm_adapters.google_openai_adapter import ChatGoogleOpenAI
         return ChatGoogleOpenAI(
             model=model,
             google_api_key=google_api_key,
@@ -81,6 +82,7 @@ def create_llm_by_provider(provider: str, model: str, backend_url: str, temperat
         dashscope_api_key = api_key or os.getenv('DASHSCOPE_API_KEY')
 
         # 传递 base_url 参数，使厂家配置的 default_base_url 生效
+        from tradingagents.llm_adapters.dashscope_openai_adapter import ChatDashScopeOpenAI
         return ChatDashScopeOpenAI(
             model=model,
             api_key=dashscope_api_key,  # 🔥 传递 API Key
@@ -141,6 +143,7 @@ def create_llm_by_provider(provider: str, model: str, backend_url: str, temperat
         )
 
     elif provider.lower() == "anthropic":
+        from langchain_anthropic import ChatAnthropic
         return ChatAnthropic(
             model=model,
             base_url=backend_url,
@@ -190,6 +193,19 @@ def create_llm_by_provider(provider: str, model: str, backend_url: str, temperat
         )
 
 
+@dataclass
+class RunContext:
+    """单次 propagate 的运行状态
+
+    与已编译的图分离保存（线程本地），同一个 TradingAgentsGraph 实例
+    可以被多个线程并发 propagate 而不会互相覆盖 ticker / curr_state。
+    """
+    ticker: Optional[str] = None
+    trade_date: Optional[str] = None
+    task_id: Optional[str] = None
+    curr_state: Optional[Dict[str, Any]] = None
+
+
 class TradingAgentsGraph:
     """Main class that orchestrates the trading agents framework."""
 
@@ -208,6 +224,7 @@ class TradingAgentsGraph:
         """
         self.debug = debug
         self.config = config or DEFAULT_CONFIG
+        self.selected_analysts = list(selected_analysts)
 
         # Update the interface's config
         set_config(self.config)
@@ -360,6 +377,7 @@ class TradingAgentsGraph:
             logger.info(f"🔧 [Anthropic-快速模型] max_tokens={quick_max_tokens}, temperature={quick_temperature}, timeout={quick_timeout}s")
             logger.info(f"🔧 [Anthropic-深度模型] max_tokens={deep_max_tokens}, temperature={deep_temperature}, timeout={deep_timeout}s")
 
+            from langchain_anthropic import ChatAnthropic
             self.deep_thinking_llm = ChatAnthropic(
                 model=self.config["deep_think_llm"],
                 base_url=self.config["backend_url"],
@@ -407,6 +425,7 @@ class TradingAgentsGraph:
             else:
                 logger.info(f"🔧 [Google AI] 未配置 backend_url，使用默认端点")
 
+            from tradingagents.llm_adapters.google_openai_adapter import ChatGoogleOpenAI
             self.deep_thinking_llm = ChatGoogleOpenAI(
                 model=self.config["deep_think_llm"],
                 google_api_key=google_api_key,
@@ -470,6 +489,7 @@ class TradingAgentsGraph:
             logger.info(f"   request_timeout: {deep_timeout}")
             logger.info("=" * 80)
 
+            from tradingagents.llm_adapters.dashscope_openai_adapter import ChatDashScopeOpenAI
             self.deep_thinking_llm = ChatDashScopeOpenAI(
                 model=self.config["deep_think_llm"],
                 api_key=dashscope_api_key,  # 🔥 传递 API Key
@@ -804,13 +824,52 @@ class TradingAgentsGraph:
         self.signal_processor = SignalProcessor(self.quick_thinking_llm)
 
         # State tracking
-        self.curr_state = None
-        self.ticker = None
-        self.log_states_dict = {}  # date to full state dict
+        # 每次运行的状态保存在线程本地的 RunContext 中，图实例本身只读，可在任务之间共享
+        self._run_local = threading.local()
+        self._log_states_lock = threading.Lock()
+        self._log_states: Dict[str, Dict[str, Any]] = {}  # ticker -> {date: full state dict}
 
         # Set up the graph
         self.graph = self.graph_setup.setup_graph(selected_analysts)
 
+    @property
+    def run_context(self) -> RunContext:
+        """当前线程最近一次 propagate 的运行状态"""
+        context = getattr(self._run_local, "context", None)
+        if context is None:
+            context = self._run_local.context = RunContext()
+        return context
+
+    @property
+    def curr_state(self) -> Optional[Dict[str, Any]]:
+        return self.run_context.curr_state
+
+    @curr_state.setter
+    def curr_state(self, value: Optional[Dict[str, Any]]):
+        self.run_context.curr_state = value
+
+    @property
+    def ticker(self) -> Optional[str]:
+        return self.run_context.ticker
+
+    @ticker.setter
+    def ticker(self, value: Optional[str]):
+        self.run_context.ticker = value
+
+    @property
+    def log_states_dict(self) -> Dict[str, Any]:
+        """当前股票的 date -> full state dict"""
+        with self._log_states_lock:
+            return self._log_states.setdefault(str(self.ticker), {})
+
+    def activate(self):
+        """把本实例的配置重新应用到全局配置（dataflows 接口与 Toolkit 类级配置）
+
+        从图池复用实例时调用，效果与重新构造实例一致。
+        """
+        set_config(self.config)
+        Toolkit.update_config(self.config)
+
     def _create_tool_nodes(self) -> Dict[str, ToolNode]:
         """Create tool nodes for different data sources.
 
@@ -885,8 +944,11 @@ class TradingAgentsGraph:
         logger.debug(f"🔍 [GRAPH DEBUG] 接收到的trade_date: '{trade_date}' (类型: {type(trade_date)})")
         logger.debug(f"🔍 [GRAPH DEBUG] 接收到的task_id: '{task_id}'")
 
-        self.ticker = company_name
-        logger.debug(f"🔍 [GRAPH DEBUG] 设置self.ticker: '{self.ticker}'")
+        # 本次运行的状态放在线程本地的 RunContext 中，不修改共享的图实例
+        run = self._run_local.context = RunContext(
+            ticker=company_name, trade_date=str(trade_date), task_id=task_id
+        )
+        logger.debug(f"🔍 [GRAPH DEBUG] 设置run.ticker: '{run.ticker}'")
 
         # Initialize state
         logger.debug(f"🔍 [GRAPH DEBUG] 创建初始状态，传递参数: company_name='{company_name}', trade_date='{trade_date}'")
@@ -902,11 +964,11 @@ class TradingAgentsGraph:
         current_node_start = None  # 当前节点开始时间
         current_node_name = None  # 当前节点名称
 
-        # 保存task_id用于后续保存性能数据
-        self._current_task_id = task_id
-
         # 根据是否有进度回调选择不同的stream_mode
         args = self.propagator.get_graph_args(use_progress_callback=bool(progress_callback))
+        if task_id:
+            # 节点包装按 task_id 发布进度事件（见 progress_events.py）
+            args["config"].setdefault("configurable", {})["task_id"] = task_id
 
         if self.debug:
             # Debug mode with tracing and progress updates
@@ -937,7 +999,7 @@ class TradingAgentsGraph:
                         final_state = init_agent_state.copy()
                     for node_name, node_update in chunk.items():
                         if not node_name.startswith('__'):
-                            final_state.update(node_update)
+                            self._accumulate_update(final_state, node_update)
                 else:
                     # values 模式：chunk = {"messages": [...], ...}
                     if len(chunk.get("messages", [])) > 0:
@@ -979,7 +1041,7 @@ class TradingAgentsGraph:
                         final_state = init_agent_state.copy()
                     for node_name, node_update in chunk.items():
                         if not node_name.startswith('__'):
-                            final_state.update(node_update)
+                            self._accumulate_update(final_state, node_update)
             else:
                 # 原有的invoke模式（也需要计时）
                 logger.info("⏱️ 使用 invoke 模式执行分析（无进度回调）")
@@ -1006,7 +1068,7 @@ class TradingAgentsGraph:
                         final_state = init_agent_state.copy()
                     for node_name, node_update in chunk.items():
                         if not node_name.startswith('__'):
-                            final_state.update(node_update)
+                            self._accumulate_update(final_state, node_update)
 
         # 记录最后一个节点的时间
         if current_node_name and current_node_start:
@@ -1014,6 +1076,10 @@ class TradingAgentsGraph:
             node_timings[current_node_name] = elapsed
             logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
 
+        # 并行分析师模式：各分支在子图内自行计时，覆盖按 chunk 到达顺序推算的耗时
+        if final_state and final_state.get("analyst_timings"):
+            node_timings.update(final_state["analyst_timings"])
+
         # 计算总时间
         total_elapsed = time.time() - total_start_time
 
@@ -1033,11 +1099,14 @@ class TradingAgentsGraph:
         # 将性能数据添加到状态中
         final_state['performance_metrics'] = performance_data
 
+        # 记录到耗时模型，用于后续任务的预估时长和队列调度
+        self._record_latency(performance_data)
+
         # Store current state for reflection
-        self.curr_state = final_state
+        run.curr_state = final_state
 
         # Log state
-        self._log_state(trade_date, final_state)
+        self._log_state(trade_date, final_state, ticker=company_name)
 
         # 获取模型信息
         model_info = ""
@@ -1118,6 +1187,7 @@ class TradingAgentsGraph:
                 'Risky Analyst': "🔥 激进风险评估",
                 'Safe Analyst': "🛡️ 保守风险评估",
                 'Neutral Analyst': "⚖️ 中性风险评估",
+                'Risk Round Merge': None,
                 'Risk Judge': "🎯 风险经理",
             }
 
@@ -1141,6 +1211,25 @@ class TradingAgentsGraph:
         except Exception as e:
             logger.error(f"❌ 进度更新失败: {e}", exc_info=True)
 
+    @staticmethod
+    def _accumulate_update(final_state: Dict[str, Any], node_update: Dict[str, Any]):
+        """将 updates 模式下的节点增量合并到累积状态（analyst_timings 需按键合并）"""
+        if not node_update:
+            return
+        for key, value in node_update.items():
+            if key == "analyst_timings" and isinstance(value, dict):
+                final_state[key] = {**(final_state.get(key) or {}), **value}
+            else:
+                final_state[key] = value
+
+    def _record_latency(self, performance_data: Dict[str, Any]) -> None:
+        """把本次运行的耗时写入耗时模型（失败不影响分析结果）"""
+        try:
+            analysts = getattr(self, "selected_analysts", None) or self.config.get("selected_analysts", [])
+            get_latency_model().record_run(self.config, analysts, performance_data)
+        except Exception as e:
+            logger.warning(f"⚠️ [耗时模型] 记录失败: {e}")
+
     def _build_performance_data(self, node_timings: Dict[str, float], total_elapsed: float) -> Dict[str, Any]:
         """构建性能数据结构
 
@@ -1332,9 +1421,10 @@ class TradingAgentsGraph:
         logger.info(f"  • 快速思考模型: {self.config.get('quick_think_llm', 'unknown')}")
         logger.info("=" * 80)
 
-    def _log_state(self, trade_date, final_state):
+    def _log_state(self, trade_date, final_state, ticker=None):
         """Log the final state to a JSON file."""
-        self.log_states_dict[str(trade_date)] = {
+        ticker = ticker or self.ticker
+        entry = {
             "company_of_interest": final_state["company_of_interest"],
             "trade_date": final_state["trade_date"],
             "market_report": final_state["market_report"],
@@ -1364,32 +1454,38 @@ class TradingAgentsGraph:
             "final_trade_decision": final_state["final_trade_decision"],
         }
 
-        # Save to file
-        directory = Path(f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/")
+        # Save to file（共享实例上同一股票可能并发运行，写文件时持锁）
+        directory = Path(f"eval_results/{ticker}/TradingAgentsStrategy_logs/")
         directory.mkdir(parents=True, exist_ok=True)
 
-        with open(
-            f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/full_states_log.json",
-            "w",
-        ) as f:
-            json.dump(self.log_states_dict, f, indent=4)
+        with self._log_states_lock:
+            log_states = self._log_states.setdefault(str(ticker), {})
+            log_states[str(trade_date)] = entry
+            with open(directory / "full_states_log.json", "w") as f:
+                json.dump(log_states, f, indent=4)
 
-    def reflect_and_remember(self, returns_losses):
-        """Reflect on decisions and update memory based on returns."""
+    def reflect_and_remember(self, returns_losses, state=None):
+        """Reflect on decisions and update memory based on returns.
+
+        Args:
+            returns_losses: 收益/亏损
+            state: 要反思的最终状态，默认使用当前线程最近一次 propagate 的结果
+        """
+        state = state if state is not None else self.curr_state
         self.reflector.reflect_bull_researcher(
-            self.curr_state, returns_losses, self.bull_memory
+            state, returns_losses, self.bull_memory
         )
         self.reflector.reflect_bear_researcher(
-            self.curr_state, returns_losses, self.bear_memory
+            state, returns_losses, self.bear_memory
         )
         self.reflector.reflect_trader(
-            self.curr_state, returns_losses, self.trader_memory
+            state, returns_losses, self.trader_memory
         )
         self.reflector.reflect_invest_judge(
-            self.curr_state, returns_losses, self.invest_judge_memory
+            state, returns_losses, self.invest_judge_memory
         )
         self.reflector.reflect_risk_manager(
-            self.curr_state, returns_losses, self.risk_manager_memory
+            state, returns_losses, self.risk_manager_memory
         )
 
     def process_signal(self, full_signal, stock_symbol=None):
@@ -1,5 +1,10 @@
 # LLM Adapters for TradingAgents
-from .dashscope_openai_adapter import ChatDashScopeOpenAI
-from .google_openai_adapter import ChatGoogleOpenAI
+# 适配器在第一次访问时才导入，避免加载未使用的 LLM SDK（见 tradingagents/utils/lazy_imports.py）
+from tradingagents.utils.lazy_imports import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(globals(), {}, required={
+    "ChatDashScopeOpenAI": (".dashscope_openai_adapter", "ChatDashScopeOpenAI"),
+    "ChatGoogleOpenAI": (".google_openai_adapter", "ChatGoogleOpenAI"),
+})
 
 __all__ = ["ChatDashScopeOpenAI", "ChatGoogleOpenAI"]
@@ -0,0 +1,93 @@
+"""
+包级延迟导入（PEP 562）
+
+tradingagents.dataflows、providers 等包的 __init__ 以前在导入时就加载全部数据源
+（yfinance、akshare、tushare、baostock、stockstats、新闻模块、interface.py ……），
+FastAPI 应用、每个 worker 和 CLI 即使只用到其中一个也要为全部付出启动时间。
+
+lazy_exports 为包生成模块级 __getattr__ / __dir__：
+- 导出名在第一次访问时才导入对应子模块，结果写回包的命名空间，之后是普通属性访问
+- 与原来的 ``try: from .x import Y except ImportError: Y = None`` 语义一致：
+  依赖缺失时导出值为 None，*_AVAILABLE 标志为 False
+- 未列出的名字如果是子模块（如 ``dataflows.interface``）同样按需导入
+- 重新导出子包的 *_AVAILABLE 标志时应写在 flags 中（而不是 exports）：子包导入失败时
+  exports 中的值为 None，flags 始终为 bool；需要在导入时就确定的标志用 module_available()
+
+使用方法（在包的 __init__.py 中）：
+    from tradingagents.utils.lazy_imports import lazy_exports
+
+    _EXPORTS = {"AKShareProvider": (".akshare", "AKShareProvider")}
+    _FLAGS = {"AKSHARE_AVAILABLE": "AKShareProvider"}
+
+    __getattr__, __dir__ = lazy_exports(globals(), _EXPORTS, _FLAGS)
+    __all__ = [*_EXPORTS, *_FLAGS]
+"""
+
+import importlib
+import importlib.util
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def lazy_exports(
+    namespace: Dict[str, Any],
+    exports: Dict[str, Tuple[str, str]],
+    flags: Optional[Dict[str, str]] = None,
+    required: Optional[Dict[str, Tuple[str, str]]] = None,
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    生成包的 __getattr__ / __dir__
+
+    Args:
+        namespace: 包的 globals()
+        exports: 导出名 -> (模块路径（可相对包）, 属性名)；导入失败时值为 None
+        flags: 可用性标志名 -> 导出名；该导出可用（不为 None）时为 True
+        required: 同 exports，但导入失败时直接抛出异常（原来没有 try/except 的导入）
+
+    Returns:
+        (__getattr__, __dir__)
+    """
+    package = namespace["__name__"]
+    flags = flags or {}
+    required = required or {}
+
+    def _import(module_name: str):
+        return importlib.import_module(module_name, package)
+
+    def __getattr__(name: str) -> Any:
+        if name in exports:
+            module_name, attr = exports[name]
+            try:
+                value = getattr(_import(module_name), attr)
+            except (ImportError, AttributeError):
+                value = None
+        elif name in required:
+            module_name, attr = required[name]
+            value = getattr(_import(module_name), attr)
+        elif name in flags:
+            export = flags[name]
+            value = (namespace[export] if export in namespace else __getattr__(export)) is not None
+        elif name.startswith("__"):
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        else:
+            try:
+                return _import(f".{name}")
+            except ModuleNotFoundError as e:
+                if e.name != f"{package}.{name}":
+                    raise
+                raise AttributeError(f"module {package!r} has no attribute {name!r}") from None
+
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports) | set(flags) | set(required))
+
+    return __getattr__, __dir__
+
+
+def module_available(name: str) -> bool:
+    """不导入模块，检查顶层依赖（如 ``yfinance``）是否已安装"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
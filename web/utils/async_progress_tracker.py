@@ -2,6 +2,9 @@
 """
 异步进度跟踪器
 支持Redis和文件两种存储方式，前端定时轮询获取进度
+
+进度以增量事件追加到任务的事件流（Redis Stream 或 JSONL 文件，见 app.services.progress.stream），
+不再每次更新都重写完整文档；get_progress_by_id 读取时折叠为快照。
 """
 
 import json
@@ -14,6 +17,12 @@ from pathlib import Path
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
+from app.services.progress.stream import (
+    DEFAULT_FILE_DIR,
+    ProgressStreamWriter,
+    STREAM_KEY_PREFIX,
+    read_progress_snapshot,
+)
 logger = get_logger('async_progress')
 
 def safe_serialize(obj):
@@ -105,11 +114,7 @@ class AsyncProgressTracker:
         # 尝试初始化Redis，失败则使用文件
         self.redis_client = None
         self.use_redis = self._init_redis()
-        
-        if not self.use_redis:
-            # 使用文件存储
-            self.progress_file = f"./data/progress_{analysis_id}.json"
-            os.makedirs(os.path.dirname(self.progress_file), exist_ok=True)
+        self._stream = ProgressStreamWriter(analysis_id, redis_client=self.redis_client if self.use_redis else None)
         
         # 保存初始状态
         self._save_progress()
@@ -495,60 +500,20 @@ class AsyncProgressTracker:
 
         return remaining
     
-    def _save_progress(self):
-        """保存进度到存储"""
+    def _save_progress(self, final: bool = False):
+        """把当前进度提交到事件流（只写出变化的字段，按最小间隔合并）"""
         try:
             current_step_name = self.progress_data.get('current_step_name', '未知')
             progress_pct = self.progress_data.get('progress_percentage', 0)
             status = self.progress_data.get('status', 'running')
 
-            if self.use_redis:
-                # 保存到Redis（安全序列化）
-                key = f"progress:{self.analysis_id}"
-                safe_data = safe_serialize(self.progress_data)
-                data_json = json.dumps(safe_data, ensure_ascii=False)
-                self.redis_client.setex(key, 3600, data_json)  # 1小时过期
-
-                logger.info(f"📊 [Redis写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [Redis详情] 键: {key}, 数据大小: {len(data_json)} 字节")
-            else:
-                # 保存到文件（安全序列化）
-                safe_data = safe_serialize(self.progress_data)
-                with open(self.progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(safe_data, f, ensure_ascii=False, indent=2)
-
-                logger.info(f"📊 [文件写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [文件详情] 路径: {self.progress_file}")
+            # safe_serialize 生成新的字典，事件流以它作为下一次增量的比较基准
+            self._stream.publish(safe_serialize(self.progress_data), final=final)
 
+            logger.debug(f"📊 [进度事件] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}% "
+                         f"({'Redis' if self.use_redis else '文件'})")
         except Exception as e:
             logger.error(f"📊 [异步进度] 保存失败: {e}")
-            # 尝试备用存储方式
-            try:
-                if self.use_redis:
-                    # Redis失败，尝试文件存储
-                    logger.warning(f"📊 [异步进度] Redis保存失败，尝试文件存储")
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    os.makedirs(os.path.dirname(backup_file), exist_ok=True)
-                    safe_data = safe_serialize(self.progress_data)
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(safe_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 文件保存成功: {backup_file}")
-                else:
-                    # 文件存储失败，尝试简化数据
-                    logger.warning(f"📊 [异步进度] 文件保存失败，尝试简化数据")
-                    simplified_data = {
-                        'analysis_id': self.analysis_id,
-                        'status': self.progress_data.get('status', 'unknown'),
-                        'progress_percentage': self.progress_data.get('progress_percentage', 0),
-                        'last_message': str(self.progress_data.get('last_message', '')),
-                        'last_update': self.progress_data.get('last_update', time.time())
-                    }
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(simplified_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 简化数据保存成功: {backup_file}")
-            except Exception as backup_e:
-                logger.error(f"📊 [异步进度] 备用存储也失败: {backup_e}")
     
     def get_progress(self) -> Dict[str, Any]:
         """获取当前进度"""
@@ -570,7 +535,7 @@ class AsyncProgressTracker:
                 logger.warning(f"📊 [异步进度] 结果序列化失败: {e}")
                 self.progress_data['raw_results'] = str(results)  # 最后的fallback
 
-        self._save_progress()
+        self._save_progress(final=True)
         logger.info(f"📊 [异步进度] 分析完成: {self.analysis_id}")
 
         # 从日志系统注销
@@ -585,7 +550,7 @@ class AsyncProgressTracker:
         self.progress_data['status'] = 'failed'
         self.progress_data['last_message'] = f"分析失败: {error_message}"
         self.progress_data['last_update'] = time.time()
-        self._save_progress()
+        self._save_progress(final=True)
         logger.error(f"📊 [异步进度] 分析失败: {self.analysis_id}, 错误: {error_message}")
 
         # 从日志系统注销
@@ -629,14 +594,19 @@ def get_progress_by_id(analysis_id: str) -> Optional[Dict[str, Any]]:
                         decode_responses=True
                     )
 
-                key = f"progress:{analysis_id}"
-                data = redis_client.get(key)
-                if data:
-                    return json.loads(data)
+                # 折叠事件流（兼容只有旧的 progress:{analysis_id} 完整文档的情况）
+                progress_data = read_progress_snapshot(analysis_id, redis_client=redis_client)
+                if progress_data:
+                    return progress_data
             except Exception as e:
                 logger.debug(f"📊 [异步进度] Redis读取失败: {e}")
 
-        # 尝试文件
+        # 尝试文件事件流
+        progress_data = read_progress_snapshot(analysis_id)
+        if progress_data:
+            return progress_data
+
+        # 兼容旧的完整文档文件
         progress_file = f"./data/progress_{analysis_id}.json"
         if os.path.exists(progress_file):
             with open(progress_file, 'r', encoding='utf-8') as f:
@@ -693,25 +663,22 @@ def get_latest_analysis_id() -> Optional[str]:
                         decode_responses=True
                     )
 
-                # 获取所有progress键
-                keys = redis_client.keys("progress:*")
+                # 获取所有进度事件流，按最后一个事件的ID（毫秒时间戳）找到最新的
+                keys = redis_client.keys(f"{STREAM_KEY_PREFIX}*")
                 if not keys:
                     return None
 
-                # 获取每个键的数据，找到最新的
                 latest_time = 0
                 latest_id = None
 
                 for key in keys:
                     try:
-                        data = redis_client.get(key)
-                        if data:
-                            progress_data = json.loads(data)
-                            last_update = progress_data.get('last_update', 0)
-                            if last_update > latest_time:
-                                latest_time = last_update
-                                # 从键名中提取analysis_id (去掉"progress:"前缀)
-                                latest_id = key.replace('progress:', '')
+                        entries = redis_client.xrevrange(key, count=1)
+                        if entries:
+                            last_event_ms = int(entries[0][0].split('-')[0])
+                            if last_event_ms > latest_time:
+                                latest_time = last_event_ms
+                                latest_id = key[len(STREAM_KEY_PREFIX):]
                     except Exception:
                         continue
 
@@ -725,16 +692,20 @@ def get_latest_analysis_id() -> Optional[str]:
         # 如果Redis失败或未启用，尝试从文件查找
         data_dir = Path("data")
         if data_dir.exists():
-            progress_files = list(data_dir.glob("progress_*.json"))
+            progress_files = list(Path(DEFAULT_FILE_DIR).glob("*.events.jsonl")) + list(data_dir.glob("progress_*.json"))
             if progress_files:
                 # 按修改时间排序，获取最新的
                 latest_file = max(progress_files, key=lambda f: f.stat().st_mtime)
                 # 从文件名提取analysis_id
                 filename = latest_file.name
-                if filename.startswith("progress_") and filename.endswith(".json"):
+                if filename.endswith(".events.jsonl"):
+                    analysis_id = filename[:-len(".events.jsonl")]
+                elif filename.startswith("progress_") and filename.endswith(".json"):
                     analysis_id = filename[9:-5]  # 去掉前缀和后缀
-                    logger.debug(f"📊 [恢复分析] 从文件找到最新分析ID: {analysis_id}")
-                    return analysis_id
+                else:
+                    return None
+                logger.debug(f"📊 [恢复分析] 从文件找到最新分析ID: {analysis_id}")
+                return analysis_id
 
         return None
     except Exception as e: